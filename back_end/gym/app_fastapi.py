@@ -8,13 +8,23 @@ from fastapi import FastAPI, HTTPException
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
 from starlette.middleware.sessions import SessionMiddleware
+from starlette.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 
 # --- Importaciones Corregidas ---
 try:
     # Usar importación relativa (. significa desde el mismo directorio gym)
-    from .middlewares import AuthenticationMiddleware
+    from .middlewares import AuthenticationMiddleware, RequestIdMiddleware
+    from .utils.logging_setup import setup_logging
     from .services.fitbit_scheduler import start_scheduler # Asumiendo que está en services/
+    from .services.db_pool import get_pool, close_pool
+    from .services.async_db_pool import open_async_pool, close_async_pool
+    from .services.migrations import AUTO_MIGRATE, assert_schema_current, run_migrations
+    from .services.auth_service import get_google_verifier
+    from .config import (RESPONSE_COMPRESSION, RESPONSE_COMPRESSION_LEVEL,
+                         RESPONSE_COMPRESSION_MIN_SIZE)
+    from .utils.compression import add_compression_middleware
+    from .utils.json_response import FastJSONResponse
 except ImportError as e:
     # Log crítico si falla importación esencial
     logging.critical(f"Error crítico importando módulos locales: {e}", exc_info=True)
@@ -27,20 +37,11 @@ except ImportError as e:
 load_dotenv()
 
 
-# --- Configuración de Logging (Nivel DEBUG) ---
-logging.basicConfig(
-    level=logging.DEBUG, # <-- ASEGÚRATE QUE SEA DEBUG
-    format='%(asctime)s - %(name)s [%(levelname)s] - %(message)s', # Añadido levelname
-    handlers=[
-        logging.StreamHandler(sys.stdout), # Log a consola stdout
-        # logging.FileHandler('app.log', encoding='utf-8') # Opcional: guardar en archivo
-    ]
-)
-# Configurar logging para librerías externas si son muy ruidosas
-logging.getLogger('uvicorn').setLevel(logging.INFO)
-logging.getLogger('uvicorn.access').setLevel(logging.WARNING)
-logging.getLogger('fastapi').setLevel(logging.INFO)
-logging.getLogger('watchfiles').setLevel(logging.WARNING)
+# --- Configuración de Logging ---
+# JSON con request_id, escritura en un hilo aparte (QueueListener) y niveles por
+# logger desde el entorno (LOG_LEVEL, LOG_LEVELS, LOG_FORMAT, LOG_DEBUG_SAMPLE_RATE).
+# Ver utils/logging_setup.py.
+setup_logging()
 
 logger = logging.getLogger(__name__) # Logger para este archivo
 
@@ -51,6 +52,20 @@ logger = logging.getLogger(__name__) # Logger para este archivo
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     scheduler = None
+    # Abrir los pools al arrancar: el síncrono (scheduler/threadpool) y el asíncrono (rutas)
+    get_pool()
+    await open_async_pool()
+    # Aplicar migraciones pendientes (back_end/gym/migrations) antes de servir peticiones
+    if AUTO_MIGRATE:
+        try:
+            applied = await run_in_threadpool(run_migrations)
+            if applied: logger.info(f"✅ Migraciones aplicadas: {applied}")
+        except Exception as e:
+            logger.error(f"💥 Error aplicando migraciones: {str(e)}", exc_info=True)
+    # Fallar al arrancar si el esquema va por detrás del código (SchemaOutOfDateError)
+    await run_in_threadpool(assert_schema_current)
+    # Descargar las claves de Google en segundo plano: el primer login no espera a la red
+    get_google_verifier().refresh_in_background()
     try:
         # Asegúrate que start_scheduler está correctamente importado arriba
         scheduler = start_scheduler()
@@ -69,8 +84,11 @@ async def lifespan(app: FastAPI):
         except Exception as e:
             logger.error(f"💥 Error deteniendo Fitbit scheduler: {str(e)}")
 
-# Inicializar FastAPI
-app = FastAPI(lifespan=lifespan)
+    await close_async_pool()
+    close_pool()
+
+# Inicializar FastAPI (JSON con orjson si está instalado, ver utils/json_response.py)
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
 
 # Configurar CORS - MEJORADA
 cors_origins_str = os.getenv('CORS_ORIGINS', 'http://localhost,http://localhost:3000,http://localhost:5050') # Valor por defecto más permisivo
@@ -113,6 +131,13 @@ except NameError:
      # Considera detener la app si el middleware es esencial
      # sys.exit("Middleware de autenticación no pudo ser añadido.")
 
+# Compresión gzip/brotli de las respuestas grandes (fuera de auth y sesiones: comprime el cuerpo final)
+if RESPONSE_COMPRESSION:
+    add_compression_middleware(app, RESPONSE_COMPRESSION_MIN_SIZE, RESPONSE_COMPRESSION_LEVEL)
+
+# request_id por petición (el último añadido es el más externo: cubre también CORS y sesiones)
+app.add_middleware(RequestIdMiddleware)
+
 
 # Importar routers (usando importaciones relativas)
 # --- Importaciones Corregidas ---
@@ -125,6 +150,7 @@ try:
     from .routes import profile as profile_routes
     from .routes import routine as routine_routes
     from .routes import login_handler as login_routes  # NUEVO: Importar login_handler.py
+    from .routes import importer as importer_routes
 
     logger.info("Incluyendo routers...")
     app.include_router(login_routes.router)  # NUEVO: Incluir login_handler primero
@@ -134,6 +160,7 @@ try:
     app.include_router(profile_routes.router)
     app.include_router(chatbot_routes.router)
     app.include_router(auth_routes.router)
+    app.include_router(importer_routes.router)
     logger.info("✅ Routers incluidos.")
 # --- Fin Importaciones Corregidas ---
 except ImportError as e:
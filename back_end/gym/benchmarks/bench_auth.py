@@ -0,0 +1,54 @@
+# Archivo: benchmarks/bench_auth.py
+"""
+Micro-benchmark del coste de autenticación por petición (solo JWT, sin BD).
+
+Compara:
+  - antes:   el token se decodificaba dos veces (middleware + get_current_user),
+             sin caché: 2 x decode_token.
+  - después: get_token_claims verifica una vez por petición y verify_token sirve
+             los claims desde CLAIMS_CACHE cuando el token ya se vio.
+
+Uso:
+    python -m back_end.gym.benchmarks.bench_auth [iteraciones]
+"""
+
+import sys
+import timeit
+
+from starlette.requests import Request
+
+from back_end.gym.middlewares import get_token_claims
+from back_end.gym.services.jwt_service import (CLAIMS_CACHE, create_access_token,
+                                               decode_token)
+
+
+def _request(token):
+    scope = {"type": "http", "headers": [(b"authorization", f"Bearer {token}".encode())]}
+    return Request(scope)
+
+
+def main(iterations=20000):
+    token = create_access_token({"sub": "42", "email": "bench@example.com"})
+
+    def before():
+        decode_token(token)  # AuthenticationMiddleware.dispatch
+        decode_token(token)  # get_current_user (request.state sin user_id)
+
+    def after():
+        request = _request(token)
+        get_token_claims(request)  # middleware
+        get_token_claims(request)  # dependencia: reutiliza request.state.token_claims
+
+    CLAIMS_CACHE.clear()
+    results = {
+        "antes (2 x decode)": timeit.timeit(before, number=iterations),
+        "después (1 x caché)": timeit.timeit(after, number=iterations),
+    }
+    for name, total in results.items():
+        print(f"{name:<22} {total / iterations * 1e6:8.2f} µs/petición")
+    print(f"Aceleración: x{results['antes (2 x decode)'] / results['después (1 x caché)']:.1f}")
+    print(f"Caché: {CLAIMS_CACHE.stats()}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
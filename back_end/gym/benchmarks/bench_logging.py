@@ -0,0 +1,68 @@
+# Archivo: benchmarks/bench_logging.py
+"""
+Coste del logging por petición en el hilo que atiende la petición.
+
+Simula las líneas que dejaba una petición autenticada típica (varias INFO del
+middleware, un DEBUG con payload y una línea de la ruta) y compara:
+  - antes:   basicConfig a nivel DEBUG con StreamHandler síncrono (formato texto).
+  - después: setup_logging (QueueHandler + QueueListener, JSON, nivel INFO).
+  - después con DEBUG activo y muestreo LOG_DEBUG_SAMPLE_RATE=0.05.
+
+La salida va a os.devnull para medir el coste de formateo y la E/S sin depender
+del terminal.
+
+Uso:
+    python -m back_end.gym.benchmarks.bench_logging [peticiones]
+"""
+
+import os
+import sys
+import logging
+import timeit
+
+from back_end.gym.utils.logging_setup import setup_logging, shutdown_logging
+
+PAYLOAD = {"registro": [{"ejercicio": "press banca", "series": [{"repeticiones": 8, "peso": 80}] * 5}]}
+
+middleware_logger = logging.getLogger("back_end.gym.middlewares")
+route_logger = logging.getLogger("back_end.gym.routes.main")
+llm_logger = logging.getLogger("back_end.gym.services.prompt_service")
+
+
+def one_request():
+    middleware_logger.info("Token JWT encontrado en header")
+    middleware_logger.info("Token JWT válido para usuario ID: 42")
+    middleware_logger.debug("Usuario obtenido por ID 42: Bench")
+    llm_logger.debug("JSON parseado: %s", PAYLOAD)
+    route_logger.info("Logs obtenidos (25 registros) exitosamente para usuario 42")
+    middleware_logger.info("Response Status: 200 for '/api/logs'")
+
+
+def _legacy(devnull):
+    shutdown_logging()
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(name)s [%(levelname)s] - %(message)s',
+                        handlers=[logging.StreamHandler(devnull)], force=True)
+
+
+def main(n=20000):
+    results = {}
+    with open(os.devnull, "w") as devnull:
+        configs = [
+            ("antes (DEBUG síncrono)", lambda: _legacy(devnull)),
+            ("cola + JSON (INFO)", lambda: setup_logging(stream=devnull, level="INFO", fmt="json", sample_rate=1.0)),
+            ("cola + JSON (DEBUG 5%)", lambda: setup_logging(stream=devnull, level="DEBUG", fmt="json", sample_rate=0.05)),
+        ]
+        for name, configure in configs:
+            configure()
+            results[name] = timeit.timeit(one_request, number=n) / n * 1e6
+            shutdown_logging()
+    baseline = results["antes (DEBUG síncrono)"]
+    for name, us in results.items():
+        print(f"{name:<26} {us:8.2f} µs/petición  (x{baseline / us:.1f})")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
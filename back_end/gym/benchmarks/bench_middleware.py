@@ -0,0 +1,77 @@
+# Archivo: benchmarks/bench_middleware.py
+"""
+Benchmark de peticiones/segundo en la raíz de la API (GET /api) con el
+middleware de autenticación anterior (BaseHTTPMiddleware + búsqueda lineal de
+rutas públicas) y con el actual (ASGI puro + regex precompilada).
+
+Se usa el router real de routes/main.py. El usuario del token se precarga en
+la caché de usuarios, así que la petición no toca Postgres. Las peticiones van
+en proceso mediante httpx.ASGITransport: se mide la pila ASGI, no la red.
+
+Uso:
+    python -m back_end.gym.benchmarks.bench_middleware [peticiones]
+"""
+
+import asyncio
+import sys
+import time
+
+import httpx
+from fastapi import FastAPI, status
+from fastapi.responses import RedirectResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from back_end.gym.middlewares import PUBLIC_PATHS, AuthenticationMiddleware, get_token_claims
+from back_end.gym.routes import main as main_routes
+from back_end.gym.services.auth_service import cache_user
+from back_end.gym.services.jwt_service import create_access_token
+
+
+class LegacyAuthenticationMiddleware(BaseHTTPMiddleware):
+    """Reproducción del middleware anterior (misma lógica, sin los logs)."""
+
+    async def dispatch(self, request, call_next):
+        if any(request.url.path.startswith(p) for p in PUBLIC_PATHS):
+            return await call_next(request)
+        payload = get_token_claims(request)
+        user_id = payload.get("sub") if payload else None
+        if not user_id:
+            return RedirectResponse(url=f"/login?redirect_url={request.url.path}",
+                                    status_code=status.HTTP_307_TEMPORARY_REDIRECT)
+        request.state.user_id = user_id
+        return await call_next(request)
+
+
+def _app(middleware):
+    app = FastAPI()
+    app.add_middleware(middleware)
+    app.include_router(main_routes.router)
+    return app
+
+
+async def _requests_per_second(app, headers, n):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for _ in range(200):  # calentamiento
+            await client.get("/api", headers=headers)
+        start = time.perf_counter()
+        for _ in range(n):
+            response = await client.get("/api", headers=headers)
+        elapsed = time.perf_counter() - start
+    assert response.status_code == 200, response.status_code
+    return n / elapsed
+
+
+def main(n=5000):
+    cache_user({"id": 42, "google_id": "bench", "display_name": "Bench", "email": "bench@example.com"})
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': '42'})}"}
+    results = {}
+    for name, middleware in (("BaseHTTPMiddleware", LegacyAuthenticationMiddleware),
+                             ("ASGI puro", AuthenticationMiddleware)):
+        results[name] = asyncio.run(_requests_per_second(_app(middleware), headers, n))
+        print(f"{name:<20} {results[name]:9.0f} req/s")
+    print(f"Mejora: {(results['ASGI puro'] / results['BaseHTTPMiddleware'] - 1) * 100:+.1f}%")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
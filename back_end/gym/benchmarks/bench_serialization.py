@@ -0,0 +1,94 @@
+# Archivo: benchmarks/bench_serialization.py
+"""
+Benchmark de serialización y bytes en la red de /api/ejercicios_stats (sin BD).
+
+Usuario grande sintético: 40 ejercicios con 1.500 sesiones cada uno. Compara:
+  - antes:   JSONResponse (json de la biblioteca estándar) con 'datos_agrupados'
+             y fechas convertidas con strftime (la conversión entra en el tiempo).
+  - después: FastJSONResponse (orjson si está instalado) con fechas como date,
+             con y sin 'datos_agrupados' (ahora opcional).
+
+Para cada variante muestra el tiempo de serialización y el tamaño del cuerpo
+sin comprimir, con gzip (nivel 5, como RESPONSE_COMPRESSION_LEVEL) y con
+brotli si está instalado.
+
+Uso:
+    python -m back_end.gym.benchmarks.bench_serialization [repeticiones]
+"""
+
+import sys
+import gzip
+import random
+import timeit
+import datetime
+
+from fastapi.responses import JSONResponse
+
+from back_end.gym.utils.json_response import ORJSON_AVAILABLE, FastJSONResponse
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+EXERCISES = 40
+SESSIONS_PER_EXERCISE = 1_500
+LEVEL = 5
+
+
+def make_entries(seed=42):
+    """Sesiones de cada ejercicio con el formato de 'datos' (fecha como date)."""
+    rng = random.Random(seed)
+    start = datetime.date(2015, 1, 1)
+    grouped = {}
+    for index in range(EXERCISES):
+        entries = []
+        for n in range(SESSIONS_PER_EXERCISE):
+            max_peso = round(rng.uniform(20, 180), 2)
+            entries.append({
+                "fecha": start + datetime.timedelta(days=2 * n + index % 2),
+                "max_peso": max_peso,
+                "avg_peso": round(max_peso * rng.uniform(0.8, 1), 2),
+                "total_reps": float(rng.randint(10, 40)),
+                "volumen": round(max_peso * rng.randint(10, 40), 2),
+                "max_e1rm_session": round(max_peso * rng.uniform(1, 1.3), 2),
+            })
+        grouped[f"ejercicio {index}"] = entries
+    return grouped
+
+
+def content(grouped, agrupados):
+    ejercicio = "ejercicio 0"
+    data = {"success": True, "ejercicios_disponibles": list(grouped), "filtro_ejercicio": ejercicio}
+    if agrupados:
+        data["datos_agrupados"] = grouped
+    data["datos"] = grouped[ejercicio]
+    data["resumen"] = {"total_sesiones": len(grouped[ejercicio]), "progress_percent": 12.5}
+    return data
+
+
+def with_string_dates(grouped):
+    """Mismas sesiones con la fecha ya convertida a texto (como hacía _session_entry)."""
+    return {name: [{**e, "fecha": e["fecha"].strftime('%Y-%m-%d')} for e in entries] for name, entries in grouped.items()}
+
+
+def main(repeat=5):
+    grouped = make_entries()
+    variants = [
+        ("antes: json + agrupados", lambda: JSONResponse(content(with_string_dates(grouped), True)).body),
+        ("después: fast + agrupados", lambda: FastJSONResponse(content(grouped, True)).body),
+        ("después: fast sin agrupados", lambda: FastJSONResponse(content(grouped, False)).body),
+    ]
+    print(f"orjson: {'sí' if ORJSON_AVAILABLE else 'no'} | brotli: {'sí' if brotli else 'no'} | "
+          f"{EXERCISES} ejercicios x {SESSIONS_PER_EXERCISE} sesiones")
+    print(f"{'variante':<28} {'ms':>8} {'bytes':>11} {'gzip':>10} {'brotli':>10}")
+    for name, render in variants:
+        body = render()
+        elapsed = min(timeit.repeat(render, number=1, repeat=repeat))
+        gz = len(gzip.compress(body, compresslevel=LEVEL))
+        br = len(brotli.compress(body, quality=LEVEL)) if brotli else "-"
+        print(f"{name:<28} {elapsed * 1e3:>8.1f} {len(body):>11,} {gz:>10,} {br:>10}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,46 @@
+# Archivo: benchmarks/bench_stats.py
+"""
+Benchmark del cálculo de métricas por sesión (sin BD).
+
+Compara:
+  - antes:   bucle Python por sesión y por serie (compute_session_metrics).
+  - después: motor vectorizado NumPy sobre todas las sesiones (compute_metrics_batch).
+
+Comprueba además que ambos devuelven exactamente lo mismo.
+
+Uso:
+    python -m back_end.gym.benchmarks.bench_stats [repeticiones]
+"""
+
+import sys
+import random
+import timeit
+
+from back_end.gym.services.metrics_engine import compute_metrics_batch
+from back_end.gym.services.session_metrics import compute_session_metrics
+
+SIZES = (1_000, 10_000, 100_000)
+
+
+def make_sessions(count, seed=42):
+    """Sesiones sintéticas de 3 a 6 series, como las devuelve psycopg2 para el JSONB."""
+    rng = random.Random(seed)
+    return [
+        [{"repeticiones": rng.randint(1, 20), "peso": rng.choice((0, 20, 22.5, 40, 61.25, 80, 100, 132.5))}
+         for _ in range(rng.randint(3, 6))]
+        for _ in range(count)
+    ]
+
+
+def main(repeat=3):
+    print(f"{'sesiones':>9} {'antes (ms)':>12} {'después (ms)':>13} {'aceleración':>12}")
+    for size in SIZES:
+        sessions = make_sessions(size)
+        assert [compute_session_metrics(s) for s in sessions] == compute_metrics_batch(sessions)
+        before = min(timeit.repeat(lambda: [compute_session_metrics(s) for s in sessions], number=1, repeat=repeat))
+        after = min(timeit.repeat(lambda: compute_metrics_batch(sessions), number=1, repeat=repeat))
+        print(f"{size:>9} {before * 1e3:>12.1f} {after * 1e3:>13.1f} {before / after:>11.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 3)
@@ -41,6 +41,16 @@ if not all([DB_CONFIG['dbname'], DB_CONFIG['user'], DB_CONFIG['password'], DB_CO
     logger.error("Faltan variables de entorno esenciales para la base de datos (DB_NAME, DB_USER, DB_PASSWORD, DB_HOST, DB_PORT).")
     # Considera lanzar un error si la BD es indispensable: raise EnvironmentError("Faltan variables de BD")
 
+# Configuración del pool de conexiones (compartido por todo el proceso)
+DB_POOL_CONFIG = {
+    'min_size': int(os.getenv('DB_POOL_MIN_SIZE', 1)),
+    'max_size': int(os.getenv('DB_POOL_MAX_SIZE', 10)),
+    'timeout': float(os.getenv('DB_POOL_TIMEOUT', 10)), # Segundos esperando una conexión libre
+    'healthcheck_idle': float(os.getenv('DB_POOL_HEALTHCHECK_IDLE', 30)), # Ping si estuvo ociosa más de N segundos
+}
+# Filas por viaje de los cursores de servidor (lecturas en streaming)
+DB_CURSOR_ITERSIZE = int(os.getenv('DB_CURSOR_ITERSIZE', 2000))
+
 # Configuración de Fitbit
 FITBIT_CLIENT_ID = os.getenv('FITBIT_CLIENT_ID')
 FITBIT_CLIENT_SECRET = os.getenv('FITBIT_CLIENT_SECRET')
@@ -123,4 +133,26 @@ else:
 SECRET_KEY = os.getenv('SECRET_KEY')
 if not SECRET_KEY:
     logger.warning("SECRET_KEY no definida en .env. Usando valor temporal (inseguro para producción).")
-    SECRET_KEY = os.urandom(24).hex() # Genera una temporal si no existe
\ No newline at end of file
+    SECRET_KEY = os.urandom(24).hex() # Genera una temporal si no existe
+
+# Caché en memoria de usuarios resueltos por get_current_user (ver services/auth_service.py)
+USER_CACHE_TTL = float(os.getenv('USER_CACHE_TTL', 60)) # Segundos
+USER_CACHE_MAX_SIZE = int(os.getenv('USER_CACHE_MAX_SIZE', 1024))
+
+# Cálculo de las métricas por sesión de /api/ejercicios_stats:
+#   'columns' -> columnas precalculadas al escribir (services/session_metrics.py)
+#   'numpy'   -> desde el JSONB de series con el motor vectorizado (services/metrics_engine.py)
+#   'sql'     -> agregado en Postgres con jsonb_array_elements (SESSION_AGGREGATE_SQL)
+STATS_ENGINE = os.getenv('STATS_ENGINE', 'columns').lower()
+if STATS_ENGINE not in ('columns', 'numpy', 'sql'):
+    logger.warning(f"STATS_ENGINE '{STATS_ENGINE}' no válido. Usando 'columns'.")
+    STATS_ENGINE = 'columns'
+
+# Caché de respuestas del dashboard (ver services/data_version.py y utils/http_cache.py)
+DASHBOARD_CACHE_TTL = float(os.getenv('DASHBOARD_CACHE_TTL', 300)) # Segundos
+DASHBOARD_CACHE_MAX_SIZE = int(os.getenv('DASHBOARD_CACHE_MAX_SIZE', 512))
+
+# Compresión de respuestas (ver utils/compression.py)
+RESPONSE_COMPRESSION = os.getenv('RESPONSE_COMPRESSION', 'true').lower() in ('1', 'true', 'yes')
+RESPONSE_COMPRESSION_MIN_SIZE = int(os.getenv('RESPONSE_COMPRESSION_MIN_SIZE', 1024)) # Bytes
+RESPONSE_COMPRESSION_LEVEL = int(os.getenv('RESPONSE_COMPRESSION_LEVEL', 5))
@@ -1,19 +1,46 @@
 # back_end/gym/middlewares.py
 
 import os
+import re
+import uuid
 import logging
 from typing import Optional, List, Callable, Dict, Any, Union
 import json
 
 from fastapi import Request, Response, status
 from fastapi.responses import JSONResponse, RedirectResponse  # ¡AQUÍ ESTÁ LA CORRECCIÓN!
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp, Receive, Scope, Send
 
-# NO importar verify_token aquí para evitar el error circular
-# from .services.jwt_service import verify_token
+# jwt_service no importa nada de la app: se importa una vez al cargar el módulo
+# en lugar de en cada petición
+try:
+    from .services.jwt_service import verify_token
+    from .utils.logging_setup import REQUEST_ID
+except ImportError:
+    from services.jwt_service import verify_token
+    from utils.logging_setup import REQUEST_ID
 
 logger = logging.getLogger(__name__)
 
+_UNVERIFIED = object()
+
+
+def get_token_claims(request: Request) -> Optional[Dict[str, Any]]:
+    """
+    Devuelve los claims del JWT 'Authorization: Bearer' de la petición (o None).
+
+    El token se verifica una sola vez por petición: el resultado queda en
+    request.state.token_claims para el resto del middleware y las dependencias.
+    """
+    claims = getattr(request.state, "token_claims", _UNVERIFIED)
+    if claims is _UNVERIFIED:
+        claims = None
+        auth_header = request.headers.get("Authorization")
+        if auth_header and auth_header.startswith("Bearer "):
+            claims = verify_token(auth_header[len("Bearer "):])
+        request.state.token_claims = claims
+    return claims
+
 # Rutas públicas que no requieren autenticación
 PUBLIC_PATHS = [
     "/login",        # Página de login
@@ -32,6 +59,14 @@ PUBLIC_PATHS = [
     "/api/rutina_hoy",
     "/api/log-exercise",
 ]
+# Una sola regex anclada al inicio: mismo resultado que any(path.startswith(p)) en una pasada
+PUBLIC_PATH_RE = re.compile("|".join(re.escape(p) for p in PUBLIC_PATHS))
+
+
+def is_public_path(path: str) -> bool:
+    """True si la ruta empieza por alguno de los prefijos de PUBLIC_PATHS."""
+    return PUBLIC_PATH_RE.match(path) is not None
+
 def validate_telegram_token(request: Request):
     telegram_token = request.headers.get("X-Telegram-Bot-Token")
     expected_token = os.getenv("TELEGRAM_BOT_API_TOKEN")
@@ -47,64 +82,85 @@ def validate_telegram_token(request: Request):
 # Token secreto para autenticar solicitudes desde el bot de Telegram
 TELEGRAM_BOT_API_TOKEN = os.getenv("TELEGRAM_BOT_API_TOKEN")
 
-class AuthenticationMiddleware(BaseHTTPMiddleware):
-    """Middleware para verificar autenticación del usuario en cada solicitud."""
-    
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        """Procesa cada solicitud verificando la autenticación del usuario."""
-        path = request.url.path
-        
-        # Verificar si la ruta es pública
-        is_public_path = any(path.startswith(public_path) for public_path in PUBLIC_PATHS)
-        
-        if is_public_path:
-            logger.info(f"✅ Path '{path}' es público y no requiere autenticación.")
-            response = await call_next(request)
-            logger.info(f"⬅️ Response Status: {response.status_code} for '{path}'")
-            return response
-        
-        # Verificar token JWT del header Authorization
-        auth_header = request.headers.get("Authorization")
-        user_id = None
-        
-        if auth_header and auth_header.startswith("Bearer "):
-            token = auth_header.replace("Bearer ", "")
-            logger.info(f"🔑 Token JWT encontrado en header")
-            
-            # Verificar token y extraer user_id
-            try:
-                # Importar aquí para evitar la importación circular
-                from .services.jwt_service import verify_token
-                payload = verify_token(token)
-                if payload:
-                    user_id = payload.get("sub")
-                    logger.info(f"✅ Token JWT válido para usuario ID: {user_id}")
-            except ImportError as e:
-                logger.error(f"Error importando verify_token: {e}")
-        
+class AuthenticationMiddleware:
+    """
+    Middleware ASGI puro que verifica la autenticación del usuario en cada solicitud.
+
+    No envuelve la respuesta (a diferencia de BaseHTTPMiddleware): las rutas
+    públicas y las autenticadas pasan directamente a la app, y las respuestas en
+    streaming llegan al cliente sin intermediarios.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or is_public_path(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        # Verificar token JWT del header Authorization (una vez; los claims quedan en request.state)
+        request = Request(scope)
+        payload = get_token_claims(request)
+        user_id = payload.get("sub") if payload else None
+
         if not user_id:
-            logger.warning(f"🚦 DECISIÓN: Path '{path}' NO público y SIN token JWT válido. Redirigiendo a /login.")
-            redirect_path = f"/login?redirect_url={request.url.path}"
-            logger.info(f"🔀 Redirigiendo a: {redirect_path}")
-            return RedirectResponse(url=redirect_path, status_code=status.HTTP_307_TEMPORARY_REDIRECT)
-        
-        # Usuario autenticado, continuar con la solicitud
-        # Añadir user_id al estado de la solicitud para usarlo en las dependencias
+            path = scope["path"]
+            logger.info(f"Ruta '{path}' no pública y sin token JWT válido: redirigiendo a /login.")
+            response = RedirectResponse(url=f"/login?redirect_url={path}", status_code=status.HTTP_307_TEMPORARY_REDIRECT)
+            await response(scope, receive, send)
+            return
+
+        # Añadir user_id al estado de la solicitud (scope['state']) para usarlo en las dependencias
         request.state.user_id = user_id
-        response = await call_next(request)
-        logger.info(f"⬅️ Response Status: {response.status_code} for '{path}'")
-        return response
+        await self.app(scope, receive, send)
+
+_REQUEST_ID_RE = re.compile(r"^[\w.-]{1,64}$")
+
+
+class RequestIdMiddleware:
+    """
+    Middleware ASGI que asigna un request_id a cada petición HTTP.
+
+    Reutiliza la cabecera X-Request-ID si es válida (o genera uno), lo deja en
+    el contexto de logging (utils/logging_setup.REQUEST_ID) y lo devuelve en la
+    respuesta.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")
+                break
+        if not request_id or not _REQUEST_ID_RE.match(request_id):
+            request_id = uuid.uuid4().hex
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"x-request-id", request_id.encode())]
+            await send(message)
+
+        token = REQUEST_ID.set(request_id)
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            REQUEST_ID.reset(token)
 
 async def get_current_user(request: Request) -> Optional[Dict[str, Any]]:
     # Verificar si es una solicitud del bot de Telegram
     telegram_token = request.headers.get("X-Telegram-Bot-Token")
     expected_telegram_token = os.getenv("TELEGRAM_BOT_API_TOKEN")
     
-    logger.info(f"Token recibido: {telegram_token}")
-    logger.info(f"Token esperado: {expected_telegram_token}")
-    
     if telegram_token and telegram_token == expected_telegram_token:
-        logger.info("✅ Autenticación con token de Telegram exitosa")
+        logger.debug("Autenticación con token de Telegram correcta")
         return {
             "id": -1,  # ID especial para bot
             "google_id": None,
@@ -118,19 +174,11 @@ async def get_current_user(request: Request) -> Optional[Dict[str, Any]]:
     # Primero intentar obtener user_id del estado (establecido por el middleware)
     user_id = getattr(request.state, "user_id", None)
 
-    # Si no está en el estado, intentar extraerlo del token
+    # Si no está en el estado (rutas públicas), usar los claims del token (verificado una sola vez)
     if not user_id:
-        auth_header = request.headers.get("Authorization")
-        if auth_header and auth_header.startswith("Bearer "):
-            token = auth_header.replace("Bearer ", "")
-            try:
-                # Importar aquí para evitar la importación circular
-                from .services.jwt_service import verify_token
-                payload = verify_token(token)
-                if payload:
-                    user_id = payload.get("sub")
-            except ImportError as e:
-                logger.error(f"Error importando verify_token: {e}")
+        payload = get_token_claims(request)
+        if payload:
+            user_id = payload.get("sub")
 
     if not user_id:
         logger.debug(f"❌ No se encontró token JWT válido o user_id en el estado de la petición.")
@@ -138,10 +186,10 @@ async def get_current_user(request: Request) -> Optional[Dict[str, Any]]:
 
     try:
         # Importar get_user_by_id localmente para evitar importaciones circulares
-        from .services.auth_service import get_user_by_id
+        from .services.async_auth_service import get_user_by_id
         
-        # Obtener usuario de la base de datos
-        user = get_user_by_id(int(user_id))
+        # Obtener usuario de la base de datos (pool asíncrono, no bloquea el event loop)
+        user = await get_user_by_id(int(user_id))
         if user:
             logger.debug(f"✅ Usuario obtenido por ID {user_id}: {user.get('display_name', 'Unknown')}")
             return user
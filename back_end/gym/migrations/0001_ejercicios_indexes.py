@@ -0,0 +1,48 @@
+# 0001: Índices para las consultas calientes de gym.ejercicios
+"""
+(user_id, fecha):            logs por rango, rutina de hoy, reset del día, heatmap, stats
+(user_id, ejercicio, fecha): lista de ejercicios del usuario y stats filtradas por ejercicio
+trigram sobre ejercicio:     búsqueda 'ejercicio ILIKE %texto%' del dashboard
+
+Se crean con CREATE INDEX CONCURRENTLY, que no bloquea los INSERT mientras se
+construye el índice pero no puede ejecutarse dentro de una transacción: la
+migración es no transaccional (TRANSACTIONAL = False, ver services/migrations.py).
+Si una ejecución anterior se cortó a mitad, el índice queda marcado como
+inválido; se borra y se vuelve a crear.
+"""
+
+import logging
+
+from back_end.gym.services.partitions import is_partitioned
+
+logger = logging.getLogger(__name__)
+
+TRANSACTIONAL = False
+
+# Copia fija de services/partitions.EJERCICIOS_INDEXES al escribir esta migración
+EJERCICIOS_INDEXES = [
+    ("idx_ejercicios_user_fecha", "(user_id, fecha)"),
+    ("idx_ejercicios_user_ejercicio_fecha", "(user_id, ejercicio, fecha)"),
+    ("idx_ejercicios_ejercicio_trgm", "USING gin (ejercicio public.gin_trgm_ops)"),
+]
+
+INVALID_INDEX_SQL = """
+    SELECT NOT i.indisvalid FROM pg_index i
+    WHERE i.indexrelid = to_regclass(%s)
+"""
+
+
+def upgrade(conn):
+    with conn.cursor() as cur:
+        cur.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm WITH SCHEMA public")
+        # CONCURRENTLY no se admite sobre tablas particionadas (y allí los índices
+        # los crea la conversión de la 0002 sobre la tabla nueva, aún sin uso)
+        concurrently = "" if is_partitioned(cur) else "CONCURRENTLY"
+        for name, definition in EJERCICIOS_INDEXES:
+            cur.execute(INVALID_INDEX_SQL, (f"gym.{name}",))
+            row = cur.fetchone()
+            if row and row[0]:
+                logger.warning(f"Índice {name} inválido (creación interrumpida): se vuelve a crear.")
+                cur.execute(f"DROP INDEX {concurrently} IF EXISTS gym.{name}")
+            cur.execute(f"CREATE INDEX {concurrently} IF NOT EXISTS {name} ON gym.ejercicios {definition}")
+        cur.execute("ANALYZE gym.ejercicios")
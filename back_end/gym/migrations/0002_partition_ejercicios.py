@@ -0,0 +1,40 @@
+# 0002: gym.ejercicios pasa a estar particionada por mes (RANGE sobre 'fecha')
+"""
+Convierte gym.ejercicios en una tabla particionada (ver services/partition_conversion.py).
+
+En el arranque solo se convierte en línea una tabla pequeña (hasta
+DB_PARTITION_INLINE_MAX_ROWS filas), donde copiar e indexar es inmediato. Con
+una tabla mayor la copia llevaría minutos con la app sin arrancar: la
+migración se registra sin tocar la tabla y la conversión se lanza aparte,
+con la app en marcha:
+
+    python -m back_end.gym.services.partition_conversion
+
+Hasta entonces la tabla sigue sin particionar; el código no depende de ello
+(las consultas filtran 'fecha' por rangos y el scheduler no crea particiones).
+"""
+
+import logging
+
+from back_end.gym.services.partition_conversion import (
+    convert_to_partitioned, is_small)
+from back_end.gym.services.partitions import is_partitioned
+
+logger = logging.getLogger(__name__)
+
+
+def upgrade(conn):
+    with conn.cursor() as cur:
+        if is_partitioned(cur):
+            return
+        cur.execute("SELECT to_regclass('gym.ejercicios_new')")
+        in_progress = cur.fetchone()[0] is not None
+        small = is_small(cur)
+    conn.commit()
+    if small and not in_progress:
+        convert_to_partitioned(conn)
+    else:
+        logger.warning(
+            "gym.ejercicios es demasiado grande para particionarla al arrancar (o ya hay una conversión "
+            "a medias): ejecuta 'python -m back_end.gym.services.partition_conversion' con la app en marcha."
+        )
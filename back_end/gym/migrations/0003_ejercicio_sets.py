@@ -0,0 +1,62 @@
+# 0003: Tabla normalizada gym.ejercicio_sets (una fila por serie) y backfill desde el JSONB
+"""
+Crea gym.ejercicio_sets y la rellena con las series de los registros existentes,
+en lotes con un commit por lote.
+
+El SQL es el de services/exercise_sets.py al escribir esta migración (conversión
+de series con expresión regular; la 0009 las re-convierte con la actual).
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+BACKFILL_BATCH_SIZE = 10000
+
+CREATE_EXERCISE_SETS_SQL = """
+    CREATE TABLE IF NOT EXISTS gym.ejercicio_sets (
+        ejercicio_id INTEGER NOT NULL,
+        set_index SMALLINT NOT NULL,
+        reps INTEGER,
+        weight DOUBLE PRECISION,
+        PRIMARY KEY (ejercicio_id, set_index)
+    )
+"""
+
+BACKFILL_BATCH_SQL = r"""
+    WITH batch AS (
+        SELECT id, repeticiones FROM gym.ejercicios
+        WHERE id > %s ORDER BY id LIMIT %s
+    ), inserted AS (
+        INSERT INTO gym.ejercicio_sets (ejercicio_id, set_index, reps, weight)
+        SELECT e.id, s.ord - 1,
+               CASE WHEN s.serie->>'repeticiones' ~ '^\s*-?\d+(\.\d+)?\s*$'
+                    THEN trunc((s.serie->>'repeticiones')::numeric)::integer END,
+               CASE WHEN s.serie->>'peso' ~ '^\s*-?\d+(\.\d+)?\s*$'
+                    THEN (s.serie->>'peso')::double precision END
+        FROM batch e
+        CROSS JOIN LATERAL jsonb_array_elements(
+            CASE WHEN jsonb_typeof(e.repeticiones) = 'array' THEN e.repeticiones ELSE '[]'::jsonb END
+        ) WITH ORDINALITY AS s(serie, ord)
+        WHERE jsonb_typeof(s.serie) = 'object'
+        ON CONFLICT (ejercicio_id, set_index) DO NOTHING
+        RETURNING 1
+    )
+    SELECT MAX(id), (SELECT COUNT(*) FROM inserted) FROM batch
+"""
+
+
+def upgrade(conn):
+    with conn.cursor() as cur:
+        cur.execute(CREATE_EXERCISE_SETS_SQL)
+    conn.commit()
+    last_id, total = 0, 0
+    with conn.cursor() as cur:
+        while True:
+            cur.execute(BACKFILL_BATCH_SQL, (last_id, BACKFILL_BATCH_SIZE))
+            max_id, inserted = cur.fetchone()
+            conn.commit()
+            if max_id is None:
+                break
+            last_id, total = max_id, total + inserted
+            logger.info(f"Backfill de series: {total} insertadas (último id {last_id}).")
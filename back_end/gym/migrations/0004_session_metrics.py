@@ -0,0 +1,65 @@
+# 0004: Columnas de métricas por sesión en gym.ejercicios y backfill de las filas existentes
+"""
+Añade series_validas, max_peso, avg_peso, total_reps, volumen y max_e1rm
+y las calcula para el histórico por lotes, con un commit por lote.
+ADD COLUMN sin DEFAULT no reescribe la tabla.
+
+El SQL es el de services/session_metrics.py al escribir esta migración; las
+métricas se calculan con compute_session_metrics, la misma definición que
+usan los INSERT.
+"""
+
+import logging
+
+from psycopg2.extras import execute_values
+
+from back_end.gym.services.session_metrics import compute_session_metrics
+
+logger = logging.getLogger(__name__)
+
+BACKFILL_BATCH_SIZE = 5000
+
+ADD_SESSION_METRICS_SQL = """
+    ALTER TABLE gym.ejercicios
+        ADD COLUMN IF NOT EXISTS series_validas SMALLINT,
+        ADD COLUMN IF NOT EXISTS max_peso DOUBLE PRECISION,
+        ADD COLUMN IF NOT EXISTS avg_peso DOUBLE PRECISION,
+        ADD COLUMN IF NOT EXISTS total_reps INTEGER,
+        ADD COLUMN IF NOT EXISTS volumen DOUBLE PRECISION,
+        ADD COLUMN IF NOT EXISTS max_e1rm DOUBLE PRECISION
+"""
+BACKFILL_SELECT_SQL = """
+    SELECT id, fecha, repeticiones FROM gym.ejercicios
+    WHERE id > %s AND series_validas IS NULL
+    ORDER BY id LIMIT %s
+"""
+UPDATE_SESSION_METRICS_SQL = """
+    UPDATE gym.ejercicios e SET
+        series_validas = v.series_validas, max_peso = v.max_peso, avg_peso = v.avg_peso,
+        total_reps = v.total_reps, volumen = v.volumen, max_e1rm = v.max_e1rm
+    FROM (VALUES %s) AS v(id, fecha, series_validas, max_peso, avg_peso, total_reps, volumen, max_e1rm)
+    WHERE e.id = v.id AND e.fecha = v.fecha
+"""
+UPDATE_SESSION_METRICS_TEMPLATE = (
+    "(%s, %s::timestamptz, %s::smallint, %s::double precision, %s::double precision, "
+    "%s::integer, %s::double precision, %s::double precision)"
+)
+
+
+def upgrade(conn):
+    with conn.cursor() as cur:
+        cur.execute(ADD_SESSION_METRICS_SQL)
+    conn.commit()
+    last_id, total = 0, 0
+    with conn.cursor() as cur:
+        while True:
+            cur.execute(BACKFILL_SELECT_SQL, (last_id, BACKFILL_BATCH_SIZE))
+            rows = cur.fetchall()
+            if not rows:
+                break
+            values = [(row_id, fecha) + tuple(compute_session_metrics(series)) for row_id, fecha, series in rows]
+            execute_values(cur, UPDATE_SESSION_METRICS_SQL, values,
+                           template=UPDATE_SESSION_METRICS_TEMPLATE, page_size=len(values))
+            conn.commit()
+            last_id, total = rows[-1][0], total + len(rows)
+            logger.info(f"Backfill de métricas por sesión: {total} filas (último id {last_id}).")
@@ -0,0 +1,45 @@
+# 0005: Tabla gym.exercise_rollups (resumen por usuario y ejercicio) y carga inicial
+"""
+Crea gym.exercise_rollups y la rellena desde las métricas por sesión de
+gym.ejercicios (migración 0004). A partir de aquí la mantienen los INSERT y el
+reset de la rutina (ver services/rollups.py).
+
+El SQL es el de services/rollups.py al escribir esta migración.
+"""
+
+CREATE_ROLLUPS_SQL = """
+    CREATE TABLE IF NOT EXISTS gym.exercise_rollups (
+        user_id VARCHAR(255) NOT NULL,
+        ejercicio VARCHAR(255) NOT NULL,
+        total_sesiones INTEGER NOT NULL DEFAULT 0,
+        max_weight_ever DOUBLE PRECISION,
+        max_volume_session DOUBLE PRECISION,
+        max_reps_session INTEGER,
+        max_e1rm_ever DOUBLE PRECISION,
+        first_fecha TIMESTAMP WITH TIME ZONE,
+        first_max_peso DOUBLE PRECISION,
+        last_fecha TIMESTAMP WITH TIME ZONE,
+        last_max_peso DOUBLE PRECISION,
+        updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (user_id, ejercicio)
+    )
+"""
+
+REBUILD_ALL_ROLLUPS_SQL = """
+    INSERT INTO gym.exercise_rollups (user_id, ejercicio, total_sesiones, max_weight_ever, max_volume_session,
+                                      max_reps_session, max_e1rm_ever, first_fecha, first_max_peso,
+                                      last_fecha, last_max_peso)
+    SELECT user_id, ejercicio, COUNT(*), MAX(max_peso), MAX(volumen), MAX(total_reps), MAX(max_e1rm),
+           MIN(fecha), (ARRAY_AGG(max_peso ORDER BY fecha, id))[1],
+           MAX(fecha), (ARRAY_AGG(max_peso ORDER BY fecha DESC, id DESC))[1]
+    FROM gym.ejercicios
+    WHERE series_validas > 0
+    GROUP BY user_id, ejercicio
+    ON CONFLICT (user_id, ejercicio) DO NOTHING
+"""
+
+
+def upgrade(conn):
+    with conn.cursor() as cur:
+        cur.execute(CREATE_ROLLUPS_SQL)
+        cur.execute(REBUILD_ALL_ROLLUPS_SQL)
@@ -0,0 +1,39 @@
+-- 0006: Tablas de vinculación de Telegram y de tokens de Fitbit
+--
+-- Antes las creaban en caliente generate_link_code (consulta a information_schema
+-- y CREATE TABLE en cada código generado) y save_fitbit_tokens_to_db (CREATE TABLE
+-- + CREATE INDEX antes de cada guardado, también en cada refresco programado).
+-- Ahora esas funciones solo ejecutan DML.
+--
+-- fitbit_tokens existe con dos formas según quién la creó (init-scripts: user_uuid;
+-- routes/profile.py: user_id UNIQUE); se completan ambas columnas para que el
+-- UPSERT por user_id y la migración de cuentas por user_uuid funcionen siempre.
+
+CREATE TABLE IF NOT EXISTS gym.link_codes (
+    code VARCHAR(10) PRIMARY KEY,
+    user_id INTEGER REFERENCES gym.users(id) ON DELETE CASCADE,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    expires_at TIMESTAMP WITH TIME ZONE,
+    used BOOLEAN DEFAULT FALSE
+);
+
+CREATE INDEX IF NOT EXISTS idx_link_codes_user_id ON gym.link_codes (user_id);
+
+CREATE TABLE IF NOT EXISTS gym.fitbit_tokens (
+    id SERIAL PRIMARY KEY,
+    user_id VARCHAR(255) NOT NULL UNIQUE,
+    user_uuid INTEGER REFERENCES gym.users(id) ON DELETE CASCADE,
+    client_id VARCHAR(255) NOT NULL,
+    access_token TEXT NOT NULL,
+    refresh_token TEXT NOT NULL,
+    expires_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+ALTER TABLE gym.fitbit_tokens ADD COLUMN IF NOT EXISTS user_id VARCHAR(255);
+ALTER TABLE gym.fitbit_tokens ADD COLUMN IF NOT EXISTS user_uuid INTEGER REFERENCES gym.users(id) ON DELETE CASCADE;
+
+-- ON CONFLICT (user_id) necesita un índice único; si la tabla se creó con
+-- 'user_id ... UNIQUE' ya existe con este mismo nombre
+CREATE UNIQUE INDEX IF NOT EXISTS fitbit_tokens_user_id_key ON gym.fitbit_tokens (user_id);
@@ -0,0 +1,39 @@
+# 0007: Tabla gym.daily_activity (actividad por usuario y día) y carga inicial
+"""
+Crea gym.daily_activity y la rellena desde gym.ejercicios. A partir de aquí la
+mantienen los INSERT y el reset de la rutina (ver services/daily_activity.py).
+
+El SQL es el de services/daily_activity.py al escribir esta migración; la
+columna 'exercises' la añade la 0011.
+"""
+
+CREATE_DAILY_ACTIVITY_SQL = """
+    CREATE TABLE IF NOT EXISTS gym.daily_activity (
+        user_id VARCHAR(255) NOT NULL,
+        day DATE NOT NULL,
+        distinct_exercises INTEGER NOT NULL DEFAULT 0,
+        sets INTEGER NOT NULL DEFAULT 0,
+        volume DOUBLE PRECISION NOT NULL DEFAULT 0,
+        minutes INTEGER NOT NULL DEFAULT 0,
+        updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (user_id, day)
+    )
+"""
+
+REBUILD_ALL_DAILY_ACTIVITY_SQL = """
+    INSERT INTO gym.daily_activity (user_id, day, distinct_exercises, sets, volume, minutes)
+    SELECT user_id, fecha::date AS day, COUNT(DISTINCT ejercicio),
+           COALESCE(SUM(series_validas), 0), COALESCE(SUM(volumen), 0), COALESCE(SUM(duracion), 0)
+    FROM gym.ejercicios
+    WHERE user_id IS NOT NULL
+    GROUP BY user_id, day
+    ON CONFLICT (user_id, day) DO UPDATE SET
+        distinct_exercises = EXCLUDED.distinct_exercises, sets = EXCLUDED.sets, volume = EXCLUDED.volume,
+        minutes = EXCLUDED.minutes, updated_at = NOW()
+"""
+
+
+def upgrade(conn):
+    with conn.cursor() as cur:
+        cur.execute(CREATE_DAILY_ACTIVITY_SQL)
+        cur.execute(REBUILD_ALL_DAILY_ACTIVITY_SQL)
@@ -0,0 +1,48 @@
+# 0008: Tabla gym.personal_records (récords por usuario, ejercicio, métrica y repeticiones) y carga inicial
+"""
+Crea gym.personal_records y la rellena desde gym.ejercicios y gym.ejercicio_sets
+(migraciones 0003 y 0004). A partir de aquí la mantienen los INSERT y el reset
+de la rutina (ver services/personal_records.py).
+
+El SQL es el de services/personal_records.py al escribir esta migración.
+"""
+
+CREATE_PERSONAL_RECORDS_SQL = """
+    CREATE TABLE IF NOT EXISTS gym.personal_records (
+        user_id VARCHAR(255) NOT NULL,
+        ejercicio VARCHAR(255) NOT NULL,
+        metric VARCHAR(16) NOT NULL,
+        reps SMALLINT NOT NULL DEFAULT 0,
+        value DOUBLE PRECISION NOT NULL,
+        fecha TIMESTAMP WITH TIME ZONE NOT NULL,
+        ejercicio_id INTEGER,
+        updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (user_id, ejercicio, metric, reps)
+    )
+"""
+
+# Mejor valor por (user_id, ejercicio, metric, reps); en empate, el primero en el tiempo
+REBUILD_ALL_RECORDS_SQL = """
+    INSERT INTO gym.personal_records (user_id, ejercicio, metric, reps, value, fecha, ejercicio_id)
+    SELECT DISTINCT ON (user_id, ejercicio, metric, reps) user_id, ejercicio, metric, reps, value, fecha, ejercicio_id
+    FROM (
+        SELECT e.user_id, e.ejercicio, 'weight' AS metric, r.reps, s.weight AS value, e.fecha, e.id AS ejercicio_id
+        FROM gym.ejercicios e
+        JOIN gym.ejercicio_sets s ON s.ejercicio_id = e.id
+        JOIN (VALUES (1), (3), (5), (8), (10)) AS r(reps) ON s.reps >= r.reps
+        WHERE s.weight > 0
+        UNION ALL
+        SELECT user_id, ejercicio, 'e1rm', 0, max_e1rm, fecha, id FROM gym.ejercicios WHERE max_e1rm > 0
+        UNION ALL
+        SELECT user_id, ejercicio, 'volume', 0, volumen, fecha, id FROM gym.ejercicios WHERE volumen > 0
+    ) c
+    WHERE user_id IS NOT NULL
+    ORDER BY user_id, ejercicio, metric, reps, value DESC, fecha, ejercicio_id
+    ON CONFLICT (user_id, ejercicio, metric, reps) DO NOTHING
+"""
+
+
+def upgrade(conn):
+    with conn.cursor() as cur:
+        cur.execute(CREATE_PERSONAL_RECORDS_SQL)
+        cur.execute(REBUILD_ALL_RECORDS_SQL)
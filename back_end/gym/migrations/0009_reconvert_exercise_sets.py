@@ -0,0 +1,77 @@
+# 0009: gym.ejercicio_sets con la conversión de series de session_metrics y récords afectados
+"""
+Hasta ahora gym.ejercicio_sets convertía las series con su propia expresión
+regular ('8.5' repeticiones -> 8, booleanos y '+8' -> NULL), distinta de
+compute_session_metrics y de STATS_ENGINE=sql. Re-convierte las series ya
+guardadas con SET_REPS_SQL/SET_WEIGHT_SQL y recalcula los récords personales
+de los (usuario, ejercicio) cuyas series cambian.
+
+El SQL es el de services/exercise_sets.py, session_metrics.py y
+personal_records.py al escribir esta migración.
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Series re-convertidas y (user_id, ejercicios) afectados
+RECONVERT_SETS_SQL = r"""
+    WITH fixed AS (
+        UPDATE gym.ejercicio_sets es SET reps = c.reps, weight = c.weight
+        FROM (
+            SELECT e.id AS ejercicio_id, (s.ord - 1)::smallint AS set_index,
+                   (CASE jsonb_typeof(s.serie->'repeticiones')
+                        WHEN 'number' THEN trunc((s.serie->>'repeticiones')::numeric)::double precision
+                        WHEN 'string' THEN CASE WHEN s.serie->>'repeticiones' ~ '^\s*[-+]?\d+\s*$'
+                                                THEN (s.serie->>'repeticiones')::numeric::double precision END
+                        WHEN 'boolean' THEN (s.serie->>'repeticiones')::boolean::integer::double precision END)::integer AS reps,
+                   CASE jsonb_typeof(s.serie->'peso')
+                        WHEN 'number' THEN (s.serie->>'peso')::double precision
+                        WHEN 'string' THEN CASE WHEN s.serie->>'peso' ~ '^\s*[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?\s*$'
+                                                THEN (s.serie->>'peso')::double precision END
+                        WHEN 'boolean' THEN (s.serie->>'peso')::boolean::integer::double precision END AS weight
+            FROM gym.ejercicios e
+            CROSS JOIN LATERAL jsonb_array_elements(
+                CASE WHEN jsonb_typeof(e.repeticiones) = 'array' THEN e.repeticiones ELSE '[]'::jsonb END
+            ) WITH ORDINALITY AS s(serie, ord)
+            WHERE jsonb_typeof(s.serie) = 'object'
+        ) c
+        WHERE es.ejercicio_id = c.ejercicio_id AND es.set_index = c.set_index
+          AND (es.reps, es.weight) IS DISTINCT FROM (c.reps, c.weight)
+        RETURNING es.ejercicio_id
+    )
+    SELECT e.user_id, ARRAY_AGG(DISTINCT e.ejercicio)
+    FROM gym.ejercicios e JOIN (SELECT DISTINCT ejercicio_id FROM fixed) f ON f.ejercicio_id = e.id
+    WHERE e.user_id IS NOT NULL
+    GROUP BY e.user_id
+"""
+
+# Recalculo de los récords de un usuario. Parámetros: (user_id, lista de ejercicios)
+DELETE_USER_RECORDS_SQL = "DELETE FROM gym.personal_records WHERE user_id = %s AND ejercicio = ANY(%s)"
+REBUILD_USER_RECORDS_SQL = """
+    INSERT INTO gym.personal_records (user_id, ejercicio, metric, reps, value, fecha, ejercicio_id)
+    SELECT DISTINCT ON (user_id, ejercicio, metric, reps) user_id, ejercicio, metric, reps, value, fecha, ejercicio_id
+    FROM (
+        SELECT e.user_id, e.ejercicio, 'weight' AS metric, r.reps, s.weight AS value, e.fecha, e.id AS ejercicio_id
+        FROM gym.ejercicios e
+        JOIN gym.ejercicio_sets s ON s.ejercicio_id = e.id
+        JOIN (VALUES (1), (3), (5), (8), (10)) AS r(reps) ON s.reps >= r.reps
+        WHERE s.weight > 0
+        UNION ALL
+        SELECT user_id, ejercicio, 'e1rm', 0, max_e1rm, fecha, id FROM gym.ejercicios WHERE max_e1rm > 0
+        UNION ALL
+        SELECT user_id, ejercicio, 'volume', 0, volumen, fecha, id FROM gym.ejercicios WHERE volumen > 0
+    ) c
+    WHERE user_id IS NOT NULL AND user_id = %s AND ejercicio = ANY(%s)
+    ORDER BY user_id, ejercicio, metric, reps, value DESC, fecha, ejercicio_id
+"""
+
+
+def upgrade(conn):
+    with conn.cursor() as cur:
+        cur.execute(RECONVERT_SETS_SQL)
+        affected = cur.fetchall()
+        for user_id, ejercicios in affected:
+            cur.execute(DELETE_USER_RECORDS_SQL, (user_id, list(ejercicios)))
+            cur.execute(REBUILD_USER_RECORDS_SQL, (user_id, list(ejercicios)))
+    logger.info(f"Series re-convertidas: récords recalculados para {len(affected)} usuarios.")
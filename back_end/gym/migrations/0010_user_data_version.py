@@ -0,0 +1,19 @@
+# 0010: Tabla gym.user_data_version (versión de los datos de cada usuario para los ETags)
+"""
+Crea gym.user_data_version y su secuencia. Sin carga inicial: un usuario sin
+fila tiene la versión 0 y la primera escritura le asigna una (ver
+services/data_version.py).
+"""
+
+CREATE_USER_DATA_VERSION_SQL = """
+    CREATE SEQUENCE IF NOT EXISTS gym.user_data_version_seq;
+    CREATE TABLE IF NOT EXISTS gym.user_data_version (
+        user_id VARCHAR(255) PRIMARY KEY,
+        version BIGINT NOT NULL
+    );
+"""
+
+
+def upgrade(conn):
+    with conn.cursor() as cur:
+        cur.execute(CREATE_USER_DATA_VERSION_SQL)
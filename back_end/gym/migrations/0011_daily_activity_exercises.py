@@ -0,0 +1,36 @@
+# 0011: gym.daily_activity guarda la lista de ejercicios del día y los INSERT suman sobre la fila
+"""
+Hasta ahora cada INSERT recalculaba el día completo desde su propio snapshot de
+gym.ejercicios, y con dos INSERT concurrentes del mismo día el último pisaba
+al primero. Ahora suman las filas insertadas a la fila del día (ver
+services/daily_activity.py), lo que necesita la columna 'exercises'. Se
+reconstruye la tabla para rellenarla y corregir los días ya desfasados.
+
+El SQL es el de services/daily_activity.py al escribir esta migración.
+"""
+
+ADD_EXERCISES_COLUMN_SQL = """
+    ALTER TABLE gym.daily_activity
+        ADD COLUMN IF NOT EXISTS exercises TEXT[] NOT NULL DEFAULT ARRAY[]::text[]
+"""
+
+# El bloqueo impide INSERT concurrentes mientras se reescribe la tabla
+REBUILD_ALL_DAILY_ACTIVITY_SQL = """
+    LOCK TABLE gym.daily_activity IN SHARE ROW EXCLUSIVE MODE;
+    INSERT INTO gym.daily_activity (user_id, day, distinct_exercises, sets, volume, minutes, exercises)
+    SELECT user_id, fecha::date AS day, COUNT(DISTINCT ejercicio),
+           COALESCE(SUM(series_validas), 0), COALESCE(SUM(volumen), 0), COALESCE(SUM(duracion), 0),
+           COALESCE(ARRAY_AGG(DISTINCT ejercicio::text) FILTER (WHERE ejercicio IS NOT NULL), ARRAY[]::text[])
+    FROM gym.ejercicios
+    WHERE user_id IS NOT NULL
+    GROUP BY user_id, day
+    ON CONFLICT (user_id, day) DO UPDATE SET
+        distinct_exercises = EXCLUDED.distinct_exercises, sets = EXCLUDED.sets, volume = EXCLUDED.volume,
+        minutes = EXCLUDED.minutes, exercises = EXCLUDED.exercises, updated_at = NOW()
+"""
+
+
+def upgrade(conn):
+    with conn.cursor() as cur:
+        cur.execute(ADD_EXERCISES_COLUMN_SQL)
+        cur.execute(REBUILD_ALL_DAILY_ACTIVITY_SQL)
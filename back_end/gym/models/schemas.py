@@ -1,5 +1,6 @@
 # models/schemas.py
 import unicodedata
+from datetime import datetime
 from typing import Any, Dict, List, Optional, Union
 
 from config import KNOWN_EXERCISES
@@ -37,6 +38,7 @@ class Exercise(BaseModel):
 
 class ExerciseData(BaseModel):
     registro: Optional[List[Exercise]] = None
+    fecha: Optional[datetime] = None  # Fecha de la sesión (importaciones); None = NOW()
 
     def get_exercises(self) -> List[Exercise]:
         return self.registro or []
\ No newline at end of file
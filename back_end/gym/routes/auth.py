@@ -5,24 +5,27 @@ import logging
 import psycopg2 # Necesario si usas psycopg2 aquí directamente
 from dotenv import load_dotenv
 from fastapi import APIRouter, Cookie, Form, HTTPException, Query, Request, Response, status, Depends
-from fastapi.responses import JSONResponse, RedirectResponse
+from fastapi.responses import RedirectResponse
 
 # --- Importaciones Corregidas ---
 # Usar importación relativa (..) para subir un nivel desde routes a gym
 from ..middlewares import get_current_user
+from ..utils.json_response import FastJSONResponse
 try:
-    from ..services.auth_service import (
+    from ..services.async_auth_service import (
         generate_link_code,
         get_or_create_user,
         get_user_by_email,
         get_user_by_id,
         get_user_id_by_google,
         get_user_id_by_telegram,
+        invalidate_user,
         migrate_user_data,
         verify_google_token,
         verify_link_code
     )
     from ..config import DB_CONFIG # Importar DB_CONFIG desde gym
+    from ..services.async_db_pool import DB_ERRORS, async_execute
 except ImportError as e:
     logging.critical(f"Error Crítico de importación en auth.py (relativa): {e}. ¡Auth no funcionará!")
     raise e
@@ -42,7 +45,7 @@ logger = logging.getLogger(__name__)
 # --- Rutas API ---
 
 # Ruta: /api/generate-link-code
-@router.post("/generate-link-code", response_class=JSONResponse)
+@router.post("/generate-link-code", response_class=FastJSONResponse)
 async def generate_link_code_route(request: Request, user: dict = Depends(get_current_user)):
     """Genera un código para vincular una cuenta de Telegram (Requiere Login)."""
     if not user:
@@ -58,19 +61,19 @@ async def generate_link_code_route(request: Request, user: dict = Depends(get_cu
 
     try:
         # Asegúrate que generate_link_code está importado
-        code = generate_link_code(user_id_internal)
+        code = await generate_link_code(user_id_internal)
         if not code:
             logger.error(f"Error al generar código de enlace para user_id: {user_id_internal}")
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Error al generar código")
 
         logger.info(f"Código de enlace generado: {code} para user_id: {user_id_internal}")
-        return JSONResponse(content={"success": True, "code": code})
+        return FastJSONResponse(content={"success": True, "code": code})
     except Exception as e:
         logger.exception(f"Error inesperado en generate_link_code_route para user_id {user_id_internal}: {str(e)}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Error interno del servidor")
 
 # Ruta: /api/verify-link-code
-@router.post("/verify-link-code", response_class=JSONResponse)
+@router.post("/verify-link-code", response_class=FastJSONResponse)
 async def verify_link_code_route(request: Request):
     """Verifica un código de vinculación desde el bot de Telegram."""
     logger.info("Recibida solicitud para verificar código de enlace desde Bot.")
@@ -84,10 +87,10 @@ async def verify_link_code_route(request: Request):
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Faltan parámetros requeridos (code, telegram_id)")
 
         # Asegúrate que verify_link_code está importado
-        success = verify_link_code(code, str(telegram_id))
+        success = await verify_link_code(code, str(telegram_id))
         if success:
             logger.info(f"Código '{code}' verificado con éxito para Telegram ID: {telegram_id}")
-            return JSONResponse(content={"success": True, "message": "Cuentas vinculadas correctamente"})
+            return FastJSONResponse(content={"success": True, "message": "Cuentas vinculadas correctamente"})
         else:
             logger.warning(f"Código '{code}' inválido o expirado para Telegram ID: {telegram_id}")
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Código inválido o expirado")
@@ -102,7 +105,7 @@ async def verify_link_code_route(request: Request):
         raise HTTPException(status_code=500, detail="Error interno del servidor")
 
 # Ruta: /api/auth/google/verify
-@router.post("/auth/google/verify", response_class=JSONResponse)
+@router.post("/auth/google/verify", response_class=FastJSONResponse)
 async def verify_google_signin(request: Request, response: Response):
     """Verifica token Google, crea/actualiza user, genera token JWT."""
     logger.info("Recibida solicitud para verificar token de Google.")
@@ -125,7 +128,7 @@ async def verify_google_signin(request: Request, response: Response):
 
         # Verificar token con Google
         logger.info(f"Llamando a verify_google_token con token de longitud {len(token)}")
-        user_info = verify_google_token(token)
+        user_info = await verify_google_token(token)
         
         if not user_info:
             logger.warning("verify_google_token devolvió None")
@@ -143,7 +146,7 @@ async def verify_google_signin(request: Request, response: Response):
         logger.info(f"Obteniendo o creando usuario para Google ID: {google_id}, Email: {email}")
         
         # Crear o actualizar usuario
-        user_id_internal = get_or_create_user(
+        user_id_internal = await get_or_create_user(
             google_id=google_id, email=email, display_name=display_name, profile_picture=profile_picture
         )
         logger.info(f"ID de usuario interno obtenido/creado: {user_id_internal}")
@@ -153,7 +156,7 @@ async def verify_google_signin(request: Request, response: Response):
              raise HTTPException(status_code=500, detail="Error al crear o actualizar el usuario en la base de datos")
 
         # Obtener detalles completos del usuario
-        temp_user_details = get_user_by_id(user_id_internal)
+        temp_user_details = await get_user_by_id(user_id_internal)
         has_telegram_linked = temp_user_details.get("telegram_id") is not None if temp_user_details else False
 
         # Crear objeto de usuario para el frontend
@@ -181,7 +184,7 @@ async def verify_google_signin(request: Request, response: Response):
         
         # Devolver el token JWT y los datos del usuario
         logger.info("Preparando respuesta final con token JWT y datos de usuario")
-        return JSONResponse(
+        return FastJSONResponse(
             content={ 
                 "success": True, 
                 "user": user_data_for_frontend,
@@ -244,7 +247,7 @@ async def logout(request: Request, response: Response):
     return response
 
 # Ruta: /api/current-user
-@router.get("/current-user", response_class=JSONResponse)
+@router.get("/current-user", response_class=FastJSONResponse)
 async def get_current_user_api(request: Request, user: dict = Depends(get_current_user)):
     """Obtiene la información del usuario autenticado por token JWT."""
     logger.debug(f"--- 👤 Solicitud a /api/current-user ---")
@@ -263,10 +266,10 @@ async def get_current_user_api(request: Request, user: dict = Depends(get_curren
     }
     logger.info(f"✅ Devolviendo información para usuario ID={user.get('id')}")
     logger.debug(f"  User data: {safe_user_info}")
-    return JSONResponse(content={"success": True, "user": safe_user_info})
+    return FastJSONResponse(content={"success": True, "user": safe_user_info})
 
 # Ruta: /api/link-telegram
-@router.post("/link-telegram", response_class=JSONResponse)
+@router.post("/link-telegram", response_class=FastJSONResponse)
 async def link_telegram_account(request: Request, telegram_id: str = Form(...), user = Depends(get_current_user)):
     """(Requiere Login Web) Vincula una cuenta de Telegram a la cuenta web actual."""
     if not user: raise HTTPException(status_code=401, detail="Usuario no autenticado")
@@ -280,7 +283,7 @@ async def link_telegram_account(request: Request, telegram_id: str = Form(...),
 
     try:
         # Asegúrate que get_user_id_by_telegram está importado
-        existing_user_id = get_user_id_by_telegram(str(telegram_id))
+        existing_user_id = await get_user_id_by_telegram(str(telegram_id))
         if existing_user_id and existing_user_id != user_id_internal:
              logger.warning(f"Telegram ID {telegram_id} ya vinculado a user ID {existing_user_id}. Migrando a user ID {user_id_internal}.")
              # Lógica de migración (asegúrate que migrate_user_data existe si es necesaria)
@@ -288,29 +291,21 @@ async def link_telegram_account(request: Request, telegram_id: str = Form(...),
              #      raise HTTPException(status_code=500, detail="Error crítico al migrar datos.")
              # logger.info(f"Migración de datos para Telegram ID {telegram_id} completada.")
 
-        # Actualizar usuario actual (usando psycopg2 directamente)
-        conn = None
-        cur = None
+        # Actualizar usuario actual (pool asíncrono)
         try:
-             # Asegúrate que DB_CONFIG está importado
-             conn = psycopg2.connect(**DB_CONFIG)
-             cur = conn.cursor()
-             cur.execute("UPDATE users SET telegram_id = %s, updated_at = CURRENT_TIMESTAMP WHERE id = %s",
-                         (str(telegram_id), user_id_internal))
-             conn.commit()
-             updated_rows = cur.rowcount
+             updated_rows = await async_execute(
+                 "UPDATE users SET telegram_id = %s, updated_at = CURRENT_TIMESTAMP WHERE id = %s",
+                 (str(telegram_id), user_id_internal)
+             )
              if updated_rows == 0:
                   logger.error(f"No se encontró user ID {user_id_internal} para actualizar Telegram ID.")
                   raise HTTPException(status_code=404, detail="Usuario no encontrado para vincular.")
+             invalidate_user(user_id_internal)
              logger.info(f"Telegram ID {telegram_id} vinculado/actualizado para user {user_id_internal}.")
-             return JSONResponse(content={"success": True, "message": "Cuenta de Telegram vinculada."})
-        except psycopg2.Error as db_err:
+             return FastJSONResponse(content={"success": True, "message": "Cuenta de Telegram vinculada."})
+        except DB_ERRORS as db_err:
             logger.error(f"Error DB al vincular Telegram ID {telegram_id} a user {user_id_internal}: {db_err}")
-            if conn: conn.rollback()
             raise HTTPException(status_code=500, detail="Error de base de datos al vincular.")
-        finally:
-            if cur: cur.close()
-            if conn: conn.close()
 
     except HTTPException as http_exc:
         raise http_exc
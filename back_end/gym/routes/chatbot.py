@@ -12,12 +12,13 @@ if project_root not in sys.path:
 
 from fastapi import APIRouter, Depends, HTTPException, Request, status
 # Se elimina HTMLResponse y Jinja2Templates
-from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
 # from fastapi.templating import Jinja2Templates # Eliminado
 
 # Asumiendo que middlewares está accesible
 # Ajusta la ruta si es necesario, p.ej., from ...middlewares import get_current_user
 from back_end.gym.middlewares import get_current_user
+from back_end.gym.utils.json_response import FastJSONResponse
 
 # Configure LangSmith if available (logging ya está configurado)
 try:
@@ -86,12 +87,12 @@ except ImportError as e:
 
 # --- Endpoints API para el Chatbot ---
 
-@router.post("/send", response_class=JSONResponse) # Ruta relativa al prefijo: /api/chatbot/send
+@router.post("/send", response_class=FastJSONResponse) # Ruta relativa al prefijo: /api/chatbot/send
 async def chatbot_send(request: Request, user = Depends(get_current_user)):
     """API endpoint to send messages to the chatbot"""
     # Verify user authentication
     if not user or not user.get('id'): # Verificar que 'id' existe en el objeto user
-        return JSONResponse(
+        return FastJSONResponse(
             content={"success": False, "message": "User not authenticated"},
             status_code=status.HTTP_401_UNAUTHORIZED
         )
@@ -114,7 +115,8 @@ async def chatbot_send(request: Request, user = Depends(get_current_user)):
 
         # Process the message using the imported (or fallback) function
         # Asume que process_message devuelve un objeto con atributo 'content'
-        response_obj = process_message(user_id=user_id, message=message)
+        # El agente (LLM + consultas) es bloqueante: se ejecuta en el threadpool
+        response_obj = await run_in_threadpool(process_message, user_id=user_id, message=message)
 
         # Format the response for the frontend
         # Asegurarse que response_obj.content existe
@@ -125,7 +127,7 @@ async def chatbot_send(request: Request, user = Depends(get_current_user)):
             "content": response_content
         }]
 
-        return JSONResponse(content={"success": True, "responses": responses})
+        return FastJSONResponse(content={"success": True, "responses": responses})
 
     except json.JSONDecodeError:
          raise HTTPException(
@@ -137,24 +139,24 @@ async def chatbot_send(request: Request, user = Depends(get_current_user)):
          raise http_exc
     except AttributeError as attr_err:
          logging.error(f"Attribute error processing message (likely response object issue): {attr_err}")
-         return JSONResponse(
+         return FastJSONResponse(
              content={"success": False, "message": "Error formatting the response."},
              status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
          )
     except Exception as e:
         logging.exception(f"Error processing message for user {user.get('id', 'N/A')}: {e}") # Log completo del error
         # Devolver un error genérico al cliente
-        return JSONResponse(
+        return FastJSONResponse(
             content={"success": False, "message": "An internal error occurred while processing the message."},
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
-@router.get("/history", response_class=JSONResponse) # Ruta relativa al prefijo: /api/chatbot/history
+@router.get("/history", response_class=FastJSONResponse) # Ruta relativa al prefijo: /api/chatbot/history
 async def chatbot_history(request: Request, user = Depends(get_current_user)):
     """API endpoint to get conversation history"""
     # Verify user authentication
     if not user or not user.get('id'):
-        return JSONResponse(
+        return FastJSONResponse(
             content={"success": False, "message": "User not authenticated"},
             status_code=status.HTTP_401_UNAUTHORIZED
         )
@@ -171,11 +173,11 @@ async def chatbot_history(request: Request, user = Depends(get_current_user)):
         # history_from_db = tu_funcion_para_obtener_historial(user_id)
         history_from_db = [] # Placeholder
 
-        return JSONResponse(content={"success": True, "history": history_from_db, "user_id": user_id})
+        return FastJSONResponse(content={"success": True, "history": history_from_db, "user_id": user_id})
 
     except Exception as e:
         logging.exception(f"Error fetching history for user {user_id}: {e}") # Log completo del error
-        return JSONResponse(
+        return FastJSONResponse(
              content={"success": False, "message": "An internal error occurred while fetching history."},
              status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
\ No newline at end of file
@@ -1,19 +1,49 @@
-# Archivo: routes/dashboard.py (CON LOGS DE DEBUG PARA PROGRESO)
+# Archivo: routes/dashboard.py
 
 import os
 import sys
+import asyncio
 import logging
 import json
-from datetime import datetime
+from datetime import date, datetime, timedelta
 import math # Necesario para e y otros cálculos si usas otras fórmulas
 
 import psycopg2
 from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
-from fastapi.responses import JSONResponse
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 
 # Asumiendo que config y middlewares están accesibles
-from config import DB_CONFIG
+from config import (DASHBOARD_CACHE_MAX_SIZE, DASHBOARD_CACHE_TTL, DB_CONFIG,
+                    STATS_ENGINE)
 from back_end.gym.middlewares import get_current_user # Asegúrate que esta importación funciona
+from back_end.gym.services.async_db_pool import (DB_ERRORS, async_fetch_all,
+                                                 async_stream)
+from back_end.gym.services.database import (CALENDAR_HEATMAP_SQL,
+                                            EXERCISE_NAMES_SQL,
+                                            SESSION_AGGREGATE_SQL,
+                                            SESSION_SERIES_SQL,
+                                            SESSION_STATS_SQL)
+from back_end.gym.services.daily_activity import (DAILY_ACTIVITY_COLUMNS,
+                                                  DAILY_ACTIVITY_RANGE_SQL,
+                                                  DEFAULT_RANGE_DAYS,
+                                                  MAX_RANGE_DAYS,
+                                                  encode_compact,
+                                                  rows_to_heatmap)
+from back_end.gym.services.data_version import get_data_version
+from back_end.gym.services.downsampling import (DEFAULT_MAX_POINTS, MAX_POINTS,
+                                                MIN_POINTS, SERIES_KEYS,
+                                                downsample_series)
+from back_end.gym.services.metrics_engine import compute_metrics_batch
+from back_end.gym.services.personal_records import (USER_RECORDS_SQL,
+                                                    rows_to_records)
+from back_end.gym.services.session_metrics import metrics_from_aggregates
+from back_end.gym.services.rollups import (ROLLUPS_FOR_FILTER_SQL,
+                                           summary_from_rollups)
+from back_end.gym.utils.cache import TTLCache
+from back_end.gym.utils.http_cache import cached_json_response
+from back_end.gym.utils.json_response import FastJSONResponse
+from back_end.gym.utils.streaming import NDJSON_MEDIA_TYPE, ndjson_stream
 
 # Configurar logger para este módulo
 logger = logging.getLogger(__name__)
@@ -23,26 +53,287 @@ router = APIRouter(
     tags=["dashboard", "stats"],
 )
 
-# Función para calcular e1RM (Brzycki)
-def calculate_e1rm_brzycki(weight: float, reps: int) -> float | None:
-    """Calcula el 1RM estimado usando la fórmula de Brzycki."""
-    if reps <= 0 or weight <= 0: return 0
-    if reps == 1: return weight
-    if reps > 15: return None # Límite opcional
+# Cuerpos JSON ya serializados por (endpoint, usuario, versión de datos, filtros);
+# una escritura cambia la versión y las entradas viejas dejan de usarse
+DASHBOARD_CACHE = TTLCache(maxsize=DASHBOARD_CACHE_MAX_SIZE, ttl=DASHBOARD_CACHE_TTL, name="dashboard")
 
-    denominator = 1.0278 - (0.0278 * reps)
-    if denominator <= 0: return None
+# Secciones de /api/dashboard/bundle que se pueden pedir con 'fields'
+BUNDLE_FIELDS = ("ejercicios", "datos", "resumen", "heatmap")
 
-    e1rm = weight / denominator
-    return round(e1rm, 2)
 
+def _session_entry(row):
+    """Convierte una fila de SESSION_STATS_SQL en (ejercicio, entrada) o (ejercicio, None) si no tiene series válidas."""
+    fecha, nombre_ejercicio, valid_series_count, max_peso, avg_peso, total_reps, volumen, max_e1rm = row
+    if not valid_series_count:
+        return nombre_ejercicio, None
+    return nombre_ejercicio, {
+        "fecha": fecha.date(),
+        "max_peso": max_peso,
+        "avg_peso": avg_peso,
+        "total_reps": total_reps,
+        "volumen": volumen,
+        "max_e1rm_session": max_e1rm
+    }
 
-@router.get("/ejercicios_stats", response_class=JSONResponse)
+
+async def _session_rows_from_series(where_clause, query_params):
+    """
+    Filas con el formato de SESSION_STATS_SQL calculadas desde el JSONB de series
+    con el motor vectorizado (STATS_ENGINE=numpy), en el threadpool para no
+    bloquear el event loop.
+    """
+    raw_rows = await async_fetch_all(SESSION_SERIES_SQL.format(where_clause=where_clause), query_params)
+    metrics = await run_in_threadpool(compute_metrics_batch, [row[2] for row in raw_rows])
+    return [(fecha, nombre) + tuple(m) for (fecha, nombre, _), m in zip(raw_rows, metrics)]
+
+
+async def _session_rows(where_clause, query_params):
+    """
+    Filas (fecha, ejercicio, series_validas, max_peso, avg_peso, total_reps, volumen, max_e1rm)
+    de las sesiones filtradas, calculadas con el motor de STATS_ENGINE.
+    """
+    if STATS_ENGINE == "numpy":
+        return await _session_rows_from_series(where_clause, query_params)
+    if STATS_ENGINE == "sql":
+        rows = await async_fetch_all(SESSION_AGGREGATE_SQL.format(where_clause=where_clause), query_params)
+        return [(row[0], row[1]) + tuple(metrics_from_aggregates(*row[2:])) for row in rows]
+    return await async_fetch_all(SESSION_STATS_SQL.format(where_clause=where_clause), query_params)
+
+
+class _RunningSummary:
+    """Resumen del dashboard calculado sesión a sesión (modo streaming, memoria constante)."""
+
+    _MAXIMA = {"max_weight_ever": "max_peso", "max_volume_session": "volumen",
+               "max_reps_session": "total_reps", "max_e1rm_ever": "max_e1rm_session"}
+
+    def __init__(self):
+        self.total_sesiones = 0
+        self.maxima = {}
+        self.first_peso = self.last_peso = None
+
+    def add(self, entry):
+        self.total_sesiones += 1
+        for key, field in self._MAXIMA.items():
+            self.maxima[key] = max(self.maxima.get(key, entry[field]), entry[field])
+        if self.first_peso is None:
+            self.first_peso = float(entry['max_peso'])
+        self.last_peso = float(entry['max_peso'])
+
+    def as_dict(self):
+        if self.total_sesiones == 0:
+            return {"total_sesiones": 0, "max_e1rm_ever": 0, "progress_percent": 0}
+        progress_percent = 0
+        if self.total_sesiones >= 2 and self.first_peso > 0:
+            progress_percent = (self.last_peso - self.first_peso) / self.first_peso * 100
+        return {"total_sesiones": self.total_sesiones, **self.maxima, "progress_percent": round(progress_percent, 2)}
+
+
+async def _stream_stats_events(ejercicios_list, ejercicio, data_query, query_params):
+    """Eventos NDJSON de /api/ejercicios_stats: 'meta', una línea por 'sesion' y 'resumen' (si hay filtro)."""
+    yield {"tipo": "meta", "ejercicios_disponibles": ejercicios_list, "filtro_ejercicio": ejercicio}
+    resumen = _RunningSummary()
+    matched = False
+    async for row in async_stream(data_query, query_params):
+        matched = True
+        nombre_ejercicio, entry = _session_entry(row)
+        if entry is None:
+            continue
+        if ejercicio:
+            resumen.add(entry)
+        yield {"tipo": "sesion", "ejercicio": ejercicio or nombre_ejercicio, **entry}
+    if ejercicio and matched:
+        yield {"tipo": "resumen", **resumen.as_dict()}
+
+
+def _parse_series_params(ejercicio, max_points, series):
+    """
+    Valida 'max_points' y 'series' de /api/ejercicios_stats.
+
+    Returns:
+        tuple: (métricas, max_points) o (None, None) si no se pidieron series reducidas.
+
+    Raises:
+        HTTPException: 400 si alguna métrica no existe o falta 'ejercicio'.
+    """
+    if max_points is None and not series:
+        return None, None
+    if not ejercicio:
+        raise HTTPException(status_code=400, detail="'series' y 'max_points' requieren 'ejercicio'.")
+    keys = tuple(dict.fromkeys(k.strip() for k in series.split(",") if k.strip())) if series else SERIES_KEYS
+    unknown = [k for k in keys if k not in SERIES_KEYS]
+    if unknown or not keys:
+        raise HTTPException(status_code=400, detail=f"'series' admite: {', '.join(SERIES_KEYS)}.")
+    return keys, max_points or DEFAULT_MAX_POINTS
+
+
+def _stats_filters(user_id_for_query, ejercicio, desde, hasta):
+    """
+    WHERE y parámetros de las sesiones filtradas de /api/ejercicios_stats y /api/dashboard/bundle.
+
+    Returns:
+        tuple: (where_clause, query_params).
+
+    Raises:
+        HTTPException: 400 si 'desde' o 'hasta' no son YYYY-MM-DD.
+    """
+    query_conditions = ["user_id = %s"]
+    query_params = [user_id_for_query]
+    if ejercicio:
+        query_conditions.append("ejercicio ILIKE %s")
+        query_params.append(f"%{ejercicio}%")
+    if desde:
+        try:
+            datetime.strptime(desde, '%Y-%m-%d')
+            query_conditions.append("fecha >= %s")
+            query_params.append(desde)
+        except ValueError: raise HTTPException(status_code=400, detail="Formato 'desde' inválido.")
+    if hasta:
+        try:
+            # Rango semiabierto: incluye todo el día 'hasta'
+            hasta_exclusivo = datetime.strptime(hasta, '%Y-%m-%d').date() + timedelta(days=1)
+            query_conditions.append("fecha < %s")
+            query_params.append(hasta_exclusivo)
+        except ValueError: raise HTTPException(status_code=400, detail="Formato 'hasta' inválido.")
+    return " AND ".join(query_conditions), query_params
+
+
+async def _exercise_names(user_id_for_query):
+    """Ejercicios distintos del usuario, ordenados por nombre."""
+    return [row[0] for row in await async_fetch_all(EXERCISE_NAMES_SQL, (user_id_for_query,))]
+
+
+async def _build_stats_content(user_id_for_query, ejercicio, desde, hasta, where_clause, query_params,
+                               series_keys=None, max_points=None, agrupados=False):
+    """
+    Contenido JSON de /api/ejercicios_stats (modo no streaming) para los filtros ya validados.
+
+    La lista de ejercicios y las sesiones se consultan a la vez, cada una con su
+    conexión del pool.
+    """
+    ejercicios_list, sections = await asyncio.gather(
+        _exercise_names(user_id_for_query),
+        _stats_sections(user_id_for_query, ejercicio, desde, hasta, where_clause, query_params,
+                        series_keys, max_points, agrupados),
+    )
+    return {"success": True, "ejercicios_disponibles": ejercicios_list, **sections}
+
+
+async def _stats_sections(user_id_for_query, ejercicio, desde, hasta, where_clause, query_params,
+                          series_keys=None, max_points=None, agrupados=False):
+    """
+    Sesiones y resumen de /api/ejercicios_stats para los filtros ya validados
+    ('filtro_ejercicio', 'datos', 'resumen' y, si se piden, 'datos_agrupados' y 'series').
+
+    'datos_agrupados' (todas las sesiones de todos los ejercicios filtrados) solo
+    se incluye con agrupados=True. Con series_keys, en lugar de todas las sesiones
+    en 'datos'/'datos_agrupados' se devuelven las métricas pedidas reducidas con
+    LTTB a max_points puntos en 'series'.
+    """
+    if not ejercicio and not agrupados:
+        # Sin ejercicio ni agrupados la respuesta no lleva sesiones: no se consultan
+        return {"filtro_ejercicio": None, "datos": [], "resumen": {}}
+
+    # Sin rango de fechas el resumen sale de gym.exercise_rollups: se lee a la vez que las sesiones
+    queries = [_session_rows(where_clause, query_params)]
+    if ejercicio and not desde and not hasta:
+        queries.append(async_fetch_all(ROLLUPS_FOR_FILTER_SQL, (user_id_for_query, f"%{ejercicio}%")))
+    rows, *rollup_rows = await asyncio.gather(*queries)
+    logger.info(f"Consulta devolvió {len(rows)} sesiones para Google ID {user_id_for_query}")
+
+    # Inicializar resultados
+    exercise_data = []
+    summary = {}
+    entries_by_exercise = {}
+
+    # --- Inicio Procesamiento de Datos ---
+    for row in rows:
+        nombre_ejercicio, entry = _session_entry(row)
+        current_exercise_name = nombre_ejercicio if not ejercicio else ejercicio
+        if current_exercise_name not in entries_by_exercise: entries_by_exercise[current_exercise_name] = []
+        if entry is not None:
+            entries_by_exercise[current_exercise_name].append(entry)
+    # --- Fin Procesamiento de Datos ---
+
+
+    # Calcular resumen si se filtró por un ejercicio específico
+    if ejercicio and ejercicio in entries_by_exercise and not desde and not hasta:
+        # Sin rango de fechas: lectura directa de gym.exercise_rollups (O(1) por ejercicio)
+        exercise_data = entries_by_exercise[ejercicio]
+        summary = summary_from_rollups(rollup_rows[0])
+    elif ejercicio and ejercicio in entries_by_exercise:
+        exercise_data = entries_by_exercise[ejercicio]
+        total_sesiones = len(exercise_data)
+        if total_sesiones > 0:
+            max_weight_ever = max(entry['max_peso'] for entry in exercise_data)
+            max_volume_session = max(entry['volumen'] for entry in exercise_data)
+            max_reps_session = max(entry['total_reps'] for entry in exercise_data)
+            max_e1rm_ever = max(entry['max_e1rm_session'] for entry in exercise_data)
+
+            # Progreso: max_peso de la última sesión frente a la primera
+            weight_progress = 0
+            progress_percent = 0
+            if total_sesiones >= 2:
+                # Asegurarse que exercise_data está ordenado por fecha (ya debería por el SQL)
+                first_session = exercise_data[0]
+                last_session = exercise_data[-1]
+                # Asegurarse que los pesos son números antes de calcular
+                try:
+                    # Usar .get con default 0 por si la clave faltara (aunque no debería)
+                    first_peso = float(first_session.get('max_peso', 0))
+                    last_peso = float(last_session.get('max_peso', 0))
+
+                    weight_progress = last_peso - first_peso
+
+                    if first_peso > 0:
+                        progress_percent = (weight_progress / first_peso) * 100
+                    else:
+                        progress_percent = 0
+                except (TypeError, ValueError) as e:
+                    logger.error(f"Error al convertir pesos para cálculo de progreso: {e}")
+                    progress_percent = 0 # Error en conversión, progreso 0
+            else:
+                progress_percent = 0
+
+            summary = {
+                "total_sesiones": total_sesiones,
+                "max_weight_ever": max_weight_ever,
+                "max_volume_session": max_volume_session,
+                "max_reps_session": max_reps_session,
+                "max_e1rm_ever": max_e1rm_ever,
+                "progress_percent": round(progress_percent, 2)
+            }
+        else: # No hay datos válidos para este ejercicio en el rango
+            summary = {"total_sesiones": 0, "max_e1rm_ever": 0, "progress_percent": 0}
+    else:
+         summary = None # O {} si prefieres
+
+    # Construir la respuesta final
+    response_content = {"filtro_ejercicio": ejercicio}
+    if agrupados:
+        response_content["datos_agrupados"] = entries_by_exercise
+    response_content["datos"] = exercise_data if ejercicio else []
+    response_content["resumen"] = summary if ejercicio and summary is not None else {}
+
+    if series_keys:
+        response_content["series"] = await run_in_threadpool(downsample_series, exercise_data, series_keys, max_points)
+        response_content["series_info"] = {"sesiones": len(exercise_data), "max_points": max_points}
+        response_content["datos"] = []
+        if agrupados:
+            response_content["datos_agrupados"] = {}
+
+    return response_content
+
+
+@router.get("/ejercicios_stats", response_class=FastJSONResponse)
 async def get_ejercicios_stats(
     request: Request,
     ejercicio: str = Query(None, description="Nombre del ejercicio para filtrar"),
     desde: str = Query(None, description="Fecha de inicio (YYYY-MM-DD)"),
     hasta: str = Query(None, description="Fecha de fin (YYYY-MM-DD)"),
+    stream: str = Query(None, description="'ndjson': sesiones en streaming, una por línea (cursor de servidor)"),
+    max_points: int = Query(None, ge=MIN_POINTS, le=MAX_POINTS, description="Máximo de puntos por serie (LTTB)"),
+    series: str = Query(None, description=f"Series reducidas a devolver, separadas por comas: {', '.join(SERIES_KEYS)}"),
+    agrupados: bool = Query(False, description="Incluir 'datos_agrupados': las sesiones de todos los ejercicios filtrados"),
     user = Depends(get_current_user)
 ):
     # Verificación de usuario (usando google_id)
@@ -51,219 +342,236 @@ async def get_ejercicios_stats(
     user_id_for_query = user['google_id']
     logger.info(f"Obteniendo estadísticas para usuario Google ID: {user_id_for_query}")
 
-    conn = None
-    cur = None
     try:
-        # Construcción de query_conditions y query_params (usando google_id)
-        query_conditions = ["user_id = %s"]
-        query_params = [user_id_for_query]
-        if ejercicio:
-            query_conditions.append("ejercicio ILIKE %s")
-            query_params.append(f"%{ejercicio}%")
-        if desde:
-            try:
-                datetime.strptime(desde, '%Y-%m-%d')
-                query_conditions.append("fecha >= %s")
-                query_params.append(desde)
-            except ValueError: raise HTTPException(status_code=400, detail="Formato 'desde' inválido.")
-        if hasta:
-            try:
-                datetime.strptime(hasta, '%Y-%m-%d')
-                hasta_con_hora = f"{hasta} 23:59:59"
-                query_conditions.append("fecha <= %s")
-                query_params.append(hasta_con_hora)
-            except ValueError: raise HTTPException(status_code=400, detail="Formato 'hasta' inválido.")
-        where_clause = " AND ".join(query_conditions)
-
-        conn = psycopg2.connect(**DB_CONFIG)
-        cur = conn.cursor()
-        # cur.execute("SET search_path TO gym, public;") # Si es necesario
-
-        # Obtener lista de ejercicios únicos (usando google_id)
-        ejercicios_query = "SELECT DISTINCT ejercicio FROM gym.ejercicios WHERE user_id = %s ORDER BY ejercicio"
-        cur.execute(ejercicios_query, (user_id_for_query,))
-        ejercicios_list = [row[0] for row in cur.fetchall()]
-
-        # Inicializar resultados
-        exercise_data = []
-        summary = {}
-        entries_by_exercise = {}
-
-        # Obtener datos crudos (usando google_id)
-        data_query = f"""
-            SELECT fecha, repeticiones, ejercicio
-            FROM gym.ejercicios
-            WHERE {where_clause} AND repeticiones IS NOT NULL AND repeticiones != 'null'
-            ORDER BY fecha
-        """
-        cur.execute(data_query, query_params)
-        rows = cur.fetchall()
-        logger.info(f"Consulta devolvió {len(rows)} filas para Google ID {user_id_for_query}")
-
-        # --- Inicio Procesamiento de Datos (con cálculo de e1RM) ---
-        for row in rows:
-            # ... (lógica de procesamiento de cada fila, cálculo de métricas por sesión
-            #      incluyendo max_e1rm_session, como en la versión anterior) ...
-            fecha, series_json, nombre_ejercicio = row
-            current_exercise_name = nombre_ejercicio if not ejercicio else ejercicio
-            if current_exercise_name not in entries_by_exercise: entries_by_exercise[current_exercise_name] = []
-            if series_json:
-                try:
-                    series = json.loads(series_json) if isinstance(series_json, str) else series_json
-                    if not isinstance(series, list): continue
-                    max_peso_session = 0
-                    total_volumen_session = 0
-                    total_reps_session = 0
-                    max_e1rm_session = 0
-                    valid_series_count = 0
-                    for serie in series:
-                        if isinstance(serie, dict) and 'repeticiones' in serie and 'peso' in serie:
-                            try:
-                                reps = int(serie.get('repeticiones', 0))
-                                peso = float(serie.get('peso', 0))
-                                if reps > 0 and peso > 0:
-                                    total_reps_session += reps
-                                    total_volumen_session += reps * peso
-                                    max_peso_session = max(max_peso_session, peso)
-                                    valid_series_count += 1
-                                    e1rm_serie = calculate_e1rm_brzycki(peso, reps)
-                                    if e1rm_serie is not None: max_e1rm_session = max(max_e1rm_session, e1rm_serie)
-                            except (ValueError, TypeError): continue
-                    if valid_series_count > 0:
-                        avg_peso_session = total_volumen_session / total_reps_session if total_reps_session > 0 else 0
-                        entries_by_exercise[current_exercise_name].append({
-                            "fecha": fecha.strftime('%Y-%m-%d'),
-                            "max_peso": max_peso_session,
-                            "avg_peso": round(avg_peso_session, 2),
-                            "total_reps": total_reps_session,
-                            "volumen": round(total_volumen_session, 2),
-                            "max_e1rm_session": max_e1rm_session
-                        })
-                except json.JSONDecodeError: continue
-                except Exception: continue
-        # --- Fin Procesamiento de Datos ---
-
-
-        # Calcular resumen si se filtró por un ejercicio específico
-        if ejercicio and ejercicio in entries_by_exercise:
-            exercise_data = entries_by_exercise[ejercicio]
-            total_sesiones = len(exercise_data)
-            if total_sesiones > 0:
-                max_weight_ever = max(entry['max_peso'] for entry in exercise_data)
-                max_volume_session = max(entry['volumen'] for entry in exercise_data)
-                max_reps_session = max(entry['total_reps'] for entry in exercise_data)
-                max_e1rm_ever = max(entry['max_e1rm_session'] for entry in exercise_data)
-
-                # <<< INICIO BLOQUE DE CÁLCULO DE PROGRESO CON LOGS >>>
-                logger.info(f"--- DEBUG Progreso ---")
-                logger.info(f"Total sesiones para cálculo: {total_sesiones}")
-                weight_progress = 0
-                progress_percent = 0
-                if total_sesiones >= 2:
-                    # Asegurarse que exercise_data está ordenado por fecha (ya debería por el SQL)
-                    first_session = exercise_data[0]
-                    last_session = exercise_data[-1]
-                    # Añadir logs para ver qué sesiones se están comparando
-                    logger.info(f"Primera sesión (fecha {first_session.get('fecha')}): max_peso = {first_session.get('max_peso')}")
-                    logger.info(f"Última sesión (fecha {last_session.get('fecha')}): max_peso = {last_session.get('max_peso')}")
-
-                    # Asegurarse que los pesos son números antes de calcular
-                    try:
-                        # Usar .get con default 0 por si la clave faltara (aunque no debería)
-                        first_peso = float(first_session.get('max_peso', 0))
-                        last_peso = float(last_session.get('max_peso', 0))
-
-                        weight_progress = last_peso - first_peso
-                        logger.info(f"Progreso absoluto peso: {weight_progress}")
-
-                        if first_peso > 0:
-                            progress_percent = (weight_progress / first_peso) * 100
-                            logger.info(f"Progreso porcentual calculado: {progress_percent}")
-                        else:
-                            logger.info("Peso inicial es 0, progreso porcentual es 0.")
-                            progress_percent = 0
-                    except (TypeError, ValueError) as e:
-                        logger.error(f"Error al convertir pesos para cálculo de progreso: {e}")
-                        progress_percent = 0 # Error en conversión, progreso 0
-                else:
-                    logger.info("Menos de 2 sesiones, progreso es 0.")
-                    progress_percent = 0
-                logger.info(f"Valor final progress_percent antes de añadir a summary: {progress_percent}")
-                # <<< FIN BLOQUE DE CÁLCULO DE PROGRESO CON LOGS >>>
-
-                summary = {
-                    "total_sesiones": total_sesiones,
-                    "max_weight_ever": max_weight_ever,
-                    "max_volume_session": max_volume_session,
-                    "max_reps_session": max_reps_session,
-                    "max_e1rm_ever": max_e1rm_ever,
-                    "progress_percent": round(progress_percent, 2) # Usar el valor calculado y loggeado
-                }
-            else: # No hay datos válidos para este ejercicio en el rango
-                summary = {"total_sesiones": 0, "max_e1rm_ever": 0, "progress_percent": 0}
-        else:
-             summary = None # O {} si prefieres
-
-        # Construir la respuesta final
-        response_content = {
-            "success": True,
-            "ejercicios_disponibles": ejercicios_list,
-            "filtro_ejercicio": ejercicio,
-            "datos_agrupados": entries_by_exercise,
-            "datos": exercise_data if ejercicio else [],
-            "resumen": summary if ejercicio and summary is not None else {}
-        }
-
-        # Log opcional para ver la respuesta completa justo antes de enviarla
-        # logger.info("--- DEBUG BACKEND RESPONSE ---")
-        # try: logger.info(json.dumps(response_content, indent=2, default=str))
-        # except Exception as print_err: logger.info(f"Raw response_content: {response_content}")
-        # logger.info("--- FIN DEBUG BACKEND RESPONSE ---")
-
-        return JSONResponse(content=response_content)
+        where_clause, query_params = _stats_filters(user_id_for_query, ejercicio, desde, hasta)
+        series_keys, max_points = _parse_series_params(ejercicio, max_points, series)
+
+        if stream:
+            if stream != "ndjson":
+                raise HTTPException(status_code=400, detail="'stream' solo admite 'ndjson'.")
+            if series_keys:
+                raise HTTPException(status_code=400, detail="'series' no es compatible con 'stream'.")
+            ejercicios_list = await _exercise_names(user_id_for_query)
+            # Métricas por sesión precalculadas al insertar (columnas de gym.ejercicios);
+            # el streaming siempre las usa para mantener la memoria constante
+            data_query = SESSION_STATS_SQL.format(where_clause=where_clause)
+            return StreamingResponse(
+                ndjson_stream(_stream_stats_events(ejercicios_list, ejercicio, data_query, query_params)),
+                media_type=NDJSON_MEDIA_TYPE
+            )
+
+        # Misma versión de datos y mismos filtros -> misma respuesta: 304 o cuerpo cacheado
+        # con una sola lectura de gym.user_data_version
+        cache_key = ("ejercicios_stats", user_id_for_query, await get_data_version(user_id_for_query),
+                     ejercicio, desde, hasta, series_keys, max_points, agrupados)
+        return await cached_json_response(
+            request, DASHBOARD_CACHE, cache_key,
+            lambda: _build_stats_content(user_id_for_query, ejercicio, desde, hasta, where_clause, query_params,
+                                         series_keys, max_points, agrupados)
+        )
 
     # Manejo de excepciones
     except HTTPException as http_exc: raise http_exc
-    except psycopg2.Error as db_err:
+    except DB_ERRORS as db_err:
         logger.error(f"Error DB: {db_err}", exc_info=True)
         raise HTTPException(status_code=500, detail="Error BBDD.")
     except Exception as e:
         logger.exception(f"Error inesperado: {e}")
         raise HTTPException(status_code=500, detail="Error inesperado.")
-    finally:
-        if cur: cur.close()
-        if conn: conn.close()
 
 
-# --- Endpoint /api/calendar_heatmap (sin cambios, usa google_id) ---
-@router.get("/calendar_heatmap", response_class=JSONResponse)
+async def _calendar_heatmap_data(user_id_for_query, year):
+    """[{'date', 'count'}] del año: ejercicios distintos por día con actividad."""
+    rows = await async_fetch_all(CALENDAR_HEATMAP_SQL, (user_id_for_query, date(year, 1, 1), date(year + 1, 1, 1)))
+    return [{"date": row[0], "count": row[1]} for row in rows]
+
+
+# --- Endpoint /api/calendar_heatmap (usa google_id) ---
+@router.get("/calendar_heatmap", response_class=FastJSONResponse)
 async def get_calendar_heatmap(
     request: Request,
-    year: int = Query(datetime.now().year),
+    year: int = Query(datetime.now().year, ge=1, le=9998),
     user = Depends(get_current_user)
 ):
      if not user or not user.get('google_id'):
         raise HTTPException(status_code=401, detail="Usuario no autenticado o sin ID Google.")
      user_id_for_query = user['google_id']
      logger.info(f"Obteniendo datos de calendario para usuario Google ID: {user_id_for_query}, Año: {year}")
-     conn=None
-     cur=None
      try:
-        conn = psycopg2.connect(**DB_CONFIG)
-        cur = conn.cursor()
-        query = """
-            SELECT fecha::date as day, COUNT(DISTINCT ejercicio) as value
-            FROM gym.ejercicios
-            WHERE user_id = %s AND EXTRACT(YEAR FROM fecha) = %s
-            GROUP BY day ORDER BY day
-        """
-        cur.execute(query, (user_id_for_query, year))
-        rows = cur.fetchall()
-        heatmap_data = [{"date": row[0].strftime('%Y-%m-%d'), "count": row[1]} for row in rows]
-        return JSONResponse(content={"success": True, "year": year, "data": heatmap_data})
+        # Rango [1 ene, 1 ene del año siguiente) sobre gym.daily_activity: recorrido de su clave primaria
+        async def build():
+            return {"success": True, "year": year, "data": await _calendar_heatmap_data(user_id_for_query, year)}
+
+        cache_key = ("calendar_heatmap", user_id_for_query, await get_data_version(user_id_for_query), year)
+        return await cached_json_response(request, DASHBOARD_CACHE, cache_key, build)
      except Exception as e:
         logger.exception(f"Error heatmap user {user_id_for_query}: {e}")
         raise HTTPException(status_code=500, detail="Error obteniendo datos heatmap.")
-     finally:
-        if cur: cur.close()
-        if conn: conn.close()
\ No newline at end of file
+
+def _parse_heatmap_range(desde, hasta):
+    """
+    Rango cerrado [desde, hasta] del heatmap. Sin 'desde', los DEFAULT_RANGE_DAYS
+    días que terminan en 'hasta' (por defecto hoy).
+
+    Raises:
+        HTTPException: 400 si una fecha no es YYYY-MM-DD o el rango es inválido o supera MAX_RANGE_DAYS.
+    """
+    try:
+        day_to = datetime.strptime(hasta, '%Y-%m-%d').date() if hasta else date.today()
+        day_from = datetime.strptime(desde, '%Y-%m-%d').date() if desde else day_to - timedelta(days=DEFAULT_RANGE_DAYS - 1)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Formato de fecha inválido (YYYY-MM-DD).")
+    if day_from > day_to:
+        raise HTTPException(status_code=400, detail="'desde' posterior a 'hasta'.")
+    if (day_to - day_from).days + 1 > MAX_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail=f"El rango no puede superar {MAX_RANGE_DAYS} días.")
+    return day_from, day_to
+
+
+# --- Endpoint /api/activity_heatmap: rango libre desde gym.daily_activity ---
+@router.get("/activity_heatmap", response_class=FastJSONResponse)
+async def get_activity_heatmap(
+    request: Request,
+    desde: str = Query(None, description=f"Primer día (YYYY-MM-DD); por defecto, los {DEFAULT_RANGE_DAYS} días hasta 'hasta'"),
+    hasta: str = Query(None, description="Último día incluido (YYYY-MM-DD); por defecto hoy"),
+    metric: str = Query("distinct_exercises", description=f"Valor de cada día en 'compact': {', '.join(DAILY_ACTIVITY_COLUMNS)}"),
+    encoding: str = Query("json", description="'json': lista de días con actividad; 'compact': bitmap de días + array de valores"),
+    user = Depends(get_current_user)
+):
+    if not user or not user.get('google_id'):
+        raise HTTPException(status_code=401, detail="Usuario no autenticado o sin ID Google.")
+    user_id_for_query = user['google_id']
+    if metric not in DAILY_ACTIVITY_COLUMNS:
+        raise HTTPException(status_code=400, detail=f"'metric' debe ser una de: {', '.join(DAILY_ACTIVITY_COLUMNS)}.")
+    if encoding not in ("json", "compact"):
+        raise HTTPException(status_code=400, detail="'encoding' solo admite 'json' o 'compact'.")
+    day_from, day_to = _parse_heatmap_range(desde, hasta)
+    logger.info(f"Heatmap de actividad para usuario Google ID: {user_id_for_query}, {day_from} - {day_to} ({encoding})")
+    try:
+        async def build():
+            rows = await async_fetch_all(DAILY_ACTIVITY_RANGE_SQL, (user_id_for_query, day_from, day_to))
+            content = {"success": True, "desde": day_from, "hasta": day_to, "encoding": encoding}
+            if encoding == "compact":
+                content["metric"] = metric
+                content.update(encode_compact(rows, day_from, day_to, metric))
+            else:
+                content["data"] = rows_to_heatmap(rows)
+            return content
+
+        cache_key = ("activity_heatmap", user_id_for_query, await get_data_version(user_id_for_query),
+                     day_from, day_to, metric if encoding == "compact" else None, encoding)
+        return await cached_json_response(request, DASHBOARD_CACHE, cache_key, build)
+    except Exception as e:
+        logger.exception(f"Error heatmap de actividad user {user_id_for_query}: {e}")
+        raise HTTPException(status_code=500, detail="Error obteniendo datos heatmap.")
+
+
+# --- Endpoint /api/records: récords personales desde gym.personal_records ---
+@router.get("/records", response_class=FastJSONResponse)
+async def get_personal_records(
+    request: Request,
+    ejercicio: str = Query(None, description="Nombre del ejercicio para filtrar"),
+    user = Depends(get_current_user)
+):
+    if not user or not user.get('google_id'):
+        raise HTTPException(status_code=401, detail="Usuario no autenticado o sin ID Google.")
+    user_id_for_query = user['google_id']
+    logger.info(f"Récords personales para usuario Google ID: {user_id_for_query}, ejercicio: {ejercicio}")
+    try:
+        async def build():
+            rows = await async_fetch_all(USER_RECORDS_SQL, (user_id_for_query, f"%{ejercicio}%" if ejercicio else "%"))
+            return {"success": True, "filtro_ejercicio": ejercicio, "records": rows_to_records(rows)}
+
+        cache_key = ("records", user_id_for_query, await get_data_version(user_id_for_query), ejercicio)
+        return await cached_json_response(request, DASHBOARD_CACHE, cache_key, build)
+    except DB_ERRORS as db_err:
+        logger.error(f"Error DB récords user {user_id_for_query}: {db_err}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Error BBDD.")
+    except Exception as e:
+        logger.exception(f"Error récords user {user_id_for_query}: {e}")
+        raise HTTPException(status_code=500, detail="Error obteniendo récords.")
+
+
+def _parse_bundle_fields(fields):
+    """
+    Secciones pedidas en 'fields' (separadas por comas); todas si no se indica.
+
+    Raises:
+        HTTPException: 400 si alguna sección no existe.
+    """
+    if not fields:
+        return BUNDLE_FIELDS
+    requested = tuple(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    if not requested or any(f not in BUNDLE_FIELDS for f in requested):
+        raise HTTPException(status_code=400, detail=f"'fields' admite: {', '.join(BUNDLE_FIELDS)}.")
+    return requested
+
+
+async def _build_bundle_content(user_id_for_query, fields, ejercicio, desde, hasta, year, where_clause, query_params,
+                                series_keys, max_points, agrupados):
+    """
+    Contenido de /api/dashboard/bundle: solo las secciones de 'fields', con sus
+    consultas lanzadas a la vez (asyncio.gather), cada una con su conexión del pool.
+    """
+    sections = {}
+    if "ejercicios" in fields:
+        sections["ejercicios_disponibles"] = _exercise_names(user_id_for_query)
+    if "datos" in fields or "resumen" in fields:
+        sections["stats"] = _stats_sections(user_id_for_query, ejercicio, desde, hasta, where_clause, query_params,
+                                            series_keys, max_points, agrupados)
+    if "heatmap" in fields:
+        sections["heatmap"] = _calendar_heatmap_data(user_id_for_query, year)
+    results = dict(zip(sections, await asyncio.gather(*sections.values())))
+
+    content = {"success": True, "fields": list(fields)}
+    if "ejercicios" in fields:
+        content["ejercicios_disponibles"] = results["ejercicios_disponibles"]
+    stats = results.get("stats")
+    if "datos" in fields:
+        content.update({key: value for key, value in stats.items() if key != "resumen"})
+    if "resumen" in fields:
+        content["filtro_ejercicio"] = ejercicio
+        content["resumen"] = stats["resumen"]
+    if "heatmap" in fields:
+        content["heatmap"] = {"year": year, "data": results["heatmap"]}
+    return content
+
+
+# --- Endpoint /api/dashboard/bundle: lista de ejercicios, estadísticas, resumen y heatmap en una llamada ---
+@router.get("/dashboard/bundle", response_class=FastJSONResponse)
+async def get_dashboard_bundle(
+    request: Request,
+    fields: str = Query(None, description=f"Secciones a devolver, separadas por comas: {', '.join(BUNDLE_FIELDS)} (por defecto todas)"),
+    ejercicio: str = Query(None, description="Nombre del ejercicio para filtrar"),
+    desde: str = Query(None, description="Fecha de inicio (YYYY-MM-DD)"),
+    hasta: str = Query(None, description="Fecha de fin (YYYY-MM-DD)"),
+    year: int = Query(None, ge=1, le=9998, description="Año del heatmap (por defecto el actual)"),
+    max_points: int = Query(None, ge=MIN_POINTS, le=MAX_POINTS, description="Máximo de puntos por serie (LTTB)"),
+    series: str = Query(None, description=f"Series reducidas a devolver, separadas por comas: {', '.join(SERIES_KEYS)}"),
+    agrupados: bool = Query(False, description="Incluir 'datos_agrupados' en la sección 'datos'"),
+    user = Depends(get_current_user)
+):
+    if not user or not user.get('google_id'):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Usuario no autenticado o sin ID de Google válido.")
+    user_id_for_query = user['google_id']
+    fields = _parse_bundle_fields(fields)
+    year = year or datetime.now().year
+    where_clause, query_params = _stats_filters(user_id_for_query, ejercicio, desde, hasta)
+    series_keys, max_points = _parse_series_params(ejercicio, max_points, series)
+    logger.info(f"Bundle del dashboard para usuario Google ID: {user_id_for_query}, secciones: {','.join(fields)}")
+
+    try:
+        cache_key = ("dashboard_bundle", user_id_for_query, await get_data_version(user_id_for_query),
+                     fields, ejercicio, desde, hasta, year, series_keys, max_points, agrupados)
+        return await cached_json_response(
+            request, DASHBOARD_CACHE, cache_key,
+            lambda: _build_bundle_content(user_id_for_query, fields, ejercicio, desde, hasta, year,
+                                          where_clause, query_params, series_keys, max_points, agrupados)
+        )
+    except HTTPException as http_exc: raise http_exc
+    except DB_ERRORS as db_err:
+        logger.error(f"Error DB: {db_err}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Error BBDD.")
+    except Exception as e:
+        logger.exception(f"Error inesperado: {e}")
+        raise HTTPException(status_code=500, detail="Error inesperado.")
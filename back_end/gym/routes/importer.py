@@ -0,0 +1,52 @@
+# Archivo: back_end/gym/routes/importer.py
+import logging
+
+from fastapi import (APIRouter, Depends, File, HTTPException, Query, Request,
+                     UploadFile, status)
+from starlette.concurrency import run_in_threadpool
+
+try:
+    from ..middlewares import get_current_user
+    from ..utils.json_response import FastJSONResponse
+    from ..services.import_service import (ImportFormatError, detect_format,
+                                           import_exercises)
+except ImportError as e:
+    logging.critical(f"Error Crítico de importación en importer.py: {e}. ¡La importación no funcionará!")
+    raise e
+
+router = APIRouter(prefix="/api", tags=["import"])
+logger = logging.getLogger(__name__)
+
+
+# Ruta: /api/import
+@router.post("/import", response_class=FastJSONResponse)
+async def import_history(
+    request: Request,
+    file: UploadFile = File(..., description="Fichero CSV o NDJSON con filas (fecha, ejercicio, series/duracion)"),
+    format: str = Query(None, description="Formato del fichero: csv o ndjson (por defecto, según extensión)"),
+    user = Depends(get_current_user)
+):
+    """Importa un historial de entrenamientos sin pasar por el LLM."""
+    if not user or not user.get('google_id'):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Usuario no autenticado o sin ID de Google válido.")
+    user_id_for_logic = user['google_id']
+
+    try:
+        fmt = detect_format(file.filename, file.content_type, format)
+    except ImportFormatError as e:
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail=str(e))
+
+    logger.info(f"Importación {fmt} '{file.filename}' para usuario {user_id_for_logic}")
+    try:
+        # El fichero ya está volcado a disco por el parser multipart; se lee en
+        # streaming y se carga con COPY en el threadpool (no bloquea el event loop)
+        summary = await run_in_threadpool(import_exercises, file.file, fmt, user_id_for_logic)
+    except ImportFormatError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.exception(f"Error inesperado importando para usuario {user_id_for_logic}: {e}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Error interno durante la importación.")
+    finally:
+        await file.close()
+
+    return FastJSONResponse(content=summary)
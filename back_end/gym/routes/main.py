@@ -10,19 +10,33 @@ import datetime # Asegúrate que datetime está importado si usas tipos de fecha
 # sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
-from fastapi.responses import JSONResponse
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from back_end.gym.utils.json_response import FastJSONResponse
 # Asumiendo que los servicios y utils están en las rutas correctas
 # Ajusta estas importaciones si tu estructura es diferente
 try:
     # <<< CORRECCIÓN IMPORTACIÓN >>>
-    # Importar TODAS las funciones necesarias de database.py
-    from services.database import (
+    # Versión asíncrona de database.py (no bloquea el event loop)
+    from back_end.gym.services.async_database import (
         get_exercise_logs,
+        get_exercise_logs_page,
         insert_into_db,
+        stream_exercise_logs,
         reset_today_routine_status # <-- Asegúrate que esta línea esté presente
     )
-    from services.prompt_service import format_for_postgres
-    from utils.formatting import clean_input
+    from back_end.gym.services.database import (LOG_TYPE_FILTERS,
+                                                LOGS_PAGE_DEFAULT_LIMIT,
+                                                LOGS_PAGE_MAX_LIMIT,
+                                                decode_logs_cursor)
+    from back_end.gym.services.async_db_pool import get_async_pool_stats
+    from back_end.gym.services.db_pool import get_pool_stats
+    from back_end.gym.services.prompt_service import format_for_postgres
+    from back_end.gym.utils.formatting import clean_input
+    from back_end.gym.utils.streaming import (NDJSON_MEDIA_TYPE,
+                                              STREAM_FORMATS,
+                                              json_array_stream, ndjson_stream)
     # Asumiendo que el middleware está en la ruta correcta
     from back_end.gym.middlewares import get_current_user
 except ImportError as e:
@@ -31,12 +45,19 @@ except ImportError as e:
      # Podrías querer lanzar una excepción o definir stubs si es crítico
      # Por ahora, definimos stubs para que el archivo no falle al cargar
      async def get_current_user(request: Request): return None
-     def get_exercise_logs(user_id, days): return []
-     def insert_into_db(json_data, user_id): return False
+     async def get_exercise_logs(user_id, days): return []
+     async def stream_exercise_logs(user_id, days, **filters): return; yield
+     async def get_exercise_logs_page(user_id, limit, after=None, **filters): return None
+     LOG_TYPE_FILTERS, LOGS_PAGE_DEFAULT_LIMIT, LOGS_PAGE_MAX_LIMIT = {}, 50, 500
+     def decode_logs_cursor(token): raise ValueError(token)
+     STREAM_FORMATS = () # Sin streaming: las peticiones con 'stream' reciben 400
+     async def insert_into_db(json_data, user_id, with_records=False): return None if with_records else False
      # Quita o comenta el stub si la importación real funciona
      # def reset_today_routine_status(user_id):
      #     logging.error("STUB INUTILIZADO: reset_today_routine_status debería importarse correctamente.")
      #     return False
+     def get_pool_stats(): return None
+     def get_async_pool_stats(): return None
      def format_for_postgres(text): return None
      def clean_input(text): return text
 
@@ -45,19 +66,22 @@ router = APIRouter(prefix="/api", tags=["main"])
 logger = logging.getLogger(__name__) # Usar __name__ es una buena práctica
 
 # La ruta ahora es relativa al prefijo: /api/
-@router.get("", response_class=JSONResponse) # Ruta -> /api/
+@router.get("", response_class=FastJSONResponse) # Ruta -> /api/
 async def get_api_root(request: Request, user = Depends(get_current_user)):
     # Mantenemos la ruta GET /api/ para un status check simple de la API
     logger.info(f"Acceso a la raíz de la API. User: {user.get('id') if user else 'None'}")
-    return JSONResponse(content={
+    return FastJSONResponse(content={
         "success": True,
         "message": "API funcionando correctamente",
         "user_id": user.get("id") if user else None,
-        "google_id": user.get("google_id") if user else None
+        "google_id": user.get("google_id") if user else None,
+        # Métricas de los pools de conexiones (None si aún no se han abierto)
+        "db_pool": get_pool_stats(),
+        "async_db_pool": get_async_pool_stats()
     })
 
 # La ruta ahora es relativa al prefijo: /api/log-exercise
-@router.post("/log-exercise", response_class=JSONResponse, status_code=status.HTTP_200_OK) # Ruta -> /api/log-exercise
+@router.post("/log-exercise", response_class=FastJSONResponse, status_code=status.HTTP_200_OK) # Ruta -> /api/log-exercise
 async def log_exercise_endpoint(
     request: Request,
     user = Depends(get_current_user)
@@ -139,7 +163,7 @@ async def log_exercise_endpoint(
             try:
                 # Llama a la función importada desde services.database
                 # Asegúrate que la función reset_today_routine_status esté importada arriba
-                success_reset = reset_today_routine_status(user_id_for_logic)
+                success_reset = await reset_today_routine_status(user_id_for_logic)
                 # Si tu función necesita 'day_name', pásalo:
                 # success_reset = reset_today_routine_status(user_id_for_logic, day_name=day_name_for_reset)
 
@@ -151,7 +175,7 @@ async def log_exercise_endpoint(
 
             if success_reset:
                  logger.info(f"Rutina de hoy reiniciada para {user_id_for_logic}")
-                 return JSONResponse(content={
+                 return FastJSONResponse(content={
                      "success": True,
                      "message": "Estado de la rutina de hoy reiniciado correctamente."
                  })
@@ -165,7 +189,8 @@ async def log_exercise_endpoint(
         cleaned_text = clean_input(exercise_data)
         # logger.debug(f"Texto limpiado: {cleaned_text}") # Debug si es necesario
 
-        formatted_json = format_for_postgres(cleaned_text) # Llamada a la función corregida
+        # La llamada al LLM es bloqueante: se ejecuta en el threadpool
+        formatted_json = await run_in_threadpool(format_for_postgres, cleaned_text)
         # logger.debug(f"JSON formateado por IA: {formatted_json}") # Debug si es necesario
 
         if formatted_json is None:
@@ -175,13 +200,16 @@ async def log_exercise_endpoint(
                 detail="No se pudo interpretar la descripción del entrenamiento. Intenta ser más específico, ej: 'Press Banca 3x10 80kg'"
             )
 
-        success_insert = insert_into_db(formatted_json, user_id_for_logic)
+        # Los récords batidos salen de la misma sentencia que inserta (services/personal_records.py)
+        nuevos_records = await insert_into_db(formatted_json, user_id_for_logic, with_records=True)
+        success_insert = nuevos_records is not None
         logger.info(f"Resultado de inserción para {user_id_for_logic}: {'Éxito' if success_insert else 'Fallo'}")
 
         if success_insert:
-            return JSONResponse(content={
+            return FastJSONResponse(content={
                 "success": True,
-                "message": "Entrenamiento procesado por IA y registrado correctamente."
+                "message": "Entrenamiento procesado por IA y registrado correctamente.",
+                "nuevos_records": nuevos_records
             })
         else:
              raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Error al registrar el entrenamiento en la base de datos.")
@@ -195,12 +223,43 @@ async def log_exercise_endpoint(
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error interno del servidor al procesar la solicitud.")
 
 
+def _parse_log_filters(days, desde, hasta, ejercicio, tipo):
+    """
+    Valida los filtros de /api/logs y los traduce a argumentos de build_logs_query.
+
+    'desde' y 'hasta' son días YYYY-MM-DD incluidos; 'desde' tiene prioridad sobre 'days'.
+    'days' se resuelve al inicio del día (hoy - days): la ventana no se mueve
+    mientras el cliente pide las páginas siguientes.
+
+    Raises:
+        HTTPException: 400 si algún filtro no es válido.
+    """
+    if tipo and tipo not in LOG_TYPE_FILTERS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"'tipo' debe ser uno de: {', '.join(LOG_TYPE_FILTERS)}.")
+    try:
+        since = datetime.date.fromisoformat(desde) if desde else None
+        until = datetime.date.fromisoformat(hasta) + datetime.timedelta(days=1) if hasta else None
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Formato de fecha inválido. Use YYYY-MM-DD.")
+    if since is None and days:
+        since = datetime.date.today() - datetime.timedelta(days=days)
+    return {"since": since, "until": until, "ejercicio": ejercicio, "tipo": tipo}
+
+
 # La ruta ahora es relativa al prefijo: /api/logs
-@router.get("/logs", response_class=JSONResponse) # Ruta -> /api/logs
+@router.get("/logs", response_class=FastJSONResponse) # Ruta -> /api/logs
 async def get_logs_endpoint(
     request: Request,
-    days: int = Query(7, ge=1, description="Número de días hacia atrás para obtener logs."),
+    days: int = Query(None, ge=1, description="Número de días hacia atrás (7 por defecto sin paginación; sin límite con paginación)."),
     telegram_id: str = Query(None, description="ID de Telegram para solicitudes del bot"),
+    stream: str = Query(None, description="Respuesta en streaming: 'json' (mismo formato) o 'ndjson' (un log por línea)"),
+    limit: int = Query(None, ge=1, description=f"Logs por página (máximo {LOGS_PAGE_MAX_LIMIT}). Activa la paginación."),
+    cursor: str = Query(None, description="'next_cursor' de la página anterior."),
+    ejercicio: str = Query(None, description="Filtrar por nombre de ejercicio (contiene)."),
+    desde: str = Query(None, description="Fecha inicial incluida (YYYY-MM-DD)."),
+    hasta: str = Query(None, description="Fecha final incluida (YYYY-MM-DD)."),
+    tipo: str = Query(None, description="'fuerza' o 'cardio'."),
     user = Depends(get_current_user)
 ):
     if not user:
@@ -230,9 +289,31 @@ async def get_logs_endpoint(
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="ID de usuario inválido para obtener logs.")
 
     logger.info(f"Obteniendo logs para {user_id_for_logic}, {days} días.")
+    filters = _parse_log_filters(days, desde, hasta, ejercicio, tipo)
+
+    if stream:
+        # Cursor de servidor + StreamingResponse: memoria constante aunque la ventana sea de años
+        if stream not in STREAM_FORMATS:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="'stream' debe ser 'json' o 'ndjson'.")
+        logs_iter = stream_exercise_logs(user_id_for_logic, days or 7, **filters)
+        if stream == "ndjson":
+            return StreamingResponse(ndjson_stream(logs_iter), media_type=NDJSON_MEDIA_TYPE)
+        return StreamingResponse(json_array_stream({"success": True}, "logs", logs_iter), media_type="application/json")
+
+    if limit is not None or cursor or any((ejercicio, desde, hasta, tipo)):
+        # Paginación keyset: cada petición lee como mucho 'limit' + 1 filas
+        try:
+            after = decode_logs_cursor(cursor) if cursor else None
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="'cursor' inválido.")
+        page = await get_exercise_logs_page(user_id_for_logic, limit=min(limit or LOGS_PAGE_DEFAULT_LIMIT, LOGS_PAGE_MAX_LIMIT),
+                                            after=after, **filters)
+        if page is None:
+            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Error interno al consultar los logs de entrenamiento.")
+        return FastJSONResponse(content={"success": True, **page})
 
     try:
-        logs = get_exercise_logs(user_id_for_logic, days)
+        logs = await get_exercise_logs(user_id_for_logic, days or 7)
 
         if logs is None:
             # Esto indica un error en la función de BD, no necesariamente que no haya logs
@@ -241,7 +322,7 @@ async def get_logs_endpoint(
 
         logger.info(f"Logs obtenidos ({len(logs)} registros) exitosamente para usuario {user_id_for_logic}")
         # Devuelve la lista de logs directamente (puede ser vacía si no hay registros)
-        return JSONResponse(content={
+        return FastJSONResponse(content={
             "success": True,
             "logs": logs
         })
@@ -22,9 +22,12 @@ from dotenv import load_dotenv
 from fastapi import (APIRouter, Depends, Form, HTTPException, Query, Request,
                      Response, status) # Añadido status
 # Eliminado HTMLResponse y Jinja2Templates
-from fastapi.responses import JSONResponse, RedirectResponse
+from fastapi.responses import RedirectResponse
+from starlette.concurrency import run_in_threadpool
 # from fastapi.templating import Jinja2Templates # Eliminado
 
+from back_end.gym.utils.json_response import FastJSONResponse
+
 # --- Carga de Variables de Entorno ---
 load_dotenv() # Carga desde .env en la raíz o directorios padre
 
@@ -34,6 +37,7 @@ try:
     from config import DB_CONFIG # Asegúrate que DB_CONFIG se carga bien
     # Asumiendo que tu middleware está en workflows.gym.middlewares
     from back_end.gym.middlewares import get_current_user # ¡¡¡Ajusta esta ruta!!!
+    from back_end.gym.services.db_pool import get_db_connection
 
     # --- Placeholder para get_current_user (si no puedes importarlo directamente) ---
     # async def get_current_user(request: Request): # Placeholder
@@ -51,8 +55,6 @@ except ImportError as e:
     # Podrías querer que la aplicación no inicie si faltan dependencias clave
     sys.exit(f"Error de importación: {e}")
 
-# --- Configuración de Logging Básico ---
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 # --- Router de FastAPI ---
 router = APIRouter(
@@ -95,32 +97,26 @@ if missing_vars:
 
 def _execute_db_query(query, params=None, fetch_one=False, fetch_all=False, commit=False):
     """Función auxiliar genérica para ejecutar consultas a la BD."""
-    conn = None
-    cur = None
     result = None
     try:
-        conn = psycopg2.connect(**DB_CONFIG) # Usa DB_CONFIG importado
-        cur = conn.cursor()
-        cur.execute(query, params)
-
-        if commit:
-            conn.commit()
-            result = True
-        elif fetch_one:
-            result = cur.fetchone()
-        elif fetch_all:
-            result = cur.fetchall()
+        with get_db_connection() as conn: # Conexión prestada por el pool del proceso
+            with conn.cursor() as cur:
+                cur.execute(query, params)
+
+                if commit:
+                    conn.commit()
+                    result = True
+                elif fetch_one:
+                    result = cur.fetchone()
+                elif fetch_all:
+                    result = cur.fetchall()
 
     except psycopg2.Error as db_err:
         logging.error(f"Error de base de datos: {db_err}", exc_info=True)
-        if conn: conn.rollback()
         raise # Relanzar para manejo específico o error 500 genérico
     except Exception as e:
         logging.error(f"Error inesperado en la base de datos: {e}", exc_info=True)
         raise
-    finally:
-        if cur: cur.close()
-        if conn: conn.close()
     return result
 
 def get_fitbit_tokens_from_db(user_id):
@@ -150,18 +146,7 @@ def save_fitbit_tokens_to_db(user_id, client_id, tokens):
     refresh_token = tokens.get('refresh_token')
     user_id_str = str(user_id) # Asegurar tipo string si la columna es VARCHAR
 
-    # Crear tabla si no existe (Idealmente manejado por migraciones)
-    create_table_query = """
-        CREATE TABLE IF NOT EXISTS fitbit_tokens (
-            id SERIAL PRIMARY KEY, user_id VARCHAR(255) NOT NULL UNIQUE, client_id VARCHAR(255) NOT NULL,
-            access_token TEXT NOT NULL, refresh_token TEXT NOT NULL, expires_at TIMESTAMP WITH TIME ZONE NOT NULL, -- Usar TIMESTAMPTZ
-            created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP, updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
-        ); CREATE INDEX IF NOT EXISTS idx_fitbit_user_id ON fitbit_tokens(user_id);
-    """
-    try: _execute_db_query(create_table_query, commit=True)
-    except Exception as e:
-        if "already exists" not in str(e): logging.warning(f"Error al intentar crear tabla fitbit_tokens: {e}")
-
+    # La tabla (y el índice único sobre user_id del UPSERT) la crea la migración 0006
     upsert_query = """
         INSERT INTO fitbit_tokens (user_id, client_id, access_token, refresh_token, expires_at, updated_at)
         VALUES (%s, %s, %s, %s, %s, NOW())
@@ -332,7 +317,7 @@ async def fitbit_callback_handler(request: Request, code: str = Query(None), sta
 
     try:
         logging.info(f"Intercambiando código Fitbit por tokens para usuario pendiente: {user_id_pending}")
-        token_response = requests.post(FITBIT_TOKEN_URL, headers=headers, data=data, timeout=20)
+        token_response = await run_in_threadpool(requests.post, FITBIT_TOKEN_URL, headers=headers, data=data, timeout=20)
 
         if token_response.status_code != 200:
             logging.error(f"Error al intercambiar código Fitbit ({token_response.status_code}): {token_response.text[:200]}")
@@ -342,7 +327,7 @@ async def fitbit_callback_handler(request: Request, code: str = Query(None), sta
         logging.info(f"Tokens Fitbit recibidos para usuario pendiente: {user_id_pending}")
 
         # Guardar Tokens
-        if save_fitbit_tokens_to_db(user_id_pending, FITBIT_CLIENT_ID, tokens):
+        if await run_in_threadpool(save_fitbit_tokens_to_db, user_id_pending, FITBIT_CLIENT_ID, tokens):
             logging.info(f"Tokens Fitbit guardados para usuario: {user_id_pending}")
             return create_frontend_redirect(success_redirect_url, message="¡Fitbit conectado!", is_error=False)
         else:
@@ -357,7 +342,7 @@ async def fitbit_callback_handler(request: Request, code: str = Query(None), sta
         return create_frontend_redirect(error_redirect_url_base, "Error inesperado durante conexión Fitbit.")
 
 # Endpoint /api/fitbit-data renombrado a /data y mejorado
-@router.get("/data", name="fitbit_data", response_class=JSONResponse)
+@router.get("/data", name="fitbit_data", response_class=FastJSONResponse)
 async def get_fitbit_data_api(
     request: Request,
     data_type: str = Query(..., description="Tipo de dato a obtener", # Hacerlo requerido
@@ -373,10 +358,10 @@ async def get_fitbit_data_api(
 
     user_id = user['id'] # Usar ID interno
 
-    access_token = get_valid_access_token(user_id) # Maneja refresco
+    access_token = await run_in_threadpool(get_valid_access_token, user_id) # Maneja refresco (HTTP + BD)
     if not access_token:
         # Comprobar si debería estar conectado
-        is_supposed_to_be_connected = get_fitbit_tokens_from_db(user_id).get("is_connected", False)
+        is_supposed_to_be_connected = (await run_in_threadpool(get_fitbit_tokens_from_db, user_id)).get("is_connected", False)
         status_code = status.HTTP_503_SERVICE_UNAVAILABLE if is_supposed_to_be_connected else status.HTTP_403_FORBIDDEN
         message = "Error al acceder a Fitbit (token inválido/expirado)." if status_code == 503 else "Usuario no conectado a Fitbit."
         raise HTTPException(status_code=status_code, detail=message, headers={"X-Fitbit-Connected": "false"})
@@ -404,14 +389,14 @@ async def get_fitbit_data_api(
         fitbit_api_url = f"{base_fitbit_api_url}{api_path}"
         logging.info(f"Solicitando datos Fitbit: {data_type} para usuario {user_id}")
 
-        response = requests.get(fitbit_api_url, headers=headers, timeout=20)
+        response = await run_in_threadpool(requests.get, fitbit_api_url, headers=headers, timeout=20)
 
         # Procesar respuesta de Fitbit
         if response.status_code == 200:
-            return JSONResponse(content={"success": True, "data_type": data_type, "data": response.json(), "is_connected": True})
+            return FastJSONResponse(content={"success": True, "data_type": data_type, "data": response.json(), "is_connected": True})
         elif response.status_code == 401:
              logging.warning(f"Error 401 de Fitbit API para usuario {user_id}.")
-             delete_fitbit_tokens(user_id)
+             await run_in_threadpool(delete_fitbit_tokens, user_id)
              raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Acceso denegado por Fitbit. Vuelve a conectar.", headers={"X-Fitbit-Connected": "false"})
         elif response.status_code == 429:
              logging.warning(f"Error 429 (Rate Limit) de Fitbit API para usuario {user_id}.")
@@ -432,7 +417,7 @@ async def get_fitbit_data_api(
 
 
 # Endpoint /disconnect-fitbit renombrado a /disconnect
-@router.post("/disconnect", name="fitbit_disconnect", response_class=JSONResponse)
+@router.post("/disconnect", name="fitbit_disconnect", response_class=FastJSONResponse)
 async def disconnect_fitbit_api(request: Request, user = Depends(get_current_user)):
     """API: Desconecta la cuenta de Fitbit eliminando los tokens."""
     if not user or not user.get('id'):
@@ -443,8 +428,8 @@ async def disconnect_fitbit_api(request: Request, user = Depends(get_current_use
 
     # Opcional: Revocar token en Fitbit antes de borrarlo localmente
 
-    if delete_fitbit_tokens(user_id):
-        return JSONResponse(content={"success": True, "message": "Cuenta de Fitbit desconectada."})
+    if await run_in_threadpool(delete_fitbit_tokens, user_id):
+        return FastJSONResponse(content={"success": True, "message": "Cuenta de Fitbit desconectada."})
     else:
         # El error ya debería haberse loggeado
         # Devolver error 500 porque la acción falló en el backend
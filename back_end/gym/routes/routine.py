@@ -16,27 +16,28 @@ try:
     from ..config import DB_CONFIG
     from fastapi import (APIRouter, Depends, Form, HTTPException, Query, Request,
                          Response, status)
-    from fastapi.responses import JSONResponse, RedirectResponse
+    from fastapi.responses import RedirectResponse
     # Importa las funciones de servicio CORRECTAS que necesitas
     # Asegúrate que estas funciones existen y hacen lo que se espera
-    from ..services.database import get_routine, get_today_routine, save_routine
+    from ..services.async_database import get_routine, get_today_routine, save_routine
     # Importa la función para obtener el ID de Google/interno desde Telegram ID
     # Asumimos que existe una función así en auth_service o database_service
-    from ..services.auth_service import get_user_id_by_telegram # O get_google_id_by_telegram si la tienes
+    from ..services.async_auth_service import get_user_id_by_telegram # O get_google_id_by_telegram si la tienes
 
     # Importa tu middleware de autenticación
     from ..middlewares import get_current_user # Ajusta la ruta si es diferente
     # Importa utilidades si las usas
     from ..utils.date_utils import get_weekday_name # Ajusta la ruta si es diferente
+    from ..utils.json_response import FastJSONResponse
 
 except ImportError as e:
     logging.error(f"Error CRÍTICO de importación en routine.py: {e}. Revisa las rutas.")
     # Define stubs o lanza error si es crítico para el arranque
     async def get_current_user(request: Request): return None
-    def get_routine(user_id): return {}
-    def get_today_routine(user_id): return {"success": False, "message": "Error interno (stub)"}
-    def save_routine(user_id, data): return False
-    def get_user_id_by_telegram(telegram_id: str): return None # Placeholder
+    async def get_routine(user_id): return {}
+    async def get_today_routine(user_id): return {"success": False, "message": "Error interno (stub)"}
+    async def save_routine(user_id, data): return False
+    async def get_user_id_by_telegram(telegram_id: str): return None # Placeholder
     def get_weekday_name(day_num): return "Desconocido"
     DB_CONFIG = {} # Placeholder
     # Considera lanzar 'raise e' si la app no debe iniciar sin estas importaciones
@@ -49,7 +50,7 @@ router = APIRouter(prefix="/api", tags=["routine"])
 logger = logging.getLogger(__name__) # Logger
 
 # Ruta: /api/rutina_hoy
-@router.get("/rutina_hoy", response_class=JSONResponse)
+@router.get("/rutina_hoy", response_class=FastJSONResponse)
 async def rutina_hoy(
     request: Request,
     format: str = Query(None),
@@ -77,12 +78,12 @@ async def rutina_hoy(
         # Buscar el ID interno/google_id correspondiente al telegram_id
         # Asume que get_user_id_by_telegram devuelve el ID interno/google_id necesario para rutinas
         # O usa una función get_google_id_by_telegram si la tienes
-        internal_user_id = get_user_id_by_telegram(str(telegram_id)) # Llama a tu función de servicio
+        internal_user_id = await get_user_id_by_telegram(str(telegram_id)) # Llama a tu función de servicio
 
         if not internal_user_id:
             logger.warning(f"No se encontró un usuario interno/google_id vinculado al telegram_id: {telegram_id}")
             # Puedes decidir devolver success: False o un error 404/403
-            return JSONResponse(content={
+            return FastJSONResponse(content={
                 "success": False,
                 "message": "Este usuario de Telegram no está vinculado a una cuenta.",
                 "dia_nombre": get_weekday_name(datetime.now().isoweekday()), # Nombre del día actual
@@ -106,7 +107,7 @@ async def rutina_hoy(
     logger.info(f"Obteniendo rutina de hoy para Usuario ID (interno/google): {user_id_for_logic}")
 
     # Llamar al servicio de base de datos con el ID CORRECTO
-    result = get_today_routine(user_id_for_logic)
+    result = await get_today_routine(user_id_for_logic)
 
     # Añadir día actual a la respuesta si no lo incluye get_today_routine
     if 'dia_nombre' not in result:
@@ -119,13 +120,13 @@ async def rutina_hoy(
         dia_actual_num = now_local.isoweekday()
         result['dia_nombre'] = get_weekday_name(dia_actual_num) # Usa tu helper
 
-    # Devolver siempre JSONResponse para consistencia
+    # Devolver siempre JSON para consistencia
     # El status code HTTP será 200 OK, el 'success' dentro del JSON indica si se encontró rutina
-    return JSONResponse(content=result)
+    return FastJSONResponse(content=result)
 
 
 # Ruta: /api/rutina (GET)
-@router.get("/rutina", response_class=JSONResponse)
+@router.get("/rutina", response_class=FastJSONResponse)
 async def get_routine_config(
     request: Request,
     format: str = Query(None), # Parámetro 'format' parece no usarse, considerar quitarlo
@@ -150,11 +151,11 @@ async def get_routine_config(
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Parámetro 'telegram_id' requerido.")
 
         logger.info(f"Bot solicitando config rutina para telegram_id: {telegram_id}")
-        internal_user_id = get_user_id_by_telegram(str(telegram_id))
+        internal_user_id = await get_user_id_by_telegram(str(telegram_id))
         if not internal_user_id:
             logger.warning(f"No se encontró usuario interno/google_id para telegram_id: {telegram_id}")
             # Devuelve éxito true pero rutina vacía, ya que la llamada fue válida pero no hay datos
-            return JSONResponse(content={"success": True, "rutina": {}})
+            return FastJSONResponse(content={"success": True, "rutina": {}})
         user_id_for_logic = internal_user_id
         logger.info(f"Telegram ID {telegram_id} -> Usuario ID (interno/google): {user_id_for_logic}")
         # --- FIN LÓGICA CORREGIDA ---
@@ -171,13 +172,13 @@ async def get_routine_config(
     logger.info(f"Obteniendo configuración de rutina para Usuario ID (interno/google): {user_id_for_logic}")
 
     # Llama al servicio con el ID correcto
-    rutina_data = get_routine(user_id_for_logic)
+    rutina_data = await get_routine(user_id_for_logic)
     # Devuelve siempre éxito true si la obtención fue posible (incluso si está vacía)
-    return JSONResponse(content={"success": True, "rutina": rutina_data if rutina_data is not None else {}})
+    return FastJSONResponse(content={"success": True, "rutina": rutina_data if rutina_data is not None else {}})
 
 
 # Ruta: /api/rutina (POST)
-@router.post("/rutina", response_class=JSONResponse)
+@router.post("/rutina", response_class=FastJSONResponse)
 async def save_routine_config(
     request: Request,
     user = Depends(get_current_user)
@@ -206,7 +207,7 @@ async def save_routine_config(
                 raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Payload debe incluir 'telegram_id' para solicitudes del bot.")
 
             logger.info(f"Bot guardando rutina. Payload telegram_id: {telegram_id_from_payload}")
-            internal_user_id = get_user_id_by_telegram(str(telegram_id_from_payload))
+            internal_user_id = await get_user_id_by_telegram(str(telegram_id_from_payload))
             if not internal_user_id:
                 logger.error(f"Bot intentó guardar rutina para telegram_id no vinculado: {telegram_id_from_payload}")
                 raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Usuario de Telegram no vinculado encontrado.")
@@ -226,11 +227,11 @@ async def save_routine_config(
         logger.info(f"Intentando guardar rutina para Usuario ID (interno/google): {user_id_for_logic}")
 
         # Llama al servicio con el ID correcto y los datos de rutina
-        success = save_routine(user_id_for_logic, rutina_data_received)
+        success = await save_routine(user_id_for_logic, rutina_data_received)
 
         if success:
             logger.info(f"Rutina guardada exitosamente para usuario ID: {user_id_for_logic}")
-            return JSONResponse(content={
+            return FastJSONResponse(content={
                 "success": True,
                 "message": "Rutina actualizada correctamente"
             })
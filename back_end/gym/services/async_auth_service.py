@@ -0,0 +1,190 @@
+# Archivo: services/async_auth_service.py
+"""
+Versión asíncrona de services/auth_service.py para las rutas y el middleware.
+
+Las consultas de usuario (las que se hacen en cada petición autenticada) y
+get_or_create_user usan el pool asíncrono. La verificación del token de Google
+(puede descargar las claves de Google si la caché está fría) y las operaciones
+poco frecuentes de vinculación de cuentas reutilizan la implementación síncrona
+en el threadpool.
+"""
+
+import logging
+
+from starlette.concurrency import run_in_threadpool
+
+from . import auth_service as sync_auth
+from .async_db_pool import ASYNC_DB_AVAILABLE, async_db_connection
+
+logger = logging.getLogger(__name__)
+
+
+async def verify_google_token(token):
+    """Verifica un token de Google y devuelve la información si es válido."""
+    return await run_in_threadpool(sync_auth.verify_google_token, token)
+
+
+async def get_or_create_user(google_id=None, telegram_id=None, email=None, display_name=None, profile_picture=None):
+    """
+    Obtiene o crea un usuario basado en su ID de Google o Telegram.
+
+    Args:
+        google_id (str, optional): ID de Google del usuario
+        telegram_id (str, optional): ID de Telegram del usuario
+        email (str, optional): Email del usuario
+        display_name (str, optional): Nombre a mostrar del usuario
+        profile_picture (str, optional): URL de la foto de perfil
+
+    Returns:
+        int: ID interno del usuario
+    """
+    if not ASYNC_DB_AVAILABLE:
+        return await run_in_threadpool(
+            sync_auth.get_or_create_user, google_id, telegram_id, email, display_name, profile_picture
+        )
+    try:
+        async with async_db_connection() as conn:
+            async with conn.cursor() as cur:
+                user_id = None
+
+                if google_id:
+                    await cur.execute(sync_auth.USER_ID_BY_GOOGLE_SQL, (google_id,))
+                    result = await cur.fetchone()
+                    if result:
+                        user_id = result[0]
+
+                if not user_id and telegram_id:
+                    await cur.execute(sync_auth.USER_ID_BY_TELEGRAM_SQL, (telegram_id,))
+                    result = await cur.fetchone()
+                    if result:
+                        user_id = result[0]
+
+                if user_id:
+                    update = sync_auth.build_user_update(user_id, google_id, telegram_id, email, display_name, profile_picture)
+                    if update:
+                        await cur.execute(*update)
+                else:
+                    await cur.execute(sync_auth.INSERT_USER_SQL, (telegram_id, google_id, email, display_name, profile_picture))
+                    user_id = (await cur.fetchone())[0]
+        sync_auth.invalidate_user(user_id)
+        return user_id
+    except Exception as e:
+        logger.error(f"Error en get_or_create_user: {e}")
+        return None
+
+
+def invalidate_user(*user_ids):
+    """Elimina usuarios de la caché (ver auth_service.invalidate_user)."""
+    sync_auth.invalidate_user(*user_ids)
+
+
+def get_user_cache_stats():
+    """Contadores de la caché de usuarios (ver auth_service.get_user_cache_stats)."""
+    return sync_auth.get_user_cache_stats()
+
+
+async def migrate_user_data(old_user_id, new_user_id):
+    """Migra los datos de un usuario a otro (ver auth_service.migrate_user_data)."""
+    return await run_in_threadpool(sync_auth.migrate_user_data, old_user_id, new_user_id)
+
+
+async def _fetch_one(query, params, func_name):
+    """Ejecuta una consulta de una fila con el pool asíncrono; loguea y relanza los errores."""
+    try:
+        async with async_db_connection() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(query, params)
+                return await cur.fetchone()
+    except Exception as e:
+        logger.error(f"Error en {func_name}: {e}")
+        raise
+
+
+async def get_user_by_id(user_id):
+    """
+    Obtiene la información de un usuario por su ID interno.
+
+    Args:
+        user_id (int): ID interno del usuario
+
+    Returns:
+        dict: Información del usuario o None si no se encuentra
+    """
+    try:
+        # Caché compartida con la versión síncrona (sync_auth.USER_CACHE)
+        user = sync_auth.cached_user(user_id)
+        if user is not None:
+            return user
+        if not ASYNC_DB_AVAILABLE:
+            return await run_in_threadpool(sync_auth.get_user_by_id, user_id)
+        result = await _fetch_one(sync_auth.USER_SELECT_SQL + " WHERE id = %s", (user_id,), "get_user_by_id")
+        return sync_auth.cache_user(sync_auth.row_to_user(result))
+    except Exception:
+        return None
+
+
+async def get_user_by_email(email):
+    """
+    Obtiene un usuario por su correo electrónico.
+
+    Args:
+        email (str): Correo electrónico del usuario
+
+    Returns:
+        dict: Información del usuario o None si no se encuentra
+    """
+    if not ASYNC_DB_AVAILABLE:
+        return await run_in_threadpool(sync_auth.get_user_by_email, email)
+    try:
+        result = await _fetch_one(sync_auth.USER_SELECT_SQL + " WHERE email = %s", (email,), "get_user_by_email")
+        return sync_auth.row_to_user(result)
+    except Exception:
+        return None
+
+
+async def get_user_id_by_telegram(telegram_id):
+    """
+    Obtiene el ID interno de un usuario por su ID de Telegram.
+
+    Args:
+        telegram_id (str): ID de Telegram del usuario
+
+    Returns:
+        int: ID interno del usuario o None si no se encuentra
+    """
+    if not ASYNC_DB_AVAILABLE:
+        return await run_in_threadpool(sync_auth.get_user_id_by_telegram, telegram_id)
+    try:
+        result = await _fetch_one(sync_auth.USER_ID_BY_TELEGRAM_SQL, (telegram_id,), "get_user_id_by_telegram")
+        return result[0] if result else None
+    except Exception:
+        return None
+
+
+async def get_user_id_by_google(google_id):
+    """
+    Obtiene el ID interno de un usuario por su ID de Google.
+
+    Args:
+        google_id (str): ID de Google del usuario
+
+    Returns:
+        int: ID interno del usuario o None si no se encuentra
+    """
+    if not ASYNC_DB_AVAILABLE:
+        return await run_in_threadpool(sync_auth.get_user_id_by_google, google_id)
+    try:
+        result = await _fetch_one(sync_auth.USER_ID_BY_GOOGLE_SQL, (google_id,), "get_user_id_by_google")
+        return result[0] if result else None
+    except Exception:
+        return None
+
+
+async def generate_link_code(user_id):
+    """Genera un código de vinculación de Telegram (ver auth_service.generate_link_code)."""
+    return await run_in_threadpool(sync_auth.generate_link_code, user_id)
+
+
+async def verify_link_code(code, telegram_id):
+    """Verifica un código de vinculación (ver auth_service.verify_link_code)."""
+    return await run_in_threadpool(sync_auth.verify_link_code, code, telegram_id)
@@ -0,0 +1,292 @@
+# Archivo: services/async_database.py
+"""
+Versión asíncrona de services/database.py para las rutas FastAPI.
+
+Mismas funciones, mismos argumentos y mismos valores de retorno que el módulo
+síncrono; el SQL y el post-procesado de filas se comparten con él. Si psycopg 3
+no está disponible, cada función ejecuta su equivalente síncrono en el threadpool.
+"""
+
+import datetime
+import json
+import logging
+
+from starlette.concurrency import run_in_threadpool
+
+from . import database as sync_db
+from .data_version import BUMP_DATA_VERSION_SQL, data_version_ids
+from .async_db_pool import (ASYNC_DB_AVAILABLE, async_db_connection,
+                            async_fetch_all, async_stream, psycopg)
+from .daily_activity import DELETE_DAILY_ACTIVITY_SQL, REBUILD_DAILY_ACTIVITY_SQL
+from .personal_records import DELETE_USER_RECORDS_SQL, REBUILD_USER_RECORDS_SQL
+from .rollups import DELETE_USER_ROLLUPS_SQL, REBUILD_USER_ROLLUPS_SQL
+
+logger = logging.getLogger(__name__)
+
+
+async def insert_into_db(json_data, user_id, with_records=False):
+    """
+    Inserta los datos de ejercicios en la base de datos utilizando solo user_id.
+
+    Args:
+        json_data (dict): Datos de ejercicios en formato JSON.
+        user_id (str): ID de Google del usuario.
+        with_records (bool): Devolver los récords personales batidos en lugar de un bool.
+
+    Returns:
+        bool: True si la inserción fue exitosa, False en caso contrario.
+        Con with_records=True, la lista de récords batidos (vacía si no hay
+        ninguno) o None si la inserción falla.
+    """
+    if not ASYNC_DB_AVAILABLE:
+        return await run_in_threadpool(sync_db.insert_into_db, json_data, user_id, with_records)
+
+    user_id_str = str(user_id)
+    try:
+        rows = sync_db.build_exercise_rows(json_data, user_id_str)
+        logger.info(f"Intentando insertar {len(rows)} ejercicios para usuario {user_id_str}.")
+        async with async_db_connection() as conn:
+            async with conn.cursor() as cur:
+                new_records = []
+                if rows:
+                    # Misma sentencia multi-fila que la versión síncrona: un solo INSERT
+                    # (y un round-trip) para todos los ejercicios de la sesión
+                    await cur.execute(*sync_db.build_insert_statement(rows))
+                    _, new_records = await cur.fetchone()
+        logger.info(f"✅ Inserción exitosa para usuario {user_id_str} ({len(new_records)} récords nuevos).")
+        return new_records if with_records else True
+    except Exception as e:
+        logger.error(f"❌ Error al insertar en la base de datos para usuario {user_id_str}: {e}", exc_info=True)
+        return None if with_records else False
+
+
+async def insert_many(records, user_id, batch_size=None):
+    """
+    Inserta muchas sesiones en lotes sin bloquear el event loop.
+
+    Importaciones masivas: se ejecuta services.database.insert_many (INSERT
+    multi-fila con execute_values) en el threadpool.
+
+    Returns:
+        dict: {'success', 'inserted', 'batches', 'errors'} (ver database.insert_many).
+    """
+    return await run_in_threadpool(sync_db.insert_many, records, user_id, batch_size)
+
+
+async def get_exercise_logs(user_id, days=7):
+    """
+    Obtiene los logs de ejercicios de un usuario usando su ID de Google.
+
+    Args:
+        user_id (str): ID de Google del usuario.
+        days (int): Número de días hacia atrás para obtener logs.
+
+    Returns:
+        list or None: Lista de logs o None si hay un error.
+    """
+    if not ASYNC_DB_AVAILABLE:
+        return await run_in_threadpool(sync_db.get_exercise_logs, user_id, days)
+
+    user_id_str = str(user_id)
+    try:
+        cutoff = datetime.datetime.now() - datetime.timedelta(days=days)
+        logger.info(f"Obteniendo logs de los últimos {days} días para usuario {user_id_str}")
+        logs = [sync_db.row_to_log(row) async for row in async_stream(sync_db.EXERCISE_LOGS_SQL, (cutoff, user_id_str))]
+        logger.info(f"Se encontraron {len(logs)} registros de log para usuario {user_id_str}")
+        return logs
+    except Exception as e:
+        logger.error(f"Error al obtener logs para usuario {user_id_str}: {e}", exc_info=True)
+        return None
+
+
+async def get_exercise_logs_page(user_id, limit=sync_db.LOGS_PAGE_DEFAULT_LIMIT, after=None, **filters):
+    """
+    Obtiene una página de logs de un usuario, de más reciente a más antiguo.
+
+    Args:
+        user_id (str): ID de Google/Telegram del usuario.
+        limit (int): Logs por página.
+        after (tuple, optional): Cursor decodificado de la página anterior.
+        **filters: since, until, ejercicio y tipo (ver database.build_logs_query).
+
+    Returns:
+        dict or None: {'logs', 'next_cursor'} o None si hay un error.
+    """
+    user_id_str = str(user_id)
+    try:
+        query, params = sync_db.build_logs_query(user_id_str, after=after, limit=limit, **filters)
+        return sync_db.rows_to_logs_page(await async_fetch_all(query, params), limit)
+    except Exception as e:
+        logger.error(f"Error al obtener la página de logs para usuario {user_id_str}: {e}", exc_info=True)
+        return None
+
+
+async def stream_exercise_logs(user_id, days=7, **filters):
+    """
+    Igual que get_exercise_logs pero generando los logs uno a uno (cursor de servidor).
+
+    Para respuestas en streaming: la memoria no depende del número de logs.
+    Los errores de base de datos se propagan al consumidor.
+
+    Args:
+        user_id (str): ID de Google/Telegram del usuario.
+        days (int): Días hacia atrás si no se indica 'since'.
+        **filters: since, until, ejercicio y tipo (ver database.build_logs_query).
+
+    Yields:
+        dict: Log con 'fecha', 'ejercicio' y 'data'.
+    """
+    if filters.get("since") is None:
+        filters["since"] = datetime.datetime.now() - datetime.timedelta(days=days)
+    query, params = sync_db.build_logs_query(user_id, **filters)
+    async for row in async_stream(query, params):
+        yield sync_db.row_to_log(row)
+
+
+async def save_routine(user_id, routine_data):
+    """
+    Guarda la rutina de un usuario usando su ID de Google.
+
+    Args:
+        user_id (str): ID de Google del usuario.
+        routine_data (dict): Datos de la rutina.
+
+    Returns:
+        bool: True si la operación fue exitosa, False en caso contrario.
+    """
+    if not ASYNC_DB_AVAILABLE:
+        return await run_in_threadpool(sync_db.save_routine, user_id, routine_data)
+
+    user_id_str = str(user_id)
+    try:
+        logger.info(f"Guardando/Actualizando rutina para usuario ID={user_id_str}")
+        dias_insertados = 0
+        async with async_db_connection() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(sync_db.DELETE_ROUTINE_SQL, (user_id_str,))
+                for dia, ejercicios in routine_data.items():
+                    try:
+                        dia_semana = int(dia)
+                        if not 1 <= dia_semana <= 7: continue
+                        if not isinstance(ejercicios, list): continue
+                        ejercicios_json = json.dumps(ejercicios)
+                    except ValueError: logger.warning(f"Clave día no numérica '{dia}', user {user_id_str}. Ignorando."); continue
+                    except TypeError as json_err: logger.error(f"Error JSON día {dia}, user {user_id_str}: {json_err}"); continue
+                    await cur.execute(sync_db.INSERT_ROUTINE_DAY_SQL, (user_id_str, dia_semana, ejercicios_json))
+                    dias_insertados += 1
+        logger.info(f"✅ Rutina guardada/actualizada ({dias_insertados} días) para usuario {user_id_str}.")
+        return True
+    except Exception as e:
+        logger.error(f"Error al guardar rutina para usuario {user_id_str}: {e}", exc_info=True)
+        return False
+
+
+async def get_routine(user_id):
+    """
+    Obtiene la rutina completa de un usuario usando su ID de Google.
+
+    Args:
+        user_id (str): ID de Google del usuario.
+
+    Returns:
+        dict or None: Rutina del usuario o None si hay un error.
+    """
+    if not ASYNC_DB_AVAILABLE:
+        return await run_in_threadpool(sync_db.get_routine, user_id)
+
+    user_id_str = str(user_id)
+    try:
+        logger.info(f"Obteniendo rutina completa para usuario ID={user_id_str}")
+        async with async_db_connection() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(sync_db.ROUTINE_SQL, (user_id_str,))
+                rows = await cur.fetchall()
+        rutina = sync_db.rows_to_routine(rows, user_id_str)
+        logger.info(f"Rutina obtenida para usuario {user_id_str} ({len(rutina)} días definidos)")
+        return rutina
+    except Exception as e:
+        logger.error(f"Error al obtener rutina para usuario {user_id_str}: {e}", exc_info=True)
+        return None
+
+
+async def get_today_routine(user_id):
+    """
+    Obtiene la rutina del día actual para un usuario y marca los realizados.
+
+    Args:
+        user_id (str): ID de Google del usuario.
+
+    Returns:
+        dict: Información de la rutina del día o mensaje de error.
+    """
+    if not ASYNC_DB_AVAILABLE:
+        return await run_in_threadpool(sync_db.get_today_routine, user_id)
+
+    user_id_str = str(user_id)
+    dia_actual = datetime.datetime.now().isoweekday()
+    dia_nombre_actual = sync_db.get_weekday_name(dia_actual)
+
+    try:
+        logger.info(f"Obteniendo rutina de hoy ({dia_nombre_actual}) para usuario {user_id_str}")
+        async with async_db_connection() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(sync_db.ROUTINE_DAY_SQL, (user_id_str, dia_actual))
+                row_rutina = await cur.fetchone()
+
+                if not row_rutina:
+                    logger.info(f"No hay rutina definida para hoy ({dia_nombre_actual}) para usuario {user_id_str}")
+                    return {"success": False, "message": "No hay rutina definida para hoy.", "dia_nombre": dia_nombre_actual, "rutina": []}
+
+                ejercicios_planeados = sync_db.parse_planned_exercises(row_rutina[0])
+
+                hoy_fecha = datetime.date.today()
+                await cur.execute(sync_db.EXERCISES_DONE_ON_DAY_SQL, (user_id_str, hoy_fecha, hoy_fecha))
+                ejercicios_realizados_set = {row[0] for row in await cur.fetchall()}
+        logger.debug(f"Ejercicios realizados hoy por {user_id_str}: {ejercicios_realizados_set}")
+
+        rutina_resultado = sync_db.build_today_routine(ejercicios_planeados, ejercicios_realizados_set, user_id_str)
+        return {"success": True, "message": "Rutina para hoy obtenida correctamente.", "rutina": rutina_resultado, "dia_nombre": dia_nombre_actual}
+
+    except psycopg.Error as db_err:
+        logger.error(f"Error DB al obtener rutina para user {user_id_str} día {dia_actual}: {db_err}", exc_info=True)
+        return {"success": False, "message": f"Error DB: {db_err}", "dia_nombre": dia_nombre_actual, "rutina": []}
+    except Exception as e:
+        logger.error(f"Error general al obtener rutina de hoy para user {user_id_str}: {e}", exc_info=True)
+        return {"success": False, "message": f"Error interno al obtener la rutina de hoy.", "dia_nombre": dia_nombre_actual, "rutina": []}
+
+
+async def reset_today_routine_status(user_id: str) -> bool:
+    """
+    Reinicia el estado de 'realizado' para la rutina de hoy de un usuario
+    eliminando los registros de ejercicios del día actual.
+
+    Args:
+        user_id (str): ID de Google del usuario.
+
+    Returns:
+        bool: True si la operación fue exitosa, False en caso contrario.
+    """
+    if not ASYNC_DB_AVAILABLE:
+        return await run_in_threadpool(sync_db.reset_today_routine_status, user_id)
+
+    user_id_str = str(user_id)
+    try:
+        hoy_fecha = datetime.date.today()
+        logger.info(f"Intentando reiniciar estado de rutina (eliminar logs) para hoy ({hoy_fecha}) - Usuario: {user_id_str}")
+        async with async_db_connection() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(sync_db.DELETE_EXERCISES_ON_DAY_SQL, (user_id_str, hoy_fecha, hoy_fecha))
+                num_deleted, ejercicios_borrados = await cur.fetchone()
+                if ejercicios_borrados:
+                    await cur.execute(DELETE_USER_ROLLUPS_SQL, (user_id_str, ejercicios_borrados))
+                    await cur.execute(REBUILD_USER_ROLLUPS_SQL, (user_id_str, ejercicios_borrados))
+                    await cur.execute(DELETE_USER_RECORDS_SQL, (user_id_str, ejercicios_borrados))
+                    await cur.execute(REBUILD_USER_RECORDS_SQL, (user_id_str, ejercicios_borrados))
+                await cur.execute(DELETE_DAILY_ACTIVITY_SQL, (user_id_str, hoy_fecha, hoy_fecha))
+                await cur.execute(REBUILD_DAILY_ACTIVITY_SQL, (user_id_str, hoy_fecha, hoy_fecha))
+                await cur.execute(BUMP_DATA_VERSION_SQL, (data_version_ids(user_id_str),))
+        logger.info(f"✅ Estado de rutina reiniciado para usuario {user_id_str}. Se eliminaron {num_deleted} registros de ejercicios de hoy.")
+        return True
+    except Exception as e:
+        logger.error(f"❌ Error al reiniciar estado de rutina para usuario {user_id_str}: {e}", exc_info=True)
+        return False
@@ -0,0 +1,202 @@
+# Archivo: services/async_db_pool.py
+"""
+Pool de conexiones PostgreSQL asíncrono (psycopg 3) para las rutas FastAPI.
+
+Las rutas 'async def' piden la conexión con 'async with async_db_connection()'
+y no bloquean el event loop mientras esperan a la base de datos. El pool
+síncrono de services/db_pool.py sigue existiendo para el scheduler, el CLI y
+cualquier código que corra en hilos.
+
+Si psycopg 3 no está instalado, ASYNC_DB_AVAILABLE es False y los servicios
+asíncronos delegan en las funciones síncronas dentro del threadpool.
+"""
+
+import logging
+from contextlib import asynccontextmanager
+
+import psycopg2
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+
+try:
+    import psycopg
+    from psycopg_pool import AsyncConnectionPool
+    ASYNC_DB_AVAILABLE = True
+except ImportError:
+    psycopg = None
+    AsyncConnectionPool = None
+    ASYNC_DB_AVAILABLE = False
+
+try:
+    from ..config import DB_CONFIG, DB_CURSOR_ITERSIZE, DB_POOL_CONFIG
+except ImportError:
+    try:
+        from config import DB_CONFIG, DB_CURSOR_ITERSIZE, DB_POOL_CONFIG
+    except ImportError:
+        logging.critical("No se pudo importar DB_CONFIG/DB_POOL_CONFIG. Verifica la estructura del proyecto.")
+        DB_CONFIG = {}
+        DB_POOL_CONFIG = {}
+        DB_CURSOR_ITERSIZE = 2000
+
+from .db_pool import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+# Errores de base de datos de cualquiera de los dos drivers, para los 'except' de las rutas
+DB_ERRORS = (psycopg2.Error, psycopg.Error) if ASYNC_DB_AVAILABLE else (psycopg2.Error,)
+
+if not ASYNC_DB_AVAILABLE:
+    logger.warning("psycopg 3 no está instalado. Las rutas usarán el pool síncrono en el threadpool.")
+
+_async_pool = None
+
+
+async def open_async_pool():
+    """
+    Crea y abre el pool asíncrono (llamar desde el lifespan de la app).
+
+    Returns:
+        AsyncConnectionPool or None: El pool, o None si psycopg 3 no está disponible.
+    """
+    global _async_pool
+    if not ASYNC_DB_AVAILABLE:
+        return None
+    if _async_pool is None:
+        pool = AsyncConnectionPool(
+            conninfo="",
+            kwargs={k: v for k, v in DB_CONFIG.items() if v is not None},
+            min_size=DB_POOL_CONFIG.get('min_size', 1),
+            max_size=DB_POOL_CONFIG.get('max_size', 10),
+            timeout=DB_POOL_CONFIG.get('timeout', 10.0),
+            max_idle=600.0,
+            check=AsyncConnectionPool.check_connection,
+            name="gym-async",
+            open=False,
+        )
+        # wait=False: si la BD no está lista la app arranca igual y el pool reintenta en segundo plano
+        await pool.open(wait=False)
+        _async_pool = pool
+        logger.info(f"Pool asíncrono creado (min={pool.min_size}, max={pool.max_size}).")
+    return _async_pool
+
+
+async def close_async_pool():
+    """Cierra el pool asíncrono (llamar al apagar la aplicación)."""
+    global _async_pool
+    if _async_pool is not None:
+        await _async_pool.close()
+        _async_pool = None
+        logger.info("Pool asíncrono cerrado.")
+
+
+def get_async_pool_stats():
+    """Métricas del pool asíncrono (pool_size, requests_waiting...) o None si aún no existe."""
+    return _async_pool.get_stats() if _async_pool is not None else None
+
+
+@asynccontextmanager
+async def async_db_connection():
+    """
+    Presta una conexión asíncrona del pool durante el bloque 'async with'.
+
+    A diferencia de get_db_connection(), la transacción se confirma al salir
+    del bloque sin errores y se deshace si el bloque lanza una excepción.
+    """
+    pool = _async_pool or await open_async_pool()
+    if pool is None:
+        raise RuntimeError("psycopg 3 no está instalado: no hay pool asíncrono disponible.")
+    async with pool.connection() as conn:
+        yield conn
+
+
+def _fetch_all_sync(query, params):
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(query, params)
+            return cur.fetchall()
+
+
+async def async_fetch_all(query, params=None):
+    """
+    Ejecuta una consulta de lectura y devuelve todas las filas sin bloquear el event loop.
+
+    Args:
+        query (str): SQL con placeholders %s (válido para psycopg2 y psycopg 3).
+        params (tuple or list, optional): Parámetros de la consulta.
+
+    Returns:
+        list: Filas devueltas por la consulta.
+    """
+    if not ASYNC_DB_AVAILABLE:
+        return await run_in_threadpool(_fetch_all_sync, query, params)
+    async with async_db_connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(query, params)
+            return await cur.fetchall()
+
+
+def _execute_sync(query, params):
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(query, params)
+            rowcount = cur.rowcount
+        conn.commit()
+    return rowcount
+
+
+async def async_execute(query, params=None):
+    """
+    Ejecuta una sentencia de escritura en su propia transacción.
+
+    Args:
+        query (str): SQL con placeholders %s.
+        params (tuple or list, optional): Parámetros de la sentencia.
+
+    Returns:
+        int: Filas afectadas (rowcount).
+    """
+    if not ASYNC_DB_AVAILABLE:
+        return await run_in_threadpool(_execute_sync, query, params)
+    async with async_db_connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(query, params)
+            return cur.rowcount
+
+
+def _stream_sync(query, params, itersize):
+    with get_db_connection() as conn:
+        try:
+            # Cursor con nombre = cursor de servidor: trae 'itersize' filas por viaje
+            with conn.cursor(name="gym_stream") as cur:
+                cur.itersize = itersize
+                cur.execute(query, params)
+                yield from cur
+        finally:
+            conn.rollback()  # Cierra la transacción de solo lectura del cursor
+
+
+async def async_stream(query, params=None, itersize=None):
+    """
+    Itera las filas de una consulta con un cursor de servidor, sin cargarlas todas en memoria.
+
+    La conexión queda prestada mientras dure la iteración (p.ej. lo que tarde en
+    enviarse una StreamingResponse).
+
+    Args:
+        query (str): SQL con placeholders %s.
+        params (tuple or list, optional): Parámetros de la consulta.
+        itersize (int, optional): Filas por viaje (por defecto DB_CURSOR_ITERSIZE).
+
+    Yields:
+        tuple: Cada fila.
+    """
+    itersize = itersize or DB_CURSOR_ITERSIZE
+    if not ASYNC_DB_AVAILABLE:
+        async for row in iterate_in_threadpool(_stream_sync(query, params, itersize)):
+            yield row
+        return
+    async with async_db_connection() as conn:
+        async with conn.cursor(name="gym_stream") as cur:
+            cur.itersize = itersize
+            await cur.execute(query, params)
+            async for row in cur:
+                yield row
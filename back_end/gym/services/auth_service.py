@@ -1,6 +1,5 @@
 import os
 import sys
-# Añade esta línea al principio del archivo auth_service.py
 import logging
 
 
@@ -10,46 +9,164 @@ import datetime
 import json
 import random
 import string
+import threading
 
 import psycopg2
-from config import DB_CONFIG
-from google.auth.transport import requests
-from google.oauth2 import id_token
+from config import DB_CONFIG, USER_CACHE_MAX_SIZE, USER_CACHE_TTL
+from .data_version import bump_data_version
+from .db_pool import get_db_connection
+try:
+    from ..utils.cache import TTLCache
+except ImportError:
+    from utils.cache import TTLCache
+import jwt
+from .google_token_verifier import GoogleTokenVerifier
+
+logger = logging.getLogger(__name__)
 
 # Cargar configuración de Google Auth
 GOOGLE_CLIENT_ID = os.getenv('GOOGLE_CLIENT_ID')
 GOOGLE_CLIENT_SECRET = os.getenv('GOOGLE_CLIENT_SECRET')
 GOOGLE_REDIRECT_URI = os.getenv('GOOGLE_REDIRECT_URI', 'http://localhost:5050/google-callback')
 
-# En auth_service.py, añade/modifica la función verify_google_token:
+# SQL compartido con services/async_auth_service.py
+USER_SELECT_SQL = """
+    SELECT id, telegram_id, google_id, email, display_name, profile_picture,
+          created_at, updated_at
+    FROM users
+"""
+USER_ID_BY_TELEGRAM_SQL = "SELECT id FROM users WHERE telegram_id = %s"
+USER_ID_BY_GOOGLE_SQL = "SELECT id FROM users WHERE google_id = %s"
+# IDs con los que gym.ejercicios guarda los datos de los usuarios indicados
+USER_DATA_IDS_SQL = "SELECT google_id, telegram_id FROM users WHERE id = ANY(%s)"
+INSERT_USER_SQL = """
+    INSERT INTO users (telegram_id, google_id, email, display_name, profile_picture)
+    VALUES (%s, %s, %s, %s, %s)
+    RETURNING id
+"""
+
+# Usuarios por ID interno: get_current_user resuelve el usuario en cada petición
+# autenticada y así la mayoría no consulta la BD. Toda escritura sobre 'users'
+# (o que cambie a qué usuario pertenecen los datos) debe llamar a invalidate_user.
+USER_CACHE = TTLCache(maxsize=USER_CACHE_MAX_SIZE, ttl=USER_CACHE_TTL, name="users")
+
+
+def cached_user(user_id):
+    """Devuelve una copia del usuario cacheado con ese ID interno o None."""
+    user = USER_CACHE.get(int(user_id))
+    return dict(user) if user is not None else None
+
+
+def cache_user(user):
+    """Guarda en caché un dict de row_to_user (los None no se cachean)."""
+    if user:
+        USER_CACHE.set(int(user['id']), dict(user))
+    return user
+
+
+def invalidate_user(*user_ids):
+    """Elimina de la caché los usuarios indicados por ID interno (ignora None)."""
+    USER_CACHE.invalidate(*(int(uid) for uid in user_ids if uid is not None))
+
+
+def bump_users_data_version(cur, user_ids, *extra_ids):
+    """
+    Cambia la versión de datos (ETags del dashboard) de usuarios por ID interno.
+
+    Args:
+        cur: Cursor de la transacción que cambia a qué usuario pertenecen los datos.
+        user_ids (list): IDs internos (se ignoran los None).
+        *extra_ids: Otros IDs de gym.ejercicios afectados (p.ej. el Telegram ID recibido).
+    """
+    cur.execute(USER_DATA_IDS_SQL, ([int(uid) for uid in user_ids if uid is not None],))
+    bump_data_version(cur, *(uid for row in cur.fetchall() for uid in row), *extra_ids)
+
+
+def get_user_cache_stats():
+    """Contadores de la caché de usuarios (hits, misses, size...)."""
+    return USER_CACHE.stats()
+
+
+def row_to_user(result):
+    """Convierte una fila de USER_SELECT_SQL en el dict de usuario (o None)."""
+    if not result:
+        return None
+    return {
+        'id': result[0],
+        'telegram_id': result[1],
+        'google_id': result[2],
+        'email': result[3],
+        'display_name': result[4],
+        'profile_picture': result[5],
+        'created_at': result[6],
+        'updated_at': result[7]
+    }
+
+
+def build_user_update(user_id, google_id=None, telegram_id=None, email=None, display_name=None, profile_picture=None):
+    """
+    Construye el UPDATE de get_or_create_user para un usuario existente.
+
+    Returns:
+        tuple or None: (query, params) o None si no hay nada que actualizar.
+    """
+    update_fields = []
+    params = []
+
+    if google_id and telegram_id:
+        # Actualizar el Google ID si el usuario se autenticó primero con Telegram
+        update_fields.append("google_id = %s")
+        params.append(google_id)
+
+        # Actualizar el Telegram ID si el usuario se autenticó primero con Google
+        update_fields.append("telegram_id = %s")
+        params.append(telegram_id)
+
+    if email:
+        update_fields.append("email = %s")
+        params.append(email)
+
+    if display_name:
+        update_fields.append("display_name = %s")
+        params.append(display_name)
+
+    if profile_picture:
+        update_fields.append("profile_picture = %s")
+        params.append(profile_picture)
+
+    if not update_fields:
+        return None
+    update_fields.append("updated_at = CURRENT_TIMESTAMP")
+    params.append(user_id)
+    return f"UPDATE users SET {', '.join(update_fields)} WHERE id = %s", params
+
+_google_verifier = None
+_google_verifier_lock = threading.Lock()
+
+
+def get_google_verifier():
+    """Devuelve el GoogleTokenVerifier del proceso (una sesión HTTP y un JWKS en caché)."""
+    global _google_verifier
+    with _google_verifier_lock:
+        if _google_verifier is None:
+            _google_verifier = GoogleTokenVerifier(os.getenv("GOOGLE_CLIENT_ID"))
+        return _google_verifier
+
 
 def verify_google_token(token):
     """Verifica un token de Google y devuelve la información si es válido."""
     try:
-        # Asegúrate que GOOGLE_CLIENT_ID esté correctamente cargado
-        client_id = os.getenv("GOOGLE_CLIENT_ID")
-        logging.info(f"Verificando token con GOOGLE_CLIENT_ID: {client_id[:10] if client_id else 'No configurado'}...")
-        
-        # Aquí muestra un pequeño fragmento del token para debugging
-        logging.info(f"Intentando verificar token Google (primeros 20 chars): {token[:20] if token else 'None'}...")
-        
-        # Hacer la solicitud a Google para verificar
-        idinfo = id_token.verify_oauth2_token(token, requests.Request(), client_id)
-        
-        # Verificar el emisor del token
-        if idinfo['iss'] not in ['accounts.google.com', 'https://accounts.google.com']:
-            logging.warning(f"Emisor del token no es Google: {idinfo.get('iss')}")
-            raise ValueError('Emisor del token no es Google.')
-        
-        logging.info(f"Token Google verificado correctamente para sub: {idinfo.get('sub')}, email: {idinfo.get('email')}")
+        # Verificación local de firma, audiencia, emisor y caducidad (claves de Google en caché)
+        idinfo = get_google_verifier().verify(token)
+        logger.info(f"Token Google verificado correctamente para sub: {idinfo.get('sub')}, email: {idinfo.get('email')}")
         return idinfo
-    except ValueError as e:
-        # Capturar valores inválidos (token expirado, etc.)
-        logging.error(f"Error validando token Google: {str(e)}")
+    except (jwt.PyJWTError, ValueError) as e:
+        # Capturar valores inválidos (token expirado, firma incorrecta, etc.)
+        logger.error(f"Error validando token Google: {str(e)}")
         return None
     except Exception as e:
         # Capturar otros errores
-        logging.exception(f"Error inesperado al verificar token Google: {str(e)}")
+        logger.exception(f"Error inesperado al verificar token Google: {str(e)}")
         return None
     
 def get_or_create_user(google_id=None, telegram_id=None, email=None, display_name=None, profile_picture=None):
@@ -67,78 +184,42 @@ def get_or_create_user(google_id=None, telegram_id=None, email=None, display_nam
         int: ID interno del usuario
     """
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
-        cur = conn.cursor()
-        
-        user_id = None
-        
-        # Primero intentar buscar por Google ID si se proporciona
-        if google_id:
-            cur.execute("SELECT id FROM users WHERE google_id = %s", (google_id,))
-            result = cur.fetchone()
-            if result:
-                user_id = result[0]
-        
-        # Si no se encontró por Google ID, buscar por Telegram ID
-        if not user_id and telegram_id:
-            cur.execute("SELECT id FROM users WHERE telegram_id = %s", (telegram_id,))
-            result = cur.fetchone()
-            if result:
-                user_id = result[0]
-        
-        # Si se encontró el usuario, actualizar sus datos si es necesario
-        if user_id:
-            update_fields = []
-            params = []
+        with get_db_connection() as conn:
+            cur = conn.cursor()
             
-            if google_id and telegram_id:
-                # Actualizar el Google ID si el usuario se autenticó primero con Telegram
-                update_fields.append("google_id = %s")
-                params.append(google_id)
+            user_id = None
             
-            if telegram_id and google_id:
-                # Actualizar el Telegram ID si el usuario se autenticó primero con Google
-                update_fields.append("telegram_id = %s")
-                params.append(telegram_id)
+            # Primero intentar buscar por Google ID si se proporciona
+            if google_id:
+                cur.execute(USER_ID_BY_GOOGLE_SQL, (google_id,))
+                result = cur.fetchone()
+                if result:
+                    user_id = result[0]
             
-            if email:
-                update_fields.append("email = %s")
-                params.append(email)
+            # Si no se encontró por Google ID, buscar por Telegram ID
+            if not user_id and telegram_id:
+                cur.execute(USER_ID_BY_TELEGRAM_SQL, (telegram_id,))
+                result = cur.fetchone()
+                if result:
+                    user_id = result[0]
             
-            if display_name:
-                update_fields.append("display_name = %s")
-                params.append(display_name)
+            # Si se encontró el usuario, actualizar sus datos si es necesario
+            if user_id:
+                update = build_user_update(user_id, google_id, telegram_id, email, display_name, profile_picture)
+                if update:
+                    cur.execute(*update)
+            else:
+                # Si no se encontró el usuario, crearlo
+                cur.execute(INSERT_USER_SQL, (telegram_id, google_id, email, display_name, profile_picture))
+                user_id = cur.fetchone()[0]
             
-            if profile_picture:
-                update_fields.append("profile_picture = %s")
-                params.append(profile_picture)
-            
-            if update_fields:
-                update_fields.append("updated_at = CURRENT_TIMESTAMP")
-                query = f"UPDATE users SET {', '.join(update_fields)} WHERE id = %s"
-                params.append(user_id)
-                cur.execute(query, params)
-        else:
-            # Si no se encontró el usuario, crearlo
-            cur.execute(
-                """
-                INSERT INTO users (telegram_id, google_id, email, display_name, profile_picture)
-                VALUES (%s, %s, %s, %s, %s)
-                RETURNING id
-                """,
-                (telegram_id, google_id, email, display_name, profile_picture)
-            )
-            user_id = cur.fetchone()[0]
-        
-        conn.commit()
-        cur.close()
-        conn.close()
+            conn.commit()
+            cur.close()
         
+        invalidate_user(user_id)
         return user_id
     except Exception as e:
-        print(f"Error en get_or_create_user: {e}")
-        if 'conn' in locals() and conn:
-            conn.close()
+        logger.error(f"Error en get_or_create_user: {e}")
         return None
 
 def migrate_user_data(old_user_id, new_user_id):
@@ -153,36 +234,35 @@ def migrate_user_data(old_user_id, new_user_id):
         bool: True si la migración fue exitosa, False en caso contrario
     """
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
-        cur = conn.cursor()
-        
-        # Migrar ejercicios
-        cur.execute(
-            "UPDATE ejercicios SET user_uuid = %s WHERE user_id = %s",
-            (new_user_id, old_user_id)
-        )
-        
-        # Migrar rutinas
-        cur.execute(
-            "UPDATE rutinas SET user_uuid = %s WHERE user_id = %s",
-            (new_user_id, old_user_id)
-        )
-        
-        # Migrar tokens de Fitbit
-        cur.execute(
-            "UPDATE fitbit_tokens SET user_uuid = %s WHERE user_id = %s",
-            (new_user_id, old_user_id)
-        )
-        
-        conn.commit()
-        cur.close()
-        conn.close()
+        with get_db_connection() as conn:
+            cur = conn.cursor()
+            
+            # Migrar ejercicios
+            cur.execute(
+                "UPDATE ejercicios SET user_uuid = %s WHERE user_id = %s",
+                (new_user_id, old_user_id)
+            )
+            
+            # Migrar rutinas
+            cur.execute(
+                "UPDATE rutinas SET user_uuid = %s WHERE user_id = %s",
+                (new_user_id, old_user_id)
+            )
+            
+            # Migrar tokens de Fitbit
+            cur.execute(
+                "UPDATE fitbit_tokens SET user_uuid = %s WHERE user_id = %s",
+                (new_user_id, old_user_id)
+            )
+            
+            bump_users_data_version(cur, [new_user_id], old_user_id)
+            conn.commit()
+            cur.close()
         
+        invalidate_user(new_user_id)
         return True
     except Exception as e:
-        print(f"Error en migrate_user_data: {e}")
-        if 'conn' in locals() and conn:
-            conn.close()
+        logger.error(f"Error en migrate_user_data: {e}")
         return False
 
 def get_user_by_id(user_id):
@@ -196,40 +276,20 @@ def get_user_by_id(user_id):
         dict: Información del usuario o None si no se encuentra
     """
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
-        cur = conn.cursor()
-        
-        cur.execute(
-            """
-            SELECT id, telegram_id, google_id, email, display_name, profile_picture,
-                  created_at, updated_at
-            FROM users
-            WHERE id = %s
-            """,
-            (user_id,)
-        )
-        
-        result = cur.fetchone()
-        cur.close()
-        conn.close()
+        user = cached_user(user_id)
+        if user is not None:
+            return user
+        with get_db_connection() as conn:
+            cur = conn.cursor()
+            
+            cur.execute(USER_SELECT_SQL + " WHERE id = %s", (user_id,))
+            
+            result = cur.fetchone()
+            cur.close()
         
-        if result:
-            return {
-                'id': result[0],
-                'telegram_id': result[1],
-                'google_id': result[2],
-                'email': result[3],
-                'display_name': result[4],
-                'profile_picture': result[5],
-                'created_at': result[6],
-                'updated_at': result[7]
-            }
-        else:
-            return None
+        return cache_user(row_to_user(result))
     except Exception as e:
-        print(f"Error en get_user_by_id: {e}")
-        if 'conn' in locals() and conn:
-            conn.close()
+        logger.error(f"Error en get_user_by_id: {e}")
         return None
 
 def get_user_id_by_telegram(telegram_id):
@@ -243,20 +303,17 @@ def get_user_id_by_telegram(telegram_id):
         int: ID interno del usuario o None si no se encuentra
     """
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
-        cur = conn.cursor()
-        
-        cur.execute("SELECT id FROM users WHERE telegram_id = %s", (telegram_id,))
-        result = cur.fetchone()
-        
-        cur.close()
-        conn.close()
+        with get_db_connection() as conn:
+            cur = conn.cursor()
+            
+            cur.execute(USER_ID_BY_TELEGRAM_SQL, (telegram_id,))
+            result = cur.fetchone()
+            
+            cur.close()
         
         return result[0] if result else None
     except Exception as e:
-        print(f"Error en get_user_id_by_telegram: {e}")
-        if 'conn' in locals() and conn:
-            conn.close()
+        logger.error(f"Error en get_user_id_by_telegram: {e}")
         return None
 
 def get_user_id_by_google(google_id):
@@ -270,20 +327,17 @@ def get_user_id_by_google(google_id):
         int: ID interno del usuario o None si no se encuentra
     """
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
-        cur = conn.cursor()
-        
-        cur.execute("SELECT id FROM users WHERE google_id = %s", (google_id,))
-        result = cur.fetchone()
-        
-        cur.close()
-        conn.close()
+        with get_db_connection() as conn:
+            cur = conn.cursor()
+            
+            cur.execute(USER_ID_BY_GOOGLE_SQL, (google_id,))
+            result = cur.fetchone()
+            
+            cur.close()
         
         return result[0] if result else None
     except Exception as e:
-        print(f"Error en get_user_id_by_google: {e}")
-        if 'conn' in locals() and conn:
-            conn.close()
+        logger.error(f"Error en get_user_id_by_google: {e}")
         return None
 
 def generate_link_code(user_id):
@@ -303,57 +357,31 @@ def generate_link_code(user_id):
         # Establecer tiempo de expiración (10 minutos)
         expires_at = datetime.datetime.now() + datetime.timedelta(minutes=10)
         
-        conn = psycopg2.connect(**DB_CONFIG)
-        cur = conn.cursor()
-        
-        # Comprobar si la tabla existe
-        cur.execute("""
-            SELECT EXISTS (
-                SELECT FROM information_schema.tables 
-                WHERE table_name = 'link_codes'
+        with get_db_connection() as conn:
+            cur = conn.cursor()
+            
+            # La tabla link_codes la crea la migración 0006 al arrancar
+            # Eliminar códigos previos no usados del mismo usuario
+            cur.execute(
+                "DELETE FROM link_codes WHERE user_id = %s AND used = FALSE",
+                (user_id,)
             )
-        """)
-        table_exists = cur.fetchone()[0]
-        
-        # Crear la tabla si no existe
-        if not table_exists:
-            cur.execute("""
-                CREATE TABLE link_codes (
-                    code VARCHAR(10) PRIMARY KEY,
-                    user_id INTEGER REFERENCES users(id),
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    expires_at TIMESTAMP,
-                    used BOOLEAN DEFAULT FALSE
-                )
-            """)
             
-            # Crear índice para búsquedas
-            cur.execute("CREATE INDEX idx_link_codes_user_id ON link_codes(user_id)")
-        
-        # Eliminar códigos previos no usados del mismo usuario
-        cur.execute(
-            "DELETE FROM link_codes WHERE user_id = %s AND used = FALSE",
-            (user_id,)
-        )
-        
-        # Insertar nuevo código
-        cur.execute(
-            """
-            INSERT INTO link_codes (code, user_id, expires_at, used)
-            VALUES (%s, %s, %s, FALSE)
-            """,
-            (code, user_id, expires_at)
-        )
-        
-        conn.commit()
-        cur.close()
-        conn.close()
+            # Insertar nuevo código
+            cur.execute(
+                """
+                INSERT INTO link_codes (code, user_id, expires_at, used)
+                VALUES (%s, %s, %s, FALSE)
+                """,
+                (code, user_id, expires_at)
+            )
+            
+            conn.commit()
+            cur.close()
         
         return code
     except Exception as e:
-        print(f"Error en generate_link_code: {e}")
-        if 'conn' in locals() and conn:
-            conn.close()
+        logger.error(f"Error en generate_link_code: {e}")
         return None
 def get_user_by_email(email):
     """
@@ -366,38 +394,17 @@ def get_user_by_email(email):
         dict: Información del usuario o None si no se encuentra
     """
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
-        cur = conn.cursor()
-        
-        cur.execute(
-            """
-            SELECT id, telegram_id, google_id, email, display_name, profile_picture,
-                  created_at, updated_at
-            FROM users
-            WHERE email = %s
-            """,
-            (email,)
-        )
-        
-        result = cur.fetchone()
-        cur.close()
-        conn.close()
+        with get_db_connection() as conn:
+            cur = conn.cursor()
+            
+            cur.execute(USER_SELECT_SQL + " WHERE email = %s", (email,))
+            
+            result = cur.fetchone()
+            cur.close()
         
-        if result:
-            return {
-                'id': result[0],
-                'telegram_id': result[1],
-                'google_id': result[2],
-                'email': result[3],
-                'display_name': result[4],
-                'profile_picture': result[5],
-                'created_at': result[6],
-                'updated_at': result[7]
-            }
-        else:
-            return None
+        return row_to_user(result)
     except Exception as e:
-        print(f"Error en get_user_by_email: {str(e)}")
+        logger.error(f"Error en get_user_by_email: {str(e)}")
         return None
     
 def verify_link_code(code, telegram_id):
@@ -412,85 +419,86 @@ def verify_link_code(code, telegram_id):
         bool: True si la vinculación fue exitosa, False en caso contrario
     """
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
-        cur = conn.cursor()
-        
-        # Buscar código válido y no expirado
-        cur.execute(
-            """
-            SELECT user_id FROM link_codes
-            WHERE code = %s AND used = FALSE AND expires_at > NOW()
-            """,
-            (code.upper(),)
-        )
-        
-        result = cur.fetchone()
-        if not result:
-            cur.close()
-            conn.close()
-            return False
-        
-        user_id = result[0]
-        
-        # Marcar código como usado
-        cur.execute(
-            "UPDATE link_codes SET used = TRUE WHERE code = %s",
-            (code.upper(),)
-        )
-        
-        # Obtener datos actuales del usuario
-        cur.execute(
-            """
-            SELECT google_id, email, display_name, profile_picture 
-            FROM users WHERE id = %s
-            """,
-            (user_id,)
-        )
-        
-        user_data = cur.fetchone()
-        if not user_data:
+        with get_db_connection() as conn:
+            cur = conn.cursor()
+            
+            # Buscar código válido y no expirado
+            cur.execute(
+                """
+                SELECT user_id FROM link_codes
+                WHERE code = %s AND used = FALSE AND expires_at > NOW()
+                """,
+                (code.upper(),)
+            )
+            
+            result = cur.fetchone()
+            if not result:
+                cur.close()
+                return False
+            
+            user_id = result[0]
+            
+            # Marcar código como usado
+            cur.execute(
+                "UPDATE link_codes SET used = TRUE WHERE code = %s",
+                (code.upper(),)
+            )
+            
+            # Obtener datos actuales del usuario
+            cur.execute(
+                """
+                SELECT google_id, email, display_name, profile_picture 
+                FROM users WHERE id = %s
+                """,
+                (user_id,)
+            )
+            
+            user_data = cur.fetchone()
+            if not user_data:
+                conn.commit()
+                cur.close()
+                return False
+            
+            google_id, email, display_name, profile_picture = user_data
+            
+            # Actualizar o crear usuario con el Telegram ID vinculado
+            cur.execute(
+                """
+                UPDATE users
+                SET telegram_id = %s, updated_at = CURRENT_TIMESTAMP
+                WHERE id = %s
+                """,
+                (telegram_id, user_id)
+            )
+            
+            # Migrar datos si es necesario (misma conexión: otra del pool no vería
+            # el UPDATE anterior, aún sin commit)
+            cur.execute("SELECT id FROM users WHERE telegram_id = %s AND id <> %s", (telegram_id, user_id))
+            existing = cur.fetchone()
+            existing_user_id = existing[0] if existing else None
+            # Antes del DELETE: también los IDs del usuario que desaparece
+            bump_users_data_version(cur, [user_id, existing_user_id], telegram_id)
+            if existing_user_id and existing_user_id != user_id:
+                # Actualizar referencias en tablas
+                tables = ["ejercicios", "rutinas", "fitbit_tokens"]
+                for table in tables:
+                    cur.execute(
+                        f"""
+                        UPDATE {table} 
+                        SET user_uuid = %s 
+                        WHERE user_uuid = %s OR user_id = %s
+                        """,
+                        (user_id, existing_user_id, telegram_id)
+                    )
+                
+                # Eliminar el usuario antiguo
+                cur.execute("DELETE FROM users WHERE id = %s", (existing_user_id,))
+            
             conn.commit()
             cur.close()
-            conn.close()
-            return False
-        
-        google_id, email, display_name, profile_picture = user_data
-        
-        # Actualizar o crear usuario con el Telegram ID vinculado
-        cur.execute(
-            """
-            UPDATE users
-            SET telegram_id = %s, updated_at = CURRENT_TIMESTAMP
-            WHERE id = %s
-            """,
-            (telegram_id, user_id)
-        )
-        
-        # Migrar datos si es necesario
-        existing_user_id = get_user_id_by_telegram(telegram_id)
-        if existing_user_id and existing_user_id != user_id:
-            # Actualizar referencias en tablas
-            tables = ["ejercicios", "rutinas", "fitbit_tokens"]
-            for table in tables:
-                cur.execute(
-                    f"""
-                    UPDATE {table} 
-                    SET user_uuid = %s 
-                    WHERE user_uuid = %s OR user_id = %s
-                    """,
-                    (user_id, existing_user_id, telegram_id)
-                )
-            
-            # Eliminar el usuario antiguo
-            cur.execute("DELETE FROM users WHERE id = %s", (existing_user_id,))
-        
-        conn.commit()
-        cur.close()
-        conn.close()
         
+        invalidate_user(user_id, existing_user_id)
         return True
     except Exception as e:
-        print(f"Error en verify_link_code: {e}")
-        if 'conn' in locals() and conn:
-            conn.close()
-        return False
\ No newline at end of file
+        logger.error(f"Error en verify_link_code: {e}")
+        return False
@@ -0,0 +1,152 @@
+# Archivo: services/daily_activity.py
+"""
+Actividad diaria por usuario precalculada en gym.daily_activity.
+
+Una fila por (usuario, día) con ejercicios distintos, series válidas, volumen
+y minutos de cardio. Cada INSERT de ejercicios suma en la misma sentencia las
+filas recién insertadas al día (como gym.exercise_rollups): ON CONFLICT DO
+UPDATE trabaja sobre la última versión confirmada de la fila, así que dos
+INSERT concurrentes del mismo día no se pisan. Para poder sumar los ejercicios
+distintos se guarda su lista ('exercises'). El reset de la rutina de hoy
+recalcula el día desde gym.ejercicios. Así el heatmap de cualquier rango es un
+único recorrido de la clave primaria (user_id, day).
+
+Uso:
+    python -m back_end.gym.services.daily_activity    # reconstruye la tabla completa
+"""
+
+import base64
+import logging
+
+import numpy as np
+
+from .db_pool import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+# Tabla creada por la migración 0007; la columna 'exercises' la añade la 0011
+DAILY_ACTIVITY_COLUMNS = ("distinct_exercises", "sets", "volume", "minutes")
+# Columnas que escriben los INSERT/rebuild (las del heatmap + la lista de ejercicios)
+_WRITE_COLUMNS = ", ".join(DAILY_ACTIVITY_COLUMNS + ("exercises",))
+# Rango por defecto del heatmap (últimos 365 días) y máximo permitido (~10 años)
+DEFAULT_RANGE_DAYS = 365
+MAX_RANGE_DAYS = 3660
+
+# Agregado por (user_id, día). {source}: filas con user_id, fecha, ejercicio, series_validas, volumen, duracion
+_DAY_AGGREGATE_SQL = """
+    SELECT user_id, fecha::date AS day, COUNT(DISTINCT ejercicio),
+           COALESCE(SUM(series_validas), 0), COALESCE(SUM(volumen), 0), COALESCE(SUM(duracion), 0),
+           COALESCE(ARRAY_AGG(DISTINCT ejercicio::text) FILTER (WHERE ejercicio IS NOT NULL), ARRAY[]::text[])
+    FROM {source}
+    {where}
+    GROUP BY user_id, day
+"""
+
+# Ejercicios de la fila existente + los del INSERT, sin repetir
+_MERGED_EXERCISES_SQL = "SELECT DISTINCT x FROM unnest(d.exercises || EXCLUDED.exercises) x"
+
+# Solo las filas del INSERT ({source}: CTE 'inserted' de INSERT_EXERCISES_TEMPLATE),
+# sumadas a lo que ya hay: no lee gym.ejercicios (su snapshot no vería otros INSERT en curso)
+UPSERT_DAILY_ACTIVITY_SQL = f"""
+    INSERT INTO gym.daily_activity AS d (user_id, day, {_WRITE_COLUMNS})
+    {_DAY_AGGREGATE_SQL.format(source="{source}", where="")}
+    ON CONFLICT (user_id, day) DO UPDATE SET
+        distinct_exercises = (SELECT COUNT(*) FROM ({_MERGED_EXERCISES_SQL}) merged),
+        exercises = ARRAY({_MERGED_EXERCISES_SQL} ORDER BY x),
+        sets = d.sets + EXCLUDED.sets,
+        volume = d.volume + EXCLUDED.volume,
+        minutes = d.minutes + EXCLUDED.minutes,
+        updated_at = NOW()
+"""
+
+# Recalculo de un rango de días desde gym.ejercicios. Parámetros: (user_id, desde, hasta) x 2
+DELETE_DAILY_ACTIVITY_SQL = "DELETE FROM gym.daily_activity WHERE user_id = %s AND day >= %s AND day <= %s"
+REBUILD_DAILY_ACTIVITY_SQL = f"""
+    INSERT INTO gym.daily_activity (user_id, day, {_WRITE_COLUMNS})
+    {_DAY_AGGREGATE_SQL.format(source="gym.ejercicios",
+                               where="WHERE user_id = %s AND fecha >= %s::date AND fecha < %s::date + 1")}
+"""
+# El LOCK (incompatible con los INSERT/UPDATE de otras transacciones) espera a los
+# INSERT en curso y frena los nuevos hasta el commit: el recálculo no ve sus filas
+# y ellos las suman después, en lugar de que una de las dos escrituras pise a la otra
+REBUILD_ALL_DAILY_ACTIVITY_SQL = f"""
+    LOCK TABLE gym.daily_activity IN SHARE ROW EXCLUSIVE MODE;
+    INSERT INTO gym.daily_activity (user_id, day, {_WRITE_COLUMNS})
+    {_DAY_AGGREGATE_SQL.format(source="gym.ejercicios", where="WHERE user_id IS NOT NULL")}
+    ON CONFLICT (user_id, day) DO UPDATE SET
+        {", ".join(f"{c} = EXCLUDED.{c}" for c in DAILY_ACTIVITY_COLUMNS + ("exercises",))},
+        updated_at = NOW()
+"""
+
+# Heatmap: rango cerrado [desde, hasta] sobre la clave primaria. Parámetros: (user_id, desde, hasta)
+DAILY_ACTIVITY_RANGE_SQL = f"""
+    SELECT day, {", ".join(DAILY_ACTIVITY_COLUMNS)} FROM gym.daily_activity
+    WHERE user_id = %s AND day >= %s AND day <= %s
+    ORDER BY day
+"""
+
+
+def rebuild_daily_activity(cur, user_id, day_from, day_to):
+    """
+    Recalcula desde gym.ejercicios la actividad de un usuario en [day_from, day_to].
+
+    La transacción la gestiona el llamador (se usa tras borrar sesiones).
+
+    Args:
+        cur: Cursor psycopg2.
+        user_id (str): ID de Google/Telegram del usuario.
+        day_from (datetime.date): Primer día.
+        day_to (datetime.date): Último día (incluido).
+    """
+    cur.execute(DELETE_DAILY_ACTIVITY_SQL, (user_id, day_from, day_to))
+    cur.execute(REBUILD_DAILY_ACTIVITY_SQL, (user_id, day_from, day_to))
+
+
+def rows_to_heatmap(rows):
+    """Filas de DAILY_ACTIVITY_RANGE_SQL -> [{'date', 'count' (ejercicios distintos), 'sets', 'volume', 'minutes'}]."""
+    return [
+        {"date": day, "count": distinct, "sets": sets, "volume": volume, "minutes": minutes}
+        for day, distinct, sets, volume, minutes in rows
+    ]
+
+
+def encode_compact(rows, day_from, day_to, metric="distinct_exercises"):
+    """
+    Codificación compacta del heatmap: bitmap de días con actividad + array de valores.
+
+    El bit i (orden little-endian dentro de cada byte) indica actividad el día
+    day_from + i; 'counts' trae el valor de 'metric' de cada bit a 1, en orden.
+
+    Args:
+        rows (list): Filas de DAILY_ACTIVITY_RANGE_SQL ordenadas por día.
+        day_from (datetime.date): Primer día del rango.
+        day_to (datetime.date): Último día del rango (incluido).
+        metric (str): Una de DAILY_ACTIVITY_COLUMNS.
+
+    Returns:
+        dict: {'days', 'bitmap' (base64), 'counts'}.
+    """
+    days = (day_to - day_from).days + 1
+    column = DAILY_ACTIVITY_COLUMNS.index(metric) + 1
+    bits = np.zeros(days, dtype=np.uint8)
+    counts = []
+    for row in rows:
+        bits[(row[0] - day_from).days] = 1
+        counts.append(row[column])
+    bitmap = np.packbits(bits, bitorder="little").tobytes()
+    return {"days": days, "bitmap": base64.b64encode(bitmap).decode("ascii"), "counts": counts}
+
+
+def rebuild_all_daily_activity():
+    """Reconstruye gym.daily_activity completa desde gym.ejercicios. Devuelve las filas escritas."""
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(REBUILD_ALL_DAILY_ACTIVITY_SQL)
+            written = cur.rowcount
+        conn.commit()
+    return written
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s [%(levelname)s] - %(message)s')
+    print(f"Días reconstruidos: {rebuild_all_daily_activity()}")
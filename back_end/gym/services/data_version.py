@@ -0,0 +1,68 @@
+# Archivo: services/data_version.py
+"""
+Versión de los datos de entrenamiento de cada usuario (gym.user_data_version).
+
+Una fila por user_id (el de gym.ejercicios: Google o Telegram ID) que cambia en
+la misma transacción que cada escritura (inserción, importación, reinicio del
+día, migración o vinculación de cuenta). Las respuestas del dashboard se
+cachean y llevan un ETag derivado de esta versión (ver utils/http_cache.py):
+mientras no cambie se sirven con una sola lectura por clave primaria.
+
+Al estar en la BD la comparten todos los workers y sobrevive a los reinicios.
+Los valores salen de una secuencia global, no de un contador por usuario: si
+se borra la fila de un usuario, la siguiente versión sigue siendo distinta de
+todas las ya emitidas en un ETag.
+
+Los INSERT sobre gym.ejercicios la actualizan dentro de
+INSERT_EXERCISES_TEMPLATE; cualquier otra escritura debe llamar a
+bump_data_version con su cursor antes del commit.
+"""
+
+from .async_db_pool import async_fetch_all
+
+# Tabla y secuencia creadas por la migración 0010
+# {source}: relación con una columna user_id (p.ej. las filas 'inserted' de un
+# INSERT ... RETURNING). DISTINCT antes de nextval: ON CONFLICT no puede tocar
+# la misma fila dos veces en una sentencia.
+BUMP_DATA_VERSION_TEMPLATE = """
+    INSERT INTO gym.user_data_version (user_id, version)
+    SELECT user_id, nextval('gym.user_data_version_seq')
+    FROM (SELECT DISTINCT user_id FROM {source} WHERE user_id IS NOT NULL) changed
+    ON CONFLICT (user_id) DO UPDATE SET version = EXCLUDED.version
+"""
+BUMP_DATA_VERSION_SQL = BUMP_DATA_VERSION_TEMPLATE.format(source="unnest(%s::text[]) AS ids(user_id)")
+DATA_VERSION_SQL = """
+    SELECT COALESCE((SELECT version FROM gym.user_data_version WHERE user_id = %s), 0)
+"""
+
+
+def data_version_ids(*user_ids):
+    """Parámetro de BUMP_DATA_VERSION_SQL: los IDs como texto (ignora None)."""
+    return [str(user_id) for user_id in user_ids if user_id is not None]
+
+
+def bump_data_version(cur, *user_ids):
+    """
+    Marca como cambiados los datos de los usuarios indicados.
+
+    Args:
+        cur: Cursor psycopg2 de la transacción que hace la escritura.
+        *user_ids: IDs de usuario en gym.ejercicios (se ignoran los None).
+    """
+    ids = data_version_ids(*user_ids)
+    if ids:
+        cur.execute(BUMP_DATA_VERSION_SQL, (ids,))
+
+
+async def get_data_version(user_id):
+    """
+    Versión actual de los datos de un usuario.
+
+    Args:
+        user_id (str): ID del usuario en gym.ejercicios.
+
+    Returns:
+        int: Versión (0 si el usuario aún no ha escrito nada).
+    """
+    rows = await async_fetch_all(DATA_VERSION_SQL, (str(user_id),))
+    return rows[0][0]
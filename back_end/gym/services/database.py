@@ -2,22 +2,26 @@
 
 import os
 import sys
+import base64
+import binascii
 import datetime
 import json
 import traceback
 import logging
 import psycopg2
+from psycopg2.extras import execute_values
 
 # Asumiendo que config está en el directorio padre 'gym' o accesible
 try:
-    from ..config import DB_CONFIG # Usar .. si config.py está un nivel arriba
+    from ..config import DB_CONFIG, DB_CURSOR_ITERSIZE # Usar .. si config.py está un nivel arriba
 except ImportError:
     # Fallback si la estructura es diferente
     try:
-        from config import DB_CONFIG
+        from config import DB_CONFIG, DB_CURSOR_ITERSIZE
     except ImportError:
         logging.critical("No se pudo importar DB_CONFIG. Verifica la estructura del proyecto.")
         DB_CONFIG = {} # Placeholder para evitar más errores
+        DB_CURSOR_ITERSIZE = 2000
 
 # Asumiendo que schemas está en models/ y utils en utils/ al mismo nivel que services/ o accesible
 try:
@@ -34,68 +38,454 @@ except ImportError:
         def get_exercises(self): return [] # Simplificación
     def get_weekday_name(day_num): return "Día Desconocido"
 
+from .daily_activity import UPSERT_DAILY_ACTIVITY_SQL, rebuild_daily_activity
+from .data_version import BUMP_DATA_VERSION_TEMPLATE, bump_data_version
+from .db_pool import get_db_connection
+from .exercise_sets import SETS_FROM_EXERCISES_SQL
+from .personal_records import (NEW_RECORDS_JSON_SQL, NEW_RECORDS_SQL,
+                               RECORD_COLUMNS, UPSERT_RECORDS_SQL,
+                               rebuild_personal_records)
+from .rollups import UPSERT_ROLLUPS_SQL, rebuild_rollups
+from .session_metrics import (EMPTY_METRICS, SESSION_METRIC_COLUMNS,
+                              SET_REPS_SQL, SET_WEIGHT_SQL,
+                              compute_session_metrics)
+
 logger = logging.getLogger(__name__) # Configura un logger
 
-def insert_into_db(json_data, user_id) -> bool:
+# --- SQL compartido con services/async_database.py (psycopg2 y psycopg3 usan placeholders %s) ---
+# gym.ejercicios está particionada por mes sobre 'fecha' (migración 0002): las
+# consultas filtran 'fecha' con rangos directos (nunca fecha::date ni EXTRACT)
+# para que Postgres descarte las particiones fuera del rango.
+# Fila de ejercicio: (fecha | None, ejercicio, series_json | None, duracion | None, user_id,
+#                    *métricas de la sesión en el orden de SESSION_METRIC_COLUMNS)
+# Cada INSERT rellena también gym.ejercicio_sets, gym.exercise_rollups,
+# gym.daily_activity y gym.personal_records en la misma sentencia y devuelve
+# (ejercicios insertados, array JSON de los récords que se llegaron a escribir).
+# {source}: 'VALUES ...' o un SELECT con las columnas de EXERCISE_COLUMNS
+EXERCISE_COLUMNS = "fecha, ejercicio, repeticiones, duracion, user_id, " + ", ".join(SESSION_METRIC_COLUMNS)
+INSERT_EXERCISES_TEMPLATE = f"""
+    WITH inserted AS (
+        INSERT INTO gym.ejercicios ({EXERCISE_COLUMNS}) {{source}}
+        RETURNING id, {EXERCISE_COLUMNS}
+    ), sets AS (
+        {SETS_FROM_EXERCISES_SQL.format(source="inserted")}
+        RETURNING ejercicio_id, reps, weight
+    ), rollups AS (
+        {UPSERT_ROLLUPS_SQL.format(source="inserted")}
+        RETURNING 1
+    ), activity AS (
+        {UPSERT_DAILY_ACTIVITY_SQL.format(source="inserted")}
+        RETURNING 1
+    ), new_records AS (
+        {NEW_RECORDS_SQL.format(source="inserted", sets="sets")}
+    ), records AS (
+        {UPSERT_RECORDS_SQL.format(source="new_records")}
+        RETURNING {RECORD_COLUMNS}
+    ), data_version AS (
+        {BUMP_DATA_VERSION_TEMPLATE.format(source="inserted")}
+        RETURNING 1
+    )
+    SELECT (SELECT COUNT(*) FROM inserted), {NEW_RECORDS_JSON_SQL.format(written="records", candidates="new_records")}
+"""
+EXERCISE_ROW_TEMPLATE = (
+    "(COALESCE(%s::timestamptz, NOW()), %s, %s::jsonb, %s, %s, "
+    "%s, %s::double precision, %s::double precision, %s, %s::double precision, %s::double precision)"
+)
+INSERT_EXERCISES_SQL = INSERT_EXERCISES_TEMPLATE.format(source="VALUES %s")
+# Tamaño de lote por defecto de insert_many (filas por sentencia/transacción)
+INSERT_BATCH_SIZE = int(os.getenv('DB_INSERT_BATCH_SIZE', 1000))
+EXERCISE_LOGS_SQL = """
+    SELECT fecha, ejercicio, repeticiones, duracion
+    FROM gym.ejercicios
+    WHERE fecha >= %s AND user_id = %s
+    ORDER BY fecha DESC
+"""
+# Paginación keyset de /api/logs: orden (fecha DESC, id DESC) y la página
+# siguiente empieza en '(fecha, id) < cursor', así cada página lee solo sus
+# filas (idx_ejercicios_user_fecha) en lugar de OFFSET sobre toda la ventana.
+# {filters}: condiciones de build_logs_query. El LIMIT pide una fila de más
+# para saber si hay página siguiente (LIMIT NULL = sin límite).
+LOGS_PAGE_SQL = """
+    SELECT fecha, ejercicio, repeticiones, duracion, id, max_peso, total_reps, volumen
+    FROM gym.ejercicios
+    WHERE user_id = %s {filters}
+    ORDER BY fecha DESC, id DESC
+    LIMIT %s
+"""
+# Tipo de registro: fuerza (series en JSONB) o cardio (duración)
+LOG_TYPE_FILTERS = {
+    "fuerza": "AND repeticiones IS NOT NULL AND repeticiones != 'null'",
+    "cardio": "AND duracion IS NOT NULL",
+}
+LOGS_PAGE_DEFAULT_LIMIT = 50
+LOGS_PAGE_MAX_LIMIT = 500
+DELETE_ROUTINE_SQL = "DELETE FROM gym.rutinas WHERE user_id = %s"
+INSERT_ROUTINE_DAY_SQL = """
+    INSERT INTO gym.rutinas (user_id, dia_semana, ejercicios)
+    VALUES (%s, %s, %s::jsonb)
+"""
+ROUTINE_SQL = """
+    SELECT dia_semana, ejercicios FROM gym.rutinas
+    WHERE user_id = %s ORDER BY dia_semana
+"""
+ROUTINE_DAY_SQL = """
+    SELECT ejercicios FROM gym.rutinas
+    WHERE user_id = %s AND dia_semana = %s
+"""
+# Rangos semiabiertos [día, día + 1) en lugar de 'fecha::date = %s': así la
+# condición es sargable y usa idx_ejercicios_user_fecha (migración 0001).
+# Parámetros: (user_id, día, día)
+EXERCISES_DONE_ON_DAY_SQL = """
+    SELECT DISTINCT ejercicio FROM gym.ejercicios
+    WHERE user_id = %s AND fecha >= %s::date AND fecha < %s::date + 1
+"""
+# Borra también sus series; devuelve (ejercicios borrados, nombres afectados)
+# para recalcular después sus rollups (services/rollups.py), sus récords
+# (services/personal_records.py) y la actividad del día (services/daily_activity.py)
+DELETE_EXERCISES_ON_DAY_SQL = """
+    WITH deleted AS (
+        DELETE FROM gym.ejercicios
+        WHERE user_id = %s AND fecha >= %s::date AND fecha < %s::date + 1
+        RETURNING id, ejercicio
+    ), sets AS (
+        DELETE FROM gym.ejercicio_sets WHERE ejercicio_id IN (SELECT id FROM deleted)
+    )
+    SELECT COUNT(*), COALESCE(ARRAY_AGG(DISTINCT ejercicio), '{}') FROM deleted
+"""
+# Consultas del dashboard
+EXERCISE_NAMES_SQL = "SELECT DISTINCT ejercicio FROM gym.ejercicios WHERE user_id = %s ORDER BY ejercicio"
+# Métricas por sesión precalculadas al escribir (services/session_metrics.py)
+# {where_clause}: condiciones construidas por la ruta (user_id, ejercicio ILIKE, rango de fechas)
+# Columnas: fecha, ejercicio, series_validas, max_peso, avg_peso, total_reps, volumen, max_e1rm
+SESSION_STATS_SQL = """
+    SELECT fecha, ejercicio, series_validas, max_peso, avg_peso, total_reps, volumen, max_e1rm
+    FROM gym.ejercicios
+    WHERE {where_clause} AND repeticiones IS NOT NULL AND repeticiones != 'null'
+    ORDER BY fecha
+"""
+# Mismas filas que SESSION_STATS_SQL pero con el JSONB de series (STATS_ENGINE=numpy)
+SESSION_SERIES_SQL = """
+    SELECT fecha, ejercicio, repeticiones
+    FROM gym.ejercicios
+    WHERE {where_clause} AND repeticiones IS NOT NULL AND repeticiones != 'null'
+    ORDER BY fecha
+"""
+# Agregación por sesión dentro de Postgres (STATS_ENGINE=sql): las series se expanden
+# con jsonb_array_elements y solo viaja una fila pequeña por sesión. Conversión de
+# cada serie con SET_REPS_SQL/SET_WEIGHT_SQL (la misma que gym.ejercicio_sets).
+# Se devuelven los agregados sin redondear: el redondeo y la combinación del e1RM los
+# hace session_metrics.metrics_from_aggregates, idénticos a la versión Python.
+# Columnas: fecha, ejercicio, series_validas, max_peso, total_reps, volumen, e1rm_single, e1rm_multi
+SESSION_AGGREGATE_SQL = f"""
+    SELECT e.fecha, e.ejercicio,
+           COUNT(*) FILTER (WHERE v.valida) AS series_validas,
+           MAX(v.peso) FILTER (WHERE v.valida) AS max_peso,
+           SUM(v.reps) FILTER (WHERE v.valida) AS total_reps,
+           SUM(v.reps * v.peso) FILTER (WHERE v.valida) AS volumen,
+           MAX(v.peso) FILTER (WHERE v.valida AND v.reps = 1) AS e1rm_single,
+           MAX(v.peso / (1.0278 - 0.0278 * v.reps))
+               FILTER (WHERE v.valida AND v.reps > 1 AND v.reps <= 15) AS e1rm_multi
+    FROM gym.ejercicios e
+    LEFT JOIN LATERAL (
+        SELECT c.reps, c.peso, COALESCE(c.reps > 0 AND c.peso > 0, FALSE) AS valida
+        FROM jsonb_array_elements(
+            CASE WHEN jsonb_typeof(e.repeticiones) = 'array' THEN e.repeticiones ELSE '[]'::jsonb END
+        ) AS s(serie)
+        CROSS JOIN LATERAL (
+            SELECT {SET_REPS_SQL} AS reps,
+                   {SET_WEIGHT_SQL} AS peso
+        ) c
+        WHERE jsonb_typeof(s.serie) = 'object'
+    ) v ON TRUE
+    WHERE {{where_clause}} AND e.repeticiones IS NOT NULL AND e.repeticiones != 'null'
+    GROUP BY e.id, e.fecha, e.ejercicio
+    ORDER BY e.fecha, e.id
+"""
+# Actividad diaria precalculada (services/daily_activity.py).
+# Parámetros: (user_id, 1 de enero del año, 1 de enero del año siguiente)
+CALENDAR_HEATMAP_SQL = """
+    SELECT day, distinct_exercises as value
+    FROM gym.daily_activity
+    WHERE user_id = %s AND day >= %s AND day < %s
+    ORDER BY day
+"""
+
+
+def build_exercise_rows(json_data, user_id):
+    """
+    Valida el JSON de ejercicios y lo convierte en filas para INSERT_EXERCISES_SQL.
+
+    Args:
+        json_data (dict or ExerciseData): Datos de ejercicios de una sesión.
+        user_id (str): ID de Google/Telegram del usuario.
+
+    Returns:
+        list: Tuplas (fecha, ejercicio, series_json, duracion, user_id, *métricas) en orden.
+    """
+    parsed = json_data if isinstance(json_data, ExerciseData) else ExerciseData.model_validate(json_data)
+    fecha = getattr(parsed, 'fecha', None)
+    rows = []
+    for exercise in parsed.get_exercises():
+        if exercise.series is not None:
+            series = [s.model_dump() for s in exercise.series]
+            rows.append((fecha, exercise.ejercicio, json.dumps(series), None, user_id)
+                        + tuple(compute_session_metrics(series)))
+        elif exercise.duracion is not None:
+            rows.append((fecha, exercise.ejercicio, None, exercise.duracion, user_id) + tuple(EMPTY_METRICS))
+    return rows
+
+
+def build_insert_statement(rows):
+    """
+    Sentencia INSERT multi-fila con placeholders explícitos (driver async, sin execute_values).
+
+    Args:
+        rows (list): Filas de build_exercise_rows (al menos una).
+
+    Returns:
+        tuple: (sql, parámetros aplanados) para una única sentencia con todas las filas.
+    """
+    sql = INSERT_EXERCISES_TEMPLATE.format(source="VALUES " + ", ".join([EXERCISE_ROW_TEMPLATE] * len(rows)))
+    return sql, [value for row in rows for value in row]
+
+
+def _insert_rows(cur, rows):
+    """
+    Inserta todas las filas con un único INSERT multi-fila.
+
+    Returns:
+        tuple: (filas insertadas, récords batidos [{'ejercicio', 'metric', 'reps', 'value', 'previous', 'fecha'}]).
+    """
+    if not rows:
+        return 0, []
+    # page_size=len(rows): una sola sentencia (ejercicios + series) para todo el lote
+    result = execute_values(cur, INSERT_EXERCISES_SQL, rows, template=EXERCISE_ROW_TEMPLATE,
+                            page_size=len(rows), fetch=True)
+    return result[0][0], result[0][1]
+
+
+def row_to_log(row):
+    """Convierte una fila de EXERCISE_LOGS_SQL en un log de /api/logs."""
+    data = row[2] if row[2] is not None else row[3]
+    return {
+        "fecha": row[0],
+        "ejercicio": row[1],
+        "data": data
+    }
+
+
+def rows_to_logs(rows):
+    """Convierte las filas de EXERCISE_LOGS_SQL al formato de respuesta de /api/logs."""
+    return [row_to_log(row) for row in rows]
+
+
+def encode_logs_cursor(fecha, row_id):
+    """Codifica la posición (fecha, id) del último log de una página como token opaco."""
+    payload = json.dumps([fecha.isoformat() if isinstance(fecha, datetime.datetime) else fecha, row_id])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_logs_cursor(token):
+    """
+    Decodifica un token de encode_logs_cursor.
+
+    Returns:
+        tuple: (fecha como datetime, id).
+
+    Raises:
+        ValueError: Si el token no es válido.
+    """
+    try:
+        fecha, row_id = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        return datetime.datetime.fromisoformat(fecha), int(row_id)
+    except (ValueError, TypeError, binascii.Error) as e:
+        raise ValueError(f"Cursor de paginación inválido: {token!r}") from e
+
+
+def build_logs_query(user_id, since=None, until=None, ejercicio=None, tipo=None, after=None, limit=None):
+    """
+    Construye LOGS_PAGE_SQL con los filtros de /api/logs.
+
+    Args:
+        user_id (str): ID de Google/Telegram del usuario.
+        since (datetime | date, optional): Fecha mínima (incluida).
+        until (datetime | date, optional): Fecha máxima (excluida).
+        ejercicio (str, optional): Subcadena del nombre (ILIKE, como el dashboard).
+        tipo (str, optional): Clave de LOG_TYPE_FILTERS.
+        after (tuple, optional): Cursor decodificado (fecha, id) de la página anterior.
+        limit (int, optional): Tamaño de página; None devuelve todas las filas.
+
+    Returns:
+        tuple: (sql, params).
+    """
+    filters, params = [], [str(user_id)]
+    if since is not None:
+        filters.append("AND fecha >= %s")
+        params.append(since)
+    if until is not None:
+        filters.append("AND fecha < %s")
+        params.append(until)
+    if ejercicio:
+        filters.append("AND ejercicio ILIKE %s")
+        params.append(f"%{ejercicio}%")
+    if tipo:
+        filters.append(LOG_TYPE_FILTERS[tipo])
+    if after is not None:
+        filters.append("AND (fecha, id) < (%s, %s)")
+        params.extend(after)
+    params.append(limit + 1 if limit is not None else None)
+    return LOGS_PAGE_SQL.format(filters=" ".join(filters)), tuple(params)
+
+
+def rows_to_logs_page(rows, limit):
+    """
+    Convierte las filas de LOGS_PAGE_SQL (limit + 1 como máximo) en una página de /api/logs.
+
+    Returns:
+        dict: {'logs': [...], 'next_cursor': token o None si es la última página}.
+    """
+    rows = list(rows)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_logs_cursor(rows[-1][0], rows[-1][4])
+    logs = []
+    for row in rows:
+        log = row_to_log(row)
+        log.update(id=row[4], max_peso=row[5], total_reps=row[6], volumen=row[7])
+        logs.append(log)
+    return {"logs": logs, "next_cursor": next_cursor}
+
+
+def rows_to_routine(rows, user_id_str):
+    """Convierte las filas de ROUTINE_SQL en el dict {dia: [ejercicios]}."""
+    rutina = {}
+    for row in rows:
+        dia_semana = row[0]
+        ejercicios = []
+        if isinstance(row[1], str):
+             try: ejercicios = json.loads(row[1])
+             except json.JSONDecodeError: logger.warning(f"Error JSON rutina día {dia_semana}, user {user_id_str}.")
+        elif isinstance(row[1], list): ejercicios = row[1]
+        else: logger.warning(f"Tipo inesperado rutina día {dia_semana}, user {user_id_str}: {type(row[1])}")
+        if isinstance(ejercicios, list): rutina[str(dia_semana)] = ejercicios
+        else: rutina[str(dia_semana)] = []
+    return rutina
+
+
+def parse_planned_exercises(raw):
+    """Decodifica la columna 'ejercicios' de una rutina. Lanza ValueError si es inválida."""
+    ejercicios_planeados = []
+    if isinstance(raw, str):
+        try: ejercicios_planeados = json.loads(raw)
+        except json.JSONDecodeError: raise ValueError("Formato de rutina inválido en BD.")
+    elif isinstance(raw, list):
+        ejercicios_planeados = raw
+    else: raise ValueError("Tipo de dato de rutina inválido en BD.")
+    if not isinstance(ejercicios_planeados, list): raise ValueError("Formato de ejercicios planeados inválido.")
+    return ejercicios_planeados
+
+
+def build_today_routine(ejercicios_planeados, ejercicios_realizados_set, user_id_str):
+    """Marca como realizados los ejercicios planeados que ya se registraron hoy."""
+    rutina_resultado = []
+    for ejercicio_nombre in ejercicios_planeados:
+        if isinstance(ejercicio_nombre, str):
+             rutina_resultado.append({"ejercicio": ejercicio_nombre, "realizado": ejercicio_nombre in ejercicios_realizados_set})
+        else: logger.warning(f"Elemento no string en rutina planeada para {user_id_str}: {ejercicio_nombre}")
+    return rutina_resultado
+
+
+def insert_into_db(json_data, user_id, with_records=False):
     """
     Inserta los datos de ejercicios en la base de datos utilizando solo user_id.
 
     Args:
         json_data (dict): Datos de ejercicios en formato JSON.
         user_id (str): ID de Google del usuario.
+        with_records (bool): Devolver los récords personales batidos en lugar de un bool.
 
     Returns:
         bool: True si la inserción fue exitosa, False en caso contrario.
+        Con with_records=True, la lista de récords batidos (vacía si no hay
+        ninguno) o None si la inserción falla.
     """
-    conn = None
     # --- CORRECCIÓN: Convertir a string aquí es suficiente ---
     user_id_str = str(user_id)
     # --- FIN CORRECCIÓN ---
     try:
         logger.debug("\n🔍 Recibido JSON para inserción:")
-        parsed = ExerciseData.model_validate(json_data)
-        exercises = parsed.get_exercises()
-        logger.info(f"Intentando insertar {len(exercises)} ejercicios para usuario {user_id_str}.")
-
-        conn = psycopg2.connect(**DB_CONFIG)
-        cur = conn.cursor()
-        cur.execute("SET search_path TO gym, public;")
-
-        for exercise in exercises:
-            nombre_ejercicio = exercise.ejercicio
-            logger.debug(f"Preparando inserción para {nombre_ejercicio}")
-
-            if exercise.series is not None:
-                series_json = json.dumps([s.model_dump() for s in exercise.series])
-                # Pasar user_id_str directamente (ya es string)
-                cur.execute(
-                    """
-                    INSERT INTO gym.ejercicios (fecha, ejercicio, repeticiones, user_id)
-                    VALUES (NOW(), %s, %s::jsonb, %s)
-                    """,
-                    (nombre_ejercicio, series_json, user_id_str)
-                )
-            elif exercise.duracion is not None:
-                 # Pasar user_id_str directamente (ya es string)
-                cur.execute(
-                    """
-                    INSERT INTO gym.ejercicios (fecha, ejercicio, duracion, user_id)
-                    VALUES (NOW(), %s, %s, %s)
-                    """,
-                    (nombre_ejercicio, exercise.duracion, user_id_str)
-                )
-
-        conn.commit()
-        logger.info(f"✅ Inserción exitosa para usuario {user_id_str}.")
-        return True
+        rows = build_exercise_rows(json_data, user_id_str)
+        logger.info(f"Intentando insertar {len(rows)} ejercicios para usuario {user_id_str}.")
+
+        with get_db_connection() as conn:
+            cur = conn.cursor()
+            # Todos los ejercicios de la sesión en un solo round-trip
+            _, new_records = _insert_rows(cur, rows)  # También cambia la versión de datos
+            conn.commit()
+        logger.info(f"✅ Inserción exitosa para usuario {user_id_str} ({len(new_records)} récords nuevos).")
+        return new_records if with_records else True
     except Exception as e:
         logger.error(f"❌ Error al insertar en la base de datos para usuario {user_id_str}: {e}", exc_info=True)
-        if conn: conn.rollback()
-        return False
-    finally:
-        if conn:
-            try: conn.close()
-            except Exception as close_error: logger.error(f"Error al cerrar la conexión: {close_error}")
+        return None if with_records else False
+
+def insert_many(records, user_id, batch_size=None):
+    """
+    Inserta muchas sesiones de ejercicios en lotes (importaciones e historiales).
+
+    Cada lote es un único INSERT multi-fila en su propia transacción, de modo
+    que un fallo solo descarta ese lote. Las sesiones que no validan contra
+    ExerciseData se saltan y se informan en 'errors'.
+
+    Args:
+        records (iterable): Sesiones en el formato de insert_into_db (dict o
+            ExerciseData), opcionalmente con 'fecha' de la sesión.
+        user_id (str): ID de Google/Telegram del usuario.
+        batch_size (int, optional): Filas por lote (por defecto INSERT_BATCH_SIZE).
+
+    Returns:
+        dict: {'success', 'inserted', 'batches' (filas insertadas por lote), 'errors'}.
+    """
+    user_id_str = str(user_id)
+    batch_size = batch_size or INSERT_BATCH_SIZE
+    result = {"success": True, "inserted": 0, "batches": [], "errors": []}
+
+    def flush(cur, conn, batch):
+        try:
+            inserted, _ = _insert_rows(cur, batch)
+            conn.commit()
+        except psycopg2.Error as db_err:
+            conn.rollback()
+            logger.error(f"❌ Lote {len(result['batches']) + 1} fallido para usuario {user_id_str}: {db_err}")
+            result["success"] = False
+            result["errors"].append({"batch": len(result["batches"]) + 1, "error": str(db_err)})
+            inserted = 0
+        result["batches"].append(inserted)
+        result["inserted"] += inserted
+        logger.info(f"Lote {len(result['batches'])}: {inserted} filas insertadas para usuario {user_id_str}.")
+
+    try:
+        with get_db_connection() as conn:
+            cur = conn.cursor()
+            batch = []
+            for index, record in enumerate(records):
+                try:
+                    batch.extend(build_exercise_rows(record, user_id_str))
+                except ValueError as e:  # pydantic.ValidationError hereda de ValueError
+                    result["errors"].append({"index": index, "error": str(e)})
+                    continue
+                if len(batch) >= batch_size:
+                    flush(cur, conn, batch)
+                    batch = []
+            if batch:
+                flush(cur, conn, batch)
+    except Exception as e:
+        logger.error(f"❌ Error en insert_many para usuario {user_id_str}: {e}", exc_info=True)
+        result["success"] = False
+        result["errors"].append({"error": str(e)})
+
+    logger.info(f"insert_many: {result['inserted']} filas en {len(result['batches'])} lotes para usuario {user_id_str} ({len(result['errors'])} errores).")
+    return result
 
 def get_exercise_logs(user_id, days=7):
     """
@@ -108,45 +498,51 @@ def get_exercise_logs(user_id, days=7):
     Returns:
         list or None: Lista de logs o None si hay un error.
     """
-    conn = None
     # --- CORRECCIÓN: Convertir a string aquí ---
     user_id_str = str(user_id)
     # --- FIN CORRECCIÓN ---
     try:
         cutoff = datetime.datetime.now() - datetime.timedelta(days=days)
         logger.info(f"Obteniendo logs de los últimos {days} días para usuario {user_id_str}")
-        conn = psycopg2.connect(**DB_CONFIG)
-        cur = conn.cursor()
-        cur.execute("SET search_path TO gym, public;")
-
-        query = """
-            SELECT fecha, ejercicio, repeticiones, duracion
-            FROM gym.ejercicios
-            WHERE fecha >= %s AND user_id = %s
-            ORDER BY fecha DESC
-        """
-        # Pasar user_id_str (string) a la consulta
-        cur.execute(query, (cutoff, user_id_str))
-
-        rows = cur.fetchall()
-        logger.info(f"Se encontraron {len(rows)} registros de log para usuario {user_id_str}")
-
-        logs = []
-        for row in rows:
-            data = row[2] if row[2] is not None else row[3]
-            logs.append({
-                "fecha": row[0].isoformat() if isinstance(row[0], datetime.datetime) else row[0],
-                "ejercicio": row[1],
-                "data": data
-            })
+        with get_db_connection() as conn:
+            # Cursor de servidor: las filas llegan por bloques de DB_CURSOR_ITERSIZE
+            # y se convierten sin materializar antes la lista completa de tuplas
+            with conn.cursor(name="exercise_logs") as cur:
+                cur.itersize = DB_CURSOR_ITERSIZE
+                # Pasar user_id_str (string) a la consulta
+                cur.execute(EXERCISE_LOGS_SQL, (cutoff, user_id_str))
+                logs = rows_to_logs(cur)
+            conn.rollback()
+        logger.info(f"Se encontraron {len(logs)} registros de log para usuario {user_id_str}")
+
         return logs
     except Exception as e:
         logger.error(f"Error al obtener logs para usuario {user_id_str}: {e}", exc_info=True)
         return None
-    finally:
-        if conn:
-            try: conn.close()
-            except Exception as close_error: logger.error(f"Error al cerrar la conexión: {close_error}")
+
+def get_exercise_logs_page(user_id, limit=LOGS_PAGE_DEFAULT_LIMIT, after=None, **filters):
+    """
+    Obtiene una página de logs de un usuario, de más reciente a más antiguo.
+
+    Args:
+        user_id (str): ID de Google/Telegram del usuario.
+        limit (int): Logs por página.
+        after (tuple, optional): Cursor decodificado (decode_logs_cursor) de la página anterior.
+        **filters: since, until, ejercicio y tipo (ver build_logs_query).
+
+    Returns:
+        dict or None: {'logs', 'next_cursor'} o None si hay un error.
+    """
+    user_id_str = str(user_id)
+    try:
+        query, params = build_logs_query(user_id_str, after=after, limit=limit, **filters)
+        with get_db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(query, params)
+                return rows_to_logs_page(cur.fetchall(), limit)
+    except Exception as e:
+        logger.error(f"Error al obtener la página de logs para usuario {user_id_str}: {e}", exc_info=True)
+        return None
 
 def save_routine(user_id, routine_data):
     """
@@ -159,52 +555,39 @@ def save_routine(user_id, routine_data):
     Returns:
         bool: True si la operación fue exitosa, False en caso contrario.
     """
-    conn = None
     # --- CORRECCIÓN: Convertir a string aquí ---
     user_id_str = str(user_id)
     # --- FIN CORRECCIÓN ---
     try:
         logger.info(f"Guardando/Actualizando rutina para usuario ID={user_id_str}")
-        conn = psycopg2.connect(**DB_CONFIG)
-        cur = conn.cursor()
-        cur.execute("SET search_path TO gym, public;")
-
-        # Pasar user_id_str (string) al DELETE
-        cur.execute("DELETE FROM gym.rutinas WHERE user_id = %s", (user_id_str,))
-        logger.debug(f"Rutina antigua eliminada para usuario {user_id_str}")
-
-        dias_insertados = 0
-        for dia, ejercicios in routine_data.items():
-            try:
-                dia_semana = int(dia)
-                if not 1 <= dia_semana <= 7: continue
-                if not isinstance(ejercicios, list): continue
-                ejercicios_json = json.dumps(ejercicios)
-
-                # Pasar user_id_str (string) al INSERT
-                cur.execute(
-                    """
-                    INSERT INTO gym.rutinas (user_id, dia_semana, ejercicios)
-                    VALUES (%s, %s, %s::jsonb)
-                    """,
-                    (user_id_str, dia_semana, ejercicios_json)
-                )
-                dias_insertados += 1
-            # ... (manejo de errores de día/json sin cambios) ...
-            except ValueError: logger.warning(f"Clave día no numérica '{dia}', user {user_id_str}. Ignorando."); continue
-            except (TypeError, json.JSONDecodeError) as json_err: logger.error(f"Error JSON día {dia}, user {user_id_str}: {json_err}"); continue
-
-        conn.commit()
+        with get_db_connection() as conn:
+            cur = conn.cursor()
+
+            # Pasar user_id_str (string) al DELETE
+            cur.execute(DELETE_ROUTINE_SQL, (user_id_str,))
+            logger.debug(f"Rutina antigua eliminada para usuario {user_id_str}")
+
+            dias_insertados = 0
+            for dia, ejercicios in routine_data.items():
+                try:
+                    dia_semana = int(dia)
+                    if not 1 <= dia_semana <= 7: continue
+                    if not isinstance(ejercicios, list): continue
+                    ejercicios_json = json.dumps(ejercicios)
+
+                    # Pasar user_id_str (string) al INSERT
+                    cur.execute(INSERT_ROUTINE_DAY_SQL, (user_id_str, dia_semana, ejercicios_json))
+                    dias_insertados += 1
+                # ... (manejo de errores de día/json sin cambios) ...
+                except ValueError: logger.warning(f"Clave día no numérica '{dia}', user {user_id_str}. Ignorando."); continue
+                except (TypeError, json.JSONDecodeError) as json_err: logger.error(f"Error JSON día {dia}, user {user_id_str}: {json_err}"); continue
+
+            conn.commit()
         logger.info(f"✅ Rutina guardada/actualizada ({dias_insertados} días) para usuario {user_id_str}.")
         return True
     except Exception as e:
         logger.error(f"Error al guardar rutina para usuario {user_id_str}: {e}", exc_info=True)
-        if conn: conn.rollback()
         return False
-    finally:
-        if conn:
-            try: conn.close()
-            except Exception as close_error: logger.error(f"Error al cerrar la conexión: {close_error}")
 
 def get_routine(user_id):
     """
@@ -216,48 +599,25 @@ def get_routine(user_id):
     Returns:
         dict or None: Rutina del usuario o None si hay un error.
     """
-    conn = None
     # --- CORRECCIÓN: Convertir a string aquí ---
     user_id_str = str(user_id)
     # --- FIN CORRECCIÓN ---
     try:
         logger.info(f"Obteniendo rutina completa para usuario ID={user_id_str}")
-        conn = psycopg2.connect(**DB_CONFIG)
-        cur = conn.cursor()
-        cur.execute("SET search_path TO gym, public;")
-
-        # Pasar user_id_str (string) a la consulta
-        cur.execute(
-            """
-            SELECT dia_semana, ejercicios FROM gym.rutinas
-            WHERE user_id = %s ORDER BY dia_semana
-            """,
-            (user_id_str,)
-        )
-
-        rows = cur.fetchall()
-        rutina = {}
-        # ... (lógica de procesamiento de resultados sin cambios) ...
-        for row in rows:
-            dia_semana = row[0]
-            ejercicios = []
-            if isinstance(row[1], str):
-                 try: ejercicios = json.loads(row[1])
-                 except json.JSONDecodeError: logger.warning(f"Error JSON rutina día {dia_semana}, user {user_id_str}.")
-            elif isinstance(row[1], list): ejercicios = row[1]
-            else: logger.warning(f"Tipo inesperado rutina día {dia_semana}, user {user_id_str}: {type(row[1])}")
-            if isinstance(ejercicios, list): rutina[str(dia_semana)] = ejercicios
-            else: rutina[str(dia_semana)] = []
+        with get_db_connection() as conn:
+            cur = conn.cursor()
+
+            # Pasar user_id_str (string) a la consulta
+            cur.execute(ROUTINE_SQL, (user_id_str,))
+
+            rows = cur.fetchall()
+        rutina = rows_to_routine(rows, user_id_str)
 
         logger.info(f"Rutina obtenida para usuario {user_id_str} ({len(rutina)} días definidos)")
         return rutina
     except Exception as e:
         logger.error(f"Error al obtener rutina para usuario {user_id_str}: {e}", exc_info=True)
         return None
-    finally:
-        if conn:
-            try: conn.close()
-            except Exception as close_error: logger.error(f"Error al cerrar la conexión: {close_error}")
 
 def get_today_routine(user_id):
     """
@@ -269,7 +629,6 @@ def get_today_routine(user_id):
     Returns:
         dict: Información de la rutina del día o mensaje de error.
     """
-    conn = None
     # --- CORRECCIÓN: Convertir a string aquí ---
     user_id_str = str(user_id)
     # --- FIN CORRECCIÓN ---
@@ -278,52 +637,30 @@ def get_today_routine(user_id):
 
     try:
         logger.info(f"Obteniendo rutina de hoy ({dia_nombre_actual}) para usuario {user_id_str}")
-        conn = psycopg2.connect(**DB_CONFIG)
-        cur = conn.cursor()
-        cur.execute("SET search_path TO gym, public;")
-
-        # Query 1: Obtener rutina planeada
-        query_rutina = """
-            SELECT ejercicios FROM gym.rutinas
-            WHERE user_id = %s AND dia_semana = %s
-        """
-        params_rutina = (user_id_str, dia_actual) # Pasar user_id_str (string)
-        logger.debug(f"Ejecutando Query 1 (rutina planeada): params = {params_rutina}")
-        cur.execute(query_rutina, params_rutina)
-        row_rutina = cur.fetchone()
-
-        if not row_rutina:
-            logger.info(f"No hay rutina definida para hoy ({dia_nombre_actual}) para usuario {user_id_str}")
-            return {"success": False, "message": "No hay rutina definida para hoy.", "dia_nombre": dia_nombre_actual, "rutina": []}
-
-        # Decodificar JSON (sin cambios)
-        ejercicios_planeados = []
-        if isinstance(row_rutina[0], str):
-            try: ejercicios_planeados = json.loads(row_rutina[0])
-            except json.JSONDecodeError: raise ValueError("Formato de rutina inválido en BD.")
-        elif isinstance(row_rutina[0], list):
-            ejercicios_planeados = row_rutina[0]
-        else: raise ValueError("Tipo de dato de rutina inválido en BD.")
-        if not isinstance(ejercicios_planeados, list): raise ValueError("Formato de ejercicios planeados inválido.")
-
-        # Query 2: Obtener ejercicios realizados
-        hoy_fecha = datetime.date.today()
-        query_realizados = """
-            SELECT DISTINCT ejercicio FROM gym.ejercicios
-            WHERE user_id = %s AND fecha::date = %s
-        """
-        params_realizados = (user_id_str, hoy_fecha) # Pasar user_id_str (string)
-        logger.debug(f"Ejecutando Query 2 (ejercicios realizados): params = {params_realizados}")
-        cur.execute(query_realizados, params_realizados)
-        ejercicios_realizados_set = {row[0] for row in cur.fetchall()}
+        with get_db_connection() as conn:
+            cur = conn.cursor()
+
+            # Query 1: Obtener rutina planeada
+            params_rutina = (user_id_str, dia_actual) # Pasar user_id_str (string)
+            logger.debug(f"Ejecutando Query 1 (rutina planeada): params = {params_rutina}")
+            cur.execute(ROUTINE_DAY_SQL, params_rutina)
+            row_rutina = cur.fetchone()
+
+            if not row_rutina:
+                logger.info(f"No hay rutina definida para hoy ({dia_nombre_actual}) para usuario {user_id_str}")
+                return {"success": False, "message": "No hay rutina definida para hoy.", "dia_nombre": dia_nombre_actual, "rutina": []}
+
+            ejercicios_planeados = parse_planned_exercises(row_rutina[0])
+
+            # Query 2: Obtener ejercicios realizados
+            hoy_fecha = datetime.date.today()
+            params_realizados = (user_id_str, hoy_fecha, hoy_fecha) # Pasar user_id_str (string)
+            logger.debug(f"Ejecutando Query 2 (ejercicios realizados): params = {params_realizados}")
+            cur.execute(EXERCISES_DONE_ON_DAY_SQL, params_realizados)
+            ejercicios_realizados_set = {row[0] for row in cur.fetchall()}
         logger.debug(f"Ejercicios realizados hoy por {user_id_str}: {ejercicios_realizados_set}")
 
-        # Construir resultado (sin cambios)
-        rutina_resultado = []
-        for ejercicio_nombre in ejercicios_planeados:
-            if isinstance(ejercicio_nombre, str):
-                 rutina_resultado.append({"ejercicio": ejercicio_nombre, "realizado": ejercicio_nombre in ejercicios_realizados_set})
-            else: logger.warning(f"Elemento no string en rutina planeada para {user_id_str}: {ejercicio_nombre}")
+        rutina_resultado = build_today_routine(ejercicios_planeados, ejercicios_realizados_set, user_id_str)
 
         return {"success": True, "message": "Rutina para hoy obtenida correctamente.", "rutina": rutina_resultado, "dia_nombre": dia_nombre_actual}
 
@@ -333,10 +670,6 @@ def get_today_routine(user_id):
     except Exception as e:
         logger.error(f"Error general al obtener rutina de hoy para user {user_id_str}: {e}", exc_info=True)
         return {"success": False, "message": f"Error interno al obtener la rutina de hoy.", "dia_nombre": dia_nombre_actual, "rutina": []}
-    finally:
-        if conn:
-            try: conn.close()
-            except Exception as close_error: logger.error(f"Error al cerrar la conexión: {close_error}")
 
 
 def reset_today_routine_status(user_id: str) -> bool:
@@ -350,35 +683,26 @@ def reset_today_routine_status(user_id: str) -> bool:
     Returns:
         bool: True si la operación fue exitosa, False en caso contrario.
     """
-    conn = None
     # --- CORRECCIÓN: Convertir a string aquí ---
     user_id_str = str(user_id)
     # --- FIN CORRECCIÓN ---
     try:
         hoy_fecha = datetime.date.today()
         logger.info(f"Intentando reiniciar estado de rutina (eliminar logs) para hoy ({hoy_fecha}) - Usuario: {user_id_str}")
-        conn = psycopg2.connect(**DB_CONFIG)
-        cur = conn.cursor()
-        cur.execute("SET search_path TO gym, public;")
-
-        query = """
-            DELETE FROM gym.ejercicios
-            WHERE user_id = %s AND fecha::date = %s
-        """
-        logger.info(f"--- DEBUG RESET: Ejecutando DELETE query para user {user_id_str} en fecha {hoy_fecha}")
-        # Pasar user_id_str (string) al DELETE
-        cur.execute(query, (user_id_str, hoy_fecha))
-
-        num_deleted = cur.rowcount
-        logger.info(f"--- DEBUG RESET: Filas eliminadas: {num_deleted}")
-        conn.commit()
+        with get_db_connection() as conn:
+            cur = conn.cursor()
+
+            # Pasar user_id_str (string) al DELETE
+            cur.execute(DELETE_EXERCISES_ON_DAY_SQL, (user_id_str, hoy_fecha, hoy_fecha))
+
+            num_deleted, ejercicios_borrados = cur.fetchone()
+            rebuild_rollups(cur, user_id_str, ejercicios_borrados)
+            rebuild_personal_records(cur, user_id_str, ejercicios_borrados)
+            rebuild_daily_activity(cur, user_id_str, hoy_fecha, hoy_fecha)
+            bump_data_version(cur, user_id_str)
+            conn.commit()
         logger.info(f"✅ Estado de rutina reiniciado para usuario {user_id_str}. Se eliminaron {num_deleted} registros de ejercicios de hoy.")
         return True
     except Exception as e:
         logger.error(f"❌ Error al reiniciar estado de rutina para usuario {user_id_str}: {e}", exc_info=True)
-        if conn: conn.rollback()
         return False
-    finally:
-        if conn:
-            try: conn.close()
-            except Exception as close_error: logger.error(f"Error al cerrar la conexión tras intentar reiniciar rutina: {close_error}")
\ No newline at end of file
@@ -0,0 +1,279 @@
+# Archivo: services/db_pool.py
+"""
+Pool de conexiones PostgreSQL compartido por todo el proceso.
+
+Todos los accesos a BD del backend piden la conexión a través de
+get_db_connection() en lugar de abrir una nueva con psycopg2.connect().
+"""
+
+import time
+import logging
+import threading
+from contextlib import contextmanager
+
+import psycopg2
+import psycopg2.extensions
+from psycopg2.pool import ThreadedConnectionPool
+
+try:
+    from ..config import DB_CONFIG, DB_POOL_CONFIG
+except ImportError:
+    try:
+        from config import DB_CONFIG, DB_POOL_CONFIG
+    except ImportError:
+        logging.critical("No se pudo importar DB_CONFIG/DB_POOL_CONFIG. Verifica la estructura del proyecto.")
+        DB_CONFIG = {}
+        DB_POOL_CONFIG = {}
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeoutError(psycopg2.OperationalError):
+    """No se obtuvo una conexión libre antes de agotar el timeout."""
+
+
+class _TrackedPool(ThreadedConnectionPool):
+    """ThreadedConnectionPool que cuenta las conexiones que abre y puede cerrar las ociosas."""
+
+    def __init__(self, minconn, maxconn, *args, **kwargs):
+        self.created = 0
+        super().__init__(minconn, maxconn, *args, **kwargs)
+
+    def _connect(self, key=None):
+        # Se llama al abrir las iniciales y desde getconn (con el lock del pool) si no hay ociosas
+        conn = super()._connect(key)
+        self.created += 1
+        return conn
+
+    def close_idle(self, keep, expired):
+        """
+        Cierra conexiones ociosas para las que expired(conn) es cierto, de la más
+        antigua a la más reciente, mientras queden más de 'keep' abiertas.
+
+        Returns:
+            list: Conexiones cerradas.
+        """
+        closed = []
+        with self._lock:
+            # getconn saca del final de la lista: las primeras son las que llevan más tiempo ociosas
+            for conn in list(self._pool):
+                if len(self._pool) + len(self._used) <= keep:
+                    break
+                if expired(conn):
+                    self._pool.remove(conn)
+                    conn.close()
+                    closed.append(conn)
+        return closed
+
+
+class ConnectionPool:
+    """
+    psycopg2.pool.ThreadedConnectionPool con espera acotada y comprobación en el checkout.
+
+    ThreadedConnectionPool lanza PoolError en cuanto no queda conexión libre;
+    aquí un semáforo de max_size huecos hace esperar hasta 'timeout' segundos.
+    El pool de psycopg2 ya deshace las transacciones abiertas al devolver una
+    conexión y cierra las que quedaron en estado desconocido.
+
+    Las conexiones devueltas se conservan ociosas hasta max_size; en cada checkout
+    se cierran las que llevan más de healthcheck_idle segundos sin usarse mientras
+    haya más de min_size abiertas, así que tras un pico el pool vuelve a min_size.
+
+    Args:
+        connect_kwargs (dict): Parámetros para psycopg2.connect.
+        min_size (int): Conexiones que se abren al crear el pool y que se mantienen ociosas.
+        max_size (int): Máximo de conexiones abiertas a la vez.
+        timeout (float): Segundos máximos esperando una conexión libre.
+        healthcheck_idle (float): Si una conexión estuvo ociosa más de estos
+            segundos se comprueba con 'SELECT 1' antes de entregarla, o se
+            cierra si sobra por encima de min_size.
+    """
+
+    def __init__(self, connect_kwargs, min_size=1, max_size=10, timeout=10.0, healthcheck_idle=30.0):
+        if max_size < 1 or min_size < 0 or min_size > max_size:
+            raise ValueError(f"Tamaños de pool inválidos: min={min_size}, max={max_size}")
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.healthcheck_idle = healthcheck_idle
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        self._returned_at = {}  # id(conexión) -> instante en que se devolvió
+        self._in_use = 0
+        self._waiting = 0
+        self._timeouts = 0
+        self._closed_idle = 0
+        try:
+            self._pool = _TrackedPool(min_size, max_size, **connect_kwargs)
+        except psycopg2.Error as e:
+            # El pool sigue siendo usable; las conexiones se abrirán bajo demanda
+            logger.error(f"No se pudieron abrir las conexiones iniciales del pool: {e}")
+            self._pool = _TrackedPool(0, max_size, **connect_kwargs)
+        # psycopg2 cierra al devolverlas las conexiones que exceden 'minconn': tras abrir
+        # las iniciales se sube a max_size para conservarlas ociosas; las que sobran
+        # por encima de min_size las cierra _close_idle
+        self._pool.minconn = max_size
+
+    def getconn(self, timeout=None):
+        """
+        Obtiene una conexión del pool, abriendo una nueva si hay hueco.
+
+        Args:
+            timeout (float, optional): Segundos máximos de espera (por defecto el del pool).
+
+        Returns:
+            connection: Conexión psycopg2 lista para usar.
+
+        Raises:
+            PoolTimeoutError: Si no hay conexión libre antes del timeout.
+        """
+        with self._lock:
+            self._waiting += 1
+        try:
+            acquired = self._slots.acquire(timeout=self.timeout if timeout is None else timeout)
+        finally:
+            with self._lock:
+                self._waiting -= 1
+        if not acquired:
+            with self._lock:
+                self._timeouts += 1
+            logger.warning(f"Timeout esperando conexión del pool: {self.stats()}")
+            raise PoolTimeoutError(f"Timeout esperando conexión del pool ({self.max_size}/{self.max_size} en uso).")
+        try:
+            self._close_idle()
+            while True:
+                conn = self._pool.getconn()
+                if self._is_healthy(conn):
+                    break
+                logger.warning("Conexión del pool no válida en checkout. Se descarta y se reintenta.")
+                self._pool.putconn(conn, close=True)
+        except BaseException:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._in_use += 1
+        return conn
+
+    def putconn(self, conn, discard=False):
+        """
+        Devuelve una conexión al pool.
+
+        Args:
+            conn: Conexión obtenida con getconn().
+            discard (bool): Cerrarla en lugar de reutilizarla.
+        """
+        try:
+            with self._lock:
+                self._in_use -= 1
+                if discard or conn.closed:
+                    self._returned_at.pop(id(conn), None)
+                else:
+                    self._returned_at[id(conn)] = time.monotonic()
+            if not self._pool.closed:
+                self._pool.putconn(conn, close=discard or bool(conn.closed))
+        finally:
+            self._slots.release()
+
+    def close(self):
+        """Cierra todas las conexiones del pool."""
+        self._pool.closeall()
+
+    def stats(self):
+        """
+        Devuelve las métricas actuales del pool.
+
+        Returns:
+            dict: min_size, max_size, in_use (prestadas), waiting (hilos esperando
+                hueco), created (conexiones abiertas en total, también las que
+                sustituyen a una descartada), closed_idle (cerradas por ociosas) y timeouts.
+        """
+        with self._lock:
+            return {"min_size": self.min_size, "max_size": self.max_size,
+                    "in_use": self._in_use, "waiting": self._waiting, "created": self._pool.created,
+                    "closed_idle": self._closed_idle, "timeouts": self._timeouts}
+
+    def _close_idle(self):
+        """Cierra las conexiones ociosas más de healthcheck_idle segundos que sobran por encima de min_size."""
+        now = time.monotonic()
+
+        def expired(conn):
+            last_used = self._returned_at.get(id(conn))
+            return last_used is not None and now - last_used >= self.healthcheck_idle
+
+        with self._lock:
+            closed = self._pool.close_idle(self.min_size, expired)
+            for conn in closed:
+                self._returned_at.pop(id(conn), None)
+            self._closed_idle += len(closed)
+
+    def _is_healthy(self, conn):
+        if conn.closed:
+            return False
+        if conn.get_transaction_status() == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+            return False
+        with self._lock:
+            last_used = self._returned_at.get(id(conn))
+        if last_used is None or time.monotonic() - last_used < self.healthcheck_idle:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Devuelve el pool del proceso, creándolo la primera vez."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                pool = ConnectionPool(DB_CONFIG, **DB_POOL_CONFIG)
+                logger.info(f"Pool de conexiones creado (min={pool.min_size}, max={pool.max_size}).")
+                _pool = pool
+    return _pool
+
+
+def close_pool():
+    """Cierra el pool del proceso (llamar al apagar la aplicación)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+            logger.info("Pool de conexiones cerrado.")
+
+
+def get_pool_stats():
+    """Métricas del pool (in_use, waiting, created...; ver ConnectionPool.stats) o None si aún no existe."""
+    return _pool.stats() if _pool is not None else None
+
+
+@contextmanager
+def get_db_connection():
+    """
+    Presta una conexión del pool durante el bloque 'with'.
+
+    Si el bloque lanza una excepción se hace rollback; la conexión siempre
+    vuelve al pool (o se descarta si quedó inservible). Los llamadores
+    siguen siendo responsables de hacer commit.
+    """
+    pool = get_pool()
+    conn = pool.getconn()
+    discard = False
+    try:
+        yield conn
+    except BaseException:
+        try:
+            conn.rollback()
+        except psycopg2.Error:
+            discard = True
+        raise
+    finally:
+        pool.putconn(conn, discard=discard or bool(conn.closed))
@@ -0,0 +1,89 @@
+# Archivo: services/downsampling.py
+"""
+Reducción de series temporales para los gráficos del dashboard.
+
+Largest-Triangle-Three-Buckets (LTTB, Steinarsson 2013): conserva el primer y
+el último punto y, de cada bucket intermedio, el punto que forma el triángulo
+de mayor área con el punto elegido en el bucket anterior y la media del
+siguiente. Mantiene picos y forma de la curva con un número fijo de puntos,
+de modo que el tamaño de la respuesta y el coste de pintar no dependen de la
+longitud del historial.
+
+La dependencia entre buckets obliga a recorrerlos en orden, pero dentro de cada
+bucket las áreas se calculan con NumPy, igual que las medias de todos los
+buckets (np.add.reduceat).
+"""
+
+import numpy as np
+
+# Series que /api/ejercicios_stats puede devolver reducidas (claves de cada sesión en 'datos')
+SERIES_KEYS = ("max_peso", "avg_peso", "volumen", "total_reps", "max_e1rm_session")
+DEFAULT_MAX_POINTS = 500
+MIN_POINTS = 3
+MAX_POINTS = 5000
+
+
+def lttb_indices(x, y, threshold):
+    """
+    Índices de los puntos que conserva LTTB.
+
+    Args:
+        x (np.ndarray): Abscisas ordenadas de menor a mayor.
+        y (np.ndarray): Ordenadas (sin NaN).
+        threshold (int): Número de puntos a conservar (>= 3).
+
+    Returns:
+        np.ndarray: Índices crecientes; todos si ya hay threshold puntos o menos.
+    """
+    n = len(x)
+    if threshold >= n or threshold < MIN_POINTS:
+        return np.arange(n)
+
+    # threshold - 2 buckets para los puntos interiores [1, n - 1); cada uno con al menos un punto
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.intp)
+    counts = np.diff(edges)
+    # Media de cada bucket; para el último, el "siguiente" es el último punto
+    mean_x = np.add.reduceat(x[:n - 1], edges[:-1]) / counts
+    mean_y = np.add.reduceat(y[:n - 1], edges[:-1]) / counts
+    next_x = np.append(mean_x[1:], x[-1])
+    next_y = np.append(mean_y[1:], y[-1])
+
+    selected = np.empty(threshold, dtype=np.intp)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for bucket in range(threshold - 2):
+        lo, hi = edges[bucket], edges[bucket + 1]
+        # Doble del área del triángulo (a, punto del bucket, media del siguiente)
+        area = np.abs((x[a] - next_x[bucket]) * (y[lo:hi] - y[a])
+                      - (x[a] - x[lo:hi]) * (next_y[bucket] - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[bucket + 1] = a
+    return selected
+
+
+def downsample_series(entries, keys=SERIES_KEYS, max_points=DEFAULT_MAX_POINTS):
+    """
+    Series del dashboard reducidas con LTTB a partir de las sesiones de un ejercicio.
+
+    Args:
+        entries (list): Sesiones ordenadas por fecha (elementos de 'datos': 'fecha' date o YYYY-MM-DD y métricas).
+        keys (iterable): Métricas a devolver (subconjunto de SERIES_KEYS).
+        max_points (int): Máximo de puntos por serie.
+
+    Returns:
+        dict: {métrica: [{'fecha': ..., métrica: valor}, ...]} con como mucho
+            max_points puntos reales por serie. Se omiten valores nulos y, en
+            e1RM, los que son 0 (series sin e1RM), como hace el gráfico.
+    """
+    if not entries:
+        return {key: [] for key in keys}
+    x = np.array([entry["fecha"] for entry in entries], dtype="datetime64[D]").astype(np.float64)
+    series = {}
+    for key in keys:
+        values = np.array([entry[key] for entry in entries], dtype=np.float64)  # None -> NaN
+        with np.errstate(invalid="ignore"):
+            mask = values > 0 if key == "max_e1rm_session" else ~np.isnan(values)
+        positions = np.flatnonzero(mask)
+        keep = positions[lttb_indices(x[positions], values[positions], max_points)]
+        series[key] = [{"fecha": entries[i]["fecha"], key: entries[i][key]} for i in keep.tolist()]
+    return series
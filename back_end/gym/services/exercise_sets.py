@@ -0,0 +1,107 @@
+# Archivo: services/exercise_sets.py
+"""
+Tabla normalizada gym.ejercicio_sets: una fila por serie de cada registro de gym.ejercicios.
+
+La columna JSONB 'repeticiones' sigue siendo la fuente de compatibilidad; las
+series se derivan de ella en SQL (jsonb_array_elements) en la misma sentencia
+que inserta el ejercicio, de modo que ambas nunca divergen. Las agregaciones
+(peso máximo, volumen, e1RM) se hacen con GROUP BY sobre esta tabla.
+
+No hay FK hacia gym.ejercicios: la tabla padre está particionada y sus filas se
+mueven de partición (ver services/partitions.py); los borrados eliminan las
+series en la misma sentencia (DELETE_EXERCISES_ON_DAY_SQL).
+
+Uso:
+    python -m back_end.gym.services.exercise_sets    # re-ejecuta el backfill
+"""
+
+import logging
+
+from .db_pool import get_db_connection
+from .session_metrics import SET_REPS_SQL, SET_WEIGHT_SQL
+
+logger = logging.getLogger(__name__)
+
+BACKFILL_BATCH_SIZE = 10000
+
+CREATE_EXERCISE_SETS_SQL = """
+    CREATE TABLE IF NOT EXISTS gym.ejercicio_sets (
+        ejercicio_id INTEGER NOT NULL,
+        set_index SMALLINT NOT NULL,
+        reps INTEGER,
+        weight DOUBLE PRECISION,
+        PRIMARY KEY (ejercicio_id, set_index)
+    )
+"""
+
+# Series de cada registro con la conversión de session_metrics (SET_REPS_SQL/SET_WEIGHT_SQL),
+# la misma que compute_session_metrics y STATS_ENGINE=sql: valores no convertibles
+# quedan a NULL (la serie no cuenta en las agregaciones).
+# {source}: tabla o CTE con columnas (id, repeticiones)
+_SETS_SELECT_SQL = f"""
+    SELECT e.id AS ejercicio_id, (s.ord - 1)::smallint AS set_index,
+           ({SET_REPS_SQL})::integer AS reps, {SET_WEIGHT_SQL} AS weight
+    FROM {{source}} e
+    CROSS JOIN LATERAL jsonb_array_elements(
+        CASE WHEN jsonb_typeof(e.repeticiones) = 'array' THEN e.repeticiones ELSE '[]'::jsonb END
+    ) WITH ORDINALITY AS s(serie, ord)
+    WHERE jsonb_typeof(s.serie) = 'object'
+"""
+
+SETS_FROM_EXERCISES_SQL = f"""
+    INSERT INTO gym.ejercicio_sets (ejercicio_id, set_index, reps, weight)
+    {_SETS_SELECT_SQL}
+    ON CONFLICT (ejercicio_id, set_index) DO NOTHING
+"""
+
+BACKFILL_BATCH_SQL = f"""
+    WITH batch AS (
+        SELECT id, repeticiones FROM gym.ejercicios
+        WHERE id > %s ORDER BY id LIMIT %s
+    ), inserted AS (
+        {SETS_FROM_EXERCISES_SQL.format(source="batch")}
+        RETURNING 1
+    )
+    SELECT MAX(id), (SELECT COUNT(*) FROM inserted) FROM batch
+"""
+
+
+def backfill_exercise_sets(conn, batch_size=BACKFILL_BATCH_SIZE):
+    """
+    Rellena gym.ejercicio_sets a partir del JSONB de los registros existentes.
+
+    Recorre gym.ejercicios por id en lotes, con un commit por lote; es
+    idempotente (ON CONFLICT DO NOTHING) y puede relanzarse sin riesgo.
+
+    Args:
+        conn: Conexión psycopg2.
+        batch_size (int): Registros de gym.ejercicios por lote.
+
+    Returns:
+        int: Series insertadas.
+    """
+    last_id, total = 0, 0
+    with conn.cursor() as cur:
+        while True:
+            cur.execute(BACKFILL_BATCH_SQL, (last_id, batch_size))
+            max_id, inserted = cur.fetchone()
+            conn.commit()
+            if max_id is None:
+                break
+            last_id, total = max_id, total + inserted
+            logger.info(f"Backfill de series: {total} insertadas (último id {last_id}).")
+    return total
+
+
+def create_and_backfill():
+    """Crea la tabla si falta y ejecuta el backfill completo con una conexión del pool."""
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(CREATE_EXERCISE_SETS_SQL)
+        conn.commit()
+        return backfill_exercise_sets(conn)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s [%(levelname)s] - %(message)s')
+    print(f"Series insertadas: {create_and_backfill()}")
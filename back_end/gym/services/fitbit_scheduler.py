@@ -10,23 +10,14 @@ from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 from dotenv import load_dotenv
 
-# Configure logging
-logging.basicConfig(level=logging.INFO,
-                   format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+from .db_pool import get_db_connection
+from .partitions import ensure_future_partitions
+
 logger = logging.getLogger('fitbit_scheduler')
 
 # Load environment variables
 load_dotenv()
 
-# Database connection config
-DB_CONFIG = {
-    'dbname': os.getenv('DB_NAME'),
-    'user': os.getenv('DB_USER'),
-    'password': os.getenv('DB_PASSWORD'),
-    'host': os.getenv('DB_HOST', 'postgres_gymdb'),
-    'port': os.getenv('DB_PORT', '5432')
-}
-
 def get_fitbit_credentials():
     """Get Fitbit API credentials from environment variables"""
     return {
@@ -42,11 +33,8 @@ def refresh_tokens():
     """
     logger.info("🔄 Starting Fitbit token refresh check")
     try:
-        # Connect to database
-        conn = psycopg2.connect(**DB_CONFIG)
-        cur = conn.cursor()
-        
-        # Get tokens that expire within the next hour
+        # Get tokens that expire within the next hour (the pooled connection is
+        # released before calling Fitbit, so slow HTTP calls don't hold it)
         expire_threshold = datetime.now() + timedelta(hours=1)
         query = """
             SELECT user_id, refresh_token, expires_at 
@@ -54,8 +42,10 @@ def refresh_tokens():
             WHERE expires_at < %s
         """
         
-        cur.execute(query, (expire_threshold,))
-        tokens_to_refresh = cur.fetchall()
+        with get_db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(query, (expire_threshold,))
+                tokens_to_refresh = cur.fetchall()
         
         logger.info(f"Found {len(tokens_to_refresh)} tokens that need refreshing")
         
@@ -108,15 +98,18 @@ def refresh_tokens():
                         WHERE user_id = %s
                     """
                     
-                    cur.execute(
-                        update_query,
-                        (
-                            new_tokens.get('access_token'),
-                            new_tokens.get('refresh_token'),
-                            new_expires_at,
-                            user_id
-                        )
-                    )
+                    with get_db_connection() as conn:
+                        with conn.cursor() as cur:
+                            cur.execute(
+                                update_query,
+                                (
+                                    new_tokens.get('access_token'),
+                                    new_tokens.get('refresh_token'),
+                                    new_expires_at,
+                                    user_id
+                                )
+                            )
+                        conn.commit()
                     
                     logger.info(f"✅ Successfully refreshed token for user {user_id}")
                 else:
@@ -125,13 +118,6 @@ def refresh_tokens():
             except Exception as e:
                 logger.error(f"❌ Error refreshing token for user {user_id}: {str(e)}")
         
-        # Commit all changes
-        conn.commit()
-        
-        # Close database connection
-        cur.close()
-        conn.close()
-        
         logger.info("🏁 Token refresh check completed")
     except Exception as e:
         logger.error(f"❌ Error in refresh_tokens job: {str(e)}")
@@ -143,10 +129,6 @@ def sync_fitbit_data():
     """
     logger.info("🔄 Starting Fitbit data sync")
     try:
-        # Connect to database
-        conn = psycopg2.connect(**DB_CONFIG)
-        cur = conn.cursor()
-        
         # Get all valid tokens
         query = """
             SELECT user_id, access_token
@@ -154,8 +136,10 @@ def sync_fitbit_data():
             WHERE expires_at > CURRENT_TIMESTAMP
         """
         
-        cur.execute(query)
-        valid_tokens = cur.fetchall()
+        with get_db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(query)
+                valid_tokens = cur.fetchall()
         
         logger.info(f"Found {len(valid_tokens)} users with valid tokens")
         
@@ -175,10 +159,6 @@ def sync_fitbit_data():
             except Exception as e:
                 logger.error(f"❌ Error syncing data for user {user_id}: {str(e)}")
         
-        # Close database connection
-        cur.close()
-        conn.close()
-        
         logger.info("🏁 Data sync completed")
     except Exception as e:
         logger.error(f"❌ Error in sync_fitbit_data job: {str(e)}")
@@ -196,6 +176,16 @@ def start_scheduler():
         replace_existing=True
     )
     
+    # Create upcoming monthly partitions of gym.ejercicios (daily, and once at startup)
+    scheduler.add_job(
+        ensure_future_partitions,
+        trigger=IntervalTrigger(days=1),
+        id='ensure_ejercicios_partitions',
+        name='Ensure Ejercicios Partitions',
+        next_run_time=datetime.now(),
+        replace_existing=True
+    )
+    
     # Add job to sync data every 3 hours
     # Commented out for now - uncomment when you implement the sync logic
     # scheduler.add_job(
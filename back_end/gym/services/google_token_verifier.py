@@ -0,0 +1,166 @@
+# Archivo: services/google_token_verifier.py
+"""
+Verificación local de ID tokens de Google con las claves de firma en caché.
+
+Las claves públicas (JWKS) se descargan con una única requests.Session y se
+guardan en memoria durante el max-age de su cabecera Cache-Control. Antes de
+que caduquen se refrescan en un hilo de fondo, de modo que el login verifica la
+firma (RS256) sin salir a la red. Si el endpoint de Google falla al refrescar,
+se siguen usando las últimas claves conocidas.
+"""
+
+import re
+import time
+import logging
+import threading
+
+import jwt
+import requests
+
+logger = logging.getLogger(__name__)
+
+GOOGLE_JWKS_URL = "https://www.googleapis.com/oauth2/v3/certs"
+GOOGLE_ISSUERS = ["accounts.google.com", "https://accounts.google.com"]
+
+_MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+
+class GoogleTokenVerifier:
+    """
+    Verifica ID tokens de Google contra un JWKS cacheado.
+
+    Args:
+        client_id (str): Audiencia esperada (GOOGLE_CLIENT_ID).
+        jwks_url (str): URL del JWKS.
+        session (requests.Session, optional): Sesión HTTP reutilizada en cada descarga.
+        default_ttl (float): Segundos de caché si la respuesta no trae max-age.
+        min_ttl (float): Caché mínima, aunque max-age sea menor.
+        refresh_margin (float): Segundos antes de caducar en los que se refresca en segundo plano.
+        min_refresh_interval (float): Separación mínima entre descargas forzadas por un 'kid' desconocido.
+        timeout (float): Timeout HTTP en segundos.
+        leeway (int): Tolerancia de reloj en segundos para 'exp'/'iat'.
+        clock (callable): Reloj monotónico (inyectable en tests).
+    """
+
+    def __init__(self, client_id, jwks_url=GOOGLE_JWKS_URL, session=None, default_ttl=3600, min_ttl=60,
+                 refresh_margin=300, min_refresh_interval=30, timeout=5, leeway=30, clock=time.monotonic):
+        self.client_id = client_id
+        self.jwks_url = jwks_url
+        self.session = session or requests.Session()
+        self.default_ttl = default_ttl
+        self.min_ttl = min_ttl
+        self.refresh_margin = refresh_margin
+        self.min_refresh_interval = min_refresh_interval
+        self.timeout = timeout
+        self.leeway = leeway
+        self._clock = clock
+        self._keys = {}  # kid -> PyJWK
+        self._expires_at = 0.0
+        self._last_fetch = None
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    def _max_age(self, response):
+        """Segundos de validez según Cache-Control (menos Age) o default_ttl."""
+        match = _MAX_AGE_RE.search(response.headers.get("Cache-Control", ""))
+        if not match:
+            return self.default_ttl
+        try:
+            age = int(response.headers.get("Age", 0))
+        except ValueError:
+            age = 0
+        return max(int(match.group(1)) - age, self.min_ttl)
+
+    def refresh(self):
+        """
+        Descarga el JWKS y sustituye las claves en caché.
+
+        Raises:
+            requests.RequestException, ValueError: Si la descarga o el JWKS no son válidos
+                (las claves anteriores se conservan).
+        """
+        with self._lock:
+            self._last_fetch = self._clock()
+        response = self.session.get(self.jwks_url, timeout=self.timeout)
+        response.raise_for_status()
+        keys = {}
+        for jwk in response.json().get("keys", []):
+            try:
+                key = jwt.PyJWK(jwk)
+            except jwt.PyJWTError as e:
+                logger.warning(f"Clave del JWKS de Google ignorada (kid={jwk.get('kid')}): {e}")
+                continue
+            keys[key.key_id] = key
+        if not keys:
+            raise ValueError("El JWKS de Google no contiene claves utilizables.")
+        with self._lock:
+            self._keys = keys
+            self._expires_at = self._clock() + self._max_age(response)
+        logger.info(f"JWKS de Google actualizado: {len(keys)} claves.")
+
+    def refresh_in_background(self):
+        """Lanza un refresh en un hilo daemon (como mucho uno a la vez)."""
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._background_refresh, name="google-jwks-refresh", daemon=True).start()
+
+    def _background_refresh(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            logger.warning(f"No se pudo refrescar el JWKS de Google en segundo plano: {e}")
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def _get_key(self, kid):
+        """Devuelve la clave 'kid', refrescando el JWKS solo si hace falta."""
+        now = self._clock()
+        key = self._keys.get(kid)
+        if key is not None and now < self._expires_at:
+            if now >= self._expires_at - self.refresh_margin:
+                self.refresh_in_background()
+            return key
+
+        # Caducado o 'kid' desconocido (rotación de claves): refresco síncrono,
+        # limitado para que tokens con 'kid' inventado no provoquen una descarga cada uno
+        if self._last_fetch is not None and now - self._last_fetch < self.min_refresh_interval:
+            if key is None:
+                raise jwt.InvalidTokenError(f"Clave de firma desconocida: {kid}")
+            return key  # Caducada, pero el último intento de refresco es reciente
+        try:
+            self.refresh()
+        except Exception as e:
+            if key is None:
+                raise jwt.InvalidTokenError(f"No se pudo obtener la clave de firma {kid}: {e}") from e
+            logger.warning(f"JWKS de Google caducado y no se pudo refrescar; se usa la clave anterior: {e}")
+            return key
+        key = self._keys.get(kid)
+        if key is None:
+            raise jwt.InvalidTokenError(f"Clave de firma desconocida: {kid}")
+        return key
+
+    def verify(self, token):
+        """
+        Verifica firma, audiencia, emisor y caducidad de un ID token de Google.
+
+        Args:
+            token (str): ID token (JWT) recibido del cliente.
+
+        Returns:
+            dict: Claims del token.
+
+        Raises:
+            jwt.PyJWTError: Si el token no es válido.
+        """
+        header = jwt.get_unverified_header(token)
+        if header.get("alg") != "RS256":
+            raise jwt.InvalidAlgorithmError(f"Algoritmo no permitido: {header.get('alg')}")
+        key = self._get_key(header.get("kid"))
+        return jwt.decode(
+            token, key.key, algorithms=["RS256"], audience=self.client_id,
+            issuer=GOOGLE_ISSUERS, leeway=self.leeway,
+            options={"require": ["exp", "iat", "iss", "aud", "sub"]},
+        )
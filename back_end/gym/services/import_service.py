@@ -0,0 +1,285 @@
+# Archivo: services/import_service.py
+"""
+Importación masiva de historiales de entrenamiento (CSV o NDJSON) sin LLM.
+
+El fichero se lee línea a línea, cada fila se valida con el modelo Exercise de
+models/schemas.py y las filas válidas se cargan en gym.ejercicios con COPY en
+lotes de tamaño fijo. La memoria usada no depende del tamaño del fichero.
+
+Formato de cada fila (columnas CSV con cabecera, o claves de cada objeto NDJSON):
+    fecha      -> 'YYYY-MM-DD' o ISO 8601 (obligatoria)
+    ejercicio  -> nombre del ejercicio (debe estar en KNOWN_EXERCISES)
+    series     -> JSON '[{"repeticiones": 10, "peso": 80}]' o compacto '10x80;8x85'
+    duracion   -> minutos (ejercicios sin series)
+"""
+
+import io
+import csv
+import json
+import logging
+import datetime
+
+import psycopg2
+from pydantic import ValidationError
+
+try:
+    from models.schemas import Exercise
+except ImportError:
+    from ..models.schemas import Exercise
+
+from .db_pool import get_db_connection
+from .database import EXERCISE_COLUMNS, INSERT_EXERCISES_TEMPLATE
+from .session_metrics import EMPTY_METRICS, compute_session_metrics
+
+logger = logging.getLogger(__name__)
+
+# COPY a una tabla temporal y de ahí a gym.ejercicios con el INSERT común, que
+# rellena también series y rollups (COPY no admite RETURNING)
+CREATE_STAGING_SQL = """
+    CREATE TEMP TABLE IF NOT EXISTS import_ejercicios_staging (
+        fecha TIMESTAMP WITH TIME ZONE,
+        ejercicio VARCHAR(255),
+        repeticiones JSONB,
+        duracion INTEGER,
+        user_id VARCHAR(255),
+        series_validas SMALLINT,
+        max_peso DOUBLE PRECISION,
+        avg_peso DOUBLE PRECISION,
+        total_reps INTEGER,
+        volumen DOUBLE PRECISION,
+        max_e1rm DOUBLE PRECISION
+    ) ON COMMIT DELETE ROWS
+"""
+COPY_EXERCISES_SQL = f"COPY import_ejercicios_staging ({EXERCISE_COLUMNS}) FROM STDIN WITH (FORMAT csv)"
+INSERT_FROM_STAGING_SQL = INSERT_EXERCISES_TEMPLATE.format(
+    source=f"SELECT {EXERCISE_COLUMNS} FROM import_ejercicios_staging")
+IMPORT_BATCH_SIZE = 5000      # Filas por COPY/transacción
+MAX_REPORTED_ERRORS = 1000    # Errores por fila devueltos al cliente (el total se cuenta siempre)
+SUPPORTED_FORMATS = ("csv", "ndjson")
+
+
+class ImportFormatError(ValueError):
+    """El fichero no tiene un formato soportado o le faltan columnas."""
+
+
+def detect_format(filename=None, content_type=None, explicit=None):
+    """
+    Determina el formato del fichero ('csv' o 'ndjson').
+
+    Args:
+        filename (str, optional): Nombre del fichero subido.
+        content_type (str, optional): Content-Type de la parte multipart.
+        explicit (str, optional): Formato indicado por el cliente.
+
+    Returns:
+        str: 'csv' o 'ndjson'.
+
+    Raises:
+        ImportFormatError: Si no se puede determinar.
+    """
+    if explicit:
+        fmt = explicit.lower()
+        if fmt in ("jsonl", "json"):
+            fmt = "ndjson"
+        if fmt not in SUPPORTED_FORMATS:
+            raise ImportFormatError(f"Formato '{explicit}' no soportado. Usa csv o ndjson.")
+        return fmt
+    name = (filename or "").lower()
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    ctype = (content_type or "").lower()
+    if "csv" in ctype:
+        return "csv"
+    if "ndjson" in ctype or "jsonl" in ctype or "x-json-stream" in ctype:
+        return "ndjson"
+    raise ImportFormatError("No se pudo determinar el formato. Usa extensión .csv/.ndjson o el parámetro 'format'.")
+
+
+def _parse_fecha(value):
+    if isinstance(value, datetime.datetime):
+        return value
+    if not value or not str(value).strip():
+        raise ValueError("Falta 'fecha'.")
+    text = str(value).strip()
+    try:
+        if len(text) == 10:
+            return datetime.datetime.combine(datetime.date.fromisoformat(text), datetime.time())
+        return datetime.datetime.fromisoformat(text.replace("Z", "+00:00"))
+    except ValueError:
+        raise ValueError(f"Fecha inválida: '{text}'")
+
+
+def _parse_series(value):
+    """Acepta lista, JSON o formato compacto 'RxP;RxP' (peso opcional: '12')."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, list):
+        return value
+    text = str(value).strip()
+    if text.startswith("["):
+        return json.loads(text)
+    series = []
+    for chunk in text.replace(",", ";").split(";"):
+        chunk = chunk.strip().lower()
+        if not chunk:
+            continue
+        reps, _, peso = chunk.partition("x")
+        series.append({"repeticiones": reps.strip(), "peso": peso.strip() or 0})
+    return series
+
+
+def parse_row(raw):
+    """
+    Valida una fila del fichero sin llamar al LLM.
+
+    Args:
+        raw (dict): Fila con fecha, ejercicio y series o duracion.
+
+    Returns:
+        tuple: (fecha, ejercicio, series_json, duracion, SessionMetrics) lista para COPY.
+
+    Raises:
+        ValueError: Si la fila no es válida (incluye pydantic.ValidationError).
+    """
+    if not isinstance(raw, dict):
+        raise ValueError("La fila debe ser un objeto.")
+    fecha = _parse_fecha(raw.get("fecha"))
+    duracion = raw.get("duracion")
+    exercise = Exercise.model_validate({
+        "ejercicio": raw.get("ejercicio") or "",
+        "series": _parse_series(raw.get("series")),
+        "duracion": duracion if duracion not in ("", None) else None,
+    })
+    if exercise.series is not None:
+        series = [s.model_dump() for s in exercise.series]
+        return fecha, exercise.ejercicio, json.dumps(series), None, compute_session_metrics(series)
+    return fecha, exercise.ejercicio, None, exercise.duracion, EMPTY_METRICS
+
+
+def _iter_rows(text_stream, fmt):
+    """Genera (número_de_línea, fila_dict | excepción) leyendo el fichero en streaming."""
+    if fmt == "csv":
+        reader = csv.DictReader(text_stream)
+        fields = {f.strip().lower() for f in (reader.fieldnames or [])}
+        if "fecha" not in fields or "ejercicio" not in fields:
+            raise ImportFormatError("El CSV debe tener cabecera con al menos 'fecha' y 'ejercicio'.")
+        for row in reader:
+            yield reader.line_num, {(k or "").strip().lower(): v for k, v in row.items()}
+    else:
+        for line_num, line in enumerate(text_stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield line_num, json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_num, ValueError(f"JSON inválido: {e.msg}")
+
+
+def _copy_batch(conn, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows(rows)  # None -> campo vacío sin comillas -> NULL en COPY csv
+    buffer.seek(0)
+    with conn.cursor() as cur:
+        cur.execute(CREATE_STAGING_SQL)
+        cur.copy_expert(COPY_EXERCISES_SQL, buffer)
+        cur.execute(INSERT_FROM_STAGING_SQL)
+        inserted = cur.fetchone()[0]
+    conn.commit()  # ON COMMIT DELETE ROWS vacía la tabla temporal
+    return inserted
+
+
+def import_exercises(binary_stream, fmt, user_id, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Importa un fichero CSV/NDJSON de ejercicios en gym.ejercicios.
+
+    Cada lote se carga con COPY en su propia transacción: si un lote falla
+    se informa y se continúa con el siguiente. Un error de codificación a
+    mitad del fichero, con lotes ya confirmados, se informa también como
+    error del resumen (la lectura se detiene ahí).
+
+    Args:
+        binary_stream: Fichero binario legible (p.ej. UploadFile.file).
+        fmt (str): 'csv' o 'ndjson'.
+        user_id (str): ID de Google/Telegram del usuario.
+        batch_size (int): Filas por COPY.
+
+    Returns:
+        dict: Resumen con rows_read, inserted, batches, error_count y errors
+        (primeros MAX_REPORTED_ERRORS, cada uno {'line', 'error'}).
+
+    Raises:
+        ImportFormatError: Si falta la cabecera CSV o el fichero no es UTF-8
+            antes de confirmar ningún lote.
+    """
+    user_id_str = str(user_id)
+    summary = {
+        "success": True, "format": fmt, "rows_read": 0, "inserted": 0,
+        "batches": [], "error_count": 0, "errors": [], "errors_truncated": False,
+    }
+
+    def report(line, error):
+        summary["error_count"] += 1
+        if len(summary["errors"]) < MAX_REPORTED_ERRORS:
+            summary["errors"].append({"line": line, "error": error})
+        else:
+            summary["errors_truncated"] = True
+
+    text_stream = io.TextIOWrapper(binary_stream, encoding="utf-8-sig", newline="")
+    try:
+        with get_db_connection() as conn:
+            batch, first_line, last_line = [], None, 0
+
+            def flush():
+                try:
+                    inserted = _copy_batch(conn, batch)
+                except psycopg2.Error as db_err:
+                    conn.rollback()
+                    logger.error(f"❌ COPY fallido (líneas {first_line}+) para usuario {user_id_str}: {db_err}")
+                    summary["success"] = False
+                    report(first_line, f"Error de base de datos en el lote: {db_err}")
+                    inserted = 0
+                summary["batches"].append(inserted)
+                summary["inserted"] += inserted
+
+            try:
+                for line_num, raw in _iter_rows(text_stream, fmt):
+                    last_line = line_num
+                    summary["rows_read"] += 1
+                    if isinstance(raw, Exception):
+                        report(line_num, str(raw))
+                        continue
+                    try:
+                        fecha, ejercicio, series_json, duracion, metrics = parse_row(raw)
+                    except ValidationError as e:
+                        report(line_num, "; ".join(err["msg"] for err in e.errors()))
+                        continue
+                    except ValueError as e:
+                        report(line_num, str(e) or "Fila inválida.")
+                        continue
+                    if not batch:
+                        first_line = line_num
+                    batch.append((fecha.isoformat(), ejercicio, series_json, duracion, user_id_str) + tuple(metrics))
+                    if len(batch) >= batch_size:
+                        flush()
+                        batch = []
+            except UnicodeDecodeError:
+                if not summary["batches"]:
+                    # Aún no se ha confirmado nada: el fichero entero se rechaza
+                    raise ImportFormatError("El fichero debe estar codificado en UTF-8.")
+                # Hay lotes ya confirmados: se cargan las filas válidas leídas y se
+                # informa en el resumen en lugar de perder 'inserted'/'batches'
+                summary["success"] = False
+                report(last_line + 1, "Texto no UTF-8: se detuvo la lectura del fichero en esta línea.")
+            if batch:
+                flush()
+    finally:
+        text_stream.detach()  # No cerrar el fichero subido; lo gestiona el framework
+
+    logger.info(
+        f"Importación {fmt} para usuario {user_id_str}: {summary['inserted']} filas insertadas "
+        f"de {summary['rows_read']} leídas, {summary['error_count']} errores."
+    )
+    return summary
@@ -2,14 +2,26 @@
 import os
 import jwt
 import time
+import hashlib
 import logging
 from datetime import datetime, timedelta
 
+try:
+    from ..utils.cache import TTLCache
+except ImportError:
+    from utils.cache import TTLCache
+
 # Configuración
 SECRET_KEY = os.getenv("SECRET_KEY", "tu_clave_secreta_temporal_para_desarrollo")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 30  # 30 días
 
+# Claims de tokens ya verificados, por hash del token: las peticiones repetidas
+# con el mismo token se ahorran el HMAC y el parseo del payload. Cada entrada
+# vive como mucho hasta el 'exp' del token (y nunca más de JWT_CLAIMS_CACHE_TTL).
+CLAIMS_CACHE_TTL = float(os.getenv("JWT_CLAIMS_CACHE_TTL", 300))
+CLAIMS_CACHE = TTLCache(maxsize=int(os.getenv("JWT_CLAIMS_CACHE_SIZE", 4096)), ttl=CLAIMS_CACHE_TTL, name="jwt_claims")
+
 # Crear logger correctamente
 logger = logging.getLogger(__name__)
 
@@ -44,6 +56,25 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
 def verify_token(token: str):
     """
     Verifica un token JWT y devuelve los datos si es válido.
+
+    Usa CLAIMS_CACHE: solo la primera petición con cada token paga la verificación.
+    """
+    key = hashlib.sha256(token.encode()).digest()
+    payload = CLAIMS_CACHE.get(key)
+    if payload is not None:
+        return dict(payload)
+    payload = decode_token(token)
+    if payload is not None:
+        ttl = CLAIMS_CACHE_TTL
+        if payload.get("exp"):
+            ttl = min(ttl, payload["exp"] - time.time())
+        if ttl > 0:
+            CLAIMS_CACHE.set(key, dict(payload), ttl=ttl)
+    return payload
+
+def decode_token(token: str):
+    """
+    Verifica la firma y los claims de un token JWT sin pasar por la caché.
     """
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
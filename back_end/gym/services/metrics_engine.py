@@ -0,0 +1,156 @@
+# Archivo: services/metrics_engine.py
+"""
+Motor vectorizado (NumPy) de métricas por sesión.
+
+Calcula lo mismo que session_metrics.compute_session_metrics, pero para muchas
+sesiones a la vez: todas las series se aplanan en arrays contiguos (reps, peso,
+índice de sesión) y max/suma/media/e1RM por sesión salen de reducciones por
+segmento (np.maximum.reduceat, np.bincount) en lugar de bucles anidados con un
+try/except por serie.
+
+Los resultados son idénticos a los de la versión Python (mismas reglas de
+validación, mismo orden de suma y mismo redondeo), ver benchmarks/bench_stats.py.
+"""
+
+import json
+
+import numpy as np
+
+from .session_metrics import EMPTY_METRICS, SessionMetrics
+
+# Brzycki: e1RM = peso / (1.0278 - 0.0278 * reps); reps == 1 -> peso; reps > 15 -> sin e1RM
+BRZYCKI_A = 1.0278
+BRZYCKI_B = 0.0278
+BRZYCKI_MAX_REPS = 15
+
+
+def flatten_sets(series_list):
+    """
+    Aplana las series de varias sesiones en tres secuencias paralelas.
+
+    Args:
+        series_list (iterable): Por sesión, lista de dicts {'repeticiones', 'peso'} o su JSON.
+
+    Returns:
+        tuple: (reps, pesos, owner): valores crudos de cada serie (listas) y el
+            índice de su sesión (np.ndarray); solo series con ambas claves.
+    """
+    sets, sessions, lengths = [], [], []
+    for index, series in enumerate(series_list):
+        if isinstance(series, str):
+            try:
+                series = json.loads(series)
+            except json.JSONDecodeError:
+                continue
+        if not isinstance(series, list):
+            continue
+        valid = [serie for serie in series
+                 if isinstance(serie, dict) and 'repeticiones' in serie and 'peso' in serie]
+        if valid:
+            sets.extend(valid)
+            sessions.append(index)
+            lengths.append(len(valid))
+    reps = [serie['repeticiones'] for serie in sets]
+    pesos = [serie['peso'] for serie in sets]
+    owner = np.repeat(np.asarray(sessions, dtype=np.intp), lengths)
+    return reps, pesos, owner
+
+
+def _to_array(values, convert):
+    """
+    Convierte valores crudos a float64; los no convertibles quedan como NaN.
+
+    Si todos son numéricos (lo habitual) la conversión es una sola llamada a
+    NumPy; si hay strings, None, etc. se aplica 'convert' elemento a elemento
+    para reproducir exactamente int()/float() de la versión Python.
+    """
+    array = np.asarray(values)
+    if array.dtype.kind in "biuf":
+        array = array.astype(np.float64)
+        return np.trunc(array) if convert is int else array
+    result = np.empty(len(values), dtype=np.float64)
+    for i, value in enumerate(values):
+        try:
+            result[i] = convert(value)
+        except (ValueError, TypeError):
+            result[i] = np.nan
+    return result
+
+
+def round2(values):
+    """
+    round(x, 2) de Python aplicado a un array, con el mismo resultado exacto.
+
+    np.round escala por 100 y ese producto puede cruzar un .5 por error de
+    redondeo; los pocos valores tan cerca de un empate se redondean con round().
+    """
+    scaled = values * 100
+    rounded = np.rint(scaled) / 100
+    with np.errstate(invalid="ignore"):
+        near_tie = np.abs(scaled - np.floor(scaled) - 0.5) <= 4 * np.spacing(scaled)
+    for i in np.flatnonzero(near_tie):
+        rounded[i] = round(float(values[i]), 2)
+    return rounded
+
+
+def compute_metrics_batch(series_list):
+    """
+    Calcula las métricas de muchas sesiones de una vez.
+
+    Args:
+        series_list (list): Por sesión, lista de dicts {'repeticiones', 'peso'}, su JSON o None.
+
+    Returns:
+        list[SessionMetrics]: Una por sesión, en el mismo orden (EMPTY_METRICS si
+            la sesión no tiene series válidas).
+    """
+    results = [EMPTY_METRICS] * len(series_list)
+    raw_reps, raw_pesos, raw_owner = flatten_sets(series_list)
+    if not raw_owner.size:
+        return results
+
+    reps = _to_array(raw_reps, int)
+    pesos = _to_array(raw_pesos, float)
+    valid = (reps > 0) & (pesos > 0)  # NaN -> False
+    reps, pesos = reps[valid], pesos[valid]
+    owner = raw_owner[valid]
+    if owner.size == 0:
+        return results
+
+    # Segmentos: las series de cada sesión son contiguas y owner es creciente
+    starts = np.flatnonzero(np.concatenate(([True], owner[1:] != owner[:-1])))
+    sessions = owner[starts]
+    counts = np.diff(np.append(starts, owner.size))
+
+    # bincount acumula en orden, como la suma secuencial de la versión Python
+    volumen_por_serie = reps * pesos
+    total_reps = np.bincount(owner, weights=reps)[sessions]
+    total_volumen = np.bincount(owner, weights=volumen_por_serie)[sessions]
+    max_peso = np.maximum.reduceat(pesos, starts)
+
+    # e1RM: las series de 1 rep aportan el peso tal cual; el resto se redondea a 2
+    # decimales por serie. Como el redondeo es monótono, redondear el máximo de
+    # cada sesión equivale a redondear cada serie y tomar el máximo.
+    single = reps == 1
+    with np.errstate(divide="ignore", invalid="ignore"):
+        brzycki = pesos / (BRZYCKI_A - BRZYCKI_B * reps)
+    e1rm_single = np.maximum.reduceat(np.where(single, pesos, -np.inf), starts)
+    e1rm_multi = np.maximum.reduceat(
+        np.where(~single & (reps <= BRZYCKI_MAX_REPS), brzycki, -np.inf), starts
+    )
+    max_e1rm = np.maximum(e1rm_single, round2(e1rm_multi))
+
+    metrics = map(SessionMetrics._make, zip(
+        counts.tolist(),
+        max_peso.tolist(),
+        round2(total_volumen / total_reps).tolist(),
+        total_reps.astype(np.int64).tolist(),
+        round2(total_volumen).tolist(),
+        # Como la versión Python, que parte de max_e1rm = 0
+        [value if value > 0 else 0 for value in max_e1rm.tolist()],
+    ))
+    if sessions.size == len(results):
+        return list(metrics)
+    for session, session_metrics in zip(sessions.tolist(), metrics):
+        results[session] = session_metrics
+    return results
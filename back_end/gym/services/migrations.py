@@ -0,0 +1,187 @@
+# Archivo: services/migrations.py
+"""
+Runner de migraciones versionadas del esquema 'gym'.
+
+Las migraciones viven en back_end/gym/migrations/ con nombre NNNN_descripcion.sql
+o NNNN_descripcion.py (este último debe definir 'upgrade(conn)'). Se aplican en
+orden de versión, cada una en su propia transacción, y se registran en
+gym.schema_migrations. Un advisory lock evita que dos workers migren a la vez.
+
+Una migración .py con 'TRANSACTIONAL = False' se ejecuta en autocommit (p.ej.
+CREATE INDEX CONCURRENTLY, que no admite transacción): cada sentencia se
+confirma al momento, así que debe poder re-ejecutarse si se corta a mitad.
+
+Uso:
+    run_migrations()                              # al arrancar la app
+    python -m back_end.gym.services.migrations    # manualmente
+"""
+
+import os
+import re
+import logging
+import importlib.util
+from collections import namedtuple
+
+from .db_pool import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+# Si es False la app no migra al arrancar (p.ej. se ejecuta el CLI en el despliegue),
+# pero sigue negándose a arrancar con migraciones pendientes (assert_schema_current)
+AUTO_MIGRATE = os.getenv("DB_AUTO_MIGRATE", "true").lower() in ("1", "true", "yes")
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations")
+MIGRATION_LOCK_ID = 4_815_162_342  # Clave del pg_advisory_lock de migraciones
+_FILENAME_RE = re.compile(r"^(\d{4})_([\w\-]+)\.(sql|py)$")
+
+Migration = namedtuple("Migration", ["version", "name", "path", "kind"])
+
+CREATE_MIGRATIONS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS gym.schema_migrations (
+        version INTEGER PRIMARY KEY,
+        name VARCHAR(255) NOT NULL,
+        applied_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+
+def discover_migrations(directory=MIGRATIONS_DIR):
+    """
+    Lista las migraciones disponibles en disco, ordenadas por versión.
+
+    Args:
+        directory (str): Carpeta de migraciones.
+
+    Returns:
+        list[Migration]: Migraciones encontradas.
+
+    Raises:
+        ValueError: Si dos ficheros comparten número de versión.
+    """
+    migrations = {}
+    for filename in sorted(os.listdir(directory)):
+        match = _FILENAME_RE.match(filename)
+        if not match:
+            continue
+        version = int(match.group(1))
+        if version in migrations:
+            raise ValueError(f"Versión de migración duplicada: {version} ({migrations[version].path}, {filename})")
+        migrations[version] = Migration(version, match.group(2), os.path.join(directory, filename), match.group(3))
+    return [migrations[v] for v in sorted(migrations)]
+
+
+class SchemaOutOfDateError(RuntimeError):
+    """El esquema de la BD va por detrás de las migraciones del código."""
+
+
+def applied_versions(conn):
+    """Devuelve el conjunto de versiones ya aplicadas (crea la tabla de control si falta)."""
+    with conn.cursor() as cur:
+        cur.execute(CREATE_MIGRATIONS_TABLE_SQL)
+        cur.execute("SELECT version FROM gym.schema_migrations")
+        versions = {row[0] for row in cur.fetchall()}
+    conn.commit()
+    return versions
+
+
+def pending_migrations(conn, directory=MIGRATIONS_DIR):
+    """Migraciones en disco que aún no están registradas en gym.schema_migrations."""
+    done = applied_versions(conn)
+    return [m for m in discover_migrations(directory) if m.version not in done]
+
+
+def load_migration_module(migration):
+    """Importa el fichero de una migración .py (módulo con 'upgrade(conn)')."""
+    spec = importlib.util.spec_from_file_location(f"gym_migration_{migration.version:04d}", migration.path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _apply(conn, migration):
+    if migration.kind == "sql":
+        with open(migration.path, encoding="utf-8") as f:
+            sql = f.read()
+        with conn.cursor() as cur:
+            cur.execute(sql)
+    else:
+        module = load_migration_module(migration)
+        if getattr(module, "TRANSACTIONAL", True):
+            module.upgrade(conn)
+        else:
+            conn.commit()
+            conn.autocommit = True
+            try:
+                module.upgrade(conn)
+            finally:
+                conn.autocommit = False
+    with conn.cursor() as cur:
+        cur.execute(
+            "INSERT INTO gym.schema_migrations (version, name) VALUES (%s, %s)",
+            (migration.version, migration.name)
+        )
+    conn.commit()
+
+
+def run_migrations(directory=MIGRATIONS_DIR):
+    """
+    Aplica las migraciones pendientes en orden.
+
+    Args:
+        directory (str): Carpeta de migraciones.
+
+    Returns:
+        list[int]: Versiones aplicadas en esta ejecución.
+
+    Raises:
+        Exception: El error de la migración que falló (las anteriores quedan aplicadas).
+    """
+    applied = []
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_lock(%s)", (MIGRATION_LOCK_ID,))
+        try:
+            # Se recalcula tras obtener el lock: otro worker pudo migrar mientras esperábamos
+            for migration in pending_migrations(conn, directory):
+                logger.info(f"Aplicando migración {migration.version:04d}_{migration.name} ({migration.kind})...")
+                try:
+                    _apply(conn, migration)
+                except Exception:
+                    conn.rollback()
+                    logger.error(f"❌ Falló la migración {migration.version:04d}_{migration.name}", exc_info=True)
+                    raise
+                applied.append(migration.version)
+                logger.info(f"✅ Migración {migration.version:04d}_{migration.name} aplicada.")
+        finally:
+            conn.rollback()  # Por si la transacción quedó abortada antes de liberar el lock
+            with conn.cursor() as cur:
+                cur.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_ID,))
+            conn.commit()
+    if not applied:
+        logger.info("Esquema al día: no hay migraciones pendientes.")
+    return applied
+
+
+def assert_schema_current(directory=MIGRATIONS_DIR):
+    """
+    Comprueba que no quedan migraciones pendientes.
+
+    Se llama al arrancar la app después de run_migrations: el código asume el
+    esquema de la última migración (p.ej. ya no crea tablas en caliente), así
+    que es preferible no arrancar a fallar en mitad de una petición.
+
+    Raises:
+        SchemaOutOfDateError: Si hay migraciones sin aplicar.
+    """
+    with get_db_connection() as conn:
+        pending = pending_migrations(conn, directory)
+    if pending:
+        names = ", ".join(f"{m.version:04d}_{m.name}" for m in pending)
+        raise SchemaOutOfDateError(
+            f"Esquema desactualizado, migraciones pendientes: {names}. "
+            f"Ejecuta 'python -m back_end.gym.services.migrations'."
+        )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s [%(levelname)s] - %(message)s')
+    run_migrations()
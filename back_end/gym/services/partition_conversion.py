@@ -0,0 +1,235 @@
+# Archivo: services/partition_conversion.py
+"""
+Conversión de gym.ejercicios en tabla particionada por mes (RANGE sobre 'fecha').
+
+Es la parte pesada de la migración 0002 y se ejecuta fuera del arranque de la
+app: copiar una tabla grande e indexar la copia lleva minutos, y dentro del
+lifespan (con el advisory lock de migraciones) dejaría la API sin arrancar y
+fallando los health checks. La migración solo la ejecuta en línea si la tabla
+tiene como mucho INLINE_MAX_ROWS filas; si no, lo deja para este CLI.
+
+Pasos (reanudables si el proceso se corta a mitad):
+  1. Crea gym.ejercicios_new particionada con las columnas actuales de
+     gym.ejercicios, partición DEFAULT y una partición mensual desde el mes más
+     antiguo hasta PARTITION_MONTHS_AHEAD meses vista. Un trigger en la tabla
+     vieja apunta en gym.ejercicios_migration_changes los ids
+     insertados/modificados/borrados mientras se copia.
+  2. Copia las filas por rangos de id en lotes de COPY_BATCH_SIZE, un commit por
+     lote (la tabla vieja sigue aceptando lecturas y escrituras).
+  3. Crea los índices de la migración 0001 sobre la tabla nueva (aún no la usa nadie).
+  4. En una transacción corta con la tabla vieja bloqueada solo para escritura:
+     re-sincroniza los ids apuntados y el delta final, comprueba el número de
+     filas y hace el intercambio de nombres.
+
+La clave primaria pasa a ser (id, fecha) porque en una tabla particionada debe
+incluir la clave de partición; 'fecha' pasa a ser NOT NULL (las filas antiguas
+sin fecha toman created_at).
+
+Uso:
+    python -m back_end.gym.services.partition_conversion
+"""
+
+import os
+import logging
+import datetime
+
+from .db_pool import get_db_connection
+from .partitions import (EJERCICIOS_INDEXES, PARTITION_MONTHS_AHEAD,
+                         add_months, ensure_partitions, is_partitioned,
+                         month_start)
+
+logger = logging.getLogger(__name__)
+
+COPY_BATCH_SIZE = 10000
+# Por encima de estas filas la migración 0002 no convierte la tabla en el arranque
+INLINE_MAX_ROWS = int(os.getenv('DB_PARTITION_INLINE_MAX_ROWS', 10000))
+CONVERSION_LOCK_ID = 4_815_162_343  # pg_advisory_lock de la conversión (distinto del de migraciones)
+
+COLUMNS_SQL = """
+    SELECT column_name FROM information_schema.columns
+    WHERE table_schema = 'gym' AND table_name = %s
+    ORDER BY ordinal_position
+"""
+
+# Mismas columnas y defaults que la tabla actual (incluidas las añadidas por
+# migraciones posteriores a la 0002, si la conversión se ejecuta más tarde)
+CREATE_NEW_TABLE_SQL = """
+    CREATE TABLE gym.ejercicios_new (LIKE gym.ejercicios INCLUDING DEFAULTS INCLUDING CONSTRAINTS)
+        PARTITION BY RANGE (fecha);
+    ALTER TABLE gym.ejercicios_new
+        ALTER COLUMN id SET NOT NULL,
+        ALTER COLUMN fecha SET NOT NULL,
+        ALTER COLUMN fecha SET DEFAULT CURRENT_TIMESTAMP,
+        ADD PRIMARY KEY (id, fecha),
+        ADD FOREIGN KEY (user_uuid) REFERENCES gym.users(id) ON DELETE SET NULL;
+"""
+
+CHANGE_CAPTURE_SQL = """
+    CREATE TABLE gym.ejercicios_migration_changes (id INTEGER NOT NULL);
+
+    CREATE FUNCTION gym.ejercicios_log_change() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO gym.ejercicios_migration_changes (id) VALUES (COALESCE(NEW.id, OLD.id));
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql;
+
+    CREATE TRIGGER ejercicios_migration_changes
+        AFTER INSERT OR UPDATE OR DELETE ON gym.ejercicios
+        FOR EACH ROW EXECUTE FUNCTION gym.ejercicios_log_change();
+"""
+
+COPY_BATCH_SQL = """
+    WITH copied AS (
+        INSERT INTO gym.ejercicios_new ({columns})
+        SELECT {select_columns} FROM gym.ejercicios
+        WHERE id > %s ORDER BY id LIMIT %s
+        RETURNING id
+    )
+    SELECT MAX(id), COUNT(*) FROM copied
+"""
+
+SYNC_CHANGES_SQL = """
+    INSERT INTO gym.ejercicios_new ({columns})
+    SELECT {select_columns} FROM gym.ejercicios
+    WHERE id > %s OR id IN (SELECT id FROM gym.ejercicios_migration_changes)
+"""
+
+
+class ConversionInProgressError(RuntimeError):
+    """Otro proceso está convirtiendo gym.ejercicios."""
+
+
+def _columns(cur, table):
+    cur.execute(COLUMNS_SQL, (table,))
+    return [row[0] for row in cur.fetchall()]
+
+
+def _column_lists(cur):
+    """(columnas, expresiones SELECT) de la copia; las filas sin fecha toman created_at."""
+    columns = _columns(cur, "ejercicios")
+    select = ["COALESCE(fecha, created_at, NOW())" if c == "fecha" else c for c in columns]
+    return ", ".join(columns), ", ".join(select)
+
+
+def is_small(cur, max_rows=None):
+    """True si gym.ejercicios tiene como mucho max_rows filas (sin contarlas todas)."""
+    max_rows = INLINE_MAX_ROWS if max_rows is None else max_rows
+    cur.execute("SELECT COUNT(*) FROM (SELECT 1 FROM gym.ejercicios LIMIT %s) t", (max_rows + 1,))
+    return cur.fetchone()[0] <= max_rows
+
+
+def _prepare(conn, cur):
+    """Paso 1: tabla nueva, particiones y captura de cambios."""
+    cur.execute(CREATE_NEW_TABLE_SQL)
+    cur.execute("CREATE TABLE gym.ejercicios_default PARTITION OF gym.ejercicios_new DEFAULT")
+
+    cur.execute("SELECT MIN(COALESCE(fecha, created_at)) FROM gym.ejercicios")
+    oldest = cur.fetchone()[0]
+    current = month_start(datetime.date.today())
+    first = min(month_start(oldest), current) if oldest else current
+    created = ensure_partitions(cur, first, add_months(current, PARTITION_MONTHS_AHEAD), parent="gym.ejercicios_new")
+    cur.execute(CHANGE_CAPTURE_SQL)
+    conn.commit()
+    logger.info(f"Tabla gym.ejercicios_new creada con {len(created)} particiones mensuales.")
+
+
+def _copy_batches(conn, cur, columns, select_columns):
+    """Paso 2: copia por lotes de id, reanudable desde el último id copiado."""
+    cur.execute("SELECT COALESCE(MAX(id), 0) FROM gym.ejercicios_new")
+    last_id = cur.fetchone()[0]
+    conn.commit()
+    sql = COPY_BATCH_SQL.format(columns=columns, select_columns=select_columns)
+    total = 0
+    while True:
+        cur.execute(sql, (last_id, COPY_BATCH_SIZE))
+        max_id, count = cur.fetchone()
+        conn.commit()
+        if not count:
+            break
+        last_id, total = max_id, total + count
+        logger.info(f"Copiadas {total} filas a gym.ejercicios_new (último id {last_id}).")
+    return last_id
+
+
+def _create_indexes(conn, cur):
+    """Paso 3: índices particionados (uno por partición) sobre la tabla nueva."""
+    for name, definition in EJERCICIOS_INDEXES:
+        cur.execute(f"CREATE INDEX IF NOT EXISTS {name}_part ON gym.ejercicios_new {definition}")
+    conn.commit()
+
+
+def _swap(conn, cur, last_id, columns, select_columns):
+    """Paso 4: sincronización final y cambio de nombres en una transacción corta."""
+    # EXCLUSIVE bloquea escrituras pero permite lecturas mientras dura el swap
+    cur.execute("LOCK TABLE gym.ejercicios IN EXCLUSIVE MODE")
+    if _columns(cur, "ejercicios") != _columns(cur, "ejercicios_new"):
+        # Una migración cambió gym.ejercicios a mitad de la conversión: la copia no sirve
+        raise RuntimeError("Las columnas de gym.ejercicios cambiaron durante la conversión; "
+                           "borra gym.ejercicios_new y vuelve a ejecutarla.")
+    cur.execute(
+        "DELETE FROM gym.ejercicios_new WHERE id IN (SELECT id FROM gym.ejercicios_migration_changes)"
+    )
+    cur.execute(SYNC_CHANGES_SQL.format(columns=columns, select_columns=select_columns), (last_id,))
+    cur.execute("SELECT (SELECT COUNT(*) FROM gym.ejercicios), (SELECT COUNT(*) FROM gym.ejercicios_new)")
+    old_count, new_count = cur.fetchone()
+    if old_count != new_count:
+        raise RuntimeError(f"Recuento distinto tras la copia: {old_count} en la tabla vieja, {new_count} en la nueva.")
+
+    cur.execute("SELECT pg_get_serial_sequence('gym.ejercicios', 'id')")
+    sequence = cur.fetchone()[0]
+    cur.execute(f"ALTER SEQUENCE {sequence} OWNED BY gym.ejercicios_new.id")
+    cur.execute("DROP TABLE gym.ejercicios")  # Arrastra trigger e índices viejos
+    cur.execute("DROP TABLE gym.ejercicios_migration_changes")
+    cur.execute("DROP FUNCTION gym.ejercicios_log_change()")
+    cur.execute("ALTER TABLE gym.ejercicios_new RENAME TO ejercicios")
+    cur.execute("ALTER INDEX gym.ejercicios_new_pkey RENAME TO ejercicios_pkey")
+    for name, _ in EJERCICIOS_INDEXES:
+        cur.execute(f"ALTER INDEX gym.{name}_part RENAME TO {name}")
+    cur.execute("ANALYZE gym.ejercicios")
+    conn.commit()
+    logger.info(f"gym.ejercicios particionada ({new_count} filas).")
+
+
+def convert_to_partitioned(conn):
+    """
+    Convierte gym.ejercicios en particionada (pasos 1-4); no hace nada si ya lo está.
+
+    Hace commit por pasos y por lote de copia: si se corta, volver a llamarla
+    continúa donde se quedó.
+
+    Args:
+        conn: Conexión psycopg2 sin transacción abierta.
+
+    Returns:
+        bool: True si se convirtió ahora, False si ya estaba particionada.
+
+    Raises:
+        ConversionInProgressError: Si otro proceso tiene el lock de la conversión.
+    """
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_try_advisory_lock(%s)", (CONVERSION_LOCK_ID,))
+        if not cur.fetchone()[0]:
+            raise ConversionInProgressError("Otro proceso está convirtiendo gym.ejercicios.")
+        try:
+            if is_partitioned(cur):
+                return False
+            cur.execute("SELECT to_regclass('gym.ejercicios_new')")
+            if cur.fetchone()[0] is None:
+                _prepare(conn, cur)
+            columns, select_columns = _column_lists(cur)
+            last_id = _copy_batches(conn, cur, columns, select_columns)
+            _create_indexes(conn, cur)
+            _swap(conn, cur, last_id, columns, select_columns)
+            return True
+        finally:
+            conn.rollback()
+            cur.execute("SELECT pg_advisory_unlock(%s)", (CONVERSION_LOCK_ID,))
+            conn.commit()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s [%(levelname)s] - %(message)s')
+    with get_db_connection() as connection:
+        converted = convert_to_partitioned(connection)
+    print("gym.ejercicios particionada." if converted else "gym.ejercicios ya estaba particionada.")
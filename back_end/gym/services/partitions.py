@@ -0,0 +1,133 @@
+# Archivo: services/partitions.py
+"""
+Gestión de las particiones mensuales de gym.ejercicios (RANGE sobre 'fecha').
+
+La migración 0002 (o, con tablas grandes, services/partition_conversion.py
+fuera del arranque) convierte la tabla en particionada; a partir de ahí el
+scheduler llama a ensure_future_partitions() para que siempre existan las
+particiones de los próximos meses. Las filas fuera de rango (p.ej. un import
+de hace años) caen en la partición DEFAULT; al crear la partición de ese mes
+se mueven desde DEFAULT a la nueva.
+"""
+
+import os
+import datetime
+import logging
+
+from .db_pool import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = "gym.ejercicios"
+PARTITION_PREFIX = "ejercicios_p"
+DEFAULT_PARTITION = "ejercicios_default"
+PARTITION_MONTHS_AHEAD = int(os.getenv('DB_PARTITION_MONTHS_AHEAD', 3))
+# Índices de las consultas calientes (migración 0001; services/partition_conversion.py
+# los recrea sobre la tabla particionada)
+EJERCICIOS_INDEXES = [
+    ("idx_ejercicios_user_fecha", "(user_id, fecha)"),
+    ("idx_ejercicios_user_ejercicio_fecha", "(user_id, ejercicio, fecha)"),
+    ("idx_ejercicios_ejercicio_trgm", "USING gin (ejercicio public.gin_trgm_ops)"),
+]
+
+
+def month_start(value):
+    """Primer día del mes de una fecha/datetime."""
+    return datetime.date(value.year, value.month, 1)
+
+
+def add_months(month, count):
+    """Suma 'count' meses a un primer-de-mes."""
+    index = month.year * 12 + (month.month - 1) + count
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    """Nombre de la partición mensual, p.ej. ejercicios_p2024_03."""
+    return f"{PARTITION_PREFIX}{month.year:04d}_{month.month:02d}"
+
+
+def is_partitioned(cur, table=PARENT_TABLE):
+    """True si la tabla existe y está particionada."""
+    cur.execute("SELECT c.relkind = 'p' FROM pg_class c WHERE c.oid = to_regclass(%s)", (table,))
+    row = cur.fetchone()
+    return bool(row and row[0])
+
+
+def create_month_partition(cur, month, parent=PARENT_TABLE):
+    """
+    Crea la partición del mes indicado si no existe.
+
+    Si la partición DEFAULT ya tiene filas de ese mes, se crea la tabla suelta,
+    se mueven las filas y se adjunta; si no, se crea directamente como PARTITION OF.
+
+    Args:
+        cur: Cursor psycopg2 (la transacción la gestiona el llamador).
+        month (date): Primer día del mes.
+        parent (str): Tabla particionada.
+
+    Returns:
+        bool: True si se creó, False si ya existía.
+    """
+    name = partition_name(month)
+    cur.execute("SELECT to_regclass(%s)", (f"gym.{name}",))
+    if cur.fetchone()[0]:
+        return False
+
+    start, end = month, add_months(month, 1)
+    cur.execute(f"SELECT EXISTS (SELECT 1 FROM gym.{DEFAULT_PARTITION} WHERE fecha >= %s AND fecha < %s)", (start, end))
+    if not cur.fetchone()[0]:
+        cur.execute(f"CREATE TABLE gym.{name} PARTITION OF {parent} FOR VALUES FROM (%s) TO (%s)", (start, end))
+        return True
+
+    # Hay filas del mes en DEFAULT: moverlas y adjuntar la partición
+    cur.execute(f"CREATE TABLE gym.{name} (LIKE {parent} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+    cur.execute(
+        f"""
+        WITH moved AS (
+            DELETE FROM gym.{DEFAULT_PARTITION} WHERE fecha >= %s AND fecha < %s RETURNING *
+        )
+        INSERT INTO gym.{name} SELECT * FROM moved
+        """,
+        (start, end)
+    )
+    logger.info(f"Movidas {cur.rowcount} filas de {DEFAULT_PARTITION} a {name}.")
+    cur.execute(f"ALTER TABLE {parent} ATTACH PARTITION gym.{name} FOR VALUES FROM (%s) TO (%s)", (start, end))
+    return True
+
+
+def ensure_partitions(cur, first_month, last_month, parent=PARENT_TABLE):
+    """Crea las particiones mensuales de first_month a last_month (ambos incluidos)."""
+    created = []
+    month = month_start(first_month)
+    while month <= last_month:
+        if create_month_partition(cur, month, parent):
+            created.append(partition_name(month))
+        month = add_months(month, 1)
+    return created
+
+
+def ensure_future_partitions(months_ahead=None):
+    """
+    Tarea de mantenimiento: garantiza las particiones del mes actual y los
+    'months_ahead' siguientes. No hace nada si la tabla aún no está particionada.
+
+    Returns:
+        list[str]: Particiones creadas.
+    """
+    months_ahead = PARTITION_MONTHS_AHEAD if months_ahead is None else months_ahead
+    current = month_start(datetime.date.today())
+    try:
+        with get_db_connection() as conn:
+            with conn.cursor() as cur:
+                if not is_partitioned(cur):
+                    logger.info("gym.ejercicios no está particionada todavía; no se crean particiones.")
+                    return []
+                created = ensure_partitions(cur, current, add_months(current, months_ahead))
+            conn.commit()
+        if created:
+            logger.info(f"📅 Particiones creadas: {', '.join(created)}")
+        return created
+    except Exception as e:
+        logger.error(f"❌ Error creando particiones futuras de gym.ejercicios: {e}", exc_info=True)
+        return []
@@ -0,0 +1,165 @@
+# Archivo: services/personal_records.py
+"""
+Récords personales por (usuario, ejercicio, métrica, repeticiones) en gym.personal_records.
+
+Métricas:
+  - 'weight': mayor peso levantado en una serie de al menos N repeticiones,
+    para N en REP_RANGES (una serie de 5 reps con 100 kg cuenta para 1, 3 y 5).
+    Las series salen de gym.ejercicio_sets, convertidas igual que en
+    compute_session_metrics: el récord a 1 rep coincide con el max_peso máximo.
+  - 'e1rm':   mayor e1RM de una sesión (columna max_e1rm); reps = 0.
+  - 'volume': mayor volumen de una sesión (columna volumen); reps = 0.
+
+Cada INSERT de ejercicios calcula en la misma sentencia el mejor valor de las
+sesiones recién insertadas a partir de sus series (O(series)), lo compara con
+el récord vigente y actualiza solo los que se baten; la sentencia devuelve
+los récords que el upsert llegó a escribir, con el valor anterior, para que
+/api/log-exercise los informe sin recorrer el histórico. Al borrar sesiones (reset de la rutina de
+hoy) se recalculan los ejercicios afectados desde gym.ejercicios y
+gym.ejercicio_sets.
+
+Uso:
+    python -m back_end.gym.services.personal_records    # reconstruye la tabla completa
+"""
+
+import logging
+
+from .db_pool import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+REP_RANGES = (1, 3, 5, 8, 10)
+RECORD_METRICS = ("weight", "e1rm", "volume")
+
+CREATE_PERSONAL_RECORDS_SQL = """
+    CREATE TABLE IF NOT EXISTS gym.personal_records (
+        user_id VARCHAR(255) NOT NULL,
+        ejercicio VARCHAR(255) NOT NULL,
+        metric VARCHAR(16) NOT NULL,
+        reps SMALLINT NOT NULL DEFAULT 0,
+        value DOUBLE PRECISION NOT NULL,
+        fecha TIMESTAMP WITH TIME ZONE NOT NULL,
+        ejercicio_id INTEGER,
+        updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (user_id, ejercicio, metric, reps)
+    )
+"""
+
+RECORD_COLUMNS = "user_id, ejercicio, metric, reps, value, fecha, ejercicio_id"
+
+# Mejor valor por (user_id, ejercicio, metric, reps); en empate, el primero en el tiempo.
+# {sessions}: filas con id, user_id, ejercicio, fecha, volumen, max_e1rm
+# {sets}: filas con ejercicio_id, reps, weight (gym.ejercicio_sets o el RETURNING de su INSERT)
+_BEST_SQL = f"""
+    SELECT DISTINCT ON (user_id, ejercicio, metric, reps) {RECORD_COLUMNS}
+    FROM (
+        SELECT e.user_id, e.ejercicio, 'weight' AS metric, r.reps, s.weight AS value, e.fecha, e.id AS ejercicio_id
+        FROM {{sessions}} e
+        JOIN {{sets}} s ON s.ejercicio_id = e.id
+        JOIN (VALUES {", ".join(f"({reps})" for reps in REP_RANGES)}) AS r(reps) ON s.reps >= r.reps
+        WHERE s.weight > 0
+        UNION ALL
+        SELECT user_id, ejercicio, 'e1rm', 0, max_e1rm, fecha, id FROM {{sessions}} WHERE max_e1rm > 0
+        UNION ALL
+        SELECT user_id, ejercicio, 'volume', 0, volumen, fecha, id FROM {{sessions}} WHERE volumen > 0
+    ) c
+    WHERE user_id IS NOT NULL {{where}}
+    ORDER BY user_id, ejercicio, metric, reps, value DESC, fecha, ejercicio_id
+"""
+
+# Candidatos a récord de las sesiones recién insertadas, con el valor anterior
+# ('previous', NULL si no había récord). Todas las CTE ven la tabla antes de la
+# sentencia: una escritura concurrente puede haber subido ya el récord.
+# {source}: CTE 'inserted' de INSERT_EXERCISES_TEMPLATE; {sets}: CTE con sus series
+NEW_RECORDS_SQL = f"""
+    SELECT b.*, p.value AS previous
+    FROM ({_BEST_SQL.format(sessions="{source}", sets="{sets}", where="")}) b
+    LEFT JOIN gym.personal_records p
+        ON p.user_id = b.user_id AND p.ejercicio = b.ejercicio AND p.metric = b.metric AND p.reps = b.reps
+    WHERE p.value IS NULL OR b.value > p.value
+"""
+
+# {source}: CTE con las filas de NEW_RECORDS_SQL. El WHERE protege frente a
+# escrituras concurrentes del mismo usuario: nunca se baja un récord (y su
+# RETURNING, en INSERT_EXERCISES_TEMPLATE, trae solo las filas que escribió).
+UPSERT_RECORDS_SQL = f"""
+    INSERT INTO gym.personal_records AS p ({RECORD_COLUMNS})
+    SELECT {RECORD_COLUMNS} FROM {{source}}
+    ON CONFLICT (user_id, ejercicio, metric, reps) DO UPDATE SET
+        value = EXCLUDED.value, fecha = EXCLUDED.fecha, ejercicio_id = EXCLUDED.ejercicio_id, updated_at = NOW()
+    WHERE EXCLUDED.value > p.value
+"""
+
+# Récords nuevos como array JSON para la respuesta: solo los que escribió el upsert
+# ({written}: CTE con su RETURNING), con 'previous' del candidato ({candidates}:
+# CTE con las filas de NEW_RECORDS_SQL)
+NEW_RECORDS_JSON_SQL = """COALESCE((
+        SELECT json_agg(json_build_object(
+            'ejercicio', w.ejercicio, 'metric', w.metric, 'reps', NULLIF(w.reps, 0),
+            'value', w.value, 'previous', c.previous, 'fecha', w.fecha
+        ) ORDER BY w.ejercicio, w.metric, w.reps)
+        FROM {written} w
+        JOIN {candidates} c
+            ON c.user_id = w.user_id AND c.ejercicio = w.ejercicio AND c.metric = w.metric AND c.reps = w.reps
+    ), '[]'::json)"""
+
+# Recalculo desde gym.ejercicios. Parámetros: (user_id, lista de ejercicios)
+DELETE_USER_RECORDS_SQL = "DELETE FROM gym.personal_records WHERE user_id = %s AND ejercicio = ANY(%s)"
+REBUILD_USER_RECORDS_SQL = f"""
+    INSERT INTO gym.personal_records ({RECORD_COLUMNS})
+    {_BEST_SQL.format(sessions="gym.ejercicios", sets="gym.ejercicio_sets",
+                      where="AND user_id = %s AND ejercicio = ANY(%s)")}
+"""
+REBUILD_ALL_RECORDS_SQL = f"""
+    INSERT INTO gym.personal_records ({RECORD_COLUMNS})
+    {_BEST_SQL.format(sessions="gym.ejercicios", sets="gym.ejercicio_sets", where="")}
+    ON CONFLICT (user_id, ejercicio, metric, reps) DO NOTHING
+"""
+
+# /api/records: mismos ejercicios que el filtro 'ejercicio ILIKE %s' del dashboard
+USER_RECORDS_SQL = """
+    SELECT ejercicio, metric, reps, value, fecha FROM gym.personal_records
+    WHERE user_id = %s AND ejercicio ILIKE %s
+    ORDER BY ejercicio, metric, reps
+"""
+
+
+def rows_to_records(rows):
+    """Filas de USER_RECORDS_SQL -> [{'ejercicio', 'metric', 'reps' (None salvo en 'weight'), 'value', 'fecha'}]."""
+    return [
+        {"ejercicio": ejercicio, "metric": metric, "reps": reps or None, "value": value, "fecha": fecha}
+        for ejercicio, metric, reps, value, fecha in rows
+    ]
+
+
+def rebuild_personal_records(cur, user_id, ejercicios):
+    """
+    Recalcula desde gym.ejercicios los récords de un usuario para los ejercicios dados.
+
+    La transacción la gestiona el llamador (se usa tras borrar sesiones).
+
+    Args:
+        cur: Cursor psycopg2.
+        user_id (str): ID de Google/Telegram del usuario.
+        ejercicios (list[str]): Ejercicios a recalcular.
+    """
+    if not ejercicios:
+        return
+    cur.execute(DELETE_USER_RECORDS_SQL, (user_id, list(ejercicios)))
+    cur.execute(REBUILD_USER_RECORDS_SQL, (user_id, list(ejercicios)))
+
+
+def rebuild_all_personal_records():
+    """Reconstruye gym.personal_records completa desde el histórico. Devuelve las filas escritas."""
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("TRUNCATE gym.personal_records")
+            cur.execute(REBUILD_ALL_RECORDS_SQL)
+            written = cur.rowcount
+        conn.commit()
+    return written
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s [%(levelname)s] - %(message)s')
+    print(f"Récords reconstruidos: {rebuild_all_personal_records()}")
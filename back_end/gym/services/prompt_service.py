@@ -1,10 +1,10 @@
 # En back_end/gym/services/prompt_service.py
 import json
 import re
-import logging # <-- Asegúrate de importar logging si quieres usar logger
+import logging
 from config import KNOWN_EXERCISES, llm
 
-# logger = logging.getLogger(__name__) # <-- Opcional: configurar logger
+logger = logging.getLogger(__name__)
 
 def format_for_postgres(text: str):
     """
@@ -17,9 +17,8 @@ def format_for_postgres(text: str):
     Returns:
         dict or None: JSON estructurado con la clave 'registro' o None si hay un error.
     """
-    print("\n➡️ Texto enviado al LLM para procesamiento:")
-    print(text)
-    # logger.info(f"Texto enviado al LLM: {text}") # Alternativa con logger
+    # Payloads completos solo en DEBUG (y con argumentos diferidos: no se formatean si el nivel está desactivado)
+    logger.debug("Texto enviado al LLM para procesamiento: %s", text)
 
     exercise_list = ", ".join(KNOWN_EXERCISES.keys())
     prompt = f"""estructura los registros de entrenamiento fisico en json valido para postgresql.
@@ -83,17 +82,14 @@ salida JSON:
         response = llm.invoke(prompt)
         content = response.content.strip()
 
-        print("\n📌 Respuesta completa del LLM:")
-        print(content)
-        # logger.info(f"Respuesta LLM: {content}")
+        logger.debug("Respuesta completa del LLM: %s", content)
 
         json_str = None
         # 1. Intentar extraer de ```json ... ```
         json_match_markdown = re.search(r"```json\n([\s\S]*?)\n```", content)
         if json_match_markdown:
             json_str = json_match_markdown.group(1).strip()
-            print("DEBUG: JSON extraído de bloque Markdown.")
-            # logger.debug("JSON extraído de bloque Markdown.")
+            logger.debug("JSON extraído de bloque Markdown.")
         else:
             # 2. Si no, intentar encontrar el primer '[' o '{' que parezca iniciar un JSON
             #    y el último ']' o '}' que parezca terminarlo.
@@ -112,15 +108,13 @@ salida JSON:
 
             if start_index != -1 and end_index != -1 and start_index < end_index:
                  json_str = content[start_index:end_index].strip()
-                 print("DEBUG: JSON extraído por búsqueda de delimitadores [/{ ... }/].")
-                 # logger.debug("JSON extraído por búsqueda de delimitadores.")
+                 logger.debug("JSON extraído por búsqueda de delimitadores [/{ ... }/].")
             else:
                  # 3. Como último recurso, usar todo el contenido si parece JSON simple
                  if (content.startswith('[') and content.endswith(']')) or \
                     (content.startswith('{') and content.endswith('}')):
                       json_str = content
-                      print("DEBUG: Usando contenido completo como posible JSON.")
-                      # logger.debug("Usando contenido completo como posible JSON.")
+                      logger.debug("Usando contenido completo como posible JSON.")
 
         # Si pudimos extraer una cadena JSON, intentar parsearla
         if json_str:
@@ -137,25 +131,20 @@ salida JSON:
                      result_dict = {"registro": [json_parsed]}
                 else:
                     # Tipo inesperado
-                    print("\n❌ Error: El JSON parseado no es una lista ni un diccionario esperado.")
-                    # logger.error("El JSON parseado no es una lista ni un diccionario esperado.")
+                    logger.error("El JSON parseado no es una lista ni un diccionario esperado.")
                     return None
 
-                print("\n✅ JSON extraído y parseado correctamente:")
-                print(json.dumps(result_dict, indent=4, ensure_ascii=False))
-                # logger.info("JSON parseado correctamente.")
+                logger.info(f"JSON extraído y parseado correctamente ({len(result_dict.get('registro') or [])} registros).")
+                logger.debug("JSON parseado: %s", result_dict)
                 return result_dict
             except json.JSONDecodeError as e:
-                print(f"\n❌ Error al convertir la cadena extraída en JSON: {e}")
-                print(f"Cadena JSON intentada: {json_str}")
-                # logger.error(f"Error al convertir la cadena extraída en JSON: {e}. Cadena: {json_str}")
+                logger.error(f"Error al convertir la cadena extraída en JSON: {e}")
+                logger.debug("Cadena JSON intentada: %s", json_str)
                 return None
         else:
-            print("\n❌ No se encontró una cadena JSON válida en la respuesta del LLM.")
-            # logger.error("No se encontró JSON válido en la respuesta LLM.")
+            logger.error("No se encontró una cadena JSON válida en la respuesta del LLM.")
             return None
 
     except Exception as e:
-        print(f"\n❌ Error general en format_for_postgres (llamada a API o procesamiento): {e}")
-        # logger.exception("Error general en format_for_postgres")
+        logger.exception(f"Error general en format_for_postgres (llamada a API o procesamiento): {e}")
         return None
\ No newline at end of file
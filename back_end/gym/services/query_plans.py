@@ -0,0 +1,132 @@
+# Archivo: services/query_plans.py
+"""
+Comprobación con EXPLAIN de que las consultas calientes de gym.ejercicios (y de
+sus tablas derivadas) usan índice.
+
+Cada consulta se explica con 'enable_seqscan = off' dentro de una transacción
+que se deshace al final: con tablas pequeñas el planner prefiere un seq scan
+aunque el índice sirva, y lo que se quiere verificar es que el predicado es
+sargable y puede usar el índice esperado. EXPLAIN sin ANALYZE no ejecuta la
+consulta (el DELETE tampoco borra nada).
+
+Con gym.ejercicios particionada, el plan usa los índices de cada partición; se
+traducen a su índice particionado padre (pg_partition_ancestors) para comparar.
+
+Uso:
+    python -m pytest back_end/gym/tests/test_query_plans.py   # una prueba por consulta
+    python -m back_end.gym.services.query_plans                # sale con código 1 si alguna falla
+"""
+
+import sys
+import json
+import logging
+import datetime
+from collections import namedtuple
+
+from .daily_activity import DAILY_ACTIVITY_RANGE_SQL
+from .db_pool import get_db_connection
+from .database import (CALENDAR_HEATMAP_SQL, DELETE_EXERCISES_ON_DAY_SQL,
+                       EXERCISE_LOGS_SQL, EXERCISE_NAMES_SQL,
+                       EXERCISES_DONE_ON_DAY_SQL, SESSION_STATS_SQL)
+from .personal_records import USER_RECORDS_SQL
+
+logger = logging.getLogger(__name__)
+
+HotQuery = namedtuple("HotQuery", ["name", "sql", "params", "indexes"])
+
+USER_FECHA = "idx_ejercicios_user_fecha"
+USER_EJERCICIO_FECHA = "idx_ejercicios_user_ejercicio_fecha"
+EJERCICIO_TRGM = "idx_ejercicios_ejercicio_trgm"
+DAILY_ACTIVITY_PK = "daily_activity_pkey"
+PERSONAL_RECORDS_PK = "personal_records_pkey"
+_INDEX_NODES = {"Index Scan", "Index Only Scan", "Bitmap Index Scan"}
+
+
+def hot_queries(user_id="explain-check", today=None):
+    """
+    Consultas calientes con parámetros de ejemplo y los índices aceptables para cada una.
+
+    Returns:
+        list[HotQuery]: Consultas a comprobar.
+    """
+    today = today or datetime.date.today()
+    cutoff = datetime.datetime.combine(today, datetime.time()) - datetime.timedelta(days=7)
+    year_start, next_year = datetime.date(today.year, 1, 1), datetime.date(today.year + 1, 1, 1)
+    stats_where = "user_id = %s AND ejercicio ILIKE %s AND fecha >= %s AND fecha < %s"
+    return [
+        HotQuery("get_exercise_logs", EXERCISE_LOGS_SQL, (cutoff, user_id), {USER_FECHA, USER_EJERCICIO_FECHA}),
+        HotQuery("get_today_routine", EXERCISES_DONE_ON_DAY_SQL, (user_id, today, today), {USER_FECHA, USER_EJERCICIO_FECHA}),
+        HotQuery("reset_today_routine_status", DELETE_EXERCISES_ON_DAY_SQL, (user_id, today, today), {USER_FECHA, USER_EJERCICIO_FECHA}),
+        HotQuery("get_calendar_heatmap", CALENDAR_HEATMAP_SQL, (user_id, year_start, next_year), {DAILY_ACTIVITY_PK}),
+        HotQuery("get_activity_heatmap", DAILY_ACTIVITY_RANGE_SQL, (user_id, today - datetime.timedelta(days=364), today), {DAILY_ACTIVITY_PK}),
+        HotQuery("get_personal_records", USER_RECORDS_SQL, (user_id, "%"), {PERSONAL_RECORDS_PK}),
+        HotQuery("ejercicios_disponibles", EXERCISE_NAMES_SQL, (user_id,), {USER_EJERCICIO_FECHA}),
+        HotQuery(
+            "get_ejercicios_stats",
+            SESSION_STATS_SQL.format(where_clause=stats_where),
+            (user_id, "%press%", year_start, next_year),
+            {USER_FECHA, USER_EJERCICIO_FECHA, EJERCICIO_TRGM},
+        ),
+    ]
+
+
+def _index_scans(plan):
+    """Recorre el plan JSON y devuelve los índices usados por nodos de tipo índice."""
+    found = set()
+    if plan.get("Node Type") in _INDEX_NODES and plan.get("Index Name"):
+        found.add(plan["Index Name"])
+    for child in plan.get("Plans", []):
+        found |= _index_scans(child)
+    return found
+
+
+def _parent_indexes(cur, names):
+    """Añade a 'names' los índices padre de los índices de partición usados."""
+    resolved = set(names)
+    for name in names:
+        cur.execute(
+            "SELECT relid::regclass::text FROM pg_partition_ancestors(to_regclass(%s))",
+            (f"gym.{name}",)
+        )
+        resolved |= {row[0].split(".")[-1] for row in cur.fetchall()}
+    return resolved
+
+
+def check_index_usage(queries=None):
+    """
+    Ejecuta EXPLAIN (FORMAT JSON) sobre cada consulta caliente.
+
+    Args:
+        queries (list[HotQuery], optional): Consultas a comprobar (por defecto hot_queries()).
+
+    Returns:
+        list[dict]: Por consulta: name, ok, used (índices usados) y expected.
+    """
+    results = []
+    with get_db_connection() as conn:
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SET LOCAL enable_seqscan = off")
+                for query in queries or hot_queries():
+                    cur.execute("EXPLAIN (FORMAT JSON) " + query.sql, query.params)
+                    raw = cur.fetchone()[0]
+                    plan = (json.loads(raw) if isinstance(raw, str) else raw)[0]["Plan"]
+                    used = _parent_indexes(cur, _index_scans(plan))
+                    results.append({
+                        "name": query.name,
+                        "ok": bool(used & query.indexes),
+                        "used": sorted(used),
+                        "expected": sorted(query.indexes),
+                    })
+        finally:
+            conn.rollback()
+    return results
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s [%(levelname)s] - %(message)s')
+    report = check_index_usage()
+    for item in report:
+        status = "OK  " if item["ok"] else "FAIL"
+        print(f"{status} {item['name']}: usa {item['used'] or 'ningún índice'} (esperado uno de {item['expected']})")
+    sys.exit(0 if all(item["ok"] for item in report) else 1)
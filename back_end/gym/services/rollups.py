@@ -0,0 +1,176 @@
+# Archivo: services/rollups.py
+"""
+Resumen por (usuario, ejercicio) mantenido de forma incremental en gym.exercise_rollups.
+
+Cada INSERT de ejercicios actualiza el rollup en la misma sentencia (máximos,
+número de sesiones y valores de la primera y la última sesión); al borrar
+sesiones (reset de la rutina de hoy) se recalculan los ejercicios afectados
+a partir de las métricas por sesión de gym.ejercicios. Así el bloque 'resumen'
+de /api/ejercicios_stats es una lectura de una fila por ejercicio.
+
+Solo cuentan las sesiones con series válidas (series_validas > 0), igual que
+el resumen calculado sobre el histórico.
+
+Uso:
+    python -m back_end.gym.services.rollups [user_id] [--repair]   # comprobador de consistencia
+"""
+
+import sys
+import logging
+
+from .db_pool import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+# Tabla creada por la migración 0005
+ROLLUP_COLUMNS = (
+    "total_sesiones", "max_weight_ever", "max_volume_session", "max_reps_session",
+    "max_e1rm_ever", "first_fecha", "first_max_peso", "last_fecha", "last_max_peso",
+)
+
+# Agregado de un conjunto de sesiones por (user_id, ejercicio).
+# {source}: tabla o CTE con las columnas de gym.ejercicios (incluidas las métricas)
+_AGGREGATE_SQL = """
+    SELECT user_id, ejercicio, COUNT(*), MAX(max_peso), MAX(volumen), MAX(total_reps), MAX(max_e1rm),
+           MIN(fecha), (ARRAY_AGG(max_peso ORDER BY fecha, id))[1],
+           MAX(fecha), (ARRAY_AGG(max_peso ORDER BY fecha DESC, id DESC))[1]
+    FROM {source}
+    WHERE series_validas > 0 {where}
+    GROUP BY user_id, ejercicio
+"""
+
+# Fusión incremental con las sesiones recién insertadas (una fila por par gracias al GROUP BY)
+UPSERT_ROLLUPS_SQL = f"""
+    INSERT INTO gym.exercise_rollups AS r (user_id, ejercicio, {", ".join(ROLLUP_COLUMNS)})
+    {_AGGREGATE_SQL.format(source="{source}", where="")}
+    ON CONFLICT (user_id, ejercicio) DO UPDATE SET
+        total_sesiones = r.total_sesiones + EXCLUDED.total_sesiones,
+        max_weight_ever = GREATEST(r.max_weight_ever, EXCLUDED.max_weight_ever),
+        max_volume_session = GREATEST(r.max_volume_session, EXCLUDED.max_volume_session),
+        max_reps_session = GREATEST(r.max_reps_session, EXCLUDED.max_reps_session),
+        max_e1rm_ever = GREATEST(r.max_e1rm_ever, EXCLUDED.max_e1rm_ever),
+        first_fecha = LEAST(r.first_fecha, EXCLUDED.first_fecha),
+        first_max_peso = CASE WHEN r.first_fecha IS NULL OR EXCLUDED.first_fecha < r.first_fecha
+                              THEN EXCLUDED.first_max_peso ELSE r.first_max_peso END,
+        last_fecha = GREATEST(r.last_fecha, EXCLUDED.last_fecha),
+        last_max_peso = CASE WHEN r.last_fecha IS NULL OR EXCLUDED.last_fecha >= r.last_fecha
+                             THEN EXCLUDED.last_max_peso ELSE r.last_max_peso END,
+        updated_at = NOW()
+"""
+
+# Recalculo desde gym.ejercicios. Parámetros: (user_id, lista de ejercicios)
+DELETE_USER_ROLLUPS_SQL = "DELETE FROM gym.exercise_rollups WHERE user_id = %s AND ejercicio = ANY(%s)"
+REBUILD_USER_ROLLUPS_SQL = f"""
+    INSERT INTO gym.exercise_rollups (user_id, ejercicio, {", ".join(ROLLUP_COLUMNS)})
+    {_AGGREGATE_SQL.format(source="gym.ejercicios", where="AND user_id = %s AND ejercicio = ANY(%s)")}
+"""
+REBUILD_ALL_ROLLUPS_SQL = f"""
+    INSERT INTO gym.exercise_rollups (user_id, ejercicio, {", ".join(ROLLUP_COLUMNS)})
+    {_AGGREGATE_SQL.format(source="gym.ejercicios", where="")}
+    ON CONFLICT (user_id, ejercicio) DO NOTHING
+"""
+
+# Resumen del dashboard: mismos ejercicios que el filtro 'ejercicio ILIKE %s'
+ROLLUPS_FOR_FILTER_SQL = f"""
+    SELECT {", ".join(ROLLUP_COLUMNS)} FROM gym.exercise_rollups
+    WHERE user_id = %s AND ejercicio ILIKE %s
+"""
+
+_CHECK_SQL = f"""
+    SELECT COALESCE(r.ejercicio, x.ejercicio)
+    FROM (SELECT * FROM gym.exercise_rollups WHERE user_id = %s) r
+    FULL JOIN ({_AGGREGATE_SQL.format(source="gym.ejercicios", where="AND user_id = %s")})
+        AS x(user_id, ejercicio, {", ".join(ROLLUP_COLUMNS)})
+        ON r.ejercicio = x.ejercicio
+    WHERE ({", ".join("r." + c for c in ROLLUP_COLUMNS)})
+          IS DISTINCT FROM ({", ".join("x." + c for c in ROLLUP_COLUMNS)})
+"""
+
+
+def summary_from_rollups(rows):
+    """
+    Combina los rollups de los ejercicios que casan con el filtro en el 'resumen' del dashboard.
+
+    Args:
+        rows (list): Filas de ROLLUPS_FOR_FILTER_SQL.
+
+    Returns:
+        dict: Mismas claves que el resumen calculado sobre el histórico.
+    """
+    if not rows:
+        return {"total_sesiones": 0, "max_e1rm_ever": 0, "progress_percent": 0}
+    rollups = [dict(zip(ROLLUP_COLUMNS, row)) for row in rows]
+    total_sesiones = sum(r["total_sesiones"] for r in rollups)
+    first = min(rollups, key=lambda r: r["first_fecha"])
+    last = max(rollups, key=lambda r: r["last_fecha"])
+    progress_percent = 0
+    if total_sesiones >= 2 and first["first_max_peso"] and first["first_max_peso"] > 0:
+        progress_percent = (last["last_max_peso"] - first["first_max_peso"]) / first["first_max_peso"] * 100
+    return {
+        "total_sesiones": total_sesiones,
+        "max_weight_ever": max(r["max_weight_ever"] for r in rollups),
+        "max_volume_session": max(r["max_volume_session"] for r in rollups),
+        "max_reps_session": max(r["max_reps_session"] for r in rollups),
+        "max_e1rm_ever": max(r["max_e1rm_ever"] for r in rollups),
+        "progress_percent": round(progress_percent, 2),
+    }
+
+
+def rebuild_rollups(cur, user_id, ejercicios):
+    """
+    Recalcula desde gym.ejercicios los rollups de un usuario para los ejercicios dados.
+
+    La transacción la gestiona el llamador (se usa tras borrar sesiones).
+
+    Args:
+        cur: Cursor psycopg2.
+        user_id (str): ID de Google/Telegram del usuario.
+        ejercicios (list[str]): Ejercicios a recalcular.
+    """
+    if not ejercicios:
+        return
+    cur.execute(DELETE_USER_ROLLUPS_SQL, (user_id, list(ejercicios)))
+    cur.execute(REBUILD_USER_ROLLUPS_SQL, (user_id, list(ejercicios)))
+
+
+def check_rollups(user_id, repair=False):
+    """
+    Comprueba los rollups de un usuario contra el histórico y, opcionalmente, los repara.
+
+    Args:
+        user_id (str): ID de Google/Telegram del usuario.
+        repair (bool): Si es True reconstruye los ejercicios que no cuadran.
+
+    Returns:
+        list[str]: Ejercicios cuyo rollup no coincidía con el histórico.
+    """
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(_CHECK_SQL, (user_id, user_id))
+            mismatched = [row[0] for row in cur.fetchall()]
+            if mismatched and repair:
+                rebuild_rollups(cur, user_id, mismatched)
+                logger.info(f"Rollups reconstruidos para {user_id}: {', '.join(mismatched)}")
+        conn.commit()
+    return mismatched
+
+
+def _all_user_ids():
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT DISTINCT user_id FROM gym.ejercicios WHERE user_id IS NOT NULL "
+                        "UNION SELECT DISTINCT user_id FROM gym.exercise_rollups")
+            return [row[0] for row in cur.fetchall()]
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s [%(levelname)s] - %(message)s')
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    repair = "--repair" in sys.argv[1:]
+    failed = False
+    for uid in args or _all_user_ids():
+        bad = check_rollups(uid, repair=repair)
+        if bad:
+            failed = True
+            print(f"{'REPARADO' if repair else 'DESCUADRE'} {uid}: {', '.join(bad)}")
+    sys.exit(1 if failed and not repair else 0)
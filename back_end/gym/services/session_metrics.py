@@ -0,0 +1,201 @@
+# Archivo: services/session_metrics.py
+"""
+Métricas por sesión (una fila de gym.ejercicios) calculadas al escribir.
+
+max_peso, avg_peso, total_reps, volumen y max_e1rm se guardan como columnas de
+gym.ejercicios junto al JSONB de series, de modo que el dashboard solo lee
+números ya calculados. Solo cuentan las series con repeticiones > 0 y peso > 0.
+
+Uso:
+    python -m back_end.gym.services.session_metrics          # backfill de filas sin métricas
+    python -m back_end.gym.services.session_metrics --all    # recalcula todas las filas
+"""
+
+import sys
+import json
+import logging
+from collections import namedtuple
+
+from psycopg2.extras import execute_values
+
+from .db_pool import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+BACKFILL_BATCH_SIZE = 5000
+
+SessionMetrics = namedtuple(
+    "SessionMetrics", ["series_validas", "max_peso", "avg_peso", "total_reps", "volumen", "max_e1rm"]
+)
+SESSION_METRIC_COLUMNS = SessionMetrics._fields
+EMPTY_METRICS = SessionMetrics(0, None, None, None, None, None)
+
+# Columnas añadidas por la migración 0004
+# Paso de actualización de métricas (backfill o cualquier cambio de 'repeticiones')
+UPDATE_SESSION_METRICS_SQL = """
+    UPDATE gym.ejercicios e SET
+        series_validas = v.series_validas, max_peso = v.max_peso, avg_peso = v.avg_peso,
+        total_reps = v.total_reps, volumen = v.volumen, max_e1rm = v.max_e1rm
+    FROM (VALUES %s) AS v(id, fecha, series_validas, max_peso, avg_peso, total_reps, volumen, max_e1rm)
+    WHERE e.id = v.id AND e.fecha = v.fecha
+"""
+UPDATE_SESSION_METRICS_TEMPLATE = (
+    "(%s, %s::timestamptz, %s::smallint, %s::double precision, %s::double precision, "
+    "%s::integer, %s::double precision, %s::double precision)"
+)
+# Conversión en SQL de una serie JSONB 's.serie' igual que int(repeticiones) y
+# float(peso) en compute_session_metrics: números JSON (reps truncadas), strings
+# numéricos ('8', ' 60.5 '; no '8.5' en reps) y booleanos; el resto queda a NULL.
+# Es la única definición: la usan SESSION_AGGREGATE_SQL (STATS_ENGINE=sql) y
+# gym.ejercicio_sets, y de esta última salen los récords de peso.
+SET_REPS_SQL = r"""CASE jsonb_typeof(s.serie->'repeticiones')
+                WHEN 'number' THEN trunc((s.serie->>'repeticiones')::numeric)::double precision
+                WHEN 'string' THEN CASE WHEN s.serie->>'repeticiones' ~ '^\s*[-+]?\d+\s*$'
+                                        THEN (s.serie->>'repeticiones')::numeric::double precision END
+                WHEN 'boolean' THEN (s.serie->>'repeticiones')::boolean::integer::double precision END"""
+SET_WEIGHT_SQL = r"""CASE jsonb_typeof(s.serie->'peso')
+                WHEN 'number' THEN (s.serie->>'peso')::double precision
+                WHEN 'string' THEN CASE WHEN s.serie->>'peso' ~ '^\s*[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?\s*$'
+                                        THEN (s.serie->>'peso')::double precision END
+                WHEN 'boolean' THEN (s.serie->>'peso')::boolean::integer::double precision END"""
+BACKFILL_SELECT_SQL = """
+    SELECT id, fecha, repeticiones FROM gym.ejercicios
+    WHERE id > %s {missing_only}
+    ORDER BY id LIMIT %s
+"""
+
+
+def calculate_e1rm_brzycki(weight: float, reps: int) -> float | None:
+    """Calcula el 1RM estimado usando la fórmula de Brzycki."""
+    if reps <= 0 or weight <= 0: return 0
+    if reps == 1: return weight
+    if reps > 15: return None # Límite opcional
+
+    denominator = 1.0278 - (0.0278 * reps)
+    if denominator <= 0: return None
+
+    e1rm = weight / denominator
+    return round(e1rm, 2)
+
+
+def compute_session_metrics(series) -> SessionMetrics:
+    """
+    Calcula las métricas de una sesión a partir de sus series.
+
+    Args:
+        series (list | str | None): Lista de dicts {'repeticiones', 'peso'} o su JSON.
+
+    Returns:
+        SessionMetrics: series_validas = 0 y el resto None si no hay series válidas.
+    """
+    if isinstance(series, str):
+        try:
+            series = json.loads(series)
+        except json.JSONDecodeError:
+            return EMPTY_METRICS
+    if not isinstance(series, list):
+        return EMPTY_METRICS
+
+    max_peso = 0
+    total_volumen = 0
+    total_reps = 0
+    max_e1rm = 0
+    valid_series_count = 0
+    for serie in series:
+        if isinstance(serie, dict) and 'repeticiones' in serie and 'peso' in serie:
+            try:
+                reps = int(serie.get('repeticiones', 0))
+                peso = float(serie.get('peso', 0))
+            except (ValueError, TypeError):
+                continue
+            if reps > 0 and peso > 0:
+                total_reps += reps
+                total_volumen += reps * peso
+                max_peso = max(max_peso, peso)
+                valid_series_count += 1
+                e1rm_serie = calculate_e1rm_brzycki(peso, reps)
+                if e1rm_serie is not None: max_e1rm = max(max_e1rm, e1rm_serie)
+    if valid_series_count == 0:
+        return EMPTY_METRICS
+    return SessionMetrics(
+        series_validas=valid_series_count,
+        max_peso=max_peso,
+        avg_peso=round(total_volumen / total_reps, 2),
+        total_reps=total_reps,
+        volumen=round(total_volumen, 2),
+        max_e1rm=max_e1rm,
+    )
+
+
+def metrics_from_aggregates(series_validas, max_peso, total_reps, volumen, e1rm_single, e1rm_multi) -> SessionMetrics:
+    """
+    Completa las métricas de una sesión a partir de sus agregados sin redondear
+    (SESSION_AGGREGATE_SQL, STATS_ENGINE=sql), con el mismo redondeo que
+    compute_session_metrics.
+
+    Args:
+        series_validas (int): Series con reps > 0 y peso > 0.
+        max_peso (float): Peso máximo.
+        total_reps (float): Suma de repeticiones.
+        volumen (float): Suma de reps * peso.
+        e1rm_single (float | None): Peso máximo de las series de 1 repetición.
+        e1rm_multi (float | None): e1RM de Brzycki máximo (sin redondear) de las series de 2 a 15 reps.
+
+    Returns:
+        SessionMetrics: EMPTY_METRICS si no hay series válidas.
+    """
+    if not series_validas:
+        return EMPTY_METRICS
+    # round() es monótono: redondear el máximo equivale al máximo de las series redondeadas
+    max_e1rm = max(e1rm_single if e1rm_single is not None else 0,
+                   round(e1rm_multi, 2) if e1rm_multi is not None else 0)
+    return SessionMetrics(
+        series_validas=int(series_validas),
+        max_peso=float(max_peso),
+        avg_peso=round(volumen / total_reps, 2),
+        total_reps=int(total_reps),
+        volumen=round(volumen, 2),
+        max_e1rm=max_e1rm,
+    )
+
+
+def backfill_session_metrics(conn, batch_size=BACKFILL_BATCH_SIZE, recompute=False):
+    """
+    Calcula y guarda las métricas de las filas existentes, por lotes de id.
+
+    Cada lote se calcula de una vez con el motor vectorizado (metrics_engine).
+
+    Args:
+        conn: Conexión psycopg2.
+        batch_size (int): Filas por lote (un commit por lote).
+        recompute (bool): Si es True recalcula todas las filas; si no, solo las
+            que aún no tienen métricas (series_validas IS NULL).
+
+    Returns:
+        int: Filas actualizadas.
+    """
+    from .metrics_engine import compute_metrics_batch  # Importación diferida: metrics_engine importa este módulo
+
+    select_sql = BACKFILL_SELECT_SQL.format(missing_only="" if recompute else "AND series_validas IS NULL")
+    last_id, total = 0, 0
+    with conn.cursor() as cur:
+        while True:
+            cur.execute(select_sql, (last_id, batch_size))
+            rows = cur.fetchall()
+            if not rows:
+                break
+            metrics = compute_metrics_batch([series for _, _, series in rows])
+            values = [(row_id, fecha) + tuple(m) for (row_id, fecha, _), m in zip(rows, metrics)]
+            execute_values(cur, UPDATE_SESSION_METRICS_SQL, values,
+                           template=UPDATE_SESSION_METRICS_TEMPLATE, page_size=len(values))
+            conn.commit()
+            last_id, total = rows[-1][0], total + len(rows)
+            logger.info(f"Backfill de métricas por sesión: {total} filas (último id {last_id}).")
+    return total
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s [%(levelname)s] - %(message)s')
+    with get_db_connection() as connection:
+        updated = backfill_session_metrics(connection, recompute="--all" in sys.argv[1:])
+    print(f"Filas actualizadas: {updated}")
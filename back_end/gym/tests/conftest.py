@@ -0,0 +1,83 @@
+# conftest.py
+"""
+Fixtures compartidas: cliente HTTP autenticado sin BD ni JWT reales, y las de
+las pruebas que necesitan Postgres (DB_CONFIG con el esquema migrado; sin él
+se omiten).
+"""
+import uuid
+
+import psycopg2
+import pytest
+from fastapi.testclient import TestClient
+
+from back_end.gym import middlewares
+from back_end.gym.config import DB_CONFIG
+from back_end.gym.services.db_pool import get_db_connection
+from back_end.gym.services.migrations import pending_migrations
+
+# Tablas con filas por user_id (ID de Google/Telegram) que escriben los INSERT de ejercicios
+USER_TABLES = ("ejercicios", "exercise_rollups", "daily_activity", "personal_records", "user_data_version")
+
+
+TEST_USER = {"id": 1, "google_id": "g1", "display_name": "Test", "email": "test@example.com"}
+
+
+@pytest.fixture
+def api_client(monkeypatch):
+    """
+    TestClient de la app con TEST_USER autenticado ('Authorization: Bearer x').
+
+    No ejecuta el lifespan (migraciones y pools): las rutas que consultan la BD
+    necesitan que la prueba sustituya sus lecturas.
+    """
+    from back_end.gym.app_fastapi import app
+
+    monkeypatch.setattr(middlewares, "verify_token", lambda token: {"sub": str(TEST_USER["id"])})
+    app.dependency_overrides[middlewares.get_current_user] = lambda: dict(TEST_USER)
+    try:
+        yield TestClient(app, headers={"Authorization": "Bearer x"})
+    finally:
+        app.dependency_overrides.pop(middlewares.get_current_user, None)
+
+
+@pytest.fixture(scope="session")
+def migrated_db():
+    try:
+        psycopg2.connect(**DB_CONFIG, connect_timeout=3).close()
+    except Exception as e:
+        pytest.skip(f"Postgres no disponible: {e}")
+    with get_db_connection() as conn:
+        pending = pending_migrations(conn)
+    if pending:
+        pytest.skip(f"Esquema sin migrar ({len(pending)} migraciones pendientes)")
+
+
+def delete_user_rows(*user_ids):
+    """Borra las filas de los usuarios de prueba en gym.ejercicios y sus tablas derivadas."""
+    ids = list(user_ids)
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM gym.ejercicio_sets WHERE ejercicio_id IN "
+                        "(SELECT id FROM gym.ejercicios WHERE user_id = ANY(%s))", (ids,))
+            for table in USER_TABLES:
+                cur.execute(f"DELETE FROM gym.{table} WHERE user_id = ANY(%s)", (ids,))
+        conn.commit()
+
+
+@pytest.fixture
+def make_db_user_id(migrated_db):
+    """Crea user_id de prueba únicos (o registra el dado); sus filas se borran al terminar."""
+    created = []
+
+    def make(user_id=None):
+        created.append(user_id or f"test-{uuid.uuid4().hex[:12]}")
+        return created[-1]
+
+    yield make
+    delete_user_rows(*created)
+
+
+@pytest.fixture
+def db_user_id(make_db_user_id):
+    """user_id de prueba único; sus filas se borran al terminar."""
+    return make_db_user_id()
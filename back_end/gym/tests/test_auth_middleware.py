@@ -0,0 +1,73 @@
+# test_auth_middleware.py
+"""
+AuthenticationMiddleware ASGI (user-014): rutas públicas con una sola regex
+(mismo resultado que el startswith de antes), redirección a /login y paso
+directo de las respuestas a la app.
+"""
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from back_end.gym import middlewares
+from back_end.gym.middlewares import PUBLIC_PATHS, AuthenticationMiddleware, is_public_path
+
+
+@pytest.mark.parametrize("path", [
+    "/login", "/login?x=1", "/docs", "/docs/oauth2-redirect", "/openapi.json", "/static/js/app.js",
+    "/api/logs", "/api/logs/export", "/api/rutina_hoy", "/api/rutinaXYZ",
+    "/", "/api", "/api/ejercicios_stats", "/api/dashboard/bundle", "/static", "/LOGIN", "/x/login",
+    "/api/auth/google/verifyX", "/favicon.ico.map", "/api.logs",
+])
+def test_same_result_as_startswith(path):
+    assert is_public_path(path) == any(path.startswith(p) for p in PUBLIC_PATHS)
+
+
+def test_dots_are_literal():
+    # '.' de "/openapi.json" o "/favicon.ico" no es comodín
+    assert not is_public_path("/openapiXjson") and not is_public_path("/faviconXico")
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(middlewares, "verify_token", lambda token: {"sub": "7"} if token == "ok" else None)
+    app = FastAPI()
+    app.add_middleware(AuthenticationMiddleware)
+
+    @app.get("/api/privado")
+    async def privado(request: Request):
+        return {"user_id": request.state.user_id}
+
+    @app.get("/api/logs")
+    async def logs(request: Request):
+        return {"user_id": getattr(request.state, "user_id", None)}
+
+    @app.get("/api/stream")
+    async def stream():
+        async def chunks():
+            for i in range(3):
+                yield f"{i}\n"
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    return TestClient(app)
+
+
+def test_authenticated_request_reaches_the_route(client):
+    assert client.get("/api/privado", headers={"Authorization": "Bearer ok"}).json() == {"user_id": "7"}
+
+
+@pytest.mark.parametrize("headers", [{}, {"Authorization": "Bearer malo"}, {"Authorization": "Basic ok"}])
+def test_missing_or_invalid_token_redirects_to_login(client, headers):
+    response = client.get("/api/privado", headers=headers, follow_redirects=False)
+    assert response.status_code == 307
+    assert response.headers["location"] == "/login?redirect_url=/api/privado"
+
+
+def test_public_path_skips_the_token_check(client, monkeypatch):
+    monkeypatch.setattr(middlewares, "verify_token", lambda token: pytest.fail("No debe verificar el token"))
+    assert client.get("/api/logs", headers={"Authorization": "Bearer ok"}).json() == {"user_id": None}
+
+
+def test_streaming_response_passes_through(client):
+    with client.stream("GET", "/api/stream", headers={"Authorization": "Bearer ok"}) as response:
+        assert list(response.iter_lines()) == ["0", "1", "2"]
@@ -0,0 +1,80 @@
+# test_compression.py
+"""
+Compresión de respuestas (utils/compression.py): el NDJSON en streaming no pasa
+por el compresor, tanto con gzip como con brotli.
+"""
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from back_end.gym.utils import compression
+from back_end.gym.utils.streaming import NDJSON_MEDIA_TYPE
+
+BIG = {"items": ["x" * 100] * 50}
+
+
+async def logs(request):
+    if request.query_params.get("stream") == "ndjson":
+        async def lines():
+            for i in range(50):
+                yield f'{{"i": {i}, "pad": "{"x" * 100}"}}\n'
+        return StreamingResponse(lines(), media_type=NDJSON_MEDIA_TYPE)
+    return JSONResponse(BIG)
+
+
+class FakeBrotliMiddleware:
+    """Como BrotliMiddleware (no excluye tipos de contenido); marca la respuesta en lugar de comprimirla."""
+
+    def __init__(self, app, **options):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        async def mark(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message["headers"]) + [(b"x-fake-brotli", b"1")]
+            await send(message)
+        await self.app(scope, receive, mark)
+
+
+def compressed(response):
+    return "content-encoding" in response.headers or "x-fake-brotli" in response.headers
+
+
+def make_client(brotli):
+    app = Starlette(routes=[Route("/api/logs", logs)])
+    encoding = compression.add_compression_middleware(app, minimum_size=500)
+    assert encoding == ("br" if brotli else "gzip")
+    return TestClient(app)
+
+
+@pytest.fixture(params=[False, True], ids=["gzip", "brotli"])
+def client(request, monkeypatch):
+    if request.param:
+        monkeypatch.setattr(compression, "BROTLI_AVAILABLE", True)
+        monkeypatch.setattr(compression, "BrotliMiddleware", FakeBrotliMiddleware)
+    return make_client(request.param)
+
+
+def test_regular_responses_are_compressed(client):
+    response = client.get("/api/logs", headers={"Accept-Encoding": "br, gzip"})
+    assert compressed(response)
+    assert response.json() == BIG
+
+
+def test_ndjson_stream_bypasses_the_compressor(client):
+    response = client.get("/api/logs?stream=ndjson", headers={"Accept-Encoding": "br, gzip"})
+    assert not compressed(response)
+    assert response.headers["content-type"] == NDJSON_MEDIA_TYPE
+    assert len(response.text.splitlines()) == 50
+
+
+@pytest.mark.parametrize("query, expected", [
+    (b"stream=ndjson", True),
+    (b"days=7&stream=ndjson", True),
+    (b"stream=json", False),
+    (b"", False),
+])
+def test_is_ndjson_stream_request(query, expected):
+    assert compression.is_ndjson_stream_request({"query_string": query}) is expected
@@ -0,0 +1,99 @@
+# test_daily_activity.py
+"""
+gym.daily_activity (services/daily_activity.py): codificación compacta del
+heatmap y UPSERT de los INSERT con escrituras concurrentes del mismo día.
+
+La prueba de concurrencia necesita un Postgres accesible con DB_CONFIG y el
+esquema migrado; si no, se omite.
+"""
+import base64
+import datetime
+import threading
+
+import numpy as np
+import psycopg2
+import pytest
+
+from back_end.gym.config import DB_CONFIG
+from back_end.gym.services.daily_activity import (DAILY_ACTIVITY_RANGE_SQL,
+                                                  REBUILD_ALL_DAILY_ACTIVITY_SQL,
+                                                  encode_compact,
+                                                  rows_to_heatmap)
+from back_end.gym.services.database import _insert_rows, build_exercise_rows
+from back_end.gym.services.db_pool import get_db_connection
+
+D = datetime.date
+ROWS = [  # (day, distinct_exercises, sets, volume, minutes)
+    (D(2024, 1, 1), 2, 6, 1500.0, 0),
+    (D(2024, 1, 3), 1, 0, 0.0, 30),
+    (D(2024, 1, 10), 3, 9, 2000.0, 15),
+]
+
+
+def unpack(encoded):
+    bits = np.unpackbits(np.frombuffer(base64.b64decode(encoded["bitmap"]), dtype=np.uint8), bitorder="little")
+    return bits[:encoded["days"]]
+
+
+class TestEncodeCompact:
+    def test_bitmap_and_counts(self):
+        encoded = encode_compact(ROWS, D(2024, 1, 1), D(2024, 1, 10))
+        assert encoded["days"] == 10
+        assert np.flatnonzero(unpack(encoded)).tolist() == [0, 2, 9]
+        assert encoded["counts"] == [2, 1, 3]
+
+    def test_metric_selects_the_column(self):
+        assert encode_compact(ROWS, D(2024, 1, 1), D(2024, 1, 10), metric="minutes")["counts"] == [0, 30, 15]
+
+    def test_empty_range(self):
+        encoded = encode_compact([], D(2024, 1, 1), D(2024, 12, 31))
+        assert encoded["days"] == 366 and encoded["counts"] == []
+        assert len(base64.b64decode(encoded["bitmap"])) == 46 and not unpack(encoded).any()
+
+    def test_same_days_as_json(self):
+        encoded = encode_compact(ROWS, D(2023, 12, 30), D(2024, 1, 10))
+        days = [D(2023, 12, 30) + datetime.timedelta(days=int(i)) for i in np.flatnonzero(unpack(encoded))]
+        assert days == [entry["date"] for entry in rows_to_heatmap(ROWS)]
+
+
+def test_rebuild_all_locks_out_concurrent_inserts():
+    assert REBUILD_ALL_DAILY_ACTIVITY_SQL.strip().startswith("LOCK TABLE gym.daily_activity IN SHARE ROW EXCLUSIVE MODE")
+
+
+def session(hour, ejercicio, reps, peso):
+    return {"fecha": f"2024-05-01T{hour:02d}:00:00",
+            "registro": [{"ejercicio": ejercicio, "series": [{"repeticiones": reps, "peso": peso}]}]}
+
+
+def test_concurrent_inserts_on_the_same_day_add_up(db_user_id):
+    user_id = db_user_id
+    first = psycopg2.connect(**DB_CONFIG)
+    second = psycopg2.connect(**DB_CONFIG)
+    try:
+        with first.cursor() as cur:
+            _insert_rows(cur, build_exercise_rows(session(10, "press banca", 5, 100), user_id))  # Sin commit
+
+        def insert_second():
+            with second.cursor() as cur:
+                _insert_rows(cur, build_exercise_rows(session(12, "dominadas", 8, 20), user_id))
+            second.commit()
+
+        worker = threading.Thread(target=insert_second)
+        worker.start()
+        worker.join(0.5)
+        assert worker.is_alive(), "El segundo INSERT debe esperar a la fila del día del primero"
+        first.commit()
+        worker.join(10)
+        assert not worker.is_alive()
+    finally:
+        first.close()
+        second.close()
+
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(DAILY_ACTIVITY_RANGE_SQL, (user_id, D(2024, 4, 30), D(2024, 5, 2)))
+            rows = cur.fetchall()
+            cur.execute("SELECT exercises FROM gym.daily_activity WHERE user_id = %s", (user_id,))
+            exercises = [row[0] for row in cur.fetchall()]
+    assert [row[1:] for row in rows] == [(2, 2, 660.0, 0)]
+    assert exercises == [["dominadas", "press banca"]]
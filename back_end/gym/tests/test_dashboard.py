@@ -0,0 +1,133 @@
+# test_dashboard.py
+"""
+Rutas de routes/dashboard.py con las lecturas de la BD sustituidas (sin Postgres).
+"""
+import asyncio
+import datetime
+
+import pytest
+
+from back_end.gym.routes import dashboard as d
+
+
+def test_stats_sections_without_exercise_or_groups_skips_the_session_query(monkeypatch):
+    async def no_query(*args, **kwargs):
+        raise AssertionError("No debe consultar la BD")
+
+    monkeypatch.setattr(d, "_session_rows", no_query)
+    monkeypatch.setattr(d, "async_fetch_all", no_query)
+    where_clause, params = d._stats_filters("g1", None, None, None)
+    sections = asyncio.run(d._stats_sections("g1", None, None, None, where_clause, params))
+    assert sections == {"filtro_ejercicio": None, "datos": [], "resumen": {}}
+
+
+SESSIONS = [(datetime.datetime(2024, 5, day, 10, tzinfo=datetime.timezone.utc), "press banca", 3,
+             80.0 + day, 75.0, 15, 1200.0, 95.0 + day) for day in (1, 3, 6)]
+HEATMAP = [(datetime.date(2024, 5, day), 2) for day in (1, 3, 6)]
+
+
+@pytest.fixture
+def bundle_reads(monkeypatch):
+    """
+    Sustituye las lecturas del bundle. Cada sección espera a que empiecen las
+    demás pedidas: si se consultaran una detrás de otra, la primera no acabaría.
+    """
+    started, expected = [], set()
+    all_started = asyncio.Event()
+
+    async def section(name, result):
+        started.append(name)
+        if expected <= set(started):
+            all_started.set()
+        await asyncio.wait_for(all_started.wait(), timeout=2)
+        return result
+
+    async def fake_fetch_all(query, params):
+        if query == d.EXERCISE_NAMES_SQL:
+            return await section("ejercicios", [("dominadas",), ("press banca",)])
+        if query == d.CALENDAR_HEATMAP_SQL:
+            return await section("heatmap", HEATMAP)
+        return []
+
+    async def fake_session_rows(where_clause, query_params):
+        return await section("sesiones", SESSIONS)
+
+    async def fake_data_version(user_id):
+        return 0
+
+    monkeypatch.setattr(d, "async_fetch_all", fake_fetch_all)
+    monkeypatch.setattr(d, "_session_rows", fake_session_rows)
+    monkeypatch.setattr(d, "get_data_version", fake_data_version)
+    d.DASHBOARD_CACHE.clear()
+
+    def expect(*names):
+        expected.update(names)
+        return started
+
+    yield expect
+    d.DASHBOARD_CACHE.clear()
+
+
+class TestBundle:
+    def test_every_section_in_one_response(self, api_client, bundle_reads):
+        started = bundle_reads("ejercicios", "sesiones", "heatmap")
+        response = api_client.get("/api/dashboard/bundle", params={
+            "ejercicio": "press banca", "desde": "2024-01-01", "year": 2024})
+        assert response.status_code == 200
+        body = response.json()
+        assert sorted(started) == ["ejercicios", "heatmap", "sesiones"]
+        assert body["fields"] == list(d.BUNDLE_FIELDS)
+        assert body["ejercicios_disponibles"] == ["dominadas", "press banca"]
+        assert [entry["fecha"] for entry in body["datos"]] == ["2024-05-01", "2024-05-03", "2024-05-06"]
+        assert body["filtro_ejercicio"] == "press banca"
+        assert body["resumen"]["total_sesiones"] == 3 and body["resumen"]["max_e1rm_ever"] == 101.0
+        assert body["heatmap"] == {"year": 2024, "data": [{"date": "2024-05-01", "count": 2},
+                                                          {"date": "2024-05-03", "count": 2},
+                                                          {"date": "2024-05-06", "count": 2}]}
+
+    def test_same_sections_as_the_separate_endpoints(self, api_client, bundle_reads):
+        bundle_reads("ejercicios", "sesiones")
+        params = {"ejercicio": "press banca", "desde": "2024-01-01"}
+        stats = api_client.get("/api/ejercicios_stats", params=params).json()
+        bundle = api_client.get("/api/dashboard/bundle", params={**params, "fields": "ejercicios,datos,resumen"}).json()
+        for key in ("ejercicios_disponibles", "filtro_ejercicio", "datos", "resumen"):
+            assert bundle[key] == stats[key]
+
+    def test_fields_skip_the_other_queries(self, api_client, bundle_reads):
+        started = bundle_reads("heatmap")
+        body = api_client.get("/api/dashboard/bundle", params={"fields": "heatmap", "year": 2024}).json()
+        assert started == ["heatmap"]
+        assert set(body) == {"success", "fields", "heatmap"}
+
+    def test_resumen_without_datos(self, api_client, bundle_reads):
+        bundle_reads("sesiones")
+        body = api_client.get("/api/dashboard/bundle", params={
+            "fields": "resumen", "ejercicio": "press banca", "desde": "2024-01-01"}).json()
+        assert set(body) == {"success", "fields", "filtro_ejercicio", "resumen"}
+        assert body["resumen"]["total_sesiones"] == 3
+
+    def test_second_request_is_a_304(self, api_client, bundle_reads):
+        bundle_reads("ejercicios")
+        first = api_client.get("/api/dashboard/bundle", params={"fields": "ejercicios"})
+        second = api_client.get("/api/dashboard/bundle", params={"fields": "ejercicios"},
+                                headers={"If-None-Match": first.headers["etag"]})
+        assert second.status_code == 304
+
+    @pytest.mark.parametrize("params", [
+        {"fields": "ejercicios,calorias"},
+        {"fields": " , "},
+        {"fields": "datos", "series": "volumen"},
+        {"fields": "datos", "desde": "01/05/2024"},
+    ])
+    def test_invalid_parameters(self, api_client, bundle_reads, params):
+        started = bundle_reads()
+        assert api_client.get("/api/dashboard/bundle", params=params).status_code == 400
+        assert started == []
+
+
+@pytest.mark.parametrize("fields, expected", [
+    (None, d.BUNDLE_FIELDS),
+    ("heatmap, ejercicios,heatmap", ("heatmap", "ejercicios")),
+])
+def test_parse_bundle_fields(fields, expected):
+    assert d._parse_bundle_fields(fields) == expected
@@ -0,0 +1,110 @@
+# test_data_version.py
+"""
+Versión de datos de gym.user_data_version: toda escritura cambia el ETag del
+dashboard del usuario afectado, en la misma transacción que la escritura.
+
+Las pruebas de escritura necesitan un Postgres accesible con DB_CONFIG y el
+esquema migrado; si no, se omiten.
+"""
+import io
+import json
+import uuid
+import asyncio
+
+import pytest
+
+from back_end.gym.services import async_database, auth_service, database
+from back_end.gym.services.async_db_pool import close_async_pool
+from back_end.gym.services.data_version import (BUMP_DATA_VERSION_TEMPLATE,
+                                                DATA_VERSION_SQL,
+                                                data_version_ids)
+from back_end.gym.services.db_pool import get_db_connection
+from back_end.gym.services.import_service import (INSERT_FROM_STAGING_SQL,
+                                                  import_exercises)
+from back_end.gym.utils.http_cache import make_etag
+
+SESSION = {"registro": [{"ejercicio": "press banca", "series": [{"repeticiones": 5, "peso": 100}]}]}
+
+
+def test_inserts_bump_the_version_in_the_same_statement():
+    bump = BUMP_DATA_VERSION_TEMPLATE.format(source="inserted")
+    for sql in (database.INSERT_EXERCISES_SQL, INSERT_FROM_STAGING_SQL):
+        assert bump in sql
+
+
+def test_data_version_ids():
+    assert data_version_ids("g1", None, 42) == ["g1", "42"]
+
+
+def execute(sql, params):
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(sql, params)
+            rows = cur.fetchall() if cur.description else None
+        conn.commit()
+    return rows
+
+
+@pytest.fixture
+def user(make_db_user_id):
+    """Usuario de prueba (Google y Telegram ID únicos) que se borra al terminar."""
+    google_id = make_db_user_id()
+    telegram_id = make_db_user_id(str(uuid.uuid4().int % 10**12))
+    [(user_id,)] = execute("INSERT INTO gym.users (google_id, display_name) VALUES (%s, 'etag') RETURNING id",
+                           (google_id,))
+    yield {"id": user_id, "google_id": google_id, "telegram_id": telegram_id}
+    execute("DELETE FROM gym.users WHERE google_id = %s OR telegram_id = %s", (google_id, telegram_id))
+
+
+def etag(user_id):
+    """ETag de /api/records para el usuario (la clave de la ruta con la versión actual)."""
+    [(version,)] = execute(DATA_VERSION_SQL, (user_id,))
+    return make_etag(("records", user_id, version, None))
+
+
+def assert_changes_etag(user_id, write):
+    before = etag(user_id)
+    assert write()
+    assert etag(user_id) != before
+
+
+def test_insert_into_db(user):
+    assert_changes_etag(user["google_id"], lambda: database.insert_into_db(SESSION, user["google_id"]))
+
+
+def test_insert_many(user):
+    assert_changes_etag(user["google_id"], lambda: database.insert_many([SESSION] * 2, user["google_id"])["inserted"])
+
+
+def test_import_exercises(user):
+    line = json.dumps({"fecha": "2024-03-01", "ejercicio": "press banca", "series": "5x100"}) + "\n"
+    assert_changes_etag(user["google_id"], lambda: import_exercises(
+        io.BytesIO(line.encode()), "ndjson", user["google_id"])["inserted"])
+
+
+def test_reset_today_routine_status(user):
+    assert database.insert_into_db(SESSION, user["google_id"])
+    assert_changes_etag(user["google_id"], lambda: database.reset_today_routine_status(user["google_id"]))
+
+
+def test_async_insert_and_reset(user):
+    async def write(func, *args):
+        try:
+            return await func(*args)
+        finally:
+            await close_async_pool()  # El pool asíncrono queda ligado al loop de asyncio.run
+
+    google_id = user["google_id"]
+    assert_changes_etag(google_id, lambda: asyncio.run(write(async_database.insert_into_db, SESSION, google_id)))
+    assert_changes_etag(google_id, lambda: asyncio.run(write(async_database.reset_today_routine_status, google_id)))
+
+
+def test_migrate_user_data(user):
+    before = etag(user["telegram_id"]), etag(user["google_id"])
+    assert auth_service.migrate_user_data(user["telegram_id"], user["id"])
+    assert etag(user["telegram_id"]) != before[0] and etag(user["google_id"]) != before[1]
+
+
+def test_verify_link_code(user):
+    code = auth_service.generate_link_code(user["id"])
+    assert_changes_etag(user["google_id"], lambda: auth_service.verify_link_code(code, user["telegram_id"]))
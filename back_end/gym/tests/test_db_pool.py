@@ -0,0 +1,155 @@
+# test_db_pool.py
+"""
+Pool síncrono de services/db_pool.py sobre psycopg2.pool.ThreadedConnectionPool.
+
+psycopg2.connect se sustituye por conexiones falsas: no hace falta Postgres.
+"""
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+import psycopg2
+import psycopg2.extensions
+import pytest
+
+from back_end.gym.services import db_pool
+from back_end.gym.services.db_pool import ConnectionPool, PoolTimeoutError
+
+IDLE = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = 0
+        self.info = SimpleNamespace(transaction_status=IDLE)
+
+    def get_transaction_status(self):
+        return self.info.transaction_status
+
+    def rollback(self):
+        self.info.transaction_status = IDLE
+
+    def close(self):
+        self.closed = 1
+
+    def cursor(self):
+        return FakeCursor()
+
+
+class FakeCursor:
+    def execute(self, query):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+@pytest.fixture
+def opened(monkeypatch):
+    """Lista con las conexiones falsas que abre el pool."""
+    connections = []
+
+    def connect(*args, **kwargs):
+        connections.append(FakeConnection())
+        return connections[-1]
+
+    monkeypatch.setattr(psycopg2, "connect", connect)
+    return connections
+
+
+def test_reuses_idle_connections_above_min_size(opened):
+    pool = ConnectionPool({}, min_size=1, max_size=3)
+    conns = [pool.getconn() for _ in range(3)]
+    for conn in conns:
+        pool.putconn(conn)
+    assert not any(conn.closed for conn in conns)
+    assert pool.getconn() in conns
+    assert len(opened) == 3
+
+
+def test_waits_for_a_free_slot_and_times_out(opened):
+    pool = ConnectionPool({}, min_size=0, max_size=1, timeout=0.05)
+    conn = pool.getconn()
+    with pytest.raises(PoolTimeoutError):
+        pool.getconn()
+    threading.Timer(0.05, pool.putconn, args=(conn,)).start()
+    assert pool.getconn(timeout=2) is conn
+    assert pool.stats()["timeouts"] == 1
+
+
+def test_counts_waiting_threads(opened):
+    pool = ConnectionPool({}, min_size=0, max_size=1, timeout=2)
+    conn = pool.getconn()
+    waiter = threading.Thread(target=pool.getconn)
+    waiter.start()
+    for _ in range(200):
+        if pool.stats()["waiting"] == 1:
+            break
+        time.sleep(0.01)
+    assert pool.stats()["waiting"] == 1
+    pool.putconn(conn)
+    waiter.join(timeout=2)
+    assert pool.stats()["waiting"] == 0 and pool.stats()["in_use"] == 1
+
+
+def test_discards_broken_connections(opened):
+    pool = ConnectionPool({}, min_size=1, max_size=1)
+    conn = pool.getconn()
+    conn.info.transaction_status = psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN
+    pool.putconn(conn)
+    assert conn.closed
+    assert pool.getconn() is opened[-1] is not conn
+    assert pool.stats()["created"] == len(opened) == 2
+
+
+def test_closes_idle_connections_above_min_size(opened, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(db_pool.time, "monotonic", lambda: clock[0])
+    pool = ConnectionPool({}, min_size=1, max_size=3, healthcheck_idle=30)
+    conns = [pool.getconn() for _ in range(3)]
+    for conn in conns:
+        pool.putconn(conn)
+    clock[0] += 10
+    pool.putconn(pool.getconn())  # Ociosas menos de healthcheck_idle: se conservan
+    assert pool.stats()["closed_idle"] == 0
+
+    clock[0] += 60
+    conn = pool.getconn()
+    assert [c.closed for c in conns].count(1) == 2 and not conn.closed
+    stats = pool.stats()
+    assert stats["closed_idle"] == 2 and stats["created"] == 3 and stats["in_use"] == 1
+    pool.putconn(conn)
+    assert pool.getconn() is conn  # Nunca baja de min_size
+
+
+def test_connect_error_releases_the_slot(monkeypatch):
+    def connect(*args, **kwargs):
+        raise psycopg2.OperationalError("sin servidor")
+
+    monkeypatch.setattr(psycopg2, "connect", connect)
+    pool = ConnectionPool({}, min_size=1, max_size=1, timeout=0.05)
+    for _ in range(2):
+        with pytest.raises(psycopg2.OperationalError) as exc_info:
+            pool.getconn()
+        assert not isinstance(exc_info.value, PoolTimeoutError)
+    assert pool.stats()["in_use"] == 0
+
+
+def test_app_loads_a_single_pool_module():
+    import back_end.gym.app_fastapi  # noqa: F401  (importa todas las rutas)
+    assert "services.db_pool" not in sys.modules
+    assert "services.async_db_pool" not in sys.modules
+    assert sys.modules["back_end.gym.services.db_pool"] is db_pool
+
+
+def test_stats_in_the_api_status(api_client, opened, monkeypatch):
+    pool = ConnectionPool({}, min_size=2, max_size=4)
+    monkeypatch.setattr(db_pool, "_pool", pool)
+    pool.getconn()
+    stats = api_client.get("/api").json()["db_pool"]
+    assert stats == {"min_size": 2, "max_size": 4, "in_use": 1, "waiting": 0, "created": 2,
+                     "closed_idle": 0, "timeouts": 0}
@@ -0,0 +1,158 @@
+# test_downsampling.py
+"""
+Series reducidas con LTTB (user-021): services/downsampling y los parámetros
+'series'/'max_points' de /api/ejercicios_stats con las lecturas de la BD sustituidas.
+"""
+import datetime
+
+import numpy as np
+import pytest
+
+from back_end.gym.routes import dashboard as d
+from back_end.gym.services.downsampling import (MAX_POINTS, SERIES_KEYS,
+                                                downsample_series,
+                                                lttb_indices)
+
+START = datetime.date(2020, 1, 1)
+
+
+def lttb_reference(x, y, threshold):
+    """LTTB punto a punto (Steinarsson 2013), con los mismos buckets que lttb_indices."""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return list(range(n))
+    edges = [int(e) for e in np.linspace(1, n - 1, threshold - 1)]
+    selected, a = [0], 0
+    for bucket in range(threshold - 2):
+        lo, hi = edges[bucket], edges[bucket + 1]
+        if bucket + 2 < len(edges):
+            nxt = range(edges[bucket + 1], edges[bucket + 2])
+            avg_x = sum(x[i] for i in nxt) / len(nxt)
+            avg_y = sum(y[i] for i in nxt) / len(nxt)
+        else:
+            avg_x, avg_y = x[-1], y[-1]
+        areas = [abs((x[a] - avg_x) * (y[i] - y[a]) - (x[a] - x[i]) * (avg_y - y[a])) for i in range(lo, hi)]
+        a = lo + areas.index(max(areas))
+        selected.append(a)
+    return selected + [n - 1]
+
+
+class TestLttbIndices:
+    @pytest.mark.parametrize("n, threshold", [(0, 10), (5, 5), (5, 10), (10, 2)])
+    def test_short_series_are_kept(self, n, threshold):
+        assert lttb_indices(np.arange(n, dtype=float), np.zeros(n), threshold).tolist() == list(range(n))
+
+    @pytest.mark.parametrize("n, threshold", [(10, 3), (100, 7), (1000, 50), (1001, 500)])
+    def test_matches_the_pointwise_algorithm(self, n, threshold):
+        rng = np.random.default_rng(n)
+        x = np.cumsum(rng.integers(1, 5, n)).astype(float)
+        y = rng.normal(100, 20, n)
+        indices = lttb_indices(x, y, threshold)
+        assert len(indices) == threshold and indices[0] == 0 and indices[-1] == n - 1
+        assert np.all(np.diff(indices) > 0)
+        assert indices.tolist() == lttb_reference(x.tolist(), y.tolist(), threshold)
+
+    def test_keeps_the_peak(self):
+        y = np.ones(1000)
+        y[637] = 50
+        assert 637 in lttb_indices(np.arange(1000, dtype=float), y, 20)
+
+
+def sessions(count):
+    return [{"fecha": START + datetime.timedelta(days=i), "max_peso": 50 + i % 7, "avg_peso": 45.0,
+             "volumen": 1000.0 + i, "total_reps": 20, "max_e1rm_session": 60.0} for i in range(count)]
+
+
+class TestDownsampleSeries:
+    def test_every_series_is_bounded(self):
+        series = downsample_series(sessions(2000), max_points=100)
+        assert set(series) == set(SERIES_KEYS)
+        for key, points in series.items():
+            assert len(points) == 100
+            assert points[0]["fecha"] == START and points[-1]["fecha"] == START + datetime.timedelta(days=1999)
+            assert set(points[0]) == {"fecha", key}
+
+    def test_skips_nulls_and_zero_e1rm(self):
+        entries = sessions(6)
+        entries[1]["avg_peso"] = None
+        entries[2]["max_e1rm_session"] = entries[4]["max_e1rm_session"] = 0
+        series = downsample_series(entries, keys=("avg_peso", "max_e1rm_session"), max_points=100)
+        assert [p["fecha"].day for p in series["avg_peso"]] == [1, 3, 4, 5, 6]
+        assert [p["fecha"].day for p in series["max_e1rm_session"]] == [1, 2, 4, 6]
+
+    def test_string_dates(self):
+        entries = [{**entry, "fecha": entry["fecha"].isoformat()} for entry in sessions(50)]
+        points = downsample_series(entries, keys=("volumen",), max_points=10)["volumen"]
+        assert len(points) == 10 and points[0]["fecha"] == "2020-01-01"
+
+    def test_no_sessions(self):
+        assert downsample_series([], keys=("volumen",)) == {"volumen": []}
+
+
+def session_row(entry):
+    """Fila de SESSION_STATS_SQL para una entrada de 'datos'."""
+    fecha = datetime.datetime.combine(entry["fecha"], datetime.time(10), tzinfo=datetime.timezone.utc)
+    return (fecha, "press banca", 3, entry["max_peso"], entry["avg_peso"], entry["total_reps"],
+            entry["volumen"], entry["max_e1rm_session"])
+
+
+@pytest.fixture
+def stats_reads(monkeypatch):
+    """Sustituye las lecturas de /api/ejercicios_stats con 3000 sesiones de press banca."""
+    rows = [session_row(entry) for entry in sessions(3000)]
+
+    async def fake_session_rows(where_clause, query_params):
+        return rows
+
+    async def fake_fetch_all(query, params):
+        return [("press banca",)] if query == d.EXERCISE_NAMES_SQL else []
+
+    async def fake_data_version(user_id):
+        return 0
+
+    monkeypatch.setattr(d, "_session_rows", fake_session_rows)
+    monkeypatch.setattr(d, "async_fetch_all", fake_fetch_all)
+    monkeypatch.setattr(d, "get_data_version", fake_data_version)
+    d.DASHBOARD_CACHE.clear()
+    yield rows
+    d.DASHBOARD_CACHE.clear()
+
+
+class TestStatsEndpoint:
+    def test_series_replace_the_sessions(self, api_client, stats_reads):
+        body = api_client.get("/api/ejercicios_stats", params={
+            "ejercicio": "press banca", "desde": "2020-01-01", "series": "max_peso, volumen", "max_points": 200,
+            "agrupados": True}).json()
+        assert set(body["series"]) == {"max_peso", "volumen"}
+        assert all(len(points) == 200 for points in body["series"].values())
+        assert body["series"]["volumen"][-1] == {"fecha": "2028-03-18", "volumen": 3999.0}
+        assert body["series_info"] == {"sesiones": 3000, "max_points": 200}
+        assert body["datos"] == [] and body["datos_agrupados"] == {}
+        assert body["resumen"]["total_sesiones"] == 3000
+
+    def test_max_points_alone_returns_every_series(self, api_client, stats_reads):
+        body = api_client.get("/api/ejercicios_stats", params={"ejercicio": "press banca", "max_points": 10}).json()
+        assert list(body["series"]) == list(SERIES_KEYS)
+        assert body["series_info"]["max_points"] == 10
+
+    def test_without_series_every_session_is_returned(self, api_client, stats_reads):
+        body = api_client.get("/api/ejercicios_stats", params={"ejercicio": "press banca", "desde": "2020-01-01"}).json()
+        assert len(body["datos"]) == 3000 and "series" not in body
+
+    @pytest.mark.parametrize("params, status", [
+        ({"series": "volumen"}, 400),
+        ({"ejercicio": "press banca", "series": "volumen,calorias"}, 400),
+        ({"ejercicio": "press banca", "series": " , "}, 400),
+        ({"ejercicio": "press banca", "series": "volumen", "stream": "ndjson"}, 400),
+        ({"ejercicio": "press banca", "max_points": 2}, 422),
+        ({"ejercicio": "press banca", "max_points": MAX_POINTS + 1}, 422),
+    ])
+    def test_invalid_parameters(self, api_client, stats_reads, params, status):
+        assert api_client.get("/api/ejercicios_stats", params=params).status_code == status
+
+
+def test_payload_is_bounded_by_max_points(api_client, stats_reads):
+    full = api_client.get("/api/ejercicios_stats", params={"ejercicio": "press banca", "desde": "2020-01-01"})
+    reduced = api_client.get("/api/ejercicios_stats", params={
+        "ejercicio": "press banca", "desde": "2020-01-01", "series": "max_peso", "max_points": 100})
+    assert len(reduced.content) * 10 < len(full.content)
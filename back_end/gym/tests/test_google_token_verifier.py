@@ -0,0 +1,155 @@
+# test_google_token_verifier.py
+import json
+import time
+
+import jwt
+import pytest
+import requests
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from back_end.gym.services.google_token_verifier import GoogleTokenVerifier
+
+CLIENT_ID = "test-client.apps.googleusercontent.com"
+
+
+def make_key(kid):
+    """Par RSA local con su JWK público (sustituye a las claves de Google)."""
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key()))
+    jwk.update({"kid": kid, "alg": "RS256", "use": "sig"})
+    return private_key, jwk
+
+
+def make_token(private_key, kid, **overrides):
+    now = int(time.time())
+    claims = {
+        "iss": "https://accounts.google.com",
+        "aud": CLIENT_ID,
+        "sub": "1234567890",
+        "email": "user@example.com",
+        "iat": now,
+        "exp": now + 3600,
+    }
+    claims.update(overrides)
+    return jwt.encode(claims, private_key, algorithm="RS256", headers={"kid": kid})
+
+
+class FakeResponse:
+    def __init__(self, jwks, max_age=None):
+        self._jwks = jwks
+        self.headers = {"Cache-Control": f"public, max-age={max_age}"} if max_age is not None else {}
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self._jwks
+
+
+class FakeSession:
+    """Sesión HTTP local: sirve el JWKS indicado y cuenta las descargas."""
+
+    def __init__(self, jwks, max_age=3600):
+        self.jwks = jwks
+        self.max_age = max_age
+        self.calls = 0
+        self.fail = False
+
+    def get(self, url, timeout=None):
+        self.calls += 1
+        if self.fail:
+            raise requests.ConnectionError("certs endpoint caído")
+        return FakeResponse(self.jwks, self.max_age)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def key_pair():
+    return make_key("key-1")
+
+
+@pytest.fixture
+def session(key_pair):
+    return FakeSession({"keys": [key_pair[1]]})
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def verifier(session, clock):
+    return GoogleTokenVerifier(CLIENT_ID, session=session, clock=clock, refresh_margin=0)
+
+
+class TestGoogleTokenVerifier:
+    def test_valid_token(self, verifier, key_pair):
+        claims = verifier.verify(make_token(key_pair[0], "key-1"))
+        assert claims["sub"] == "1234567890"
+        assert claims["email"] == "user@example.com"
+
+    def test_keys_are_cached(self, verifier, session, key_pair):
+        token = make_token(key_pair[0], "key-1")
+        verifier.verify(token)
+        verifier.verify(token)
+        assert session.calls == 1
+
+    def test_keys_expire_with_max_age(self, verifier, session, clock, key_pair):
+        token = make_token(key_pair[0], "key-1")
+        verifier.verify(token)
+        clock.now += 3601
+        verifier.verify(token)
+        assert session.calls == 2
+
+    def test_wrong_audience_rejected(self, verifier, key_pair):
+        with pytest.raises(jwt.InvalidAudienceError):
+            verifier.verify(make_token(key_pair[0], "key-1", aud="otro-cliente"))
+
+    def test_wrong_issuer_rejected(self, verifier, key_pair):
+        with pytest.raises(jwt.InvalidIssuerError):
+            verifier.verify(make_token(key_pair[0], "key-1", iss="https://evil.example.com"))
+
+    def test_expired_token_rejected(self, verifier, key_pair):
+        past = int(time.time()) - 7200
+        with pytest.raises(jwt.ExpiredSignatureError):
+            verifier.verify(make_token(key_pair[0], "key-1", iat=past, exp=past + 3600))
+
+    def test_signature_from_other_key_rejected(self, verifier):
+        other_private, _ = make_key("key-1")
+        with pytest.raises(jwt.InvalidSignatureError):
+            verifier.verify(make_token(other_private, "key-1"))
+
+    def test_key_rotation_triggers_refresh(self, verifier, session, clock, key_pair):
+        verifier.verify(make_token(key_pair[0], "key-1"))
+        new_private, new_jwk = make_key("key-2")
+        session.jwks = {"keys": [key_pair[1], new_jwk]}
+        clock.now += 60
+        assert verifier.verify(make_token(new_private, "key-2"))["sub"] == "1234567890"
+        assert session.calls == 2
+
+    def test_unknown_kid_refresh_is_rate_limited(self, verifier, session, key_pair):
+        verifier.verify(make_token(key_pair[0], "key-1"))
+        for _ in range(3):
+            with pytest.raises(jwt.InvalidTokenError):
+                verifier.verify(make_token(key_pair[0], "desconocida"))
+        assert session.calls == 1
+
+    def test_stale_keys_used_when_endpoint_fails(self, verifier, session, clock, key_pair):
+        token = make_token(key_pair[0], "key-1")
+        verifier.verify(token)
+        clock.now += 3601
+        session.fail = True
+        assert verifier.verify(token)["sub"] == "1234567890"
+
+    def test_hs256_token_rejected(self, verifier):
+        token = jwt.encode({"sub": "x", "aud": CLIENT_ID}, "secret", algorithm="HS256", headers={"kid": "key-1"})
+        with pytest.raises(jwt.InvalidAlgorithmError):
+            verifier.verify(token)
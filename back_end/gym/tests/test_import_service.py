@@ -0,0 +1,146 @@
+# test_import_service.py
+"""
+Parser de /api/import (detect_format, _parse_series, parse_row, lectura CSV/NDJSON)
+y resumen de import_exercises con una conexión falsa (sin Postgres).
+"""
+import io
+import json
+import datetime
+from contextlib import contextmanager
+
+import pytest
+
+from back_end.gym.services import import_service
+from back_end.gym.services.import_service import (ImportFormatError,
+                                                  _iter_rows, _parse_series,
+                                                  detect_format,
+                                                  import_exercises, parse_row)
+from back_end.gym.services.session_metrics import EMPTY_METRICS
+
+
+class TestDetectFormat:
+    @pytest.mark.parametrize("kwargs, expected", [
+        ({"filename": "historial.CSV"}, "csv"),
+        ({"filename": "historial.jsonl"}, "ndjson"),
+        ({"filename": "x.ndjson", "explicit": "csv"}, "csv"),
+        ({"explicit": "json"}, "ndjson"),
+        ({"filename": "x.bin", "content_type": "text/csv; charset=utf-8"}, "csv"),
+        ({"content_type": "application/x-ndjson"}, "ndjson"),
+    ])
+    def test_detected(self, kwargs, expected):
+        assert detect_format(**kwargs) == expected
+
+    @pytest.mark.parametrize("kwargs", [{"explicit": "xml"}, {"filename": "x.txt", "content_type": "text/plain"}, {}])
+    def test_unsupported(self, kwargs):
+        with pytest.raises(ImportFormatError):
+            detect_format(**kwargs)
+
+
+class TestParseSeries:
+    def test_compact(self):
+        assert _parse_series("10x80; 8X85,12") == [
+            {"repeticiones": "10", "peso": "80"},
+            {"repeticiones": "8", "peso": "85"},
+            {"repeticiones": "12", "peso": 0},
+        ]
+
+    def test_json_and_list(self):
+        series = [{"repeticiones": 5, "peso": 100}]
+        assert _parse_series(json.dumps(series)) == series
+        assert _parse_series(series) is series
+
+    @pytest.mark.parametrize("value", [None, ""])
+    def test_empty(self, value):
+        assert _parse_series(value) is None
+
+
+class TestParseRow:
+    def test_series_row(self):
+        fecha, ejercicio, series_json, duracion, metrics = parse_row(
+            {"fecha": "2024-03-01", "ejercicio": "Press Banca", "series": "5x100;8x80"})
+        assert fecha == datetime.datetime(2024, 3, 1)
+        assert ejercicio == "press banca"
+        assert json.loads(series_json) == [{"repeticiones": 5, "peso": 100.0}, {"repeticiones": 8, "peso": 80.0}]
+        assert duracion is None
+        assert metrics.series_validas == 2 and metrics.max_peso == 100.0
+
+    def test_duration_row(self):
+        row = parse_row({"fecha": "2024-03-01T07:30:00Z", "ejercicio": "correr", "duracion": "30"})
+        assert row[0] == datetime.datetime(2024, 3, 1, 7, 30, tzinfo=datetime.timezone.utc)
+        assert row[2:] == (None, 30, EMPTY_METRICS)
+
+    @pytest.mark.parametrize("raw", [
+        {"ejercicio": "press banca", "series": "5x100"},                        # sin fecha
+        {"fecha": "01/03/2024", "ejercicio": "press banca", "series": "5x100"},  # fecha inválida
+        {"fecha": "2024-03-01", "ejercicio": "no existe", "series": "5x100"},
+        {"fecha": "2024-03-01", "ejercicio": "press banca"},                     # ni series ni duración
+        {"fecha": "2024-03-01", "ejercicio": "press banca", "series": "axb"},
+        ["no es un objeto"],
+    ])
+    def test_invalid(self, raw):
+        with pytest.raises(ValueError):
+            parse_row(raw)
+
+
+class TestIterRows:
+    def test_csv_normalizes_header(self):
+        text = io.StringIO(" Fecha ,EJERCICIO,series\r\n2024-03-01,press banca,5x100\r\n")
+        assert list(_iter_rows(text, "csv")) == [(2, {"fecha": "2024-03-01", "ejercicio": "press banca", "series": "5x100"})]
+
+    def test_csv_requires_header(self):
+        with pytest.raises(ImportFormatError):
+            list(_iter_rows(io.StringIO("a,b\n1,2\n"), "csv"))
+
+    def test_ndjson_skips_blank_lines_and_reports_bad_json(self):
+        rows = list(_iter_rows(io.StringIO('{"a": 1}\n\n{roto\n'), "ndjson"))
+        assert rows[0] == (1, {"a": 1})
+        assert rows[1][0] == 3 and isinstance(rows[1][1], ValueError)
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    """Sustituye la conexión y el COPY: devuelve la lista de lotes 'confirmados'."""
+    committed = []
+
+    class FakeConnection:
+        def rollback(self):
+            pass
+
+    @contextmanager
+    def fake_connection():
+        yield FakeConnection()
+
+    def fake_copy_batch(conn, rows):
+        committed.append(list(rows))
+        return len(rows)
+
+    monkeypatch.setattr(import_service, "get_db_connection", fake_connection)
+    monkeypatch.setattr(import_service, "_copy_batch", fake_copy_batch)
+    return committed
+
+
+def ndjson(count):
+    return "".join(json.dumps({"fecha": "2024-03-01", "ejercicio": "press banca", "series": "5x100"}) + "\n"
+                   for _ in range(count)).encode()
+
+
+class TestImportExercises:
+    def test_batches_and_row_errors(self, fake_db):
+        data = ndjson(3) + b'{"fecha": "2024-03-01", "ejercicio": "x", "series": "5x1"}\n' + ndjson(2)
+        summary = import_exercises(io.BytesIO(data), "ndjson", "u1", batch_size=2)
+        assert summary["success"] and summary["inserted"] == 5 and summary["batches"] == [2, 2, 1]
+        assert summary["error_count"] == 1 and summary["errors"][0]["line"] == 4
+
+    def test_decode_error_before_any_commit_rejects_the_file(self, fake_db):
+        with pytest.raises(ImportFormatError):
+            import_exercises(io.BytesIO(b"\xff\xfe" + ndjson(3)), "ndjson", "u1", batch_size=2)
+        assert fake_db == []
+
+    def test_decode_error_after_a_commit_is_reported_in_the_summary(self, fake_db):
+        # TextIOWrapper decodifica por bloques: el byte inválido va detrás de varios KB válidos
+        data = ndjson(400) + b"\xff\n" + ndjson(5)
+        summary = import_exercises(io.BytesIO(data), "ndjson", "u1", batch_size=100)
+        assert not summary["success"]
+        assert summary["inserted"] == sum(summary["batches"]) == sum(len(b) for b in fake_db) > 0
+        assert summary["error_count"] == 1
+        assert "UTF-8" in summary["errors"][0]["error"]
@@ -0,0 +1,34 @@
+# test_insert_statement.py
+"""
+INSERT de ejercicios: la versión asíncrona y la síncrona ejecutan la misma
+sentencia multi-fila (una sola sentencia por sesión, no una por ejercicio).
+"""
+from back_end.gym.services.database import (EXERCISE_ROW_TEMPLATE,
+                                            INSERT_EXERCISES_SQL,
+                                            build_exercise_rows,
+                                            build_insert_statement)
+
+SESSION = {
+    "fecha": "2024-05-01T10:00:00",
+    "registro": [
+        {"ejercicio": "press banca", "series": [{"repeticiones": 5, "peso": 100}, {"repeticiones": 8, "peso": 80}]},
+        {"ejercicio": "dominadas", "series": [{"repeticiones": 3, "peso": 140}]},
+        {"ejercicio": "correr", "duracion": 20},
+    ],
+}
+
+
+def test_single_multi_row_statement():
+    rows = build_exercise_rows(SESSION, "u1")
+    sql, params = build_insert_statement(rows)
+    assert sql.count("INSERT INTO gym.ejercicios") == 1
+    assert sql.count(EXERCISE_ROW_TEMPLATE) == len(rows) == 3
+    assert sql.count("%s") == len(params) == sum(len(row) for row in rows)
+    assert params == [value for row in rows for value in row]
+
+
+def test_same_statement_as_execute_values():
+    rows = build_exercise_rows(SESSION, "u1")
+    sql, _ = build_insert_statement(rows)
+    # execute_values sustituye 'VALUES %s' por las filas renderizadas con EXERCISE_ROW_TEMPLATE
+    assert sql == INSERT_EXERCISES_SQL.replace("VALUES %s", "VALUES " + ", ".join([EXERCISE_ROW_TEMPLATE] * len(rows)))
@@ -0,0 +1,91 @@
+# test_jwt_claims.py
+"""
+Verificación del JWT una vez por petición y caché de claims (user-013):
+services/jwt_service.verify_token y middlewares.get_token_claims.
+"""
+import datetime
+import time
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from back_end.gym import middlewares
+from back_end.gym.services import async_auth_service, jwt_service
+from back_end.gym.services.jwt_service import CLAIMS_CACHE, create_access_token, verify_token
+
+
+@pytest.fixture(autouse=True)
+def empty_claims_cache():
+    CLAIMS_CACHE.clear()
+    yield
+    CLAIMS_CACHE.clear()
+
+
+@pytest.fixture
+def decodes(monkeypatch):
+    """Cuenta las verificaciones reales (firma + claims) del token."""
+    calls = []
+    decode = jwt_service.decode_token
+
+    def counting_decode(token):
+        calls.append(token)
+        return decode(token)
+
+    monkeypatch.setattr(jwt_service, "decode_token", counting_decode)
+    return calls
+
+
+class TestVerifyToken:
+    def test_valid_token_is_decoded_once(self, decodes):
+        token = create_access_token({"sub": "7"})
+        assert verify_token(token)["sub"] == "7"
+        assert verify_token(token)["sub"] == "7"
+        assert len(decodes) == 1
+
+    def test_callers_get_copies(self, decodes):
+        token = create_access_token({"sub": "7"})
+        verify_token(token)["sub"] = "8"
+        assert verify_token(token)["sub"] == "7"
+
+    @pytest.mark.parametrize("token", [
+        "no.es.un.jwt",
+        create_access_token({"sub": "7"}, expires_delta=datetime.timedelta(seconds=-10)),
+        create_access_token({"name": "sin sub"}),
+    ])
+    def test_invalid_tokens_are_not_cached(self, decodes, token):
+        assert verify_token(token) is None and verify_token(token) is None
+        assert len(decodes) == 2 and len(CLAIMS_CACHE) == 0
+
+    def test_entry_does_not_outlive_the_token(self, decodes, monkeypatch):
+        token = create_access_token({"sub": "7"}, expires_delta=datetime.timedelta(seconds=30))
+        verify_token(token)
+        [(expires_at, _)] = CLAIMS_CACHE._data.values()
+        assert expires_at - time.monotonic() <= 30 < jwt_service.CLAIMS_CACHE_TTL
+
+
+def test_one_verification_per_request(monkeypatch):
+    """El middleware y get_current_user comparten los claims de request.state."""
+    calls = []
+
+    def counting_verify(token):
+        calls.append(token)
+        return {"sub": "7"}
+
+    async def fake_get_user_by_id(user_id):
+        return {"id": user_id, "google_id": "g7"}
+
+    monkeypatch.setattr(middlewares, "verify_token", counting_verify)
+    monkeypatch.setattr(async_auth_service, "get_user_by_id", fake_get_user_by_id)
+    app = FastAPI()
+    app.add_middleware(middlewares.AuthenticationMiddleware)
+
+    @app.get("/api/privado")
+    async def privado(user=Depends(middlewares.get_current_user)):
+        return user
+
+    client = TestClient(app)
+    assert client.get("/api/privado", headers={"Authorization": "Bearer t1"}).json() == {"id": 7, "google_id": "g7"}
+    assert calls == ["t1"]
+    response = client.get("/api/privado", follow_redirects=False)
+    assert response.status_code == 307 and calls == ["t1"]
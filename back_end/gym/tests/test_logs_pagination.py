@@ -0,0 +1,176 @@
+# test_logs_pagination.py
+"""
+Paginación keyset de /api/logs (user-011): cursor opaco, consulta con filtros,
+páginas y recorrido completo por la ruta. La prueba sobre gym.ejercicios
+necesita Postgres (se omite sin él).
+"""
+import datetime
+import types
+
+import pytest
+
+from back_end.gym.routes import main
+from back_end.gym.services import database
+from back_end.gym.services.database import (LOG_TYPE_FILTERS, build_logs_query,
+                                            decode_logs_cursor,
+                                            encode_logs_cursor,
+                                            get_exercise_logs_page,
+                                            rows_to_logs_page)
+
+UTC = datetime.timezone.utc
+START = datetime.datetime(2024, 5, 1, 10, 0, tzinfo=UTC)
+
+
+def page_row(fecha, row_id):
+    """Fila de LOGS_PAGE_SQL: fecha, ejercicio, repeticiones, duracion, id, max_peso, total_reps, volumen."""
+    return (fecha, "press banca", [{"repeticiones": 5, "peso": 100}], None, row_id, 100.0, 5, 500.0)
+
+
+# Orden (fecha DESC, id DESC), con fechas repetidas para que desempate el id
+ROWS = sorted((page_row(START - datetime.timedelta(days=i // 2), i + 1) for i in range(11)),
+              key=lambda row: (row[0], row[4]), reverse=True)
+
+
+class TestCursor:
+    @pytest.mark.parametrize("fecha", [
+        datetime.datetime(2024, 5, 1, 10, 0, 0, 123456, tzinfo=UTC),
+        datetime.datetime(2024, 5, 1, 10, 0, tzinfo=datetime.timezone(datetime.timedelta(hours=2))),
+        datetime.datetime(2024, 5, 1, 10, 0),
+    ])
+    def test_round_trip(self, fecha):
+        token = encode_logs_cursor(fecha, 42)
+        assert "=" not in token
+        assert decode_logs_cursor(token) == (fecha, 42)
+
+    @pytest.mark.parametrize("token", ["", "no-es-base64!", encode_logs_cursor("ayer", 1), "WzFd"])
+    def test_invalid(self, token):
+        with pytest.raises(ValueError):
+            decode_logs_cursor(token)
+
+
+class TestBuildLogsQuery:
+    def test_all_filters(self):
+        until = datetime.date(2024, 6, 1)
+        sql, params = build_logs_query("g1", since=START, until=until, ejercicio="press", tipo="fuerza",
+                                       after=(START, 7), limit=20)
+        assert sql.count("%s") == len(params)
+        assert params == ("g1", START, until, "%press%", START, 7, 21)
+        assert LOG_TYPE_FILTERS["fuerza"] in sql and "(fecha, id) < (%s, %s)" in sql
+
+    def test_no_filters_no_limit(self):
+        sql, params = build_logs_query(123)
+        assert params == ("123", None) and "ILIKE" not in sql and "(fecha, id)" not in sql
+
+
+class TestRowsToLogsPage:
+    def test_last_page_has_no_cursor(self):
+        page = rows_to_logs_page(ROWS[:3], limit=3)
+        assert [log["id"] for log in page["logs"]] == [row[4] for row in ROWS[:3]]
+        assert page["next_cursor"] is None
+
+    def test_extra_row_gives_the_cursor_of_the_last_returned_row(self):
+        page = rows_to_logs_page(ROWS[:4], limit=3)
+        assert len(page["logs"]) == 3
+        assert decode_logs_cursor(page["next_cursor"]) == (ROWS[2][0], ROWS[2][4])
+        assert page["logs"][0]["volumen"] == 500.0
+
+
+@pytest.fixture
+def paged(monkeypatch):
+    """Sustituye get_exercise_logs_page por la misma semántica keyset sobre ROWS."""
+    calls = []
+
+    async def fake_page(user_id, limit, after=None, **filters):
+        calls.append({"user_id": user_id, "limit": limit, "after": after, **filters})
+        rows = [row for row in ROWS if after is None or (row[0], row[4]) < after]
+        return rows_to_logs_page(rows[:limit + 1], limit)
+
+    monkeypatch.setattr(main, "get_exercise_logs_page", fake_page)
+    return calls
+
+
+class TestLogsEndpoint:
+    def test_walks_every_row_once(self, api_client, paged):
+        seen, cursor = [], None
+        while True:
+            params = {"limit": 4, **({"cursor": cursor} if cursor else {})}
+            body = api_client.get("/api/logs", params=params).json()
+            seen.extend(log["id"] for log in body["logs"])
+            cursor = body["next_cursor"]
+            if cursor is None:
+                break
+        assert seen == [row[4] for row in ROWS]
+        assert len(paged) == 3
+
+    def test_filters_are_parsed(self, api_client, paged):
+        response = api_client.get("/api/logs", params={"desde": "2024-04-01", "hasta": "2024-04-30",
+                                                       "ejercicio": "press", "tipo": "cardio"})
+        assert response.status_code == 200
+        call = paged[0]
+        assert call["since"] == datetime.date(2024, 4, 1) and call["until"] == datetime.date(2024, 5, 1)
+        assert call["ejercicio"] == "press" and call["tipo"] == "cardio"
+        assert call["limit"] == database.LOGS_PAGE_DEFAULT_LIMIT
+
+    def test_days_window_does_not_move_between_pages(self, api_client, monkeypatch):
+        # La fila 3 cae justo en el límite de 'days=7': entre la página 1 (10:00) y
+        # la 2 (10:30) un 'now - 7 días' la sacaría de la ventana
+        rows = [page_row(START + datetime.timedelta(days=7, hours=2), 1),
+                page_row(START + datetime.timedelta(days=7, hours=1), 2),
+                page_row(START + datetime.timedelta(minutes=15), 3),
+                page_row(START - datetime.timedelta(days=1), 4)]
+        clock = [START + datetime.timedelta(days=7)]
+
+        class FakeDateTime(datetime.datetime):
+            @classmethod
+            def now(cls, tz=None):
+                return clock[0]
+
+        class FakeDate(datetime.date):
+            @classmethod
+            def today(cls):
+                return clock[0].date()
+
+        async def fake_page(user_id, limit, after=None, since=None, **filters):
+            if not isinstance(since, datetime.datetime):
+                since = datetime.datetime.combine(since, datetime.time(), UTC)
+            window = [row for row in rows if row[0] >= since and (after is None or (row[0], row[4]) < after)]
+            return rows_to_logs_page(window[:limit + 1], limit)
+
+        monkeypatch.setattr(main, "datetime", types.SimpleNamespace(
+            date=FakeDate, datetime=FakeDateTime, timedelta=datetime.timedelta))
+        monkeypatch.setattr(main, "get_exercise_logs_page", fake_page)
+        first = api_client.get("/api/logs", params={"days": 7, "limit": 2}).json()
+        clock[0] += datetime.timedelta(minutes=30)
+        second = api_client.get("/api/logs", params={"days": 7, "limit": 2, "cursor": first["next_cursor"]}).json()
+        assert [log["id"] for log in first["logs"] + second["logs"]] == [1, 2, 3]
+
+    def test_limit_is_capped(self, api_client, paged):
+        api_client.get("/api/logs", params={"limit": 100000})
+        assert paged[0]["limit"] == database.LOGS_PAGE_MAX_LIMIT
+
+    @pytest.mark.parametrize("params", [{"cursor": "roto"}, {"tipo": "yoga"}, {"desde": "01/04/2024"}])
+    def test_invalid_parameters(self, api_client, paged, params):
+        assert api_client.get("/api/logs", params=params).status_code == 400
+        assert paged == []
+
+
+def test_pages_over_postgres(db_user_id):
+    # Cuatro ejercicios con la misma fecha: el id desempata dentro de la página y entre páginas
+    session = {"fecha": "2024-05-01T10:00:00", "registro": [
+        {"ejercicio": name, "series": [{"repeticiones": 5, "peso": 50}]}
+        for name in ("press banca", "dominadas", "press militar", "remo en maquina")]}
+    assert database.insert_into_db(session, db_user_id)
+    assert database.insert_into_db({**session, "fecha": "2024-05-02T10:00:00"}, db_user_id)
+
+    ids, after = [], None
+    while True:
+        page = get_exercise_logs_page(db_user_id, limit=3, after=after)
+        ids.extend(log["id"] for log in page["logs"])
+        if page["next_cursor"] is None:
+            break
+        after = decode_logs_cursor(page["next_cursor"])
+    assert len(ids) == len(set(ids)) == 8
+
+    fuerza = get_exercise_logs_page(db_user_id, limit=50, ejercicio="PRESS", tipo="fuerza",
+                                    since=datetime.date(2024, 5, 2))
+    assert sorted(log["ejercicio"] for log in fuerza["logs"]) == ["press banca", "press militar"]
@@ -0,0 +1,166 @@
+# test_migrations.py
+"""
+Runner de migraciones (services/migrations.py) sin Postgres: descubrimiento de
+ficheros, ejecución de migraciones no transaccionales en autocommit y la
+comprobación del esquema al arrancar.
+"""
+import re
+from contextlib import contextmanager
+
+import pytest
+from fastapi.testclient import TestClient
+
+from back_end.gym.services import migrations
+from back_end.gym.services.migrations import (SchemaOutOfDateError,
+                                              assert_schema_current,
+                                              discover_migrations,
+                                              load_migration_module)
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql, params=None):
+        self.conn.log.append((sql.strip().split()[0], self.conn.autocommit))
+
+    def fetchall(self):
+        return [(version,) for version in self.conn.applied]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class FakeConnection:
+    def __init__(self, applied=()):
+        self.autocommit = False
+        self.log = []
+        self.applied = applied
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.log.append(("COMMIT", self.autocommit))
+
+
+def write_migration(tmp_path, name, body):
+    (tmp_path / name).write_text(body, encoding="utf-8")
+    return discover_migrations(str(tmp_path))[-1]
+
+
+def test_discover_orders_and_rejects_duplicates(tmp_path):
+    (tmp_path / "0002_b.sql").write_text("SELECT 1;")
+    (tmp_path / "0001_a.py").write_text("def upgrade(conn): pass")
+    (tmp_path / "notas.txt").write_text("")
+    assert [(m.version, m.kind) for m in discover_migrations(str(tmp_path))] == [(1, "py"), (2, "sql")]
+    (tmp_path / "0002_c.py").write_text("def upgrade(conn): pass")
+    with pytest.raises(ValueError):
+        discover_migrations(str(tmp_path))
+
+
+def test_transactional_migration_runs_inside_the_transaction(tmp_path):
+    migration = write_migration(tmp_path, "0001_tx.py", "def upgrade(conn):\n    conn.cursor().execute('CREATE TABLE t ()')\n")
+    conn = FakeConnection()
+    migrations._apply(conn, migration)
+    assert conn.log == [("CREATE", False), ("INSERT", False), ("COMMIT", False)]
+
+
+def test_non_transactional_migration_runs_in_autocommit(tmp_path):
+    migration = write_migration(tmp_path, "0001_idx.py", (
+        "TRANSACTIONAL = False\n"
+        "def upgrade(conn):\n    conn.cursor().execute('CREATE INDEX CONCURRENTLY i ON t (a)')\n"
+    ))
+    conn = FakeConnection()
+    migrations._apply(conn, migration)
+    assert conn.log == [("COMMIT", False), ("CREATE", True), ("INSERT", False), ("COMMIT", False)]
+    assert conn.autocommit is False
+
+
+def test_index_migration_builds_concurrently():
+    migration = next(m for m in discover_migrations() if m.version == 1)
+    module = load_migration_module(migration)
+    assert module.TRANSACTIONAL is False
+
+
+def test_applied_migrations_keep_their_own_sql():
+    """Las migraciones llevan su SQL congelado: 'exercises' solo lo añade la 0011."""
+    by_version = {m.version: load_migration_module(m) for m in discover_migrations() if m.kind == "py"}
+    assert not re.search(r"\bexercises\b", by_version[7].CREATE_DAILY_ACTIVITY_SQL)
+    assert not re.search(r"\bexercises\b", by_version[7].REBUILD_ALL_DAILY_ACTIVITY_SQL)
+    assert "ADD COLUMN IF NOT EXISTS exercises" in by_version[11].ADD_EXERCISES_COLUMN_SQL
+
+
+class ScriptedCursor(FakeCursor):
+    """Cursor falso que devuelve las filas indicadas, una por cada execute."""
+
+    def __init__(self, conn, rows):
+        super().__init__(conn)
+        self.rows = rows
+
+    def fetchone(self):
+        return self.rows.pop(0)
+
+
+@pytest.mark.parametrize("row_count, expected_calls", [(10, 1), (10_001, 0)])
+def test_partition_migration_converts_inline_only_small_tables(monkeypatch, row_count, expected_calls):
+    module = load_migration_module(next(m for m in discover_migrations() if m.version == 2))
+    calls = []
+    monkeypatch.setattr(module, "convert_to_partitioned", calls.append)
+    monkeypatch.setattr("back_end.gym.services.partition_conversion.INLINE_MAX_ROWS", 10_000)
+    conn = FakeConnection()
+    # is_partitioned -> no; to_regclass('gym.ejercicios_new') -> no existe; filas (limitadas a max + 1)
+    rows = [(False,), (None,), (min(row_count, 10_001),)]
+    conn.cursor = lambda: ScriptedCursor(conn, rows)
+    module.upgrade(conn)
+    assert len(calls) == expected_calls
+
+
+@pytest.fixture
+def schema_at(monkeypatch):
+    """Hace que gym.schema_migrations (conexión falsa) tenga registradas las versiones dadas."""
+    def at(*applied):
+        @contextmanager
+        def fake_connection():
+            yield FakeConnection(applied)
+
+        monkeypatch.setattr(migrations, "get_db_connection", fake_connection)
+    return at
+
+
+def test_schema_guard(tmp_path, schema_at):
+    for name in ("0001_a.sql", "0002_b.py", "0003_c.sql"):
+        (tmp_path / name).write_text("SELECT 1;")
+    schema_at(1, 2, 3)
+    assert_schema_current(str(tmp_path))
+    schema_at(1)
+    with pytest.raises(SchemaOutOfDateError, match="0002_b, 0003_c"):
+        assert_schema_current(str(tmp_path))
+
+
+def failing_migrations():
+    raise RuntimeError("la migración falló")
+
+
+@pytest.mark.parametrize("auto_migrate", [False, True])
+def test_app_does_not_start_with_pending_migrations(monkeypatch, schema_at, auto_migrate):
+    """Sin AUTO_MIGRATE, o si las migraciones fallan (se loguea), el arranque se aborta."""
+    from back_end.gym import app_fastapi
+
+    async def no_async_pool():
+        return None
+
+    started = []
+    monkeypatch.setattr(app_fastapi, "get_pool", lambda: None)
+    monkeypatch.setattr(app_fastapi, "open_async_pool", no_async_pool)
+    monkeypatch.setattr(app_fastapi, "AUTO_MIGRATE", auto_migrate)
+    monkeypatch.setattr(app_fastapi, "run_migrations", failing_migrations)
+    monkeypatch.setattr(app_fastapi, "start_scheduler", lambda: started.append("scheduler"))
+    schema_at(*(m.version for m in discover_migrations()[:-1]))
+    with pytest.raises(SchemaOutOfDateError):
+        with TestClient(app_fastapi.app):
+            pass
+    assert started == []
@@ -0,0 +1,265 @@
+# test_partitions.py
+"""
+Particiones mensuales de gym.ejercicios (user-006): services/partitions.py y la
+conversión reanudable de services/partition_conversion.py.
+
+Las pruebas sobre Postgres trabajan en una base de datos temporal con su propio
+esquema gym (la conversión renombra y borra gym.ejercicios); se omiten sin
+Postgres o sin permiso para crear bases de datos.
+"""
+import datetime
+import uuid
+from contextlib import contextmanager
+
+import psycopg2
+import pytest
+
+from back_end.gym.config import DB_CONFIG
+from back_end.gym.services import partition_conversion, partitions
+from back_end.gym.services.partition_conversion import convert_to_partitioned
+from back_end.gym.services.partitions import (add_months, create_month_partition,
+                                              ensure_future_partitions,
+                                              is_partitioned, month_start,
+                                              partition_name)
+
+
+@pytest.mark.parametrize("month, count, expected", [
+    (datetime.date(2024, 3, 1), 1, datetime.date(2024, 4, 1)),
+    (datetime.date(2024, 11, 1), 3, datetime.date(2025, 2, 1)),
+    (datetime.date(2024, 12, 1), 1, datetime.date(2025, 1, 1)),
+    (datetime.date(2024, 1, 1), -1, datetime.date(2023, 12, 1)),
+    (datetime.date(2024, 5, 1), 24, datetime.date(2026, 5, 1)),
+    (datetime.date(2024, 5, 1), 0, datetime.date(2024, 5, 1)),
+])
+def test_add_months(month, count, expected):
+    assert add_months(month, count) == expected
+
+
+def test_partition_name():
+    assert partition_name(datetime.date(2024, 3, 1)) == "ejercicios_p2024_03"
+    assert partition_name(datetime.date(987, 12, 1)) == "ejercicios_p0987_12"
+    assert partition_name(month_start(datetime.datetime(2025, 1, 31, 23, 59))) == "ejercicios_p2025_01"
+
+
+# Tablas de init-scripts/create-tables.sql que toca la conversión
+SCRATCH_SCHEMA_SQL = """
+    CREATE SCHEMA gym;
+    CREATE EXTENSION IF NOT EXISTS pg_trgm WITH SCHEMA public;
+    CREATE TABLE gym.users (id SERIAL PRIMARY KEY, google_id VARCHAR(255) UNIQUE);
+"""
+PLAIN_EJERCICIOS_SQL = """
+    CREATE TABLE gym.ejercicios (
+        id SERIAL PRIMARY KEY,
+        fecha TIMESTAMP WITH TIME ZONE,
+        ejercicio VARCHAR(255),
+        repeticiones JSONB,
+        duracion INTEGER,
+        user_id VARCHAR(255),
+        user_uuid INTEGER REFERENCES gym.users(id) ON DELETE SET NULL,
+        created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+PARTITIONED_EJERCICIOS_SQL = """
+    CREATE TABLE gym.ejercicios (
+        id SERIAL,
+        fecha TIMESTAMP WITH TIME ZONE NOT NULL,
+        ejercicio VARCHAR(255),
+        user_id VARCHAR(255),
+        PRIMARY KEY (id, fecha)
+    ) PARTITION BY RANGE (fecha);
+    CREATE TABLE gym.ejercicios_default PARTITION OF gym.ejercicios DEFAULT;
+"""
+
+
+@pytest.fixture
+def scratch_db(migrated_db):
+    """Conexión a una base de datos temporal con el esquema gym vacío (se borra al terminar)."""
+    name = f"gym_partitions_{uuid.uuid4().hex[:8]}"
+    admin = psycopg2.connect(**DB_CONFIG)
+    admin.autocommit = True
+    try:
+        with admin.cursor() as cur:
+            cur.execute(f"CREATE DATABASE {name}")
+    except psycopg2.Error as e:
+        admin.close()
+        pytest.skip(f"No se puede crear una base de datos temporal: {e}")
+    conn = psycopg2.connect(**{**DB_CONFIG, "dbname": name})
+    try:
+        with conn.cursor() as cur:
+            cur.execute(SCRATCH_SCHEMA_SQL)
+        conn.commit()
+        yield conn
+    finally:
+        conn.close()
+        with admin.cursor() as cur:
+            cur.execute(f"DROP DATABASE {name}")
+        admin.close()
+
+
+def connection_to(conn):
+    """Sustituto de get_db_connection que devuelve siempre 'conn'."""
+    @contextmanager
+    def connection():
+        yield conn
+    return connection
+
+
+def fetch_all(conn, query, params=None):
+    with conn.cursor() as cur:
+        cur.execute(query, params)
+        rows = cur.fetchall()
+    conn.commit()
+    return rows
+
+
+PARTITION_OF_ROWS_SQL = """
+    SELECT e.ejercicio, c.relname FROM gym.ejercicios e JOIN pg_class c ON c.oid = e.tableoid
+    ORDER BY e.ejercicio
+"""
+
+
+def utc(*args):
+    return datetime.datetime(*args, tzinfo=datetime.timezone.utc)
+
+
+class TestCreateMonthPartition:
+    @pytest.fixture
+    def partitioned(self, scratch_db):
+        with scratch_db.cursor() as cur:
+            cur.execute(PARTITIONED_EJERCICIOS_SQL)
+            cur.execute(
+                "INSERT INTO gym.ejercicios (fecha, ejercicio) VALUES (%s, 'a'), (%s, 'b'), (%s, 'c')",
+                (utc(1990, 3, 2), utc(1990, 3, 20), utc(1990, 4, 15)),
+            )
+        scratch_db.commit()
+        return scratch_db
+
+    def test_moves_the_rows_out_of_default_then_attaches(self, partitioned):
+        with partitioned.cursor() as cur:
+            assert create_month_partition(cur, datetime.date(1990, 3, 1)) is True
+            assert create_month_partition(cur, datetime.date(1990, 3, 1)) is False
+        partitioned.commit()
+        # Adjunta: las filas se leen desde la tabla padre, cada una en su partición
+        assert fetch_all(partitioned, PARTITION_OF_ROWS_SQL) == [
+            ("a", "ejercicios_p1990_03"), ("b", "ejercicios_p1990_03"), ("c", "ejercicios_default")]
+        assert fetch_all(partitioned, "SELECT relispartition FROM pg_class "
+                                      "WHERE oid = 'gym.ejercicios_p1990_03'::regclass") == [(True,)]
+
+    def test_month_without_rows_in_default(self, partitioned):
+        with partitioned.cursor() as cur:
+            assert create_month_partition(cur, datetime.date(1990, 5, 1)) is True
+        partitioned.commit()
+        assert fetch_all(partitioned, "SELECT COUNT(*) FROM gym.ejercicios_p1990_05") == [(0,)]
+        assert fetch_all(partitioned, "SELECT COUNT(*) FROM gym.ejercicios_default") == [(3,)]
+
+    def test_future_partitions(self, partitioned, monkeypatch):
+        monkeypatch.setattr(partitions, "get_db_connection", connection_to(partitioned))
+        current = month_start(datetime.date.today())
+        expected = [partition_name(add_months(current, i)) for i in range(3)]
+        assert ensure_future_partitions(months_ahead=2) == expected
+        assert ensure_future_partitions(months_ahead=2) == []
+
+
+def test_future_partitions_skip_a_table_not_partitioned(scratch_db, monkeypatch):
+    with scratch_db.cursor() as cur:
+        cur.execute(PLAIN_EJERCICIOS_SQL)
+    scratch_db.commit()
+    monkeypatch.setattr(partitions, "get_db_connection", connection_to(scratch_db))
+    assert ensure_future_partitions(months_ahead=2) == []
+    assert fetch_all(scratch_db, "SELECT relname FROM pg_class WHERE relname LIKE 'ejercicios_p%'") == []
+
+
+class Interrupted(Exception):
+    pass
+
+
+class InterruptAtCommit:
+    """Conexión que falla una vez en el commit número 'at' (el proceso se corta ahí)."""
+
+    def __init__(self, conn, at):
+        self.conn = conn
+        self.commits = 0
+        self.at = at
+
+    def commit(self):
+        self.commits += 1
+        if self.commits == self.at:
+            raise Interrupted()
+        self.conn.commit()
+
+    def __getattr__(self, name):
+        return getattr(self.conn, name)
+
+
+@pytest.fixture
+def half_converted(scratch_db, monkeypatch):
+    """
+    gym.ejercicios sin particionar con 8 filas y una conversión cortada a mitad
+    de la copia: lotes de 3 filas, el segundo lote no llega a hacer commit.
+    """
+    monkeypatch.setattr(partition_conversion, "COPY_BATCH_SIZE", 3)
+    with scratch_db.cursor() as cur:
+        cur.execute(PLAIN_EJERCICIOS_SQL)
+        cur.execute("INSERT INTO gym.users (google_id) VALUES ('g1') RETURNING id")
+        user_uuid = cur.fetchone()[0]
+        for i in range(8):
+            # La fila 4 no tiene fecha (toma created_at); el resto, una por mes desde 2023
+            fecha = None if i == 3 else utc(2023, 1 + i, 10)
+            cur.execute("INSERT INTO gym.ejercicios (fecha, ejercicio, user_id, user_uuid) VALUES (%s, %s, 'g1', %s)",
+                        (fecha, f"ejercicio {i + 1}", user_uuid))
+    scratch_db.commit()
+
+    # Commits: 1 preparación, 2 lectura del último id copiado, 3 primer lote, 4 segundo lote
+    with pytest.raises(Interrupted):
+        convert_to_partitioned(InterruptAtCommit(scratch_db, at=4))
+    assert fetch_all(scratch_db, "SELECT id FROM gym.ejercicios_new ORDER BY id") == [(1,), (2,), (3,)]
+    return scratch_db
+
+
+def test_interrupted_conversion_resumes(half_converted):
+    conn = half_converted
+    # Escrituras en la tabla vieja entre los dos intentos: las apunta el trigger
+    with conn.cursor() as cur:
+        cur.execute("UPDATE gym.ejercicios SET ejercicio = 'cambiado' WHERE id = 1")
+        cur.execute("DELETE FROM gym.ejercicios WHERE id = 2")
+        cur.execute("INSERT INTO gym.ejercicios (fecha, ejercicio, user_id) VALUES (%s, 'nuevo', 'g1')",
+                    (utc(2023, 2, 15),))
+    conn.commit()
+    assert fetch_all(conn, "SELECT id FROM gym.ejercicios_migration_changes ORDER BY id") == [(1,), (2,), (9,)]
+
+    assert convert_to_partitioned(conn) is True
+
+    with conn.cursor() as cur:
+        assert is_partitioned(cur)
+    assert fetch_all(conn, "SELECT id, ejercicio FROM gym.ejercicios ORDER BY id") == [
+        (1, "cambiado"), (3, "ejercicio 3"), (4, "ejercicio 4"), (5, "ejercicio 5"), (6, "ejercicio 6"),
+        (7, "ejercicio 7"), (8, "ejercicio 8"), (9, "nuevo")]
+    assert fetch_all(conn, "SELECT fecha = created_at FROM gym.ejercicios WHERE id = 4") == [(True,)]
+    assert fetch_all(conn, """
+        SELECT to_regclass('gym.ejercicios_new'), to_regclass('gym.ejercicios_migration_changes'),
+               to_regclass('gym.ejercicios_pkey') IS NOT NULL, to_regclass('gym.idx_ejercicios_user_fecha') IS NOT NULL
+    """) == [(None, None, True, True)]
+    # Las filas de 2023 están en su partición mensual, no en DEFAULT
+    assert ("nuevo", "ejercicios_p2023_02") in fetch_all(conn, PARTITION_OF_ROWS_SQL)
+    # La secuencia pasó a la tabla nueva
+    assert fetch_all(conn, "INSERT INTO gym.ejercicios (ejercicio) VALUES ('tras el cambio') RETURNING id") == [(10,)]
+
+    assert convert_to_partitioned(conn) is False
+
+
+def test_row_count_is_checked_before_the_swap(half_converted):
+    conn = half_converted
+    # Un borrado que el trigger no apunta: la fila ya copiada sobra en la tabla nueva
+    with conn.cursor() as cur:
+        cur.execute("ALTER TABLE gym.ejercicios DISABLE TRIGGER ejercicios_migration_changes")
+        cur.execute("DELETE FROM gym.ejercicios WHERE id = 1")
+    conn.commit()
+
+    with pytest.raises(RuntimeError, match="Recuento distinto"):
+        convert_to_partitioned(conn)
+
+    # El intercambio no se hizo: la tabla vieja sigue en uso y la copia queda para reintentar
+    with conn.cursor() as cur:
+        assert not is_partitioned(cur)
+    assert fetch_all(conn, "SELECT COUNT(*) FROM gym.ejercicios") == [(7,)]
+    assert fetch_all(conn, "SELECT to_regclass('gym.ejercicios_new') IS NOT NULL") == [(True,)]
@@ -0,0 +1,156 @@
+# test_personal_records.py
+"""
+Récords personales (user-025): /api/records, la lista 'nuevos_records' de
+/api/log-exercise y gym.personal_records mantenida en la misma sentencia que
+inserta. Las rutas usan lecturas sustituidas; la prueba sobre la BD necesita
+Postgres (se omite sin él).
+"""
+import datetime
+import threading
+
+import psycopg2
+import pytest
+
+from back_end.gym.config import DB_CONFIG
+from back_end.gym.routes import dashboard as d
+from back_end.gym.routes import main
+from back_end.gym.services import database
+from back_end.gym.services.personal_records import REP_RANGES, rows_to_records
+
+FECHA = datetime.datetime(2024, 5, 1, 10, 0, tzinfo=datetime.timezone.utc)
+RECORD_ROWS = [
+    ("press banca", "e1rm", 0, 116.67, FECHA),
+    ("press banca", "volume", 0, 2400.0, FECHA),
+    ("press banca", "weight", 1, 100.0, FECHA),
+    ("press banca", "weight", 5, 100.0, FECHA),
+]
+
+
+def test_rows_to_records():
+    records = rows_to_records(RECORD_ROWS)
+    assert [r["reps"] for r in records] == [None, None, 1, 5]
+    assert records[0] == {"ejercicio": "press banca", "metric": "e1rm", "reps": None, "value": 116.67, "fecha": FECHA}
+
+
+@pytest.fixture
+def records_reads(monkeypatch):
+    """Sustituye la lectura de gym.personal_records y la versión de datos (modificable)."""
+    state = {"version": 1, "queries": []}
+
+    async def fake_fetch_all(query, params):
+        assert query == d.USER_RECORDS_SQL
+        state["queries"].append(params)
+        return RECORD_ROWS
+
+    async def fake_data_version(user_id):
+        return state["version"]
+
+    monkeypatch.setattr(d, "async_fetch_all", fake_fetch_all)
+    monkeypatch.setattr(d, "get_data_version", fake_data_version)
+    d.DASHBOARD_CACHE.clear()
+    yield state
+    d.DASHBOARD_CACHE.clear()
+
+
+class TestRecordsEndpoint:
+    def test_records(self, api_client, records_reads):
+        body = api_client.get("/api/records", params={"ejercicio": "press"}).json()
+        assert body["success"] and body["filtro_ejercicio"] == "press"
+        assert [(r["metric"], r["reps"], r["value"]) for r in body["records"]] == [
+            ("e1rm", None, 116.67), ("volume", None, 2400.0), ("weight", 1, 100.0), ("weight", 5, 100.0)]
+        assert records_reads["queries"] == [("g1", "%press%")]
+
+    def test_without_filter_every_exercise(self, api_client, records_reads):
+        api_client.get("/api/records")
+        assert records_reads["queries"] == [("g1", "%")]
+
+    def test_etag_until_the_data_changes(self, api_client, records_reads):
+        first = api_client.get("/api/records")
+        etag = first.headers["etag"]
+        assert api_client.get("/api/records", headers={"If-None-Match": etag}).status_code == 304
+        assert api_client.get("/api/records").content == first.content
+        assert len(records_reads["queries"]) == 1  # El segundo 200 sale de la caché
+
+        records_reads["version"] += 1  # Una escritura del usuario
+        changed = api_client.get("/api/records", headers={"If-None-Match": etag})
+        assert changed.status_code == 200 and changed.headers["etag"] != etag
+        assert len(records_reads["queries"]) == 2
+
+
+NUEVOS = [{"ejercicio": "press banca", "metric": "weight", "reps": 5, "value": 102.5, "previous": 100.0,
+           "fecha": "2024-05-01T10:00:00+00:00"}]
+
+
+@pytest.fixture
+def logged(monkeypatch):
+    """Sustituye la IA y la inserción de /api/log-exercise; devuelve las inserciones hechas."""
+    calls = []
+
+    async def fake_insert_into_db(json_data, user_id, with_records=False):
+        calls.append((json_data, user_id, with_records))
+        return NUEVOS
+
+    monkeypatch.setattr(main, "format_for_postgres", lambda text: {"registro": [{"ejercicio": "press banca"}]})
+    monkeypatch.setattr(main, "insert_into_db", fake_insert_into_db)
+    return calls
+
+
+def test_log_exercise_returns_the_new_records(api_client, logged):
+    response = api_client.post("/api/log-exercise", json={"exercise_data": "press banca 5x102.5"})
+    assert response.status_code == 200
+    assert response.json()["nuevos_records"] == NUEVOS
+    assert logged[0][1:] == ("g1", True)
+
+
+def session(fecha, series):
+    return {"fecha": fecha, "registro": [{"ejercicio": "press banca", "series": series}]}
+
+
+def test_insert_returns_only_the_records_it_beats(db_user_id):
+    first = database.insert_into_db(session("2024-05-01T10:00:00", [{"repeticiones": 5, "peso": 100}]),
+                                    db_user_id, with_records=True)
+    assert {(r["metric"], r["reps"]) for r in first} == {("e1rm", None), ("volume", None)} | {
+        ("weight", reps) for reps in REP_RANGES if reps <= 5}
+    assert all(r["previous"] is None for r in first)
+
+    # Más peso a 3 reps: bate weight@1, weight@3 y el e1RM (116.5 > 112.5), no weight@5 ni el volumen
+    second = database.insert_into_db(session("2024-05-02T10:00:00", [{"repeticiones": 3, "peso": 110}]),
+                                     db_user_id, with_records=True)
+    assert {(r["metric"], r["reps"], r["previous"]) for r in second} == {
+        ("weight", 1, 100), ("weight", 3, 100), ("e1rm", None, first[0]["value"])}
+
+    # Sin mejora: ningún récord nuevo
+    assert database.insert_into_db(session("2024-05-03T10:00:00", [{"repeticiones": 2, "peso": 60}]),
+                                   db_user_id, with_records=True) == []
+
+
+def test_records_raised_concurrently_are_not_reported(db_user_id):
+    """
+    El segundo INSERT calcula sus candidatos sin ver el récord del primero (sin
+    commit); al confirmarse, el upsert no los escribe y tampoco se informan.
+    """
+    first = psycopg2.connect(**DB_CONFIG)
+    second = psycopg2.connect(**DB_CONFIG)
+    reported = []
+    try:
+        with first.cursor() as cur:
+            database._insert_rows(cur, database.build_exercise_rows(
+                session("2024-05-01T10:00:00", [{"repeticiones": 5, "peso": 110}]), db_user_id))
+
+        def insert_second():
+            with second.cursor() as cur:
+                reported.append(database._insert_rows(cur, database.build_exercise_rows(
+                    session("2024-05-02T10:00:00", [{"repeticiones": 5, "peso": 105}]), db_user_id))[1])
+            second.commit()
+
+        worker = threading.Thread(target=insert_second)
+        worker.start()
+        worker.join(0.5)
+        assert worker.is_alive(), "El segundo upsert debe esperar a los récords del primero"
+        first.commit()
+        worker.join(10)
+        assert not worker.is_alive()
+    finally:
+        first.close()
+        second.close()
+    assert reported == [[]]
@@ -0,0 +1,16 @@
+# test_query_plans.py
+"""
+Las consultas calientes (services/query_plans.hot_queries) usan los índices
+esperados según EXPLAIN.
+
+Necesita un Postgres accesible con DB_CONFIG y el esquema migrado; si no, se omite.
+"""
+import pytest
+
+from back_end.gym.services.query_plans import check_index_usage, hot_queries
+
+
+@pytest.mark.parametrize("query", hot_queries(), ids=lambda query: query.name)
+def test_hot_query_uses_index(migrated_db, query):
+    [result] = check_index_usage([query])
+    assert result["ok"], f"{query.name} usa {result['used'] or 'ningún índice'}, se esperaba uno de {result['expected']}"
@@ -0,0 +1,77 @@
+# test_rollups.py
+"""
+Rollups por (usuario, ejercicio) de services/rollups.py: combinación en el
+'resumen' del dashboard y, con Postgres, mantenimiento incremental en los
+INSERT y comprobador de consistencia.
+"""
+import datetime
+
+from back_end.gym.services import database
+from back_end.gym.services.db_pool import get_db_connection
+from back_end.gym.services.rollups import (ROLLUP_COLUMNS, ROLLUPS_FOR_FILTER_SQL,
+                                           check_rollups, summary_from_rollups)
+
+UTC = datetime.timezone.utc
+
+
+def rollup(total, max_peso, volumen, reps, e1rm, first, first_peso, last, last_peso):
+    return (total, max_peso, volumen, reps, e1rm,
+            datetime.datetime(*first, tzinfo=UTC), first_peso, datetime.datetime(*last, tzinfo=UTC), last_peso)
+
+
+class TestSummaryFromRollups:
+    def test_no_rollups(self):
+        assert summary_from_rollups([]) == {"total_sesiones": 0, "max_e1rm_ever": 0, "progress_percent": 0}
+
+    def test_single_exercise(self):
+        summary = summary_from_rollups([rollup(4, 110, 2400, 30, 128.3, (2024, 1, 1), 100, (2024, 3, 1), 110)])
+        assert summary == {"total_sesiones": 4, "max_weight_ever": 110, "max_volume_session": 2400,
+                           "max_reps_session": 30, "max_e1rm_ever": 128.3, "progress_percent": 10.0}
+
+    def test_several_exercises_use_the_overall_first_and_last_session(self):
+        rows = [
+            rollup(2, 60, 900, 24, 70, (2024, 2, 1), 50, (2024, 4, 1), 60),
+            rollup(3, 100, 2000, 15, 120, (2024, 1, 1), 80, (2024, 3, 1), 100),
+        ]
+        summary = summary_from_rollups(rows)
+        assert summary["total_sesiones"] == 5
+        assert summary["max_weight_ever"] == 100 and summary["max_reps_session"] == 24
+        assert summary["progress_percent"] == -25.0  # 80 (1 ene) -> 60 (1 abr)
+
+    def test_one_session_has_no_progress(self):
+        assert summary_from_rollups([rollup(1, 80, 800, 10, 90, (2024, 1, 1), 80, (2024, 1, 1), 80)])["progress_percent"] == 0
+
+
+def session(fecha, *series):
+    return {"fecha": fecha, "registro": [
+        {"ejercicio": "press banca", "series": [{"repeticiones": r, "peso": p} for r, p in series]}]}
+
+
+def read_rollup(user_id):
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(ROLLUPS_FOR_FILTER_SQL, (user_id, "press banca"))
+            return [dict(zip(ROLLUP_COLUMNS, row)) for row in cur.fetchall()]
+
+
+def test_inserts_keep_the_rollup_equal_to_the_history(db_user_id):
+    # La sesión más antigua llega la última: first_* debe moverse, last_* no
+    for fecha, series in [("2024-03-01T10:00:00", [(5, 100)]), ("2024-04-01T10:00:00", [(5, 110), (3, 120)]),
+                          ("2024-01-01T10:00:00", [(8, 80)])]:
+        assert database.insert_into_db(session(fecha, *series), db_user_id)
+    [row] = read_rollup(db_user_id)
+    assert row["total_sesiones"] == 3
+    assert (row["first_max_peso"], row["last_max_peso"], row["max_weight_ever"]) == (80, 120, 120)
+    assert check_rollups(db_user_id) == []
+
+
+def test_checker_reports_and_repairs_a_stale_rollup(db_user_id):
+    assert database.insert_into_db(session("2024-03-01T10:00:00", (5, 100)), db_user_id)
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("UPDATE gym.exercise_rollups SET total_sesiones = 99 WHERE user_id = %s", (db_user_id,))
+        conn.commit()
+    assert check_rollups(db_user_id) == ["press banca"]
+    assert check_rollups(db_user_id, repair=True) == ["press banca"]
+    assert check_rollups(db_user_id) == []
+    assert read_rollup(db_user_id)[0]["total_sesiones"] == 1
@@ -0,0 +1,314 @@
+# test_stats_engines.py
+"""
+Paridad de los motores de /api/ejercicios_stats (STATS_ENGINE), de
+gym.ejercicio_sets y de los récords personales con la versión Python de
+referencia (session_metrics.compute_session_metrics), también a través de la
+ruta con las lecturas de la BD sustituidas.
+
+Los tests de SQL necesitan un Postgres accesible con DB_CONFIG; si no lo hay se omiten.
+"""
+import json
+import random
+import datetime
+
+import numpy as np
+import psycopg2
+import pytest
+from psycopg2.extras import Json, execute_values
+
+from back_end.gym.config import DB_CONFIG
+from back_end.gym.services.database import SESSION_AGGREGATE_SQL
+from back_end.gym.services.exercise_sets import (CREATE_EXERCISE_SETS_SQL,
+                                                 SETS_FROM_EXERCISES_SQL)
+from back_end.gym.services.metrics_engine import compute_metrics_batch, round2
+from back_end.gym.services.personal_records import (
+    CREATE_PERSONAL_RECORDS_SQL, REBUILD_ALL_RECORDS_SQL, REP_RANGES)
+from back_end.gym.services.session_metrics import (SET_REPS_SQL,
+                                                   SET_WEIGHT_SQL,
+                                                   compute_session_metrics,
+                                                   metrics_from_aggregates)
+
+EDGE_SESSIONS = [
+    [],
+    None,
+    "{no es json",
+    [{"repeticiones": 1, "peso": 100.123}],                     # 1 rep: e1RM = peso sin redondear
+    [{"repeticiones": 16, "peso": 100}],                        # > 15 reps: sin e1RM
+    [{"repeticiones": 12, "peso": 0.001}],                      # e1RM redondea a 0.0
+    [{"repeticiones": 0, "peso": 50}, {"repeticiones": 5, "peso": 0}],
+    [{"repeticiones": 8.7, "peso": 60}],                        # int(8.7) == 8
+    [{"repeticiones": "8", "peso": "60.5"}],                    # strings numéricos
+    [{"repeticiones": "8.5", "peso": 60}],                      # int("8.5") falla
+    [{"repeticiones": None, "peso": 60}, {"repeticiones": 5, "peso": "abc"}],
+    [{"repeticiones": True, "peso": 40}],
+    [{"peso": 40}, "no es un dict", {"repeticiones": 5, "peso": 2.675}],
+    [{"repeticiones": 3, "peso": 0.125}, {"repeticiones": 2, "peso": 1.005}],
+]
+
+
+def make_sessions(count, seed=7):
+    """Sesiones aleatorias (mayoría válidas, con valores raros intercalados)."""
+    rng = random.Random(seed)
+    odd_reps = [0, -1, 8.7, "8", "8.5", "x", None, True, 16, 20]
+    odd_pesos = [0, -5, "60", "abc", None, 57.123, 1e-3]
+    sessions = []
+    for _ in range(count):
+        sessions.append([
+            {"repeticiones": rng.choice(odd_reps) if rng.random() < 0.2 else rng.randint(1, 15),
+             "peso": rng.choice(odd_pesos) if rng.random() < 0.2 else round(rng.uniform(1, 200), rng.choice((0, 1, 2, 3)))}
+            for _ in range(rng.randint(0, 6))
+        ])
+    return sessions
+
+
+def sql_aggregates(series):
+    """Lo que devuelve SESSION_AGGREGATE_SQL para una sesión, calculado en Python."""
+    if isinstance(series, str):
+        try:
+            series = json.loads(series)
+        except json.JSONDecodeError:
+            return 0, None, None, None, None, None
+    valid = []
+    for serie in series if isinstance(series, list) else []:
+        if isinstance(serie, dict) and "repeticiones" in serie and "peso" in serie:
+            try:
+                reps, peso = int(serie["repeticiones"]), float(serie["peso"])
+            except (TypeError, ValueError):
+                continue
+            if reps > 0 and peso > 0:
+                valid.append((reps, peso))
+    if not valid:
+        return 0, None, None, None, None, None
+    singles = [peso for reps, peso in valid if reps == 1]
+    multis = [peso / (1.0278 - 0.0278 * reps) for reps, peso in valid if 1 < reps <= 15]
+    return (len(valid), max(peso for _, peso in valid), float(sum(reps for reps, _ in valid)),
+            sum(reps * peso for reps, peso in valid), max(singles, default=None), max(multis, default=None))
+
+
+def assert_identical(expected, actual):
+    """Mismos valores y mismos tipos (0 frente a 0.0 cambia el JSON)."""
+    assert len(expected) == len(actual)
+    for index, (exp, act) in enumerate(zip(expected, actual)):
+        assert exp == act, f"sesión {index}: {exp} != {act}"
+        assert [type(v) for v in exp] == [type(v) for v in act], f"sesión {index}: tipos {exp} != {act}"
+
+
+class TestNumpyEngine:
+    def test_edge_cases(self):
+        assert_identical([compute_session_metrics(s) for s in EDGE_SESSIONS], compute_metrics_batch(EDGE_SESSIONS))
+
+    def test_random_sessions(self):
+        sessions = make_sessions(5000)
+        assert_identical([compute_session_metrics(s) for s in sessions], compute_metrics_batch(sessions))
+
+    def test_json_strings(self):
+        sessions = [json.dumps(s) for s in make_sessions(500)]
+        assert_identical([compute_session_metrics(s) for s in sessions], compute_metrics_batch(sessions))
+
+    def test_empty_batch(self):
+        assert compute_metrics_batch([]) == []
+
+    def test_round2_matches_round(self):
+        rng = random.Random(3)
+        values = [rng.uniform(0, 1000) for _ in range(20000)] + [k * 0.005 for k in range(20000)] + [2.675, 1.005, 0.125]
+        assert round2(np.array(values)).tolist() == [round(v, 2) for v in values]
+
+
+class TestMetricsFromAggregates:
+    def test_edge_cases(self):
+        expected = [compute_session_metrics(s) for s in EDGE_SESSIONS]
+        assert_identical(expected, [metrics_from_aggregates(*sql_aggregates(s)) for s in EDGE_SESSIONS])
+
+    def test_random_sessions(self):
+        sessions = make_sessions(2000)
+        expected = [compute_session_metrics(s) for s in sessions]
+        assert_identical(expected, [metrics_from_aggregates(*sql_aggregates(s)) for s in sessions])
+
+
+@pytest.fixture(scope="module")
+def pg_conn():
+    try:
+        conn = psycopg2.connect(**DB_CONFIG, connect_timeout=3)
+    except Exception as e:
+        pytest.skip(f"Postgres no disponible: {e}")
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def temp_ejercicios(pg_conn):
+    """Tabla temporal con las columnas que usa SESSION_AGGREGATE_SQL (se borra al hacer rollback)."""
+    with pg_conn.cursor() as cur:
+        cur.execute("""
+            CREATE TEMP TABLE ejercicios (
+                id SERIAL, fecha TIMESTAMPTZ NOT NULL, ejercicio TEXT, user_id TEXT, repeticiones JSONB
+            ) ON COMMIT DROP
+        """)
+    yield pg_conn
+    pg_conn.rollback()
+
+
+def run_sql_engine(conn, sessions):
+    """Inserta las sesiones (en orden de fecha) y devuelve las métricas del motor SQL."""
+    start = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+    rows = [(start + datetime.timedelta(hours=i), "press banca", "parity", Json(s)) for i, s in enumerate(sessions)]
+    query = SESSION_AGGREGATE_SQL.replace("gym.ejercicios", "pg_temp.ejercicios").format(where_clause="user_id = %s")
+    with conn.cursor() as cur:
+        execute_values(cur, "INSERT INTO pg_temp.ejercicios (fecha, ejercicio, user_id, repeticiones) VALUES %s", rows)
+        cur.execute(query, ("parity",))
+        return [metrics_from_aggregates(*row[2:]) for row in cur.fetchall()]
+
+
+class TestSqlEngine:
+    # Series que SESSION_SERIES_SQL/SESSION_AGGREGATE_SQL reciben de un JSONB (sin strings JSON crudos ni NULL)
+    SESSIONS = [s for s in EDGE_SESSIONS if isinstance(s, list)]
+
+    def test_edge_cases(self, temp_ejercicios):
+        assert_identical([compute_session_metrics(s) for s in self.SESSIONS], run_sql_engine(temp_ejercicios, self.SESSIONS))
+
+    def test_random_sessions(self, temp_ejercicios):
+        sessions = make_sessions(3000)
+        assert_identical([compute_session_metrics(s) for s in sessions], run_sql_engine(temp_ejercicios, sessions))
+
+
+class TestSharedSetConversion:
+    """Una sola conversión de series en SQL: la del motor SQL y la de gym.ejercicio_sets."""
+
+    def test_same_fragment(self):
+        for sql in (SESSION_AGGREGATE_SQL, SETS_FROM_EXERCISES_SQL):
+            assert SET_REPS_SQL in sql and SET_WEIGHT_SQL in sql
+
+
+def to_temp(sql):
+    """Apunta el SQL de producción a tablas temporales con el mismo nombre."""
+    for table in ("ejercicios", "ejercicio_sets", "personal_records"):
+        sql = sql.replace(f"gym.{table}", f"pg_temp.{table}")
+    return sql
+
+
+@pytest.fixture
+def temp_history(pg_conn):
+    """Tablas temporales ejercicios (con métricas), ejercicio_sets y personal_records."""
+    with pg_conn.cursor() as cur:
+        cur.execute("""
+            CREATE TEMP TABLE ejercicios (
+                id SERIAL, fecha TIMESTAMPTZ NOT NULL, ejercicio TEXT, user_id TEXT, repeticiones JSONB,
+                series_validas SMALLINT, max_peso DOUBLE PRECISION, avg_peso DOUBLE PRECISION,
+                total_reps INTEGER, volumen DOUBLE PRECISION, max_e1rm DOUBLE PRECISION
+            ) ON COMMIT DROP
+        """)
+        for ddl in (CREATE_EXERCISE_SETS_SQL, CREATE_PERSONAL_RECORDS_SQL):
+            cur.execute(to_temp(ddl).replace("CREATE TABLE IF NOT EXISTS", "CREATE TEMP TABLE") + " ON COMMIT DROP")
+    yield pg_conn
+    pg_conn.rollback()
+
+
+def load_history(conn, sessions):
+    """Inserta las sesiones con sus métricas de Python y sus series; devuelve los ids en orden."""
+    start = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+    rows = [(start + datetime.timedelta(hours=i), "press banca", "parity", Json(s)) + tuple(compute_session_metrics(s))
+            for i, s in enumerate(sessions)]
+    with conn.cursor() as cur:
+        ids = execute_values(cur, """
+            INSERT INTO pg_temp.ejercicios (fecha, ejercicio, user_id, repeticiones, series_validas,
+                                            max_peso, avg_peso, total_reps, volumen, max_e1rm)
+            VALUES %s RETURNING id
+        """, rows, fetch=True)
+        cur.execute(to_temp(SETS_FROM_EXERCISES_SQL).format(source="pg_temp.ejercicios"))
+    return [row[0] for row in ids]
+
+
+def python_sets(series):
+    """(reps, peso) de las series válidas según compute_session_metrics."""
+    valid = []
+    for serie in series:
+        metrics = compute_session_metrics([serie])
+        if metrics.series_validas:
+            valid.append((metrics.total_reps, metrics.max_peso))
+    return valid
+
+
+class TestExerciseSets:
+    SESSIONS = TestSqlEngine.SESSIONS
+
+    def check(self, conn, sessions):
+        ids = load_history(conn, sessions)
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT ejercicio_id, COUNT(*), MAX(weight) FROM pg_temp.ejercicio_sets
+                WHERE reps > 0 AND weight > 0 GROUP BY ejercicio_id
+            """)
+            by_id = {row[0]: row[1:] for row in cur.fetchall()}
+        for index, (row_id, series) in enumerate(zip(ids, sessions)):
+            metrics = compute_session_metrics(series)
+            assert by_id.get(row_id, (0, None)) == (metrics.series_validas, metrics.max_peso), f"sesión {index}: {series}"
+
+    def test_edge_cases(self, temp_history):
+        self.check(temp_history, self.SESSIONS)
+
+    def test_random_sessions(self, temp_history):
+        self.check(temp_history, make_sessions(3000))
+
+
+class TestPersonalRecords:
+    def test_records_match_session_metrics(self, temp_history):
+        sessions = TestSqlEngine.SESSIONS + make_sessions(2000)
+        load_history(temp_history, sessions)
+        with temp_history.cursor() as cur:
+            cur.execute(to_temp(REBUILD_ALL_RECORDS_SQL))
+            cur.execute("SELECT metric, reps, value FROM pg_temp.personal_records WHERE user_id = 'parity'")
+            records = {(metric, reps): value for metric, reps, value in cur.fetchall()}
+
+        metrics = [compute_session_metrics(s) for s in sessions]
+        assert records[("weight", 1)] == max(m.max_peso for m in metrics if m.series_validas)
+        assert records[("e1rm", 0)] == max(m.max_e1rm for m in metrics if m.max_e1rm)
+        assert records[("volume", 0)] == max(m.volumen for m in metrics if m.volumen)
+        valid_sets = [s for series in sessions for s in python_sets(series)]
+        for reps in REP_RANGES:
+            expected = max((peso for set_reps, peso in valid_sets if set_reps >= reps), default=None)
+            assert records.get(("weight", reps)) == expected, f"récord a {reps} reps"
+
+
+@pytest.fixture
+def stats_reads(monkeypatch):
+    """
+    Sustituye las lecturas de /api/ejercicios_stats: cada motor recibe las filas
+    que le devolvería su consulta para las mismas sesiones.
+    """
+    from back_end.gym.routes import dashboard as d
+    from back_end.gym.services.database import SESSION_SERIES_SQL, SESSION_STATS_SQL
+
+    sessions = TestSqlEngine.SESSIONS + make_sessions(200)
+    start = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+    fechas = [start + datetime.timedelta(days=i) for i in range(len(sessions))]
+    where_clause, _ = d._stats_filters("g1", "press banca", "2024-01-01", None)
+    rows_by_query = {
+        SESSION_STATS_SQL: [(f, "press banca") + tuple(compute_session_metrics(s)) for f, s in zip(fechas, sessions)],
+        SESSION_SERIES_SQL: [(f, "press banca", s) for f, s in zip(fechas, sessions)],
+        SESSION_AGGREGATE_SQL: [(f, "press banca") + sql_aggregates(s) for f, s in zip(fechas, sessions)],
+    }
+    rows_by_query = {sql.format(where_clause=where_clause): rows for sql, rows in rows_by_query.items()}
+
+    async def fake_fetch_all(query, params):
+        return rows_by_query.get(query, [("press banca",)])
+
+    async def fake_data_version(user_id):
+        return 0
+
+    monkeypatch.setattr(d, "async_fetch_all", fake_fetch_all)
+    monkeypatch.setattr(d, "get_data_version", fake_data_version)
+    d.DASHBOARD_CACHE.clear()
+    yield d
+    d.DASHBOARD_CACHE.clear()
+
+
+def test_stats_endpoint_is_identical_with_every_engine(api_client, stats_reads, monkeypatch):
+    bodies = {}
+    for engine in ("columns", "numpy", "sql"):
+        monkeypatch.setattr(stats_reads, "STATS_ENGINE", engine)
+        stats_reads.DASHBOARD_CACHE.clear()
+        response = api_client.get("/api/ejercicios_stats", params={"ejercicio": "press banca", "desde": "2024-01-01"})
+        assert response.status_code == 200
+        bodies[engine] = response.content
+    assert bodies["numpy"] == bodies["columns"] and bodies["sql"] == bodies["columns"]
+    assert json.loads(bodies["columns"])["resumen"]["total_sesiones"] > 0
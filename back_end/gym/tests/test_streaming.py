@@ -0,0 +1,142 @@
+# test_streaming.py
+"""
+Lecturas en streaming (user-010): codificación NDJSON/JSON incremental, cursor
+de servidor de services/async_db_pool.async_stream y /api/logs?stream=.
+Sin Postgres: la conexión y los logs se sustituyen.
+"""
+import asyncio
+import datetime
+import json
+from contextlib import contextmanager
+
+import pytest
+
+from back_end.gym.routes import main
+from back_end.gym.services import async_database, async_db_pool
+from back_end.gym.utils.streaming import (NDJSON_MEDIA_TYPE, json_array_stream,
+                                          ndjson_stream)
+
+LOGS = [{"fecha": f"2024-05-{day:02d}T10:00:00", "ejercicio": "press banca", "data": [{"repeticiones": 5}]}
+        for day in range(1, 4)]
+
+
+async def items(values, fail_after=None):
+    for index, value in enumerate(values):
+        if index == fail_after:
+            raise RuntimeError("conexión perdida")
+        yield value
+
+
+def collect(chunks):
+    async def run():
+        return [chunk async for chunk in chunks]
+    return asyncio.run(run())
+
+
+class TestEncoders:
+    def test_ndjson_one_object_per_line(self):
+        lines = collect(ndjson_stream(items(LOGS)))
+        assert [json.loads(line) for line in lines] == LOGS and all(line.endswith("\n") for line in lines)
+
+    def test_ndjson_error_line_after_a_failure(self):
+        lines = collect(ndjson_stream(items(LOGS, fail_after=2)))
+        assert [json.loads(line) for line in lines[:2]] == LOGS[:2]
+        assert "error" in json.loads(lines[2])
+
+    @pytest.mark.parametrize("values", [LOGS, []])
+    def test_json_array_is_a_valid_document(self, values):
+        body = "".join(collect(json_array_stream({"success": True}, "logs", items(values))))
+        assert json.loads(body) == {"success": True, "logs": values}
+
+    def test_json_array_closes_the_document_after_a_failure(self):
+        body = json.loads("".join(collect(json_array_stream({"success": True}, "logs", items(LOGS, fail_after=1)))))
+        assert body["logs"] == LOGS[:1] and "error" in body
+
+
+class FakeNamedCursor:
+    def __init__(self, conn, name):
+        self.conn, self.name, self.itersize = conn, name, None
+
+    def execute(self, query, params):
+        self.conn.executed = (query, params)
+
+    def __iter__(self):
+        self.conn.fetched_with_itersize = self.itersize
+        return iter(self.conn.rows)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class FakeConnection:
+    def __init__(self, rows):
+        self.rows, self.cursor_names, self.rolled_back = rows, [], False
+
+    def cursor(self, name=None):
+        self.cursor_names.append(name)
+        return FakeNamedCursor(self, name)
+
+    def rollback(self):
+        self.rolled_back = True
+
+
+def test_async_stream_uses_a_server_side_cursor(monkeypatch):
+    conn = FakeConnection([(i,) for i in range(5)])
+
+    @contextmanager
+    def fake_connection():
+        yield conn
+
+    monkeypatch.setattr(async_db_pool, "ASYNC_DB_AVAILABLE", False)
+    monkeypatch.setattr(async_db_pool, "get_db_connection", fake_connection)
+    rows = collect(async_db_pool.async_stream("SELECT %s", (1,), itersize=2))
+    assert rows == [(i,) for i in range(5)]
+    assert conn.cursor_names == ["gym_stream"] and conn.fetched_with_itersize == 2
+    assert conn.executed == ("SELECT %s", (1,)) and conn.rolled_back
+
+
+def test_stream_exercise_logs_builds_the_filtered_query(monkeypatch):
+    seen = {}
+
+    async def fake_stream(query, params):
+        seen["query"], seen["params"] = query, params
+        yield (datetime.datetime(2024, 5, 1), "press banca", [{"repeticiones": 5}], None)
+        yield (datetime.datetime(2024, 5, 2), "correr", None, 30)
+
+    monkeypatch.setattr(async_database, "async_stream", fake_stream)
+    logs = collect(async_database.stream_exercise_logs("g1", days=7, ejercicio="press"))
+    assert [log["data"] for log in logs] == [[{"repeticiones": 5}], 30]
+    assert "ejercicio ILIKE %s" in seen["query"] and "fecha >= %s" in seen["query"]
+    assert seen["params"][0] == "g1" and "%press%" in seen["params"]
+
+
+@pytest.fixture
+def streamed_logs(monkeypatch):
+    calls = []
+
+    def fake_stream_exercise_logs(user_id, days, **filters):
+        calls.append((user_id, days, filters))
+        return items(LOGS)
+
+    monkeypatch.setattr(main, "stream_exercise_logs", fake_stream_exercise_logs)
+    return calls
+
+
+class TestLogsEndpoint:
+    def test_ndjson(self, api_client, streamed_logs):
+        response = api_client.get("/api/logs?stream=ndjson&days=30")
+        assert response.status_code == 200
+        assert response.headers["content-type"] == NDJSON_MEDIA_TYPE
+        assert [json.loads(line) for line in response.text.splitlines()] == LOGS
+        assert streamed_logs[0][:2] == ("g1", 30)
+
+    def test_json(self, api_client, streamed_logs):
+        response = api_client.get("/api/logs?stream=json")
+        assert response.json() == {"success": True, "logs": LOGS}
+
+    def test_unknown_format(self, api_client, streamed_logs):
+        assert api_client.get("/api/logs?stream=xml").status_code == 400
+        assert streamed_logs == []
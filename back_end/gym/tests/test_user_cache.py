@@ -0,0 +1,161 @@
+# test_user_cache.py
+"""
+Caché de usuarios de get_current_user (user-012): TTLCache de utils/cache.py,
+aciertos e invalidación en auth_service/async_auth_service. Sin Postgres: las
+consultas se sustituyen.
+"""
+import asyncio
+from contextlib import contextmanager
+
+import pytest
+
+from back_end.gym.services import async_auth_service, auth_service
+from back_end.gym.utils import cache as cache_module
+from back_end.gym.utils.cache import TTLCache
+
+ROW = (7, "123", "g7", "ana@example.com", "Ana", None, None, None)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module.time, "monotonic", clock)
+    return clock
+
+
+class TestTTLCache:
+    def test_hit_miss_and_expiry(self, clock):
+        cache = TTLCache(maxsize=10, ttl=5)
+        cache.set("a", 1)
+        assert cache.get("a") == 1
+        clock.now += 5.1
+        assert cache.get("a", "default") == "default"
+        assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1 and len(cache) == 0
+
+    def test_per_entry_ttl(self, clock):
+        cache = TTLCache(ttl=60)
+        cache.set("short", 1, ttl=1)
+        cache.set("long", 2)
+        clock.now += 2
+        assert cache.get("short") is None and cache.get("long") == 2
+
+    def test_evicts_the_least_recently_used(self, clock):
+        cache = TTLCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        assert cache.get("b") is None and cache.get("a") == 1 and cache.get("c") == 3
+        assert cache.stats()["evictions"] == 1
+
+    def test_invalidate_and_clear(self):
+        cache = TTLCache()
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.invalidate("a", "missing")
+        assert cache.get("a") is None and cache.get("b") == 2
+        cache.clear()
+        assert len(cache) == 0
+
+
+@pytest.fixture(autouse=True)
+def empty_user_cache():
+    auth_service.USER_CACHE.clear()
+    yield
+    auth_service.USER_CACHE.clear()
+
+
+@pytest.fixture
+def fetches(monkeypatch):
+    """Sustituye la consulta asíncrona del usuario; devuelve la lista de consultas hechas."""
+    calls = []
+
+    async def fake_fetch_one(query, params, func_name):
+        calls.append(params)
+        return ROW
+
+    monkeypatch.setattr(async_auth_service, "ASYNC_DB_AVAILABLE", True)
+    monkeypatch.setattr(async_auth_service, "_fetch_one", fake_fetch_one)
+    return calls
+
+
+def get_user(user_id):
+    return asyncio.run(async_auth_service.get_user_by_id(user_id))
+
+
+class TestGetUserById:
+    def test_second_lookup_is_served_from_the_cache(self, fetches):
+        assert get_user(7)["display_name"] == "Ana"
+        assert get_user("7")["google_id"] == "g7"
+        assert fetches == [(7,)]
+
+    def test_callers_get_copies(self, fetches):
+        get_user(7)["display_name"] = "Otra"
+        assert get_user(7)["display_name"] == "Ana"
+
+    def test_invalidate_forces_a_new_query(self, fetches):
+        get_user(7)
+        async_auth_service.invalidate_user(7, None)
+        get_user(7)
+        assert len(fetches) == 2
+
+    def test_sync_and_async_share_the_cache(self, fetches, monkeypatch):
+        get_user(7)
+        monkeypatch.setattr(auth_service, "get_db_connection", None)  # Fallaría si consultara la BD
+        assert auth_service.get_user_by_id(7)["email"] == "ana@example.com"
+
+    def test_missing_users_are_not_cached(self, monkeypatch):
+        calls = []
+
+        async def not_found(query, params, func_name):
+            calls.append(params)
+            return None
+
+        monkeypatch.setattr(async_auth_service, "ASYNC_DB_AVAILABLE", True)
+        monkeypatch.setattr(async_auth_service, "_fetch_one", not_found)
+        assert get_user(8) is None and get_user(8) is None
+        assert len(calls) == 2
+
+
+class FakeCursor:
+    def __init__(self, results):
+        self.results = results
+        self.executed = []
+
+    def execute(self, sql, params=None):
+        self.executed.append(sql)
+
+    def fetchone(self):
+        return self.results.pop(0)
+
+    def close(self):
+        pass
+
+
+def test_get_or_create_user_invalidates_the_cached_user(fetches, monkeypatch):
+    get_user(7)
+    cur = FakeCursor([(7,)])  # Encontrado por Google ID: se actualiza
+
+    class FakeConnection:
+        def cursor(self):
+            return cur
+
+        def commit(self):
+            pass
+
+    @contextmanager
+    def fake_connection():
+        yield FakeConnection()
+
+    monkeypatch.setattr(auth_service, "get_db_connection", fake_connection)
+    assert auth_service.get_or_create_user(google_id="g7", display_name="Ana María") == 7
+    assert any("UPDATE" in sql for sql in cur.executed)
+    assert auth_service.cached_user(7) is None
@@ -0,0 +1,95 @@
+# Archivo: utils/cache.py
+"""
+Caché en memoria del proceso con expulsión LRU y caducidad (TTL) por entrada.
+
+Pensada para datos pequeños que se leen en casi todas las peticiones (p.ej. el
+usuario autenticado). Es segura entre hilos: las funciones síncronas que corren
+en el threadpool y las rutas async comparten la misma instancia.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Caché LRU con caducidad por entrada y contadores de aciertos/fallos.
+
+    Args:
+        maxsize (int): Número máximo de entradas; al superarlo se expulsa la menos usada.
+        ttl (float): Segundos de vida por defecto de cada entrada.
+        name (str): Nombre para las métricas.
+    """
+
+    def __init__(self, maxsize=1024, ttl=60.0, name="cache"):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.name = name
+        self._data = OrderedDict()  # key -> (expira_en, valor)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        """Devuelve el valor vigente de 'key' (y lo marca como usado) o 'default'."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value, ttl=None):
+        """
+        Guarda 'value' en 'key'.
+
+        Args:
+            ttl (float, optional): Segundos de vida de esta entrada (por defecto self.ttl).
+        """
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, *keys):
+        """Elimina las claves indicadas (las que no existan se ignoran)."""
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        """Vacía la caché (los contadores se conservan)."""
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        """
+        Métricas de la caché.
+
+        Returns:
+            dict: name, size, maxsize, ttl, hits, misses, evictions y hit_ratio.
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "name": self.name,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            }
+
+    def __len__(self):
+        return len(self._data)
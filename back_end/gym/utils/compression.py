@@ -0,0 +1,85 @@
+# Archivo: utils/compression.py
+"""
+Compresión de las respuestas HTTP.
+
+Brotli si brotli-asgi está instalado (con gzip para clientes que no aceptan
+'br'); si no, el GZipMiddleware de Starlette. Las respuestas por debajo de
+minimum_size se envían sin comprimir: en cuerpos pequeños la compresión cuesta
+más CPU de lo que ahorra en la red. El NDJSON de los endpoints en streaming
+(?stream=ndjson) no pasa por el compresor, sea brotli o gzip: lo retendría en
+su buffer en lugar de enviar cada línea según se genera. BrotliMiddleware no
+permite excluir tipos de contenido, así que se salta por petición.
+"""
+
+import logging
+from urllib.parse import parse_qs
+
+from starlette.middleware.gzip import GZipMiddleware
+
+from .streaming import NDJSON_MEDIA_TYPE
+
+try:
+    from brotli_asgi import BrotliMiddleware
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BrotliMiddleware = None
+    BROTLI_AVAILABLE = False
+
+try:
+    from starlette.middleware.gzip import DEFAULT_EXCLUDED_CONTENT_TYPES
+    _GZIP_OPTIONS = {"exclude_content_types": DEFAULT_EXCLUDED_CONTENT_TYPES + (NDJSON_MEDIA_TYPE,)}
+except ImportError:
+    _GZIP_OPTIONS = {}
+
+logger = logging.getLogger(__name__)
+
+
+def is_ndjson_stream_request(scope):
+    """True si la petición pide una respuesta NDJSON en streaming (?stream=ndjson)."""
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    return "ndjson" in query.get("stream", [])
+
+
+class StreamingAwareCompression:
+    """
+    Middleware ASGI que comprime con 'middleware' salvo el NDJSON en streaming.
+
+    Args:
+        app: Aplicación ASGI.
+        middleware: Clase del middleware de compresión (BrotliMiddleware o GZipMiddleware).
+        **options: Argumentos del middleware de compresión.
+    """
+
+    def __init__(self, app, middleware, **options):
+        self.app = app
+        self.compressed_app = middleware(app, **options)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and is_ndjson_stream_request(scope):
+            await self.app(scope, receive, send)
+        else:
+            await self.compressed_app(scope, receive, send)
+
+
+def add_compression_middleware(app, minimum_size=1024, level=5):
+    """
+    Añade a la app el middleware de compresión disponible.
+
+    Args:
+        app (FastAPI): Aplicación.
+        minimum_size (int): Tamaño mínimo (bytes) del cuerpo para comprimir.
+        level (int): Nivel de compresión (calidad 0-11 en brotli, 1-9 en gzip).
+
+    Returns:
+        str: 'br' o 'gzip', según el middleware añadido.
+    """
+    if BROTLI_AVAILABLE:
+        app.add_middleware(StreamingAwareCompression, middleware=BrotliMiddleware, minimum_size=minimum_size,
+                           quality=min(level, 11), gzip_fallback=True)
+        encoding = "br"
+    else:
+        app.add_middleware(StreamingAwareCompression, middleware=GZipMiddleware, minimum_size=minimum_size,
+                           compresslevel=max(1, min(level, 9)), **_GZIP_OPTIONS)
+        encoding = "gzip"
+    logger.info(f"Compresión de respuestas: {encoding} a partir de {minimum_size} bytes (nivel {level}).")
+    return encoding
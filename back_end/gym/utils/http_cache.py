@@ -0,0 +1,64 @@
+# Archivo: utils/http_cache.py
+"""
+Respuestas JSON cacheadas en el servidor con ETag fuerte y GET condicional.
+
+La clave identifica por completo la representación: (endpoint, usuario, versión
+de datos, parámetros ya validados). El ETag es un hash de la clave, de modo que
+un 'If-None-Match' que coincide se responde con 304 sin calcular nada (solo se
+ha leído la versión de datos); si no coincide, el cuerpo se sirve desde la
+caché o se genera una vez y se guarda.
+"""
+
+import hashlib
+
+from fastapi.responses import Response
+
+from .json_response import dumps
+
+# no-cache: el navegador puede guardar la respuesta pero debe revalidarla (304)
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(key):
+    """ETag fuerte (entre comillas) de una clave de caché."""
+    return '"' + hashlib.sha256(repr(key).encode()).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match, etag):
+    """
+    Comprueba un If-None-Match contra el ETag (comparación débil, RFC 9110).
+
+    Args:
+        if_none_match (str | None): Cabecera recibida ('*' o lista separada por comas).
+        etag (str): ETag actual.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+async def cached_json_response(request, cache, key, build):
+    """
+    Devuelve 304, el cuerpo cacheado o el recién generado por 'build'.
+
+    Args:
+        request (Request): Petición (para If-None-Match).
+        cache (TTLCache): Caché de cuerpos ya serializados.
+        key (tuple): Clave hashable de la representación (debe incluir la versión de datos).
+        build (callable): Corrutina sin argumentos que devuelve el contenido (dict);
+            sus excepciones se propagan y no se cachea nada.
+
+    Returns:
+        Response: 304 Not Modified o 200 con el JSON, ambos con ETag.
+    """
+    etag = make_etag(key)
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    body = cache.get(key)
+    if body is None:
+        body = dumps(await build())
+        cache.set(key, body)
+    return Response(content=body, media_type="application/json", headers=headers)
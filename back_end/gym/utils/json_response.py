@@ -0,0 +1,66 @@
+# Archivo: utils/json_response.py
+"""
+Serialización JSON de las respuestas de la API.
+
+Con orjson (si está instalado) el cuerpo se codifica en C y directamente a
+bytes. date/datetime salen en ISO 8601 (como .isoformat()), Decimal como
+número y los escalares/arrays de NumPy como sus valores Python, de modo que
+las rutas pueden devolver las filas de la BD sin convertirlas a mano. Sin
+orjson se usa json de la biblioteca estándar con las mismas conversiones.
+
+FastJSONResponse es la response_class por defecto de la app (app_fastapi.py).
+"""
+
+import datetime
+import json
+from decimal import Decimal
+
+import numpy as np
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+if ORJSON_AVAILABLE:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _default(obj):
+    """Tipos que ni orjson ni json serializan por sí mismos."""
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, (datetime.date, datetime.time)):  # solo sin orjson (él los codifica igual)
+        return obj.isoformat()
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    raise TypeError(f"Objeto de tipo {type(obj).__name__} no serializable a JSON")
+
+
+def dumps(content) -> bytes:
+    """
+    Codifica 'content' como JSON compacto en UTF-8.
+
+    Args:
+        content: dict/list con str, números, bool, None, date/datetime, Decimal o tipos NumPy.
+
+    Returns:
+        bytes: Documento JSON (NaN/Infinity se codifican como null con orjson).
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(content, default=_default, option=_ORJSON_OPTIONS)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse que serializa con dumps() (orjson si está disponible)."""
+
+    def render(self, content) -> bytes:
+        return dumps(content)
@@ -0,0 +1,203 @@
+# Archivo: utils/logging_setup.py
+"""
+Configuración de logging del backend.
+
+- Los registros se encolan con un QueueHandler y un QueueListener los escribe
+  en su propio hilo: la petición no espera a la E/S de stdout.
+- Salida JSON (una línea por registro) con el request_id de la petición en curso
+  (ver RequestIdMiddleware en middlewares.py). LOG_FORMAT=text da el formato clásico.
+- Niveles por logger desde el entorno:
+      LOG_LEVEL=INFO
+      LOG_LEVELS="services.database=DEBUG,uvicorn.access=WARNING"
+- Muestreo de DEBUG: LOG_DEBUG_SAMPLE_RATE=0.1 deja pasar ~1 de cada 10 líneas DEBUG.
+- Los secretos conocidos (tokens Bearer, JWT, valores de las variables de entorno
+  sensibles) se sustituyen por [REDACTED] antes de escribir.
+"""
+
+import os
+import re
+import sys
+import copy
+import json
+import queue
+import atexit
+import random
+import logging
+import datetime
+import contextvars
+from logging.handlers import QueueHandler, QueueListener
+
+# request_id de la petición en curso (lo fija RequestIdMiddleware)
+REQUEST_ID = contextvars.ContextVar("request_id", default=None)
+
+TEXT_FORMAT = '%(asctime)s - %(name)s [%(levelname)s] [%(request_id)s] - %(message)s'
+
+# Librerías ruidosas: se pueden sobrescribir con LOG_LEVELS
+DEFAULT_LOGGER_LEVELS = {
+    "uvicorn": "INFO",
+    "uvicorn.access": "WARNING",
+    "fastapi": "INFO",
+    "watchfiles": "WARNING",
+    "httpx": "WARNING",
+    "urllib3": "WARNING",
+    "apscheduler": "INFO",
+}
+
+# Variables de entorno cuyo valor nunca debe llegar a los logs
+SECRET_ENV_VARS = (
+    "TELEGRAM_BOT_API_TOKEN", "SECRET_KEY", "DB_PASSWORD", "LLM_API_KEY",
+    "GOOGLE_CLIENT_SECRET", "FITBIT_CLIENT_SECRET", "LANGCHAIN_API_KEY",
+)
+_SECRET_PATTERNS = [
+    (re.compile(r"(Bearer\s+)[\w\-.~+/]+=*", re.IGNORECASE), r"\1[REDACTED]"),
+    (re.compile(r"eyJ[\w-]+\.[\w-]+\.[\w-]*"), "[REDACTED]"),  # JWT
+]
+
+_listener = None
+
+
+class RequestIdFilter(logging.Filter):
+    """Añade record.request_id (o '-') desde el contexto de la petición."""
+
+    def filter(self, record):
+        record.request_id = REQUEST_ID.get() or "-"
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Deja pasar solo una fracción 'rate' de los registros de nivel <= 'level'."""
+
+    def __init__(self, rate, level=logging.DEBUG):
+        super().__init__()
+        self.rate = rate
+        self.level = level
+
+    def filter(self, record):
+        return record.levelno > self.level or random.random() < self.rate
+
+
+class RedactingFilter(logging.Filter):
+    """Sustituye secretos en el mensaje y en la traza ya formateados."""
+
+    def __init__(self, secrets=()):
+        super().__init__()
+        self.patterns = list(_SECRET_PATTERNS)
+        for secret in secrets:
+            if secret and len(secret) >= 6:
+                self.patterns.append((re.compile(re.escape(secret)), "[REDACTED]"))
+
+    def redact(self, text):
+        for pattern, replacement in self.patterns:
+            text = pattern.sub(replacement, text)
+        return text
+
+    def filter(self, record):
+        record.msg = self.redact(record.getMessage())
+        record.args = None
+        if record.exc_text:
+            record.exc_text = self.redact(record.exc_text)
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Un objeto JSON por registro: ts, level, logger, request_id, message y exc."""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "message": record.getMessage(),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _QueueHandler(QueueHandler):
+    """
+    QueueHandler que solo resuelve el mensaje y la traza en el hilo de la
+    petición; el formato final (JSON o texto) lo hace el hilo del listener.
+    """
+
+    def prepare(self, record):
+        # Copia (como el QueueHandler de la stdlib): el registro original puede
+        # pasar aún por otros handlers del logger o de sus padres
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _parse_levels(spec):
+    """'a=DEBUG,b.c=WARNING' -> {'a': 'DEBUG', 'b.c': 'WARNING'} (ignora entradas mal formadas)."""
+    levels = {}
+    for item in (spec or "").split(","):
+        name, sep, level = item.partition("=")
+        if sep and name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging(stream=None, level=None, fmt=None, sample_rate=None, logger_levels=None):
+    """
+    Configura el logging del proceso (idempotente: una segunda llamada reemplaza la anterior).
+
+    Args:
+        stream: Destino de los registros (por defecto sys.stdout).
+        level (str, optional): Nivel raíz (por defecto LOG_LEVEL o INFO).
+        fmt (str, optional): 'json' o 'text' (por defecto LOG_FORMAT o 'json').
+        sample_rate (float, optional): Fracción de DEBUG que se conserva (LOG_DEBUG_SAMPLE_RATE o 1.0).
+        logger_levels (dict, optional): Niveles por logger; por defecto los de LOG_LEVELS.
+
+    Returns:
+        QueueListener: El listener en marcha.
+    """
+    global _listener
+    shutdown_logging()
+
+    level = (level or os.getenv("LOG_LEVEL", "INFO")).upper()
+    fmt = (fmt or os.getenv("LOG_FORMAT", "json")).lower()
+    if sample_rate is None:
+        sample_rate = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", 1.0))
+    if logger_levels is None:
+        logger_levels = _parse_levels(os.getenv("LOG_LEVELS"))
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT))
+    output.addFilter(RedactingFilter(os.getenv(name) for name in SECRET_ENV_VARS))
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = _QueueHandler(log_queue)
+    if sample_rate < 1.0:
+        queue_handler.addFilter(SamplingFilter(sample_rate))  # Primero: lo descartado no cuesta más
+    queue_handler.addFilter(RequestIdFilter())
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+    for name, logger_level in {**DEFAULT_LOGGER_LEVELS, **logger_levels}.items():
+        logging.getLogger(name).setLevel(logger_level)
+
+    _listener = QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def shutdown_logging():
+    """Detiene el listener vaciando antes la cola (no hace nada si no está en marcha)."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
@@ -0,0 +1,61 @@
+import logging
+
+from .json_response import dumps
+
+logger = logging.getLogger(__name__)
+
+STREAM_FORMATS = ("json", "ndjson")
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def _dumps(item) -> str:
+    return dumps(item).decode("utf-8")
+
+
+async def ndjson_stream(items):
+    """
+    Codifica un iterable asíncrono como NDJSON (un objeto JSON por línea).
+
+    Si el origen falla a mitad, se añade una última línea {"error": ...}: el
+    código HTTP ya se envió y no puede cambiarse.
+
+    Args:
+        items: Iterable asíncrono de objetos serializables.
+
+    Yields:
+        str: Líneas terminadas en '\\n'.
+    """
+    try:
+        async for item in items:
+            yield _dumps(item) + "\n"
+    except Exception as e:
+        logger.exception(f"Error durante el streaming NDJSON: {e}")
+        yield _dumps({"error": "Error interno durante el streaming."}) + "\n"
+
+
+async def json_array_stream(envelope: dict, key: str, items):
+    """
+    Codifica {**envelope, key: [items...]} como JSON sin construir la lista en memoria.
+
+    Si el origen falla a mitad, se cierra el array y se añade "error" para que
+    el documento siga siendo JSON válido.
+
+    Args:
+        envelope (dict): Claves fijas del objeto (p.ej. {"success": True}).
+        key (str): Clave del array.
+        items: Iterable asíncrono con los elementos del array.
+
+    Yields:
+        str: Fragmentos del documento JSON.
+    """
+    yield _dumps(envelope)[:-1] + ("," if envelope else "") + _dumps(key) + ":["
+    first = True
+    try:
+        async for item in items:
+            yield ("" if first else ",") + _dumps(item)
+            first = False
+    except Exception as e:
+        logger.exception(f"Error durante el streaming JSON: {e}")
+        yield '],"error":' + _dumps("Error interno durante el streaming.") + "}"
+        return
+    yield "]}"
@@ -3,6 +3,7 @@
 import datetime
 import json
 import logging
+import os
 from typing import Any, Dict, List, Optional
 
 import psycopg2
@@ -35,6 +36,9 @@ except ImportError:
         'options': f'-c search_path=gym,public'
     }
 
+# Filas por viaje de los cursores de servidor
+CURSOR_ITERSIZE = int(os.getenv('DB_CURSOR_ITERSIZE', 2000))
+
 @traceable(run_type="tool")
 def get_recent_exercises(user_id: str, days: int = 7, exercise_name: str = None) -> str:
     """
@@ -50,7 +54,9 @@ def get_recent_exercises(user_id: str, days: int = 7, exercise_name: str = None)
     """
     try:
         conn = psycopg2.connect(**DB_CONFIG)
-        cur = conn.cursor()
+        # Cursor de servidor: las filas se leen por bloques en lugar de con fetchall()
+        cur = conn.cursor(name="recent_exercises")
+        cur.itersize = CURSOR_ITERSIZE
         
         cutoff = datetime.datetime.now() - datetime.timedelta(days=days)
         cutoff_str = cutoff.strftime('%Y-%m-%d %H:%M:%S')
@@ -99,10 +105,8 @@ def get_recent_exercises(user_id: str, days: int = 7, exercise_name: str = None)
                 """
                 cur.execute(query, (cutoff_str, user_id))
             
-        rows = cur.fetchall()
-        
         logs = []
-        for row in rows:
+        for row in cur:
             fecha = row[0].strftime('%Y-%m-%d %H:%M:%S')
             ejercicio = row[1]
             repeticiones = row[2]
@@ -161,23 +165,21 @@ def get_exercise_stats(user_id: str, exercise_name: str = None) -> str:
         
         # Si se especifica un ejercicio, obtener sus estadísticas
         if exercise_name:
-            # Query para obtener todos los ejercicios del tipo específico
-            if has_uuid:
-                query = """
-                    SELECT fecha, repeticiones 
-                    FROM ejercicios 
-                    WHERE (user_id = %s OR user_uuid = %s) AND LOWER(ejercicio) = LOWER(%s) AND repeticiones IS NOT NULL
-                    ORDER BY fecha
-                """
-                cur.execute(query, (user_id, user_uuid, exercise_name))
-            else:
-                query = """
-                    SELECT fecha, repeticiones 
-                    FROM ejercicios 
-                    WHERE user_id = %s AND LOWER(ejercicio) = LOWER(%s) AND repeticiones IS NOT NULL
-                    ORDER BY fecha
-                """
-                cur.execute(query, (user_id, exercise_name))
+            # Peso máximo y volumen por sesión agregados en SQL sobre ejercicio_sets
+            # (una fila por serie) en lugar de decodificar el JSONB fila a fila
+            user_filter = "(e.user_id = %s OR e.user_uuid = %s)" if has_uuid else "e.user_id = %s"
+            user_params = (user_id, user_uuid) if has_uuid else (user_id,)
+            query = f"""
+                SELECT e.fecha,
+                       GREATEST(COALESCE(MAX(s.weight), 0), 0) AS max_peso,
+                       COALESCE(SUM(s.reps * s.weight), 0) AS volumen
+                FROM ejercicios e
+                LEFT JOIN ejercicio_sets s ON s.ejercicio_id = e.id
+                WHERE {user_filter} AND LOWER(e.ejercicio) = LOWER(%s) AND e.repeticiones IS NOT NULL
+                GROUP BY e.id, e.fecha
+                ORDER BY e.fecha
+            """
+            cur.execute(query, user_params + (exercise_name,))
             
             rows = cur.fetchall()
             
@@ -188,38 +190,9 @@ def get_exercise_stats(user_id: str, exercise_name: str = None) -> str:
             }
             
             if rows:
-                # Listas para acumular datos
-                max_pesos = []
-                volumen_por_sesion = []
-                fechas = []
-                
-                for row in rows:
-                    fecha = row[0].strftime('%Y-%m-%d %H:%M:%S')
-                    fechas.append(fecha)
-                    rep_data = row[1]
-                    
-                    # Parsear datos de repeticiones
-                    try:
-                        if isinstance(rep_data, str):
-                            series = json.loads(rep_data)
-                        else:
-                            series = rep_data
-                        
-                        # Calcular peso máximo y volumen para esta sesión
-                        max_peso_sesion = 0
-                        volumen_sesion = 0
-                        
-                        for serie in series:
-                            if isinstance(serie, dict):
-                                reps = serie.get('repeticiones', 0)
-                                peso = serie.get('peso', 0)
-                                max_peso_sesion = max(max_peso_sesion, peso)
-                                volumen_sesion += reps * peso
-                        
-                        max_pesos.append(max_peso_sesion)
-                        volumen_por_sesion.append(volumen_sesion)
-                    except (json.JSONDecodeError, TypeError, AttributeError) as e:
-                        logger.warning(f"Error parsing repetition data: {e}")
+                fechas = [row[0].strftime('%Y-%m-%d %H:%M:%S') for row in rows]
+                max_pesos = [row[1] for row in rows]
+                volumen_por_sesion = [row[2] for row in rows]
                 
                 # Añadir estadísticas
                 if max_pesos:
@@ -289,6 +262,41 @@ def get_exercise_stats(user_id: str, exercise_name: str = None) -> str:
         logger.error(f"Error getting exercise stats: {e}")
         return f"Error al obtener estadísticas de ejercicios: {str(e)}"
 
+def _get_last_session_sets(user_id: str, exercise_name: str, days: int = 30) -> Optional[List[tuple]]:
+    """
+    Series (repeticiones, peso) de la sesión más reciente del ejercicio.
+    
+    Returns:
+        Lista de tuplas en orden de serie, o None si no hay sesiones en el periodo
+    """
+    try:
+        user_uuid = int(user_id)
+        user_filter = "(user_id = %s OR user_uuid = %s)"
+        user_params = (user_id, user_uuid)
+    except ValueError:
+        user_filter = "user_id = %s"
+        user_params = (user_id,)
+    
+    cutoff = datetime.datetime.now() - datetime.timedelta(days=days)
+    conn = psycopg2.connect(**DB_CONFIG)
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f"""
+                SELECT id FROM ejercicios
+                WHERE fecha >= %s AND {user_filter} AND LOWER(ejercicio) = LOWER(%s)
+                ORDER BY fecha DESC LIMIT 1
+            """, (cutoff,) + user_params + (exercise_name,))
+            row = cur.fetchone()
+            if row is None:
+                return None
+            cur.execute("""
+                SELECT COALESCE(reps, 0), COALESCE(weight, 0) FROM ejercicio_sets
+                WHERE ejercicio_id = %s ORDER BY set_index
+            """, (row[0],))
+            return cur.fetchall()
+    finally:
+        conn.close()
+
 @traceable(run_type="tool")
 def recommend_exercise_progression(user_id: str, exercise_name: str) -> str:
     """
@@ -306,9 +314,8 @@ def recommend_exercise_progression(user_id: str, exercise_name: str) -> str:
         stats_data = get_exercise_stats(user_id, exercise_name)
         stats = json.loads(stats_data)
         
-        # Obtener el último workout
-        recent_data = get_recent_exercises(user_id, days=30, exercise_name=exercise_name)
-        recent_workouts = json.loads(recent_data)
+        # Series del último workout (últimos 30 días) leídas de ejercicio_sets
+        series = _get_last_session_sets(user_id, exercise_name, days=30)
         
         # Preparar la recomendación
         recommendation = {
@@ -318,29 +325,22 @@ def recommend_exercise_progression(user_id: str, exercise_name: str) -> str:
         }
         
         # Si hay workouts recientes, usar el último como base
-        if recent_workouts and len(recent_workouts) > 0:
-            ultimo_workout = recent_workouts[0]
-            series = ultimo_workout.get("series", [])
-            
-            if series and len(series) > 0:
+        if series is not None:
+            if series:
                 # Calcular siguientes series recomendadas (incremento aproximado del 5%)
                 nuevas_series = []
                 
-                for serie in series:
-                    if isinstance(serie, dict):
-                        reps = serie.get("repeticiones", 0)
-                        peso = serie.get("peso", 0)
-                        
-                        # Incrementar peso en ~5% (redondeado a 2.5kg)
-                        nuevo_peso = round(peso * 1.05 / 2.5) * 2.5
-                        
-                        if nuevo_peso <= peso:
-                            nuevo_peso = peso + 2.5
-                        
-                        nuevas_series.append({
-                            "repeticiones": reps,
-                            "peso": nuevo_peso
-                        })
+                for reps, peso in series:
+                    # Incrementar peso en ~5% (redondeado a 2.5kg)
+                    nuevo_peso = round(peso * 1.05 / 2.5) * 2.5
+                    
+                    if nuevo_peso <= peso:
+                        nuevo_peso = peso + 2.5
+                    
+                    nuevas_series.append({
+                        "repeticiones": reps,
+                        "peso": nuevo_peso
+                    })
                 
                 recommendation["recomendacion"] = {
                     "series_recomendadas": nuevas_series,
@@ -16,6 +16,10 @@ import ActivityHeatmap from './heatmap/ActivityHeatmap';
 // Importar CSS
 import './Dashboard.css';
 
+// Máximo de puntos por serie que devuelve el backend (reducción LTTB en el servidor)
+const MAX_CHART_POINTS = 300;
+const EMPTY_SERIES = { weight: [], e1rm: [], volume: [], reps: [] };
+
 // --- Función Auxiliar --- (Podría ir a un archivo utils)
 const formatDate = (date) => {
   const d = new Date(date);
@@ -34,31 +38,39 @@ function Dashboard() {
   const [dateFrom, setDateFrom] = useState('');
   const [dateTo, setDateTo] = useState('');
   const [metricsData, setMetricsData] = useState({});
-  const [sessionData, setSessionData] = useState([]); // Datos para los gráficos y tabla
+  const [chartSeries, setChartSeries] = useState(EMPTY_SERIES); // Series ya reducidas para cada gráfico
   const [loadingExercises, setLoadingExercises] = useState(true); // Carga inicial de ejercicios
   const [loadingChartData, setLoadingChartData] = useState(false); // Carga al aplicar filtros
   const [error, setError] = useState(null);
   const [apiResponse, setApiResponse] = useState(null); // Guardar toda la respuesta
+  const [appliedFilters, setAppliedFilters] = useState(null); // Filtros con los que SessionsTable pagina /api/logs
+  const [heatmapData, setHeatmapData] = useState(null); // Llega en el mismo bundle que la lista de ejercicios
+  const [heatmapError, setHeatmapError] = useState(null);
 
-  // --- Carga Inicial ---
+  // --- Carga Inicial: lista de ejercicios y heatmap en una sola llamada ---
   const loadExercises = useCallback(async () => {
     setLoadingExercises(true);
     setError(null);
+    setHeatmapError(null);
     try {
-      const response = await axios.get('/api/ejercicios_stats'); // Llama sin params
-      let exercises = response.data?.ejercicios_disponibles;
-      if (!exercises || exercises.length === 0) {
-         exercises = response.data?.ejercicios || response.data?.data || [];
-      }
-      if (exercises && exercises.length > 0) {
+      const year = new Date().getFullYear();
+      const response = await axios.get(`/api/dashboard/bundle?fields=ejercicios,heatmap&year=${year}`);
+      const exercises = response.data?.ejercicios_disponibles || [];
+      if (exercises.length > 0) {
         setExerciseList(exercises);
       } else {
         console.warn("No se encontraron ejercicios. Usando fallback.");
         setExerciseList(["press banca", "press militar", "sentadilla"]);
       }
+      if (Array.isArray(response.data?.heatmap?.data)) {
+        setHeatmapData(response.data.heatmap.data);
+      } else {
+        setHeatmapError("Error al cargar mapa de actividad.");
+      }
     } catch (err) {
       console.error('Error al cargar ejercicios:', err);
       setError("Error al cargar la lista de ejercicios.");
+      setHeatmapError("Error al cargar mapa de actividad.");
       setExerciseList(["press banca", "press militar"]);
     } finally {
       setLoadingExercises(false);
@@ -89,33 +101,43 @@ function Dashboard() {
 
     setLoadingChartData(true);
     setError(null);
-    setSessionData([]); // Limpiar datos previos
+    setChartSeries(EMPTY_SERIES); // Limpiar datos previos
     setMetricsData({});
     setApiResponse(null); // Limpiar respuesta completa previa
+    setAppliedFilters(null);
 
     try {
-      let url = `/api/ejercicios_stats?ejercicio=${encodeURIComponent(selectedExercise)}`;
+      let url = `/api/dashboard/bundle?fields=datos,resumen&ejercicio=${encodeURIComponent(selectedExercise)}`;
       if (dateFrom) url += `&desde=${dateFrom}`;
       if (dateTo) url += `&hasta=${dateTo}`;
+      url += `&max_points=${MAX_CHART_POINTS}`; // 'series' reducidas en lugar de todas las sesiones
 
       const response = await axios.get(url);
       setApiResponse(response.data); // Guardar toda la respuesta
 
       if (response.data.success) {
-        const data = response.data.datos; // Usar siempre 'datos' según tu backend corregido
+        const series = response.data.series || {};
+        const totalSessions = response.data.series_info?.sesiones || 0;
         const summary = response.data.resumen;
 
-        if (data && Array.isArray(data) && data.length > 0) {
-          console.log(`Datos recibidos para ${selectedExercise}: ${data.length} entradas`);
-          setSessionData(data);
+        if (totalSessions > 0) {
+          console.log(`Datos recibidos para ${selectedExercise}: ${totalSessions} sesiones`);
+          // Cada punto solo trae su métrica: los gráficos filtran por clave
+          setChartSeries({
+            weight: [...(series.max_peso || []), ...(series.avg_peso || [])],
+            e1rm: series.max_e1rm_session || [],
+            volume: series.volumen || [],
+            reps: series.total_reps || [],
+          });
+          setAppliedFilters({ ejercicio: selectedExercise, desde: dateFrom, hasta: dateTo });
           if (summary) {
              setMetricsData(summary);
           } else {
               // Calcular resumen básico si no viene
               setMetricsData({
-                  total_sesiones: data.length,
-                  max_weight_ever: Math.max(0, ...data.map(d => d.max_peso || 0)),
-                  max_volume_session: Math.max(0, ...data.map(d => d.volumen || 0)),
+                  total_sesiones: totalSessions,
+                  max_weight_ever: Math.max(0, ...(series.max_peso || []).map(d => d.max_peso || 0)),
+                  max_volume_session: Math.max(0, ...(series.volumen || []).map(d => d.volumen || 0)),
                   // Añadir más cálculos si es necesario
               });
           }
@@ -191,31 +213,31 @@ function Dashboard() {
 
           {/* Gráfico Principal */}
           <Grid item xs={12} md={9}>
-            <WeightProgressionChart data={sessionData} />
+            <WeightProgressionChart data={chartSeries.weight} />
           </Grid>
           {/* <<< NUEVO: Gráfico e1RM >>> */}
            <Grid item xs={12} md={9}> {/* Ocupa el mismo espacio que el de peso */}
-             <E1RMProgressionChart data={sessionData} />
+             <E1RMProgressionChart data={chartSeries.e1rm} />
            </Grid>
 
           {/* Tabla Sesiones */}
           <Grid item xs={12} lg={6}>
-             <SessionsTable sessionData={sessionData} />
+             <SessionsTable filters={appliedFilters} />
           </Grid>
 
           {/* Gráfico Volumen */}
           <Grid item xs={12} sm={6} lg={3}>
-             <VolumeChart data={sessionData} />
+             <VolumeChart data={chartSeries.volume} />
           </Grid>
 
           {/* Gráfico Repeticiones */}
            <Grid item xs={12} sm={6} lg={3}>
-             <RepsChart data={sessionData} />
+             <RepsChart data={chartSeries.reps} />
           </Grid>
 
            {/* Mapa de Calor */}
            <Grid item xs={12}>
-             <ActivityHeatmap />
+             <ActivityHeatmap data={heatmapData} loading={loadingExercises} error={heatmapError} />
            </Grid>
         </Grid>
       )}
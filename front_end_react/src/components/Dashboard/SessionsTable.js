@@ -1,8 +1,50 @@
 // src/components/Dashboard/SessionsTable.js
-import React from 'react';
-import { Card, CardContent, Typography, Box, Divider } from '@mui/material';
+import React, { useState, useEffect, useCallback } from 'react';
+import axios from 'axios';
+import { Card, CardContent, Typography, Box, Divider, Button, CircularProgress } from '@mui/material';
 
-function SessionsTable({ sessionData = [] }) { // Valor por defecto []
+// Sesiones por página: la tabla pide páginas acotadas a /api/logs (paginación por cursor)
+const PAGE_SIZE = 10;
+
+function SessionsTable({ filters = null }) { // { ejercicio, desde, hasta } aplicados en el Dashboard
+  const [sessions, setSessions] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loading, setLoading] = useState(false);
+  const [error, setError] = useState(null);
+
+  const fetchPage = useCallback(async (cursor) => {
+    const params = { ejercicio: filters.ejercicio, tipo: 'fuerza', limit: PAGE_SIZE };
+    if (filters.desde) params.desde = filters.desde;
+    if (filters.hasta) params.hasta = filters.hasta;
+    if (cursor) params.cursor = cursor;
+
+    setLoading(true);
+    setError(null);
+    try {
+      const response = await axios.get('/api/logs', { params });
+      if (response.data.success) {
+        const logs = response.data.logs || [];
+        setSessions(prev => (cursor ? [...prev, ...logs] : logs));
+        setNextCursor(response.data.next_cursor || null);
+      } else {
+        setError(response.data.message || 'No se pudieron cargar las sesiones');
+      }
+    } catch (err) {
+      console.error('Error al cargar sesiones:', err);
+      setError(err.message || 'Error desconocido');
+    } finally {
+      setLoading(false);
+    }
+  }, [filters]);
+
+  // Primera página cada vez que cambian los filtros aplicados
+  useEffect(() => {
+    setSessions([]);
+    setNextCursor(null);
+    if (filters && filters.ejercicio) {
+      fetchPage(null);
+    }
+  }, [filters, fetchPage]);
 
   const formatDate = (dateString) => {
      if (!dateString) return 'N/A';
@@ -27,26 +69,17 @@ function SessionsTable({ sessionData = [] }) { // Valor por defecto []
             <thead>
               <tr>
                 <th>Fecha</th>
-                {/* <th>Series Detalle</th> // Quitado si no se envían las series */}
                 <th>Peso Máx.</th>
                 <th>Reps Totales</th>
                 <th>Volumen</th>
               </tr>
             </thead>
             <tbody>
-              {sessionData.length > 0 ? (
-                // Mostrar solo las últimas 10 o menos si hay pocas
-                sessionData.slice(-10).reverse().map((session, index) => (
-                  <tr key={index}>
+              {sessions.length > 0 ? (
+                // Las páginas llegan ya ordenadas de más reciente a más antigua
+                sessions.map((session) => (
+                  <tr key={session.id}>
                     <td>{formatDate(session.fecha)}</td>
-                    {/*
-                    // Descomentar si decides enviar las series desde el backend
-                    <td>
-                      {session.series && Array.isArray(session.series)
-                        ? session.series.map(s => `${s.repeticiones}x${s.peso}kg`).join(' ')
-                        : 'N/A'}
-                    </td>
-                    */}
                     <td>{session.max_peso ?? 0} kg</td>
                     <td>{session.total_reps ?? 0}</td>
                     <td>{session.volumen ?? 0} kg</td>
@@ -55,16 +88,28 @@ function SessionsTable({ sessionData = [] }) { // Valor por defecto []
               ) : (
                 <tr className="empty-state">
                   <td colSpan="4"> {/* Ajustar colSpan si cambias columnas */}
-                     Selecciona un ejercicio y aplica filtros para ver sus datos.
+                     {loading ? 'Cargando sesiones...' : 'Selecciona un ejercicio y aplica filtros para ver sus datos.'}
                   </td>
                 </tr>
               )}
             </tbody>
           </table>
         </Box>
+        {error && (
+          <Typography variant="body2" color="error" sx={{ mt: 1 }}>
+            Error al cargar sesiones: {error}
+          </Typography>
+        )}
+        {nextCursor && (
+          <Box sx={{ display: 'flex', justifyContent: 'center', mt: 2 }}>
+            <Button variant="outlined" size="small" onClick={() => fetchPage(nextCursor)} disabled={loading}>
+              {loading ? <CircularProgress size={20} /> : 'Cargar más'}
+            </Button>
+          </Box>
+        )}
       </CardContent>
     </Card>
   );
 }
 
-export default SessionsTable;
\ No newline at end of file
+export default SessionsTable;
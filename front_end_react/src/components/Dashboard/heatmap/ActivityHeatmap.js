@@ -1,39 +1,11 @@
 // src/components/Dashboard/heatmap/ActivityHeatmap.js
-import React, { useEffect, useRef, useState, useCallback } from 'react';
-import axios from 'axios';
+import React, { useEffect, useRef } from 'react';
 import * as d3 from 'd3';
 import { Card, CardContent, Typography, Box, Divider, CircularProgress } from '@mui/material';
 
-function ActivityHeatmap() {
+// Los datos los carga Dashboard en /api/dashboard/bundle junto con la lista de ejercicios
+function ActivityHeatmap({ data: heatmapData, loading: loadingHeatmap, error: heatmapError }) {
   const heatmapRef = useRef(null);
-  const [heatmapData, setHeatmapData] = useState(null);
-  const [loadingHeatmap, setLoadingHeatmap] = useState(true);
-  const [heatmapError, setHeatmapError] = useState(null);
-
-  // Cargar datos del heatmap
-  const loadActivityHeatmap = useCallback(async () => {
-    setLoadingHeatmap(true);
-    setHeatmapError(null);
-    try {
-      const year = new Date().getFullYear();
-      const response = await axios.get(`/api/calendar_heatmap?year=${year}`);
-      if (response.data.success && Array.isArray(response.data.data)) {
-        setHeatmapData(response.data.data);
-      } else {
-        throw new Error(response.data.message || "Respuesta inválida del heatmap");
-      }
-    } catch (error) {
-      console.error('Error al cargar datos de actividad:', error);
-      setHeatmapError("Error al cargar mapa de actividad.");
-    } finally {
-      setLoadingHeatmap(false);
-    }
-  }, []);
-
-  // Efecto para cargar datos al montar
-  useEffect(() => {
-    loadActivityHeatmap();
-  }, [loadActivityHeatmap]);
 
   // Efecto para dibujar el mapa cuando los datos cambien
   useEffect(() => {
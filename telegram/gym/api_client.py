@@ -10,6 +10,8 @@ load_dotenv()
 # Configuración
 BASE_URL = os.getenv('API_BASE_URL', 'http://localhost:5050')
 TELEGRAM_BOT_API_TOKEN = os.getenv('TELEGRAM_BOT_API_TOKEN', '')
+# Logs por mensaje de /logs: el bot pide páginas acotadas en lugar de toda la ventana
+LOGS_PAGE_SIZE = int(os.getenv('LOGS_PAGE_SIZE', 30))
 
 if not TELEGRAM_BOT_API_TOKEN:
     logging.warning("⚠️ TELEGRAM_BOT_API_TOKEN no está configurado en el archivo .env")
@@ -26,20 +28,24 @@ class ApiClient:
         }
     
     @staticmethod
-    def get_logs(telegram_id, days=7):
+    def get_logs(telegram_id, days=7, limit=LOGS_PAGE_SIZE, cursor=None):
         """
-        Obtiene los logs de ejercicios para un usuario.
+        Obtiene una página de logs de ejercicios para un usuario (más recientes primero).
         
         Args:
             telegram_id (str): ID de Telegram del usuario
             days (int): Número de días hacia atrás para obtener logs
+            limit (int): Logs por página
+            cursor (str, optional): 'next_cursor' de la página anterior
             
         Returns:
-            dict: Respuesta de la API con los logs
+            dict: Respuesta de la API con los logs y 'next_cursor' (None en la última página)
         """
         try:
-            url = f"{BASE_URL}/api/logs?telegram_id={telegram_id}&days={days}"
-            response = requests.get(url, headers=ApiClient.get_headers())
+            params = {"telegram_id": telegram_id, "days": days, "limit": limit}
+            if cursor:
+                params["cursor"] = cursor
+            response = requests.get(f"{BASE_URL}/api/logs", params=params, headers=ApiClient.get_headers())
             
             if response.status_code == 200:
                 return response.json()
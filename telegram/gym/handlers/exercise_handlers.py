@@ -43,7 +43,7 @@ def register_exercise_handlers(bot):
 
             # Check the structure ApiClient returns on success/error
             if response_data and response_data.get("success") is not False: # Assuming ApiClient returns dict like {'success': True/False, ...}
-                formatted = format_logs(response_data.get('logs', [])) # Assuming logs are under a 'logs' key
+                formatted = format_logs(response_data.get('logs', []), has_more=bool(response_data.get('next_cursor'))) # Assuming logs are under a 'logs' key
                 log_to_console(f"Procesados {len(response_data.get('logs', []))} registros de ejercicios", "PROCESS")
             else:
                 # Handle error reported by ApiClient or default message
@@ -83,7 +83,7 @@ def register_exercise_handlers(bot):
 
                 # Check the structure ApiClient returns on success/error
                 if response_data and response_data.get("success") is not False: # Assuming ApiClient returns dict
-                    formatted = format_logs(response_data.get('logs', [])) # Assuming logs are under 'logs' key
+                    formatted = format_logs(response_data.get('logs', []), has_more=bool(response_data.get('next_cursor'))) # Assuming logs are under 'logs' key
                     log_to_console(f"Procesados {len(response_data.get('logs', []))} registros de ejercicios", "PROCESS")
                 else:
                      # Handle error reported by ApiClient or default message
@@ -215,7 +215,7 @@ def register_exercise_handlers(bot):
                 # Use ApiClient.get_logs
                 response_data = ApiClient.get_logs(telegram_id=telegram_id_str, days=days)
                 if response_data and response_data.get("success") is not False:
-                    formatted = format_logs(response_data.get('logs', []))
+                    formatted = format_logs(response_data.get('logs', []), has_more=bool(response_data.get('next_cursor')))
                 else:
                     error_message = response_data.get("message", "Error desconocido") if response_data else "Error desconocido"
                     formatted = f"Error al obtener los datos: {error_message}"
@@ -75,11 +75,12 @@ def send_message_split(bot, chat_id, text, parse_mode=None):
         bot.send_message(chat_id, fragment, parse_mode=parse_mode)
         log_to_console(f"Fragmento {i//MAX_MESSAGE_LENGTH + 1} enviado a {chat_id}", "INFO")
 
-def format_logs(logs):
+def format_logs(logs, has_more=False):
     """
     Formatea la lista de logs para que se muestre de forma legible.
     Cada log debe tener 'ejercicio', 'fecha' y 'data'.
     Si 'data' es una lista, se muestran los detalles (peso y repeticiones).
+    Si has_more es True (la API devolvió 'next_cursor') se indica que hay más registros.
     """
     if not logs:
         return "No hay registros de ejercicios en el período solicitado."
@@ -102,6 +103,8 @@ def format_logs(logs):
         else:
             formatted += f"Data: {data}\n"
         formatted += "\n"
+    if has_more:
+        formatted += f"Mostrando los {len(logs)} registros más recientes. Usa /logsX con menos días para acotar.\n"
     
     log_to_console(f"Formato completado. {len(formatted)} caracteres generados", "PROCESS")
     return formatted